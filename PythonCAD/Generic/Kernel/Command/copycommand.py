@@ -23,6 +23,7 @@
 from Kernel.exception               import *
 from Kernel.Command.basecommand     import *
 from Kernel.GeoEntity.arc           import Arc
+from Kernel.GeoUtil.affine          import translation_matrix
 
 class CopyCommand(BaseCommand):
     """
@@ -38,17 +39,13 @@ class CopyCommand(BaseCommand):
                         "Give me the Base Point: ",
                         "Give me the Destination Point: "]
 
-    def getEntsToSave(self):
+    def getMatrix(self):
         """
-           get entity to save
+           get the affine matrix of the copy
         """
-        updEnts=[]
-        for id in str(self.value[0]).split(','):
-            dbEnt=self.document.getEntity(id)
-            geoEnt=self.document.convertToGeometricalEntity(dbEnt)
-            geoEnt.move(self.value[1], self.value[2])
-            updEnts.append(geoEnt)
-        return updEnts
+        x1, y1=self.value[1].getCoords()
+        x2, y2=self.value[2].getCoords()
+        return translation_matrix(x2-x1, y2-y1)
 
     def applyCommand(self):
         """
@@ -56,10 +53,5 @@ class CopyCommand(BaseCommand):
         """
         if len(self.value)!=3:
             raise PyCadWrongInputData("Wrong number of input parameter")
-        try:
-            self.document.startMassiveCreation()
-            for _ent in self.getEntsToSave():
-                self.document.saveEntity(_ent)
-        finally:
-            self.document.stopMassiveCreation()
+        self.document.transformEntities(str(self.value[0]).split(','), self.getMatrix(), copy=True)
 
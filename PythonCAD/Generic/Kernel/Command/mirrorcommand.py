@@ -24,6 +24,9 @@
 from Kernel.exception               import *
 from Kernel.Command.basecommand     import *
 from Kernel.GeoEntity.point            import Point
+from Kernel.GeoEntity.segment          import Segment
+from Kernel.GeoEntity.cline            import CLine
+from Kernel.GeoUtil.affine             import mirror_matrix
 
 class MirrorCommand(BaseCommand):
     """
@@ -49,17 +52,13 @@ class MirrorCommand(BaseCommand):
                 move=False
         mirrorRef=self.document.getEntity(self.value[1])
         geoMirrorRef=self.document.convertToGeometricalEntity(mirrorRef)
-        updEnts=[]
-        for id in str(self.value[0]).split(','):
-            dbEnt=self.document.getEntity(id)
-            geoEnt=self.document.convertToGeometricalEntity(dbEnt)
-            geoEnt.mirror(geoMirrorRef)
-            if move:
-                dbEnt.setConstructionElements(geoEnt.getConstructionElements())
-                updEnts.append(dbEnt)
-            else:
-                updEnts.append(geoEnt)
-        return updEnts
+        if not isinstance(geoMirrorRef, (CLine, Segment)):
+            raise PyCadWrongInputData("The reference must be a segment or a construction line")
+        x1, y1=geoMirrorRef.getP1().getCoords()
+        x2, y2=geoMirrorRef.getP2().getCoords()
+        return self.document.transformEntities(str(self.value[0]).split(','),
+                                                mirror_matrix(x1, y1, x2, y2),
+                                                not move)
 
     def applyCommand(self):
         """
@@ -67,9 +66,4 @@ class MirrorCommand(BaseCommand):
         """
         if len(self.value)!=3:
             raise PyCadWrongInputData("Wrong number of input parameter")
-        try:
-            self.document.startMassiveCreation()
-            for _ent in self.performMirror():
-                self.document.saveEntity(_ent)
-        finally:
-            self.document.stopMassiveCreation()
+        self.performMirror()
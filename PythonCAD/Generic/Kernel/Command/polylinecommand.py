@@ -25,6 +25,7 @@ from Kernel.exception               import *
 from Kernel.Command.basecommand     import *
 from Kernel.GeoEntity.polyline         import Polyline
 from Kernel.GeoEntity.point            import Point
+from Kernel.GeoEntity.vertexarray      import VertexArray
 
 class PolylineCommand(BaseCommand):
     """
@@ -55,10 +56,6 @@ class PolylineCommand(BaseCommand):
         """
             perform the write of the entity
         """
-        i=0
-        args={}
-        for k in self.value:
-           args["POLYLINE_%s"%str(i)]=k
-           i+=1
+        args={"POLYLINE_VERTEX":VertexArray.fromPoints(self.value)}
         pline=Polyline(args)
         self.document.saveEntity(pline)
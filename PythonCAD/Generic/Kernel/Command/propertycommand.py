@@ -21,6 +21,7 @@
 # This module provide a class for the property command
 #
 import math
+import copy
 
 from Kernel.exception                  import *
 from Kernel.Command.basecommand        import *
@@ -43,7 +44,8 @@ class PropertyCommand(BaseCommand):
             change the property at the entity
         """
         entity=self.document.getEntity(_id)
-        style=entity.getInnerStyle()
+        # the style instance is shared by all the entity that use it
+        style=copy.deepcopy(entity.getInnerStyle())
         style.Derived()
         entity.resetProperty()
         for PropName,PropValue in self.value[1].get('property',{}).items():
@@ -25,6 +25,7 @@ import math
 from Kernel.exception               import *
 from Kernel.Command.basecommand     import *
 from Kernel.GeoEntity.point         import Point
+from Kernel.GeoUtil.affine          import rotation_matrix
 
 class RotateCommand(BaseCommand):
     """
@@ -44,23 +45,16 @@ class RotateCommand(BaseCommand):
 
     def performRotation(self):
         """
-            perform the mirror of all the entity selected
+            perform the rotation of all the entity selected
         """
         copy=True
         if self.value[3]:
             if self.value[3].upper()=='M':
                 copy=False
-        updEnts=[]
-        for id in str(self.value[0]).split(','):
-            dbEnt=self.document.getEntity(id)
-            geoEnt=self.document.convertToGeometricalEntity(dbEnt)
-            geoEnt.rotate(self.value[1], self.value[2])
-            if not copy:
-                dbEnt.setConstructionElements(geoEnt.getConstructionElements())
-                updEnts.append(dbEnt)
-            else:
-                updEnts.append(geoEnt)
-        return updEnts
+        x, y=self.value[1].getCoords()
+        return self.document.transformEntities(str(self.value[0]).split(','),
+                                                rotation_matrix(x, y, self.value[2]),
+                                                copy)
 
     def applyCommand(self):
         """
@@ -68,9 +62,4 @@ class RotateCommand(BaseCommand):
         """
         if len(self.value)!=4:
             raise PyCadWrongInputData("Wrong number of input parameter")
-        try:
-            self.document.startMassiveCreation()
-            for _ent in self.performRotation():
-                self.document.saveEntity(_ent)
-        finally:
-            self.document.stopMassiveCreation()
+        self.performRotation()
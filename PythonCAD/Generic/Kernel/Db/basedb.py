@@ -23,18 +23,29 @@
 
 import os
 import sys
+import time
 import tempfile
 import sqlite3 as sql
 
 from Kernel.exception import *
 
+# number of compiled statement kept by sqlite for each connection
+CACHED_STATEMENTS=200
+
 class BaseDb(object):
     """
         this class provide base db operation
+        the sql statement used by the derived class are registered by name
+        in the STATEMENTS dictionary and are bound with ? parameter so the
+        sqlite statement cache can reuse the compiled statement.
+        All the operation accept a statement name or a plain sql phrase
+        and keep the call count and the execution time for each statement
     """
     commit=True
+    STATEMENTS={}
     def __init__(self):
         self.__dbConnection=None
+        self.__statementStats={}
         self.dbPath=None
         
     def createConnection(self,dbPath=None):
@@ -45,7 +56,7 @@ class BaseDb(object):
             f=tempfile.NamedTemporaryFile(prefix='PyCad_',suffix='.pdr')
             dbPath=f.name
             f.close()
-        self.__dbConnection = sql.connect(str(dbPath))
+        self.__dbConnection = sql.connect(str(dbPath), cached_statements=CACHED_STATEMENTS)
         self.dbPath=dbPath
         
     def setConnection(self,dbConnection):
@@ -63,15 +74,68 @@ class BaseDb(object):
         """
         return self.__dbConnection
 
-    def makeSelect(self,statment):
+    def getStatement(self, statment):
+        """
+            get the sql of a registered statement
+            if statment is not a registered name it is returned as it is
+        """
+        return self.STATEMENTS.get(statment, statment)
+
+    def _statementKey(self, statment):
+        """
+            get the key used for the statistic of a statement
+        """
+        if statment in self.STATEMENTS:
+            return statment
+        return " ".join(statment.split())[:80]
+
+    def _addStatementStat(self, statment, elapsed):
+        """
+            update the statistic of a statement
+        """
+        _key=self._statementKey(statment)
+        _stat=self.__statementStats.get(_key)
+        if _stat is None:
+            self.__statementStats[_key]=[1, elapsed]
+        else:
+            _stat[0]+=1
+            _stat[1]+=elapsed
+
+    def getStatementStats(self):
+        """
+            get the statistic of the executed statement
+            return a dictionary {statementName:(callCount, totalTime)}
+        """
+        return dict([(key, tuple(value)) for key, value in self.__statementStats.items()])
+
+    def resetStatementStats(self):
+        """
+            reset the statement statistic
+        """
+        self.__statementStats={}
+
+    def _execute(self, _cursor, statment, tupleArgs):
+        """
+            execute a statement on the cursor and record its statistic
+        """
+        _sql=self.getStatement(statment)
+        _start=time.time()
+        if tupleArgs:
+            _rows = _cursor.execute(_sql,tupleArgs )
+        else:
+            _rows = _cursor.execute(_sql)
+        self._addStatementStat(statment, time.time()-_start)
+        return _rows
+
+    def makeSelect(self,statment, tupleArgs=None):
         """
             perform a select operation
         """
         try:
             _cursor = self.__dbConnection.cursor()
-            _rows = _cursor.execute(statment)
+            _rows = self._execute(_cursor, statment, tupleArgs)
         except sql.Error, _e:
-            msg="Sql Phrase: %s"%str(statment)+"\nSql Error: %s"%str( _e.args[0] )
+            msg="Sql Phrase: %s"%str(self.getStatement(statment))+"\nSql Error: %s"%str( _e.args[0] )
             raise StructuralError(msg)
         except :
             for s in sys.exc_info():
@@ -86,12 +150,9 @@ class BaseDb(object):
         """
         try:
             _cursor = self.__dbConnection.cursor()
-            if tupleArgs:
-                _rows = _cursor.execute(sqlSelect,tupleArgs )
-            else:
-                _rows = _cursor.execute(sqlSelect)
+            _rows = self._execute(_cursor, sqlSelect, tupleArgs)
         except sql.Error, _e:
-            msg="Sql Phrase: %s"%str(sqlSelect)+"\nSql Error: %s"%str( _e.args[0] )
+            msg="Sql Phrase: %s"%str(self.getStatement(sqlSelect))+"\nSql Error: %s"%str( _e.args[0] )
             raise StructuralError, msg
         except :
             for s in sys.exc_info():
@@ -110,16 +171,34 @@ class BaseDb(object):
         #print "qui1 : sql ",statment
         try:
             _cursor = self.__dbConnection.cursor()
-            if tupleArgs:
-                _rows = _cursor.execute(statment,tupleArgs )
-            else:
-                _rows = _cursor.execute(statment)
+            _rows = self._execute(_cursor, statment, tupleArgs)
             #if self.__commit:
             if BaseDb.commit:
                 self.performCommit()
                 _cursor.close()
         except sql.Error, _e:
-            msg="Sql Phrase: %s"%str(statment)+"\nSql Error: %s"%str( _e.args[0] )
+            msg="Sql Phrase: %s"%str(self.getStatement(statment))+"\nSql Error: %s"%str( _e.args[0] )
+            raise sql.Error,msg
+        except :
+            for s in sys.exc_info():
+                print "Generic Error: %s"%str(s)
+            raise KeyError
+
+    def makeMultipleUpdateInsert(self,statment, tupleArgsList):
+        """
+            make the same update Inster operation for all the tuple
+            in tupleArgsList using a single executemany
+        """
+        try:
+            _cursor = self.__dbConnection.cursor()
+            _start=time.time()
+            _cursor.executemany(self.getStatement(statment),tupleArgsList)
+            self._addStatementStat(statment, time.time()-_start)
+            if BaseDb.commit:
+                self.performCommit()
+            _cursor.close()
+        except sql.Error, _e:
+            msg="Sql Phrase: %s"%str(self.getStatement(statment))+"\nSql Error: %s"%str( _e.args[0] )
             raise sql.Error,msg
         except :
             for s in sys.exc_info():
@@ -155,3 +234,9 @@ class BaseDb(object):
             self.__dbConnection.commit()
         except:
             print "Error on commit"
+
+    def performRollback(self):
+        """
+            discard all the change not yet committed
+        """
+        self.__dbConnection.rollback()
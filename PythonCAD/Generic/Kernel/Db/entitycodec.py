@@ -0,0 +1,253 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# This module provide the binary encoding of the entity construction elements
+# stored in the pythoncad database
+#
+# Every encoded value start with a 4 byte header:
+#   CODEC_MAGIC (3 byte) + the format byte
+# the format byte is FORMAT_SCHEMA for the packed float64 layout defined
+# in ENTITY_SCHEMA or FORMAT_PICKLE for the entity that are not described
+# by a schema.
+# The value stored by the old version of pythoncad are plain pickle string
+# and are still decoded.
+#
+import struct
+import sqlite3
+import cPickle as pickle
+
+from Kernel.GeoEntity.point     import Point
+from Kernel.GeoEntity.vertexarray   import VertexArray
+
+CODEC_MAGIC='\x00PC'
+CODEC_VERSION=1
+FORMAT_SCHEMA=chr(CODEC_VERSION)
+FORMAT_PICKLE='P'
+#
+# Field type of the schema
+#   'p' Point stored as two float64
+#   'f' float stored as float64
+#   't' text stored as an utf-8 string with its length
+#
+ENTITY_SCHEMA={
+                'POINT':(('POINT_0', 'f'), ('POINT_1', 'f')),
+                'SEGMENT':(('SEGMENT_0', 'p'), ('SEGMENT_1', 'p')),
+                'ARC':(('ARC_0', 'p'), ('ARC_1', 'f'), ('ARC_2', 'f'), ('ARC_3', 'f')),
+                'ELLIPSE':(('ELLIPSE_0', 'p'), ('ELLIPSE_1', 'f'), ('ELLIPSE_2', 'f')),
+                'CLINE':(('CLINE_0', 'p'), ('CLINE_1', 'p')),
+                'CCIRCLE':(('CCIRCLE_0', 'p'), ('CCIRCLE_1', 'f')),
+                'TEXT':(('TEXT_0', 'p'), ('TEXT_1', 't'), ('TEXT_2', 'f'), ('TEXT_3', 't')),
+                'DIMENSION':(('DIMENSION_1', 'p'), ('DIMENSION_2', 'p'),
+                                ('DIMENSION_3', 'p'), ('DIMENSION_4', 'f')),
+                }
+
+_HEADER_LEN=len(CODEC_MAGIC)+1
+_UINT=struct.Struct('<I')
+_TEXT_HEADER=struct.Struct('<cI')
+_DOUBLE_PAIR=struct.Struct('<2d')
+
+def _compileSchema(schema):
+    """
+        compile the fixed size part of a schema in a struct object
+    """
+    fmt='<'
+    for name, fieldType in schema:
+        if fieldType=='p':
+            fmt+='2d'
+        elif fieldType=='f':
+            fmt+='d'
+    return struct.Struct(fmt)
+
+_COMPILED_SCHEMA=dict([(key, _compileSchema(ENTITY_SCHEMA[key])) for key in ENTITY_SCHEMA])
+
+class CodecError(ValueError):
+    """
+        the value could not be encoded with the schema
+    """
+    pass
+
+def isLegacy(data):
+    """
+        tell if the data is a pickle string created by the old pythoncad version
+    """
+    return not str(data[:len(CODEC_MAGIC)])==CODEC_MAGIC
+
+def _encodeText(value):
+    """
+        encode a text value
+    """
+    if isinstance(value, unicode):
+        _data=value.encode('utf-8')
+        return _TEXT_HEADER.pack('u', len(_data))+_data
+    if isinstance(value, str):
+        return _TEXT_HEADER.pack('s', len(value))+value
+    raise CodecError, "Text value expected"
+
+def _encodeSchema(entityType, cElements):
+    """
+        encode the construction elements with the entity schema
+    """
+    schema=ENTITY_SCHEMA[entityType]
+    if len(cElements)!=len(schema):
+        raise CodecError, "Construction elements do not match the schema"
+    values=[]
+    texts=[]
+    for name, fieldType in schema:
+        value=cElements[name]
+        if fieldType=='p':
+            if not isinstance(value, Point):
+                raise CodecError, "Point expected for %s"%str(name)
+            values.extend(value.getCoords())
+        elif fieldType=='f':
+            if not isinstance(value, (float, int, long)) or isinstance(value, bool):
+                raise CodecError, "Float expected for %s"%str(name)
+            values.append(value)
+        else:
+            texts.append(_encodeText(value))
+    return _COMPILED_SCHEMA[entityType].pack(*values)+''.join(texts)
+
+def _polylineIndex(key):
+    """
+        return the index of a polyline key POLYLINE_n
+    """
+    if not key.startswith('POLYLINE_'):
+        raise CodecError, "Wrong polyline key %s"%str(key)
+    try:
+        return int(key[9:])
+    except ValueError:
+        raise CodecError, "Wrong polyline key %s"%str(key)
+
+def _encodePolyline(cElements):
+    """
+        encode the polyline points as a point count followed by the coords
+        cElements is the POLYLINE_VERTEX VertexArray or the old POLYLINE_n
+        points
+    """
+    vertex=cElements.get('POLYLINE_VERTEX')
+    if vertex is not None:
+        if len(cElements)!=1 or not isinstance(vertex, VertexArray):
+            raise CodecError, "Wrong polyline construction elements"
+        return _UINT.pack(len(vertex))+vertex.toBuffer()
+    count=len(cElements)
+    coords=[0.0]*(count*2)
+    for key in cElements:
+        i=_polylineIndex(key)
+        if i<0 or i>=count:
+            raise CodecError, "Polyline keys are not contiguous"
+        value=cElements[key]
+        if not isinstance(value, Point):
+            raise CodecError, "Point expected for %s"%str(key)
+        coords[i*2], coords[i*2+1]=value.getCoords()
+    return _UINT.pack(count)+struct.pack('<%sd'%str(count*2), *coords)
+
+def encodeConstructionElements(entityType, cElements):
+    """
+        encode the construction elements of an entity
+        the entity described by a schema are packed as float64 all the
+        other are pickled
+        return a sqlite3.Binary ready to be stored
+    """
+    data=None
+    try:
+        if entityType in ENTITY_SCHEMA:
+            data=_encodeSchema(entityType, cElements)
+        elif entityType=='POLYLINE':
+            data=_encodePolyline(cElements)
+    except (CodecError, KeyError, struct.error):
+        data=None
+    if data is None:
+        return sqlite3.Binary(CODEC_MAGIC+FORMAT_PICKLE+pickle.dumps(cElements, 2))
+    return sqlite3.Binary(CODEC_MAGIC+FORMAT_SCHEMA+data)
+
+def _decodeSchema(entityType, data):
+    """
+        decode the construction elements with the entity schema
+    """
+    schema=ENTITY_SCHEMA[entityType]
+    compiled=_COMPILED_SCHEMA[entityType]
+    values=compiled.unpack_from(data, _HEADER_LEN)
+    offset=_HEADER_LEN+compiled.size
+    cElements={}
+    i=0
+    for name, fieldType in schema:
+        if fieldType=='p':
+            cElements[name]=Point(values[i], values[i+1])
+            i+=2
+        elif fieldType=='f':
+            cElements[name]=values[i]
+            i+=1
+        else:
+            textType, length=_TEXT_HEADER.unpack_from(data, offset)
+            offset+=_TEXT_HEADER.size
+            value=data[offset:offset+length]
+            offset+=length
+            if textType=='u':
+                value=value.decode('utf-8')
+            cElements[name]=value
+    return cElements
+
+def _decodePolyline(data):
+    """
+        decode the polyline points in a VertexArray
+    """
+    count=_UINT.unpack_from(data, _HEADER_LEN)[0]
+    return {'POLYLINE_VERTEX':VertexArray.fromBuffer(data, _HEADER_LEN+_UINT.size, count)}
+
+def decodeConstructionElements(entityType, data):
+    """
+        decode the construction elements stored in the database
+        data could be a buffer or a string as returned from sqlite
+    """
+    data=str(data)
+    if isLegacy(data):
+        return pickle.loads(data)
+    if data[len(CODEC_MAGIC)]==FORMAT_PICKLE:
+        return pickle.loads(data[_HEADER_LEN:])
+    if data[len(CODEC_MAGIC)]!=FORMAT_SCHEMA:
+        raise CodecError, "Unsupported codec version"
+    if entityType=='POLYLINE':
+        return _decodePolyline(data)
+    return _decodeSchema(entityType, data)
+
+def encodeProperties(properties):
+    """
+        encode the entity properties
+        the empty properties are stored as an empty string
+    """
+    if not properties:
+        return sqlite3.Binary('')
+    return sqlite3.Binary(CODEC_MAGIC+FORMAT_PICKLE+pickle.dumps(properties, 2))
+
+def decodeProperties(data):
+    """
+        decode the entity properties and return a list of (name, value)
+    """
+    if data is None:
+        return []
+    data=str(data)
+    if data=='':
+        return []
+    if isLegacy(data):
+        properties=pickle.loads(data)
+    else:
+        properties=pickle.loads(data[_HEADER_LEN:])
+    if isinstance(properties, dict):
+        return properties.items()
+    return properties
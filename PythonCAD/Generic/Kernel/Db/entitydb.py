@@ -21,19 +21,275 @@
 # This module provide basic operation for the entity in the pythoncad database
 #
 
+import sqlite3
 import cPickle as pickle
 
 from Kernel.entity              import *
+from Kernel.Db.entitycodec      import *
 from Kernel.Db.basedb           import BaseDb
 from Kernel.initsetting         import *
 from Kernel.exception           import *
 
+#
+# column of the pycadent table used by convertRowToDbEnt
+#
+ENT_COLUMNS="""pycad_id,
+                    pycad_entity_id,
+                    pycad_object_type,
+                    pycad_object_definition,
+                    pycad_object_style,
+                    pycad_entity_state,
+                    pycad_index,
+                    pycad_visible,
+                    pycad_property"""
+#
+# max number of ids in a single IN (...) select, sqlite accept at most
+# 999 parameter
+#
+MAX_SELECT_IDS=500
+#
+# select that recompute the head row of a list of entity
+# %s is the select that return the pycad_entity_id
+#
+_SQL_HEAD_DELETE="""DELETE FROM pycadhead
+                    WHERE pycad_entity_id IN (%s)"""
+_SQL_HEAD_INSERT="""INSERT INTO pycadhead (
+                    pycad_entity_id,
+                    pycad_id,
+                    pycad_object_type,
+                    pycad_entity_state,
+                    pycad_visible)
+                    SELECT pycad_entity_id,
+                    max(pycad_id),
+                    pycad_object_type,
+                    pycad_entity_state,
+                    pycad_visible
+                    FROM pycadent
+                    WHERE pycad_undo_visible=1
+                    AND pycad_entity_id IN (%s)
+                    GROUP BY pycad_entity_id"""
+_SQL_ENTITY_FROM_UNDO="""SELECT pycad_entity_id FROM pycadent
+                    WHERE pycad_undo_id=?"""
+
 class EntityDb(BaseDb):
     """
         this class provide the besic operation for the entity
     """
+    STATEMENTS={
+        'getRevisionIndex':"""SELECT max(pycad_index) FROM pycadent""",
+        'getMaxTableId':"""SELECT max(pycad_id) FROM pycadent""",
+        'getNewEntId':"""SELECT max(pycad_entity_id) FROM pycadent""",
+        'insertEntity':"""INSERT INTO pycadent (
+                    pycad_id,
+                    pycad_entity_id,
+                    pycad_object_type,
+                    pycad_object_definition,
+                    pycad_object_style,
+                    pycad_undo_id,
+                    pycad_undo_visible,
+                    pycad_bbox_xmin,
+                    pycad_bbox_ymin,
+                    pycad_bbox_xmax,
+                    pycad_bbox_ymax,
+                    pycad_entity_state,
+                    pycad_index,
+                    pycad_visible,
+                    pycad_property) VALUES
+                    (?,?,?,?,?,?,1,?,?,?,?,?,?,?,?)""",
+        'insertSpatialIndex':"""INSERT INTO pycadent_rtree (
+                    pycad_id,
+                    pycad_bbox_xmin,
+                    pycad_bbox_xmax,
+                    pycad_bbox_ymin,
+                    pycad_bbox_ymax) VALUES
+                    (?,?,?,?,?)""",
+        'updateSpatialIndex':"""UPDATE pycadent_rtree SET
+                    pycad_bbox_xmin=?,
+                    pycad_bbox_xmax=?,
+                    pycad_bbox_ymin=?,
+                    pycad_bbox_ymax=?
+                    WHERE pycad_id=?""",
+        'deleteHeadSpatialIndex':"""DELETE FROM pycadent_rtree
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_id=?)""",
+        'insertHeadSpatialIndex':"""INSERT INTO pycadent_rtree (
+                    pycad_id,
+                    pycad_bbox_xmin,
+                    pycad_bbox_xmax,
+                    pycad_bbox_ymin,
+                    pycad_bbox_ymax)
+                    SELECT pycad_id,?,?,?,?
+                    FROM pycadhead
+                    WHERE pycad_entity_id=?""",
+        'updateBBox':"""UPDATE pycadent SET
+                    pycad_bbox_xmin=?,
+                    pycad_bbox_ymin=?,
+                    pycad_bbox_xmax=?,
+                    pycad_bbox_ymax=?
+                    WHERE pycad_id=?""",
+        'insertHead':"""INSERT OR REPLACE INTO pycadhead (
+                    pycad_entity_id,
+                    pycad_id,
+                    pycad_object_type,
+                    pycad_entity_state,
+                    pycad_visible) VALUES
+                    (?,?,?,?,?)""",
+        'clearHead':"""DELETE FROM pycadhead""",
+        'rebuildHead':"""INSERT INTO pycadhead (
+                    pycad_entity_id,
+                    pycad_id,
+                    pycad_object_type,
+                    pycad_entity_state,
+                    pycad_visible)
+                    SELECT pycad_entity_id,
+                    max(pycad_id),
+                    pycad_object_type,
+                    pycad_entity_state,
+                    pycad_visible
+                    FROM pycadent
+                    WHERE pycad_undo_visible=1
+                    GROUP BY pycad_entity_id""",
+        'deleteHeadFromEntId':_SQL_HEAD_DELETE%"?",
+        'insertHeadFromEntId':_SQL_HEAD_INSERT%"?",
+        'deleteHeadFromUndo':_SQL_HEAD_DELETE%_SQL_ENTITY_FROM_UNDO,
+        'insertHeadFromUndo':_SQL_HEAD_INSERT%_SQL_ENTITY_FROM_UNDO,
+        'getEntityFromTableId':"""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_id=?"""%ENT_COLUMNS,
+        'getEntityEntityId':"""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_id=(
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_id=?)"""%ENT_COLUMNS,
+        'getEntitysFromStyle':"""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_id IN (
+                        SELECT pycad_id FROM pycadhead)
+                    AND pycad_object_style=?"""%ENT_COLUMNS,
+        'getEntInVersion':"""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_state NOT LIKE 'DELETE')
+                    AND pycad_index = ?"""%ENT_COLUMNS,
+        'getAllEntity':"""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_state NOT LIKE 'DELETE'
+                        AND pycad_visible=?)"""%ENT_COLUMNS,
+        'getEntityFromType':"""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_state NOT LIKE 'DELETE'
+                        AND pycad_visible=?
+                        AND pycad_object_type=?)"""%ENT_COLUMNS,
+        'exsisting':"""SELECT COUNT(*) FROM pycadent
+                    WHERE pycad_entity_id=?""",
+        'markUndoVisibility':"""UPDATE pycadent SET pycad_undo_visible=?
+                    WHERE pycad_undo_id=?""",
+        'markUndoVisibilityFromEntId':"""UPDATE pycadent SET pycad_undo_visible=?
+                    WHERE pycad_entity_id=?""",
+        'getUndoEntityIds':"""SELECT DISTINCT pycad_entity_id FROM pycadent
+                    WHERE pycad_undo_id=?""",
+        'getLastTableId':"""SELECT max(pycad_id) FROM pycadent
+                    WHERE pycad_entity_id=?""",
+        'markTableIdVisibility':"""UPDATE pycadent SET pycad_undo_visible=?
+                    WHERE pycad_id=?""",
+        'getEntityIdFromTableId':"""SELECT pycad_entity_id FROM pycadent
+                    WHERE pycad_id=?""",
+        'deleteTableId':"""DELETE FROM pycadent
+                    WHERE pycad_id=?""",
+        'deleteSpatialIndex':"""DELETE FROM pycadent_rtree
+                    WHERE pycad_id=?""",
+        'updateEntity':"""UPDATE pycadent SET
+                    pycad_object_type=?,
+                    pycad_object_definition=?,
+                    pycad_object_style=?,
+                    pycad_bbox_xmin=?,
+                    pycad_bbox_ymin=?,
+                    pycad_bbox_xmax=?,
+                    pycad_bbox_ymax=?,
+                    pycad_entity_state=?,
+                    pycad_index=?,
+                    pycad_visible=?,
+                    pycad_property=?
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_id=?)""",
+        'insertChildrenRevision':"""INSERT INTO pycadent (
+                    pycad_entity_id,
+                    pycad_object_type,
+                    pycad_object_definition,
+                    pycad_object_style,
+                    pycad_undo_id,
+                    pycad_undo_visible,
+                    pycad_bbox_xmin,
+                    pycad_bbox_ymin,
+                    pycad_bbox_xmax,
+                    pycad_bbox_ymax,
+                    pycad_entity_state,
+                    pycad_index,
+                    pycad_visible,
+                    pycad_property)
+                    SELECT pycad_entity_id,
+                    pycad_object_type,
+                    pycad_object_definition,
+                    pycad_object_style,
+                    :undoId,
+                    1,
+                    pycad_bbox_xmin,
+                    pycad_bbox_ymin,
+                    pycad_bbox_xmax,
+                    pycad_bbox_ymax,
+                    coalesce(:state, pycad_entity_state),
+                    :revisionIndex,
+                    coalesce(:visible, pycad_visible),
+                    pycad_property
+                    FROM pycadent
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_id IN (
+                            SELECT pycad_child_id
+                            FROM pycadrel
+                            WHERE pycad_parent_id=:parentId)
+                        AND pycad_entity_state NOT LIKE 'DELETE'
+                        AND (pycad_visible<>coalesce(:visible, pycad_visible)
+                            OR pycad_entity_state<>coalesce(:state, pycad_entity_state)))
+                    ORDER BY pycad_id""",
+        'insertSpatialIndexFromUndo':"""INSERT INTO pycadent_rtree (
+                    pycad_id,
+                    pycad_bbox_xmin,
+                    pycad_bbox_xmax,
+                    pycad_bbox_ymin,
+                    pycad_bbox_ymax)
+                    SELECT pycad_id,
+                    pycad_bbox_xmin,
+                    pycad_bbox_xmax,
+                    pycad_bbox_ymin,
+                    pycad_bbox_ymax
+                    FROM pycadent
+                    WHERE pycad_undo_id=? AND pycad_id>?
+                    AND pycad_bbox_xmin IS NOT NULL""",
+        'getUndoEntityIdsFrom':"""SELECT pycad_entity_id FROM pycadent
+                    WHERE pycad_undo_id=? AND pycad_id>?""",
+        'getNotReleased':"""SELECT pycad_id
+                    FROM pycadent
+                    WHERE pycad_entity_state NOT LIKE 'RELEASED'""",
+        }
+
     def __init__(self,dbConnection):
         BaseDb.__init__(self)
+        self.__styleCache={}
         self._entFields={
                     'pycad_id':'INTEGER PRIMARY KEY',
                     'pycad_entity_id':'INTEGER',
@@ -58,11 +314,11 @@ class EntityDb(BaseDb):
             for fieldName,fieldValue in self._entFields.items():
                 outStr+='%s %s,'%(str(fieldName),str(fieldValue))
             return outStr[:-1]
-        
+
         def addTableField(fieldName,fieldType):
             sql="ALTER TABLE pycadent ADD COLUMN %s %s "%(str(fieldName),str(fieldType))
             self.makeUpdateInsert(sql)
-            
+
         if dbConnection is None:
             self.createConnection()
         else:
@@ -81,16 +337,129 @@ class EntityDb(BaseDb):
                 if not classColumn in dbColumns:
                     addTableField(classColumn,self._entFields[classColumn])
             self.__revisionIndex=self.getRevisionIndex()
-            
+        # the head table is needed to read the style of the entity when
+        # the spatial index of an old database is filled
+        self._createHeadTable()
+        self._createSpatialIndex()
+
+    def _createHeadTable(self):
+        """
+            create the head table that keep for each entity the pycad_id
+            of the current revision (the last one visible for the undo)
+            in case of an old database the table is filled from pycadent
+        """
+        _sqlCheck="""select * from sqlite_master where name like 'pycadhead'"""
+        _table=self.makeSelect(_sqlCheck).fetchone()
+        if _table is not None:
+            return
+        _sqlCreation="""CREATE TABLE pycadhead(
+                    pycad_entity_id INTEGER PRIMARY KEY,
+                    pycad_id INTEGER,
+                    pycad_object_type TEXT,
+                    pycad_entity_state TEXT,
+                    pycad_visible INTEGER)"""
+        self.makeUpdateInsert(_sqlCreation)
+        self._rebuildHead()
+
+    def _rebuildHead(self):
+        """
+            recompute all the head table from the revision history
+        """
+        self.makeUpdateInsert('clearHead')
+        self.makeUpdateInsert('rebuildHead')
+        self.__styleCache={}
+
+    def _refreshHead(self, entityId=None, undoId=None):
+        """
+            recompute the head revision of the entity with entityId or of
+            all the entity that have a revision with undoId
+            Remarks : sqlite take the other column from the max(pycad_id) row
+        """
+        self.clearStyleCache()
+        if undoId is not None:
+            self.makeUpdateInsert('deleteHeadFromUndo', (undoId, ))
+            self.makeUpdateInsert('insertHeadFromUndo', (undoId, ))
+        else:
+            self.makeUpdateInsert('deleteHeadFromEntId', (entityId, ))
+            self.makeUpdateInsert('insertHeadFromEntId', (entityId, ))
+
+    def _createSpatialIndex(self):
+        """
+            create the r*tree spatial index of the entity bounding box
+            in case of an old database the index is filled from the stored entity
+        """
+        _sqlCheck="""select * from sqlite_master where name like 'pycadent_rtree'"""
+        _table=self.makeSelect(_sqlCheck).fetchone()
+        if _table is not None:
+            return
+        _sqlCreation="""CREATE VIRTUAL TABLE pycadent_rtree USING rtree(
+                    pycad_id,
+                    pycad_bbox_xmin,
+                    pycad_bbox_xmax,
+                    pycad_bbox_ymin,
+                    pycad_bbox_ymax)"""
+        self.makeUpdateInsert(_sqlCreation)
+        self._fillSpatialIndex()
+
+    def _fillSpatialIndex(self):
+        """
+            compute the bounding box of all the stored drawing entity
+            and insert it in the spatial index
+        """
+        _drwTypes=DRAWIN_ENTITY.values()
+        _sqlGet="""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_object_type IN (%s)"""%(ENT_COLUMNS, ",".join(["?"]*len(_drwTypes)))
+        _rows=self.makeSelect(_sqlGet, tuple(_drwTypes)).fetchall()
+        _boxes=[]
+        for _row in _rows:
+            _bBox=self.convertRowToDbEnt(_row).getBBox()
+            if _bBox[0] is None:
+                continue
+            _boxes.append((_row[0], )+_bBox)
+        _commit=BaseDb.commit
+        BaseDb.commit=False
+        try:
+            self.makeMultipleUpdateInsert('updateBBox', [b[1:]+(b[0], ) for b in _boxes])
+            self.makeMultipleUpdateInsert('insertSpatialIndex',
+                    [(b[0], b[1], b[3], b[2], b[4]) for b in _boxes])
+        finally:
+            BaseDb.commit=_commit
+        self.performCommit()
+
+    def updateTextBBox(self):
+        """
+            compute again the bounding box of the text stored with the box
+            of the text point only
+            Remarks : it is run once by the SchemaDb migration, the commit
+            is done by the migration
+        """
+        _sqlGet="""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_object_type='TEXT'
+                    AND pycad_bbox_xmin=pycad_bbox_xmax
+                    AND pycad_bbox_ymin=pycad_bbox_ymax"""%ENT_COLUMNS
+        _rows=self.makeSelect(_sqlGet).fetchall()
+        if not _rows:
+            return
+        _boxes=[]
+        for _row in _rows:
+            _bBox=self.convertRowToDbEnt(_row).getBBox()
+            if _bBox[0] is None:
+                continue
+            _boxes.append((_row[0], )+_bBox)
+        self.makeMultipleUpdateInsert('updateBBox', [b[1:]+(b[0], ) for b in _boxes])
+        self.makeMultipleUpdateInsert('updateSpatialIndex',
+                [(b[1], b[3], b[2], b[4], b[0]) for b in _boxes])
+
     def getRevisionIndex(self):
         """
             get the revision index from the database
         """
-        _sql="""SELECT max(pycad_index) From pycadent"""
-        index=self.fetchOneRow(_sql)
+        index=self.fetchOneRow('getRevisionIndex')
         if index is None: return 0
         return index
-        
+
     def increaseRevisionIndex(self):
         """
             increase the relesed index
@@ -108,33 +477,54 @@ class EntityDb(BaseDb):
             this method save the entity in the db
             entityObj = object that we whant to store
         """
-        _entityId=entityObj.getId()
-        _entityDump=pickle.dumps(entityObj.getConstructionElements())
+        self.saveEntities([entityObj], undoId)
+
+    def encodeEntity(self, entityObj):
+        """
+            encode the entity in the values stored in the db
+            return a tuple (entityId, entityType, dump, style, xmin, ymin,
+            xmax, ymax, state, revisionIndex, visible, property)
+            the entity could be changed after this call without changing
+            the encoded values
+        """
         _entityType=entityObj.getEntityType()
-        _property=pickle.dumps(entityObj.properties)
-        _entityVisible=entityObj.visible
-        _styleObject=pickle.dumps(entityObj.style)
         _xMin,_yMin,_xMax,_yMax=entityObj.getBBox()
-        _revisionIndex=self.__revisionIndex
-        _revisionState=entityObj.state
-        _sqlInsert="""INSERT INTO pycadent (
-                    pycad_entity_id,
-                    pycad_object_type,
-                    pycad_object_definition,
-                    pycad_object_style,
-                    pycad_undo_id,
-                    pycad_undo_visible,
-                    pycad_bbox_xmin,
-                    pycad_bbox_ymin,
-                    pycad_bbox_xmax,
-                    pycad_bbox_ymax,
-                    pycad_entity_state,
-                    pycad_index,
-                    pycad_visible,
-                    pycad_property) VALUES
-                    (?,?,?,?,?,1,?,?,?,?,?,?,?,?)"""
-                    
-        tupleArg=(
+        return (entityObj.getId(),
+                _entityType,
+                encodeConstructionElements(_entityType, entityObj.getConstructionElements()),
+                self._styleToDb(entityObj.style),
+                _xMin,
+                _yMin,
+                _xMax,
+                _yMax,
+                entityObj.state,
+                self.__revisionIndex,
+                entityObj.visible,
+                encodeProperties(entityObj.properties))
+
+    def saveEntities(self, entityObjs, undoId, encodedEntitys=None):
+        """
+            save a list of entity in the db with the same undoId
+            the pycad_id are assigned here so all the rows, the spatial
+            index and the head table are written with one executemany each
+            encodedEntitys are the value returned by encodeEntity for the
+            entityObjs, if None the entityObjs are encoded now
+        """
+        if encodedEntitys is None:
+            encodedEntitys=[self.encodeEntity(entityObj) for entityObj in entityObjs]
+        _firstId=self.fetchOneRow('getMaxTableId')
+        if _firstId is None:
+            _firstId=0
+        _entRows=[]
+        _indexRows=[]
+        _headRows=[]
+        for _i, _encoded in enumerate(encodedEntitys):
+            _tableId=_firstId+_i+1
+            (_entityId, _entityType, _entityDump, _styleObject,
+             _xMin, _yMin, _xMax, _yMax,
+             _revisionState, _revisionIndex, _entityVisible, _property)=_encoded
+            _entRows.append((
+                    _tableId,
                     _entityId,
                     _entityType,
                     _entityDump,
@@ -143,72 +533,200 @@ class EntityDb(BaseDb):
                     _xMin,
                     _yMin,
                     _xMax,
-                    _yMax, 
+                    _yMax,
                     _revisionState,
-                    _revisionIndex, 
+                    _revisionIndex,
                     _entityVisible,
-                    _property)
-        self.makeUpdateInsert(_sqlInsert, tupleArg)
-        
+                    _property))
+            if _xMin is not None:
+                _indexRows.append((_tableId, _xMin, _xMax, _yMin, _yMax))
+            _headRows.append((_entityId, _tableId, _entityType, _revisionState, _entityVisible))
+        self._insertRows(_entRows, _indexRows, _headRows)
+        for entityObj in entityObjs:
+            if entityObj.getEntityType()=='STYLE':
+                self.__styleCache[entityObj.getId()]=entityObj
+
+    def saveRecords(self, records, firstEntityId, style, undoId):
+        """
+            save the (entityType, encodedConstructionElements, xmin, ymin,
+            xmax, ymax) records as new entity with the id starting from
+            firstEntityId, no Entity object is created
+            the encodedConstructionElements are the string returned by
+            encodeConstructionElements
+        """
+        _firstId=self.fetchOneRow('getMaxTableId')
+        if _firstId is None:
+            _firstId=0
+        _styleObject=self._styleToDb(style)
+        _property=encodeProperties(None)
+        _revisionIndex=self.__revisionIndex
+        _revisionState=OBJECT_STATE[0]
+        _entRows=[]
+        _indexRows=[]
+        _headRows=[]
+        for _i, (_entityType, _entityDump, _xMin, _yMin, _xMax, _yMax) in enumerate(records):
+            _tableId=_firstId+_i+1
+            _entityId=firstEntityId+_i
+            _entRows.append((
+                    _tableId,
+                    _entityId,
+                    _entityType,
+                    sqlite3.Binary(_entityDump),
+                    _styleObject,
+                    undoId,
+                    _xMin,
+                    _yMin,
+                    _xMax,
+                    _yMax,
+                    _revisionState,
+                    _revisionIndex,
+                    1,
+                    _property))
+            if _xMin is not None:
+                _indexRows.append((_tableId, _xMin, _xMax, _yMin, _yMax))
+            _headRows.append((_entityId, _tableId, _entityType, _revisionState, 1))
+        self._insertRows(_entRows, _indexRows, _headRows)
+
+    def saveChildrenRevision(self, parentId, undoId, visible=None, state=None):
+        """
+            save with undoId a new revision of the current children of
+            parentId that do not have already the given visible and state,
+            a None visible or state keep the one of the child
+            the rows are copied by the database, no construction element
+            is decoded
+            return the id of the entity that have the new revision
+        """
+        _firstId=self.fetchOneRow('getMaxTableId')
+        if _firstId is None:
+            _firstId=0
+        _commit=BaseDb.commit
+        BaseDb.commit=False
+        try:
+            self.makeUpdateInsert('insertChildrenRevision', {'undoId':undoId,
+                                                            'state':state,
+                                                            'revisionIndex':self.__revisionIndex,
+                                                            'visible':visible,
+                                                            'parentId':parentId})
+            self.makeUpdateInsert('insertSpatialIndexFromUndo', (undoId, _firstId))
+            self._refreshHead(undoId=undoId)
+        finally:
+            BaseDb.commit=_commit
+        if BaseDb.commit:
+            self.performCommit()
+        return [_row[0] for _row in self.makeSelect('getUndoEntityIdsFrom', (undoId, _firstId))]
+
+    def _insertRows(self, entRows, indexRows, headRows):
+        """
+            write the entity rows, the spatial index and the head table
+            with one executemany each
+        """
+        _commit=BaseDb.commit
+        BaseDb.commit=False
+        try:
+            self.makeMultipleUpdateInsert('insertEntity', entRows)
+            if indexRows:
+                self.makeMultipleUpdateInsert('insertSpatialIndex', indexRows)
+            self.makeMultipleUpdateInsert('insertHead', headRows)
+        finally:
+            BaseDb.commit=_commit
+        if _commit:
+            self.performCommit()
+
+    def _styleToDb(self, style):
+        """
+            get the value to store in the pycad_object_style column
+            the style entity is referenced by its id
+        """
+        if style is None:
+            return None
+        if isinstance(style, Entity) and style.eType=='STYLE':
+            return style.getId()
+        return sqlite3.Binary(pickle.dumps(style, 2))
+
+    def _dbToStyle(self, value):
+        """
+            get the style entity from the pycad_object_style column
+            all the entity with the same style share the same instance
+            the old database have the style entity pickled in the column
+        """
+        if value is None:
+            return None
+        if isinstance(value, basestring) and value.isdigit():
+            # the id is stored as text due to the column affinity
+            value=int(value)
+        if isinstance(value, (int, long)):
+            return self.getStyleEntity(value)
+        _style=pickle.loads(str(value))
+        if isinstance(_style, Entity) and _style.eType=='STYLE':
+            _cachedStyle=self.getStyleEntity(_style.getId())
+            if _cachedStyle is not None:
+                return _cachedStyle
+        return _style
+
+    def getStyleEntity(self, styleId):
+        """
+            get the current style entity from the style cache
+            return None if the style is not in the database
+        """
+        if styleId in self.__styleCache:
+            return self.__styleCache[styleId]
+        _style=self.getEntityEntityId(styleId)
+        if _style is not None:
+            self.__styleCache[styleId]=_style
+        return _style
+
+    def clearStyleCache(self):
+        """
+            clear the style cache
+        """
+        self.__styleCache={}
+
     def getEntityFromTableId(self,entityTableId):
         """
             Get the entity object from the database Univoc id
         """
         _outObj=None
-        _sqlGet="""SELECT   pycad_entity_id,
-                            pycad_object_type,
-                            pycad_object_definition,
-                            pycad_object_style,
-                            pycad_entity_state,
-                            pycad_index,
-                            pycad_visible,
-                            pycad_property
-                FROM pycadent
-                WHERE pycad_id=%s"""%str(entityTableId)
-        _rows=self.makeSelect(_sqlGet)
+        _rows=self.makeSelect('getEntityFromTableId', (entityTableId, ))
         if _rows is not None:
             _row=_rows.fetchone()
             if _row is not None:
-                _style=pickle.loads(str(_row[3]))
-                _dumpObj=pickle.loads(str(_row[2]))
-                _outObj=Entity(_row[1],_dumpObj,_style,_row[0])
-                _outObj.state=_row[4]
-                _outObj.index=_row[5]
-                _outObj.visible=_row[6]
-                for name,value in pickle.loads(str(_row[7])):
-                    _outObj.addPropertie(name, value)
-                _outObj.updateBBox()
+                _outObj=self.convertRowToDbEnt(_row)
         return _outObj
-    
+
     def getEntityEntityId(self,entityId):
         """
-            get all the entity with the entity id
+            get the current revision of the entity with the entity id
+            return None if the entity is not in the database
         """
-        _outObj=None
-        _sqlGet="""SELECT   pycad_id,
-                            pycad_entity_id,
-                            pycad_object_type,
-                            pycad_object_definition,
-                            pycad_object_style,
-                            pycad_entity_state,
-                            pycad_index,
-                            pycad_visible,
-                            pycad_property
-                FROM pycadent
-                WHERE pycad_entity_id=%s ORDER BY  pycad_id DESC"""%str(entityId)
-        _dbEntRow=self.makeSelect(_sqlGet)
+        _dbEntRow=self.makeSelect('getEntityEntityId', (entityId, ))
         if _dbEntRow is not None:
             _row=_dbEntRow.fetchone()
-            _style=pickle.loads(str(_row[4]))
-            _dumpObj=pickle.loads(str(_row[3]))
-            _entObj=Entity(_row[2],_dumpObj,_style,_row[1])       
-            _entObj.state=_row[5]
-            _entObj.index=_row[6]
-            _entObj.visible=_row[7]
-            for name,value in pickle.loads(str(_row[8])):
-                _entObj.addPropertie(name, value)
-            _entObj.updateBBox()
-        return _entObj
+            if _row is not None:
+                return self.convertRowToDbEnt(_row)
+        return None
+
+    def getEntitiesEntityId(self, entityIds):
+        """
+            get the current revision of all the entity with the entity ids
+            the ids are looked up with one select every MAX_SELECT_IDS ids
+            return a {entityId:entity} dictionary, the missing ids are
+            not in the dictionary
+        """
+        _ids=[int(_id) for _id in entityIds]
+        _outObj={}
+        for _start in xrange(0, len(_ids), MAX_SELECT_IDS):
+            _chunk=_ids[_start:_start+MAX_SELECT_IDS]
+            _sqlGet="""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_id IN (%s))
+                    """%(ENT_COLUMNS, ",".join(["?"]*len(_chunk)))
+            for _row in self.makeSelect(_sqlGet, tuple(_chunk)):
+                _objEnt=self.convertRowToDbEnt(_row)
+                _outObj[_objEnt.getId()]=_objEnt
+        return _outObj
 
     def getEntitysFromStyle(self,styleId):
         """
@@ -220,134 +738,134 @@ class EntityDb(BaseDb):
         # the new style system is changed
         #
         _outObj=[]
-        _sqlGet="""SELECT   pycad_id,
-                            pycad_entity_id,
-                            pycad_object_type,
-                            pycad_object_definition,
-                            pycad_object_style,
-                            pycad_entity_state,
-                            pycad_index,
-                            pycad_visible,
-                            pycad_property
-                    FROM pycadent
-                    WHERE PyCad_Id IN (
-                        SELECT max(PyCad_Id) 
-                        FROM pycadent  
-                        WHERE pycad_undo_visible=1 
-                        GROUP BY pycad_entity_id ORDER BY PyCad_Id)
-                    AND pycad_object_style=%s"""%str(styleId)
-        _dbEntRow=self.makeSelect(_sqlGet)
-        for _row in _dbEntRow: 
-            _style=_row[4]
-            _dumpObj=pickle.loads(_row[3])
-            _objEnt=Entity(_row[2],_dumpObj,_style,_row[1])
-            _objEnt.state=_row[5]
-            _objEnt.index=_row[6]
-            _objEnt.visible=_dbEntRow[7]
-            for name,value in pickle.loads(str(_row[9])):
-                _objEnt.addPropertie(name, value)
-            _objEnt.updateBBox()            
+        _dbEntRow=self.makeSelect('getEntitysFromStyle', (styleId, ))
+        for _row in _dbEntRow:
+            _objEnt=self.convertRowToDbEnt(_row)
             _outObj.append(_objEnt)
         return _outObj
-    
+
     def _getEntInVersion(self, versionIndex):
         """
             get entity in version
         """
         #TODO: to be tested
-        _sqlGet="""SELECT pycad_id,
-                    pycad_entity_id,
-                    pycad_object_type,
-                    pycad_object_definition,
-                    pycad_object_style,
-                    pycad_entity_state,
-                    pycad_index,
-                    pycad_visible,
-                    pycad_property
-                    FROM pycadent
-                    WHERE PyCad_Id IN (
-                        SELECT max(PyCad_Id) 
-                        FROM pycadent  
-                        WHERE pycad_undo_visible=1 
-                        GROUP BY pycad_entity_id ORDER BY PyCad_Id)
-                    AND pycad_entity_state NOT LIKE "DELETE"
-                    AND pycad_index = %s
-                    """%str(versionIndex)
-        return self.makeSelect(_sqlGet)
-        
+        return self.makeSelect('getEntInVersion', (versionIndex, ))
+
     def getMultiFilteredEntity(self, visible=1, entityType='ALL', entityTypeArray=None):
         """
             get all visible entity
-        """  
+        """
         if entityTypeArray:
-            isFirst=1
-            for t in entityTypeArray:
-                if isFirst:
-                    entityTypes="""AND (pycad_object_type like '%s'"""%str(t)
-                    isFirst=0
-                else:
-                    entityTypes="""%s OR pycad_object_type like '%s'"""%(str(entityTypes), str(t))
-            else:
-                entityTypes=entityTypes+")"
-        else:
-            if entityType=='ALL':
-                entityTypes="""AND pycad_object_type like '%'"""
-            else:
-                entityTypes="""AND pycad_object_type like '%s'"""%str(entityType)
-                if not entityType in PY_CAD_ENT:
-                    raise TypeError,"Entity type %s not supported from the dbEnt"%str(entityType)  
-        _sqlGet="""SELECT pycad_id,
-                    pycad_entity_id,
-                    pycad_object_type,
-                    pycad_object_definition,
-                    pycad_object_style,
-                    pycad_entity_state,
-                    pycad_index,
-                    pycad_visible,
-                    pycad_property
+            _sqlGet="""SELECT %s
+                    FROM pycadent
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_state NOT LIKE 'DELETE'
+                        AND pycad_visible=?
+                        AND pycad_object_type IN (%s))
+                    """%(ENT_COLUMNS, ",".join(["?"]*len(entityTypeArray)))
+            return self.makeSelect(_sqlGet, (visible, )+tuple(entityTypeArray))
+        if entityType=='ALL':
+            return self.makeSelect('getAllEntity', (visible, ))
+        if not entityType in PY_CAD_ENT:
+            raise TypeError,"Entity type %s not supported from the dbEnt"%str(entityType)
+        return self.makeSelect('getEntityFromType', (visible, entityType))
+
+    def getEntityInRegion(self, xmin, ymin, xmax, ymax, entityTypeArray):
+        """
+            get all the visible entity of the given types that have the
+            bounding box overlapping the region
+            only the candidate from the spatial index are unpickled
+        """
+        _sqlGet="""SELECT %s
                     FROM pycadent
                     WHERE pycad_id IN (
-                        SELECT max(pycad_id) 
-                        FROM pycadent  
-                        WHERE pycad_undo_visible=1  
-                        GROUP BY pycad_entity_id ORDER BY pycad_id)
-                    AND pycad_entity_state NOT LIKE "DELETE"
-                    AND pycad_visible =%s
-                    %s
-                    """%(str(visible), str(entityTypes))
-        return self.makeSelect(_sqlGet)   
-        
+                        SELECT pycad_id
+                        FROM pycadent_rtree
+                        WHERE pycad_bbox_xmin<=? AND pycad_bbox_xmax>=?
+                        AND pycad_bbox_ymin<=? AND pycad_bbox_ymax>=?)
+                    AND pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_state NOT LIKE 'DELETE'
+                        AND pycad_visible=1
+                        AND pycad_object_type IN (%s))
+                    """%(ENT_COLUMNS, ",".join(["?"]*len(entityTypeArray)))
+        _rows=self.makeSelect(_sqlGet, (xmax, xmin, ymax, ymin)+tuple(entityTypeArray))
+        _outObj=[]
+        for _row in _rows:
+            _outObj.append(self.convertRowToDbEnt(_row))
+        return _outObj
+
+    def getEntityIdsInRegion(self, xmin, ymin, xmax, ymax, entityTypeArray):
+        """
+            get the entity id of the visible entity of the given types that
+            have the bounding box overlapping the region
+            the query start from the spatial index so the cost depend on
+            the entity in the region and not on the size of the drawing
+        """
+        _sqlGet="""SELECT pycadhead.pycad_entity_id
+                    FROM pycadent_rtree
+                    CROSS JOIN pycadent
+                        ON pycadent.pycad_id=pycadent_rtree.pycad_id
+                    CROSS JOIN pycadhead
+                        ON pycadhead.pycad_entity_id=pycadent.pycad_entity_id
+                    WHERE pycadent_rtree.pycad_bbox_xmin<=?
+                    AND pycadent_rtree.pycad_bbox_xmax>=?
+                    AND pycadent_rtree.pycad_bbox_ymin<=?
+                    AND pycadent_rtree.pycad_bbox_ymax>=?
+                    AND pycadhead.pycad_id=pycadent_rtree.pycad_id
+                    AND pycadhead.pycad_entity_state NOT LIKE 'DELETE'
+                    AND pycadhead.pycad_visible=1
+                    AND pycadhead.pycad_object_type IN (%s)
+                    """%",".join(["?"]*len(entityTypeArray))
+        _rows=self.makeSelect(_sqlGet, (xmax, xmin, ymax, ymin)+tuple(entityTypeArray))
+        return [_row[0] for _row in _rows]
+
+    def getExtents(self, entityTypeArray):
+        """
+            get the (xmin, ymin, xmax, ymax) of the bounding box of all the
+            visible entity of the given types, None if there is no entity
+        """
+        _sqlGet="""SELECT min(pycadent_rtree.pycad_bbox_xmin),
+                        min(pycadent_rtree.pycad_bbox_ymin),
+                        max(pycadent_rtree.pycad_bbox_xmax),
+                        max(pycadent_rtree.pycad_bbox_ymax)
+                    FROM pycadhead
+                    CROSS JOIN pycadent_rtree
+                        ON pycadent_rtree.pycad_id=pycadhead.pycad_id
+                    WHERE pycadhead.pycad_entity_state NOT LIKE 'DELETE'
+                    AND pycadhead.pycad_visible=1
+                    AND pycadhead.pycad_object_type IN (%s)
+                    """%",".join(["?"]*len(entityTypeArray))
+        _row=self.makeSelect(_sqlGet, tuple(entityTypeArray)).fetchone()
+        if _row is None or _row[0] is None:
+            return None
+        return tuple(_row)
+
     def getEntityFromType(self,entityType):
         """
-            get all the entity from a given type 
+            get all the entity from a given type
         """
         _outObj=[]
         _dbEntRow=self.getMultiFilteredEntity(entityType=entityType)
-        for _row in _dbEntRow: 
-            _style=pickle.loads(str(_row[4]))
-            _dumpObj=pickle.loads(str(_row[3]))
-            _objEnt=Entity(_row[2],_dumpObj,_style,_row[1])
-            _objEnt.state=_row[5]
-            _objEnt.index=_row[6]
-            _objEnt.visible=_row[7]
-            if _row[8]!=None:
-                for name,value in pickle.loads(str(_row[8])):
-                    _objEnt.addPropertie(name, value)
-                _objEnt.updateBBox()            
+        for _row in _dbEntRow:
+            _objEnt=self.convertRowToDbEnt(_row)
             _outObj.append(_objEnt)
-        return _outObj            
-    
+        return _outObj
+
     def getEntityFromTypeArray(self, typeArray):
         """
             get entitys from an array of type
         """
         _outObj=[]
         _dbEntRow=self.getMultiFilteredEntity(entityTypeArray=typeArray)
-        for _row in _dbEntRow: 
-            _objEnt=self.convertRowToDbEnt(_row)            
+        for _row in _dbEntRow:
+            _objEnt=self.convertRowToDbEnt(_row)
             _outObj.append(_objEnt)
-        return _outObj  
-        
+        return _outObj
+
     def convertRowToDbEnt(self, row):
         """
             this function convert a single db row in a dbEnt Object
@@ -363,184 +881,154 @@ class EntityDb(BaseDb):
             pycad_property
             FROM pycadent
         """
-        _style=pickle.loads(str(row[4]))
-        _dumpObj=pickle.loads(str(row[3]))
+        _style=self._dbToStyle(row[4])
+        _dumpObj=decodeConstructionElements(row[2], row[3])
         _objEnt=Entity(row[2],_dumpObj,_style,row[1])
         _objEnt.state=row[5]
         _objEnt.index=row[6]
         _objEnt.visible=row[7]
-        if row[8]!=None:
-            for name,value in pickle.loads(str(row[8])):
-                    _objEnt.addPropertie(name, value)
-        _objEnt.updateBBox()  
+        for name,value in decodeProperties(row[8]):
+            _objEnt.addPropertie(name, value)
         return _objEnt
-        
-    def exsisting(self, id):    
+
+    def iterRowItems(self, rows):
+        """
+            iterate the (entityId, entityType, constructionElements, style)
+            of the pycadent rows without creating the Entity objects
+            the rows mast have the convertRowToDbEnt column order
+        """
+        for _row in rows:
+            yield (_row[1], _row[2], decodeConstructionElements(_row[2], _row[3]),
+                   self._dbToStyle(_row[4]))
+
+    def exsisting(self, id):
         """
             check id the entity is new or is olready in the database
         """
-        sqlFrase="""
-                    SELECT COUNT(*) FROM pycadent 
-                    WHERE pycad_entity_id=%s"""%str(id)
-        _rows=self.makeSelect(sqlFrase)
+        _rows=self.makeSelect('exsisting', (id, ))
         if _rows is not None:
             _row=_rows.fetchone()
             if _row is not None:
                 return True
         return False
-        
+
     def haveDrwEntitys(self, drwEntArray):
         """
             check if there is some drawing entity in the db
             drwArray mast be an erray of type entitys
         """
-        isFirst=1
-        for ent in drwEntArray:
-            if isFirst:
-                whereCause="where pycad_object_type like '%s'"%str(ent)    
-                isFirst=0
-            else:
-                whereCause="%s or pycad_object_type like '%s'"%(str(whereCause), str(ent))
-        else:
-            try:
-                sqlSelect="""select count(*) from pycadent %s"""%str(whereCause)
-            except:
-                return 0
-            return self.fetchOneRow(sqlSelect)>0
-        return 0
-        
+        if not drwEntArray:
+            return 0
+        sqlSelect="""SELECT count(*) FROM pycadent
+                    WHERE pycad_object_type IN (%s)"""%",".join(["?"]*len(drwEntArray))
+        return self.fetchOneRow(sqlSelect, tuple(drwEntArray))>0
+
     def getNewEntId(self):
         """
-            get the last id entity 
+            get the last id entity
         """
-        _outObj=0
-        _sqlSelect="""select max(pycad_entity_id) from pycadent"""
-        _rows=self.makeSelect(_sqlSelect)
-        if _rows is not None:
-            _dbEntRow=_rows.fetchone()
-            if _dbEntRow is not None:
-                if _dbEntRow[0] is not None:
-                    _outObj=int(_dbEntRow[0])
-        return _outObj
+        _outObj=self.fetchOneRow('getNewEntId')
+        if _outObj is None:
+            return 0
+        return int(_outObj)
 
     def markUndoVisibility(self,undoId,visible):
         """
             set as undo visible all the entity with undoId
         """
-        _sqlVisible="""UPDATE pycadent SET pycad_undo_visible=%s
-                    WHERE pycad_undo_id=%s"""%(str(visible),str(undoId))
-        self.makeUpdateInsert(_sqlVisible)
-    
+        self.makeUpdateInsert('markUndoVisibility', (visible, undoId))
+        self._refreshHead(undoId=undoId)
+
+    def getUndoEntityIds(self, undoId):
+        """
+            get the id of all the entity that have a revision with undoId
+        """
+        return [_row[0] for _row in self.makeSelect('getUndoEntityIds', (undoId, ))]
+
     def markUndoVisibilityFromEntId(self, entityId, visible):
         """
             set the undo visibility to for all the entity
         """
-        _sqlVisible="""UPDATE pycadent SET pycad_undo_visible=%s
-                    WHERE pycad_entity_id=%s"""%(str(visible),str(entityId))
         try:
-            self.makeUpdateInsert(_sqlVisible)
+            self.makeUpdateInsert('markUndoVisibilityFromEntId', (visible, entityId))
         except:
             # may be the update culd fail in case we create the first entity
             return
+        self._refreshHead(entityId)
 
     def markEntVisibility(self,entId,visible):
         """
             mark the visibility of the entity
         """
-        _tableId="""SELECT MAX(pycad_id) FROM pycadent 
-                    WHERE pycad_entity_id=%s"""%str(entId)
-        _entId=self.fetchOneRow(_tableId)
-        if _entId is None:
+        _tableId=self.fetchOneRow('getLastTableId', (entId, ))
+        if _tableId is None:
             raise EmptyDbSelect, "Unable to find the entity with id %s"%str(entId)
         # Update the entity state
-        _sqlVisible="""UPDATE pycadent SET pycad_undo_visible=%s
-                    WHERE pycad_id=%s"""%(str(visible),str(_entId))
-        self.makeUpdateInsert(_sqlVisible) 
-             
+        self.makeUpdateInsert('markTableIdVisibility', (visible, _tableId))
+        self._refreshHead(entId)
+
     def hideAllEntityIstance(self,entId,visible):
         """
             hide all the row with entId
         """
-        _sqlVisible="""UPDATE pycadent SET pycad_undo_visible=%s
-                    WHERE pycad_entity_id=%s"""%(str(visible),str(entId))
-        self.makeUpdateInsert(_sqlVisible)      
-        
+        self.makeUpdateInsert('markUndoVisibilityFromEntId', (visible, entId))
+        self._refreshHead(entId)
+
     def delete(self,tableId):
         """
             delete the entity from db
         """
-        _sqlDelete="""DELETE FROM pycadent 
-                        WHERE pycad_id=%s"""%str(tableId)
-        self.makeUpdateInsert(_sqlDelete)
-    
+        _entId=self.fetchOneRow('getEntityIdFromTableId', (tableId, ))
+        self.makeUpdateInsert('deleteTableId', (tableId, ))
+        self.makeUpdateInsert('deleteSpatialIndex', (tableId, ))
+        if _entId is not None:
+            self._refreshHead(_entId)
+
     def uptateEntity(self, entityObj):
         """
-            Update an exsisting entity in the database 
+            Update an exsisting entity in the database
             *************************Attention*********************************
             Remarks : using this function you will loose the undo history.
             Remarks : with this function you will force to update all the value
             so you can update value on released entity .
             Remarks : use this function only internaly at the kernel .
             *******************************************************************
-        """    
+        """
         #toto : test update function
         _entityId=entityObj.getId()
-        _entityDump=pickle.dumps(entityObj.getConstructionElements())
         _entityType=entityObj.getEntityType()
+        _entityDump=encodeConstructionElements(_entityType, entityObj.getConstructionElements())
         _entityVisible=entityObj.visible
-        _styleObject=pickle.dumps(entityObj.style)
+        _styleObject=self._styleToDb(entityObj.style)
         _xMin,_yMin,_xMax,_yMax=entityObj.getBBox()
         _revisionIndex=entityObj.index
         _revisionState=entityObj.state
-        _property=pickle.dumps(entityObj.property)
-        _sqlInsert="""UPDATE pycadent set 
-                    pycad_object_type="%s",
-                    pycad_object_definition="%s",
-                    pycad_object_style=%s,
-                    pycad_bbox_xmin=%s,
-                    pycad_bbox_ymin=%s,
-                    pycad_bbox_xmax=%s,
-                    pycad_bbox_ymax=%s,
-                    pycad_entity_state="%s",
-                    pycad_index=%s,
-                    pycad_visible=%s,
-                    pycad_property=%s
-                    WHERE PyCad_Id IN (
-                        SELECT max(PyCad_Id) 
-                        FROM pycadent  
-                        WHERE pycad_undo_visible=1 
-                        GROUP BY pycad_entity_id ORDER BY PyCad_Id) 
-                    AND pycad_entity_id=%s
-                    """%(
-                    str(_entityType),
-                    str(_entityDump),
-                    str(_styleObject),
-                    str(_xMin),
-                    str(_yMin),
-                    str(_xMax),
-                    str(_yMax), 
-                    str(_revisionState),
-                    str(_revisionIndex), 
-                    str(_entityVisible), 
-                    str(_entityId),
-                    str(_property))
-        #**************************************
-        #**************Attention***************
-        #**************************************
-        #if dose not work conver it with ? insted of %s
-        #and use the  self.makeUpdateInsert(_sqlInsert,tupleargs)
-        self.makeUpdateInsert(_sqlInsert)
-        
+        _property=encodeProperties(entityObj.properties)
+        tupleArg=(
+                    _entityType,
+                    _entityDump,
+                    _styleObject,
+                    _xMin,
+                    _yMin,
+                    _xMax,
+                    _yMax,
+                    _revisionState,
+                    _revisionIndex,
+                    _entityVisible,
+                    _property,
+                    _entityId)
+        self.makeUpdateInsert('updateEntity', tupleArg)
+        # the spatial index row is written again, the entity could have
+        # no bounding box before or after the update
+        self.makeUpdateInsert('deleteHeadSpatialIndex', (_entityId, ))
+        if _xMin is not None:
+            self.makeUpdateInsert('insertHeadSpatialIndex', (_xMin, _xMax, _yMin, _yMax, _entityId))
+        self._refreshHead(_entityId)
+
     def clearEnt(self):
         """
             perform the clear of all the entity that are not in the release state
         """
-        _sql="""
-                SELECT pycad_id 
-                FROM pycadent
-                WHERE pycad_entity_state NOT LIKE "RELEASED"
-            """
-        _rows=self.makeSelect(_sql)   
-        for _row in _rows: 
+        _rows=self.makeSelect('getNotReleased').fetchall()
+        for _row in _rows:
             self.delete(_row[0])
-
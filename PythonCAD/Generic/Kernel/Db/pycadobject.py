@@ -27,7 +27,7 @@ class PyCadObject(object):
     """
         This class provide basic information for all the pythoncad object 
     """
-    def __init__(self,objId,style,eType,properties={}):
+    def __init__(self,objId,style,eType,properties=None):
         from Kernel.initsetting import OBJECT_STATE
         self.OBJECT_STATE=OBJECT_STATE
         self.__entityId=objId
@@ -36,6 +36,8 @@ class PyCadObject(object):
         self.__visible=1
         self.__style=style
         self.__entType=eType
+        if properties is None:
+            properties={}
         self.__properties=properties
 
     
@@ -21,21 +21,101 @@
 # This module provide basic operation for the Relation in the pythoncad database
 #
 
-import cPickle as pickle
-
-from Kernel.entity          import Entity
 from Kernel.Db.basedb       import BaseDb
 
 class RelationDb(BaseDb):
     """
         this class provide the besic operation for the relation
     """
-    def __init__(self,dbConnection=None):
+    STATEMENTS={
+        'saveRelation':"""INSERT INTO pycadrel (
+                      pycad_parent_id,
+                      pycad_child_id
+                      ) VALUES
+                      (?,?)""",
+        'getChildrenIds':"""SELECT pycad_child_id
+                FROM pycadrel
+                WHERE pycad_parent_id=?""",
+        'getAllChildrenType':"""SELECT pycad_id,
+                            pycad_entity_id,
+                            pycad_object_type,
+                            pycad_object_definition,
+                            pycad_object_style,
+                            pycad_entity_state,
+                            pycad_index,
+                            pycad_visible,
+                            pycad_property
+                            FROM pycadent
+                            WHERE pycad_entity_id IN
+                                (
+                                    SELECT pycad_child_id
+                                    FROM pycadrel
+                                    WHERE pycad_parent_id=?
+                                )
+                            AND pycad_id IN (
+                                SELECT pycad_id
+                                FROM pycadhead
+                                WHERE pycad_entity_state NOT LIKE 'DELETE'
+                                AND pycad_object_type LIKE ?)""",
+        'getParentEnt':"""SELECT pycad_id,
+                            pycad_entity_id,
+                            pycad_object_type,
+                            pycad_object_definition,
+                            pycad_object_style,
+                            pycad_entity_state,
+                            pycad_index,
+                            pycad_visible,
+                            pycad_property
+                            FROM pycadent
+                            WHERE pycad_entity_id IN
+                                (
+                                    SELECT pycad_parent_id
+                                    FROM pycadrel
+                                    WHERE pycad_child_id=?
+                                )
+                            AND pycad_id IN (
+                                SELECT pycad_id
+                                FROM pycadhead
+                                WHERE pycad_entity_state NOT LIKE 'DELETE'
+                                AND pycad_object_type LIKE ?)""",
+        'getLayerRelations':"""SELECT pycad_parent_id,
+                            pycad_child_id
+                            FROM pycadrel
+                            WHERE pycad_child_id IN (
+                                SELECT pycad_entity_id
+                                FROM pycadhead
+                                WHERE pycad_object_type='LAYER'
+                                AND pycad_entity_state NOT LIKE 'DELETE')
+                            AND pycad_parent_id IN (
+                                SELECT pycad_entity_id
+                                FROM pycadhead
+                                WHERE pycad_object_type='LAYER'
+                                AND pycad_entity_state NOT LIKE 'DELETE')""",
+        'deleteFromParent':"""DELETE FROM pycadrel
+                WHERE pycad_parent_id=?""",
+        'deleteFromChild':"""DELETE FROM pycadrel
+                WHERE pycad_child_id=?""",
+        'deleteRelation':"""DELETE FROM pycadrel
+                WHERE pycad_parent_id=? AND pycad_child_id=?""",
+        'relationExsist':"""SELECT COUNT(*)
+                FROM pycadrel
+                WHERE pycad_parent_id=? AND pycad_child_id=?""",
+        }
+
+    def __init__(self,dbConnection=None, entityDb=None):
+        """
+            entityDb is the EntityDb used to convert the entity rows
+            so the style cache is shared with it
+        """
         BaseDb.__init__(self)
         if dbConnection is None:
             self.createConnection()
         else:
             self.setConnection(dbConnection)
+        if entityDb is None:
+            from Kernel.Db.entitydb import EntityDb
+            entityDb=EntityDb(self.getConnection())
+        self.__entityDb=entityDb
 
         _sqlCheck="""select * from sqlite_master where name like 'pycadrel'"""
         _table=self.makeSelect(_sqlCheck).fetchone()
@@ -52,27 +132,20 @@ class RelationDb(BaseDb):
             This method save the Relation in the db
             TODO  : THE RELATION MAST BE UNIVOC ...
         """
-        _parentEntityId=parentEntObj.getId()
-        _childEntityId=childEntObj.getId()
-        _sqlInsert="""INSERT INTO pycadrel (
-                      pycad_parent_id,
-                      pycad_child_id
-                      ) VALUES
-                      (%s,"%s")"""%(
-                    str(_parentEntityId),
-                    str(_childEntityId))
-        self.makeUpdateInsert(_sqlInsert)
+        self.makeUpdateInsert('saveRelation', (parentEntObj.getId(), childEntObj.getId()))
+
+    def saveRelations(self, relations):
+        """
+            save a list of relation (parentId, childId) with a single executemany
+        """
+        self.makeMultipleUpdateInsert('saveRelation', relations)
 
     def getChildrenIds(self,entityParentId):
         """
             Get the children id of a relation
         """
         _outObj=[]
-        _sqlGet="""SELECT pycad_child_id
-                FROM pycadrel
-                WHERE pycad_parent_id=%s"""%str(entityParentId)
-        _rows=self.makeSelect(_sqlGet)
-        _dbEntRow=self.makeSelect(_sqlGet)
+        _dbEntRow=self.makeSelect('getChildrenIds', (entityParentId, ))
         if _dbEntRow is not None:
             for _row in _dbEntRow:
                 _outObj.append(_row[0])
@@ -87,116 +160,79 @@ class RelationDb(BaseDb):
             childrenType='%'
         if childrenType=='ALL':
             childrenType='%' # TODO : controllare questa select pycad_id,
-        _sqlSelect="""SELECT 
-                            pycad_entity_id,
-                            pycad_object_type,
-                            pycad_object_definition,
-                            pycad_object_style,
-                            pycad_entity_state,
-                            pycad_index,
-                            pycad_visible,
-                            pycad_id
-                            FROM pycadent
-                            WHERE pycad_entity_id IN
-                                (
-                                    SELECT pycad_child_id
-                                    FROM pycadrel
-                                    WHERE pycad_parent_id =%s
-                                )
-                            AND pycad_id IN (
-                                SELECT max(pycad_id) 
-                                FROM pycadent  
-                                WHERE pycad_undo_visible=1  
-                                GROUP BY pycad_entity_id ORDER BY pycad_id)
-                            AND pycad_entity_state NOT LIKE "DELETE"
-                            AND pycad_object_type LIKE '%s'
-                            AND pycad_undo_visible=1
-                            """%(str(parent.getId()), str(childrenType))
-        _dbEntRow=self.makeSelect(_sqlSelect)
+        _dbEntRow=self.makeSelect('getAllChildrenType', (parent.getId(), childrenType))
         for _row in _dbEntRow:
-            _style=pickle.loads(str(_row[3]))
-            _dumpObj=pickle.loads(str(_row[2]))
-            _objEnt=Entity(_row[1],_dumpObj,_style,_row[0])
-            _objEnt.state=_row[4]
-            _objEnt.index=_row[5]
-            _objEnt.visible=_row[6]
-            _objEnt.updateBBox()
-            _outObj.append(_objEnt)
+            _outObj.append(self.__entityDb.convertRowToDbEnt(_row))
         return _outObj
 
+    def getChildrenRows(self, parentId, childrenTypes):
+        """
+            get the cursor of the pycadent rows of the current revision of
+            the children of the given types, the rows are read from the
+            database while the cursor is iterated
+        """
+        _sqlGet="""SELECT pycad_id,
+                    pycad_entity_id,
+                    pycad_object_type,
+                    pycad_object_definition,
+                    pycad_object_style,
+                    pycad_entity_state,
+                    pycad_index,
+                    pycad_visible,
+                    pycad_property
+                    FROM pycadent
+                    WHERE pycad_id IN (
+                        SELECT pycad_id
+                        FROM pycadhead
+                        WHERE pycad_entity_id IN (
+                            SELECT pycad_child_id
+                            FROM pycadrel
+                            WHERE pycad_parent_id=?)
+                        AND pycad_entity_state NOT LIKE 'DELETE'
+                        AND pycad_object_type IN (%s))
+                    """%",".join(["?"]*len(childrenTypes))
+        return self.makeSelect(_sqlGet, (parentId, )+tuple(childrenTypes))
+
+    def getLayerRelations(self):
+        """
+            get the (parentId, childId) of all the layer nested in a layer
+        """
+        return [(_row[0], _row[1]) for _row in self.makeSelect('getLayerRelations')]
+
     def getParentEnt(self,entity):
         """
             get the parent entity
             TODO: To be tested
         """
-        _sqlSelect="""SELECT pycad_entity_id,
-                            pycad_object_type,
-                            pycad_object_definition,
-                            pycad_object_style,
-                            pycad_entity_state,
-                            pycad_index,
-                            pycad_visible
-                            FROM pycadent
-                            WHERE pycad_entity_id IN
-                                (
-                                    SELECT pycad_parent_id
-                                    FROM pycadrel
-                                    WHERE pycad_child_id =%s
-                                )
-                            AND pycad_entity_state NOT LIKE "DELETE"
-                            AND pycad_object_type LIKE '%s'
-                            AND pycad_undo_visible=1
-                            """%(str(entity.getId()), str(entity.eType))
-        _dbEntRow=self.makeSelect(_sqlSelect)
+        _dbEntRow=self.makeSelect('getParentEnt', (entity.getId(), entity.eType))
         for _row in _dbEntRow:
-            _style=_row[3]
-            _dumpObj=pickle.loads(str(_row[2]))
-            _objEnt=Entity(_row[1],_dumpObj,_style,_row[0])
-            _objEnt.state=_row[4]
-            _objEnt.index=_row[5]
-            _objEnt.visible=_row[6]
-            _objEnt.updateBBox()
-            return _objEnt
+            return self.__entityDb.convertRowToDbEnt(_row)
         return None
 
     def deleteFromParent(self,entityObj):
         """
             Delete the entity from db
         """
-        _entityId=entityObj.getId()
-        _sqlDelete="""DELETE FROM pycadrel
-            WHERE pycad_parent_id='%s'"""%str(_entityId)
-        self.makeUpdateInsert(_sqlDelete)
+        self.makeUpdateInsert('deleteFromParent', (entityObj.getId(), ))
 
     def deleteFromChild(self,entityObj):
         """
             Delete the entity from db
         """
-        _entityId=entityObj.getId()
-        _sqlDelete="""DELETE FROM pycadrel
-            WHERE pycad_child_id='%s'"""%str(_entityId)
-        self.makeUpdateInsert(_sqlDelete)
+        self.makeUpdateInsert('deleteFromChild', (entityObj.getId(), ))
 
     def deleteRelation(self,entityObjParent,entityObjChild):
         """
             delete the relation from parent and child
         """
-        _parentId=entityObjParent.getId()
-        _childId=entityObjChild.getId()
-        _sqlDelete="""DELETE FROM pycadrel
-            WHERE pycad_parent_id='%s' and pycad_child_id='%s'and """%(str(_parentId),str(_childId))
-        self.makeUpdateInsert(_sqlDelete)
+        self.makeUpdateInsert('deleteRelation',
+                              (entityObjParent.getId(), entityObjChild.getId()))
 
     def relationExsist(self, parentId, childId):
         """
             check if the given parent child id exsist or not
         """
-        _sqlSelect="""SELECT COUNT(*)
-                    FROM pycadrel
-                    WHERE pycad_parent_id='%s' and pycad_child_id='%s'
-                    """%(str(parentId),str(childId))
-        res=self.fetchOneRow(_sqlSelect)
-        return res
+        return self.fetchOneRow('relationExsist', (parentId, childId))
 
 """
     TODO TEST deleteFromChild
@@ -0,0 +1,117 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# This  module provide the schema migration of the pythoncad database
+# The schema version is stored in the sqlite user_version pragma
+#
+
+from Kernel.Db.basedb           import BaseDb
+from Kernel.Db.entitydb         import EntityDb
+
+#
+# Every migration is a list of sql statement that bring the database
+# from the previous version to the version in the key, a step that need the
+# entity could be an EntityDb method that is called with the EntityDb
+# the tables must be already created by the EntityDb, RelationDb and UndoDb
+#
+MIGRATIONS={
+    1:(
+        # current revision of an entity and head refresh
+        """CREATE INDEX IF NOT EXISTS pycadent_entity_idx
+                    ON pycadent (pycad_entity_id, pycad_id)""",
+        # undo / redo visibility and head refresh by undo id
+        """CREATE INDEX IF NOT EXISTS pycadent_undo_idx
+                    ON pycadent (pycad_undo_id, pycad_entity_id)""",
+        """CREATE INDEX IF NOT EXISTS pycadent_type_idx
+                    ON pycadent (pycad_object_type)""",
+        """CREATE INDEX IF NOT EXISTS pycadrel_parent_idx
+                    ON pycadrel (pycad_parent_id, pycad_child_id)""",
+        """CREATE INDEX IF NOT EXISTS pycadrel_child_idx
+                    ON pycadrel (pycad_child_id, pycad_parent_id)""",
+        """CREATE INDEX IF NOT EXISTS pycadundo_incremental_idx
+                    ON pycadundo (pycad_incremental_id)""",
+        """CREATE INDEX IF NOT EXISTS pycadhead_type_idx
+                    ON pycadhead (pycad_object_type, pycad_visible)""",
+        ),
+    2:(
+        # text saved with the bounding box of its point
+        EntityDb.updateTextBBox,
+        ),
+    }
+
+SCHEMA_VERSION=max(MIGRATIONS.keys())
+
+class SchemaDb(BaseDb):
+    """
+        this class upgrade the database schema to SCHEMA_VERSION
+    """
+    def __init__(self,dbConnection, entityDb=None):
+        BaseDb.__init__(self)
+        if dbConnection is None:
+            self.createConnection()
+        else:
+            self.setConnection(dbConnection)
+        self.__entityDb=entityDb
+
+    def getSchemaVersion(self):
+        """
+            get the schema version of the database
+        """
+        _version=self.fetchOneRow("PRAGMA user_version")
+        if _version is None:
+            return 0
+        return int(_version)
+
+    def setSchemaVersion(self, version):
+        """
+            set the schema version of the database
+            Remarks : pragma do not accept bound parameter
+        """
+        self.makeUpdateInsert("PRAGMA user_version=%s"%str(int(version)))
+
+    def migrate(self):
+        """
+            apply all the migration newer than the database version
+            return the number of migration applied
+        """
+        _version=self.getSchemaVersion()
+        if _version>=SCHEMA_VERSION:
+            return 0
+        _applied=0
+        _commit=BaseDb.commit
+        BaseDb.commit=False
+        try:
+            for _newVersion in sorted(MIGRATIONS.keys()):
+                if _newVersion<=_version:
+                    continue
+                for _step in MIGRATIONS[_newVersion]:
+                    if callable(_step):
+                        if self.__entityDb is None:
+                            self.__entityDb=EntityDb(self.getConnection())
+                        _step(self.__entityDb)
+                    else:
+                        self.makeUpdateInsert(_step)
+                self.setSchemaVersion(_newVersion)
+                _applied+=1
+            self.makeUpdateInsert("ANALYZE")
+        finally:
+            BaseDb.commit=_commit
+        self.performCommit()
+        return _applied
@@ -31,6 +31,19 @@ class UndoDb(BaseDb):
         this Class Provide all the basic operation to be made on the
         undo
     """
+    STATEMENTS={
+        'getMaxUndoIndex':"""SELECT max(pycad_incremental_id) FROM pycadundo""",
+        'getLastUndoIndex':"""SELECT pycad_incremental_id FROM pycadundo
+                    WHERE pycad_id=(SELECT max(pycad_id) FROM pycadundo)""",
+        'insertUndo':"""INSERT INTO pycadundo
+                    (pycad_incremental_id) VALUES (?)""",
+        'undoIdExsist':"""SELECT pycad_incremental_id FROM pycadundo
+                    WHERE pycad_incremental_id=?""",
+        'clearUndoTable':"""DELETE FROM pycadundo""",
+        'deleteUndo':"""DELETE FROM pycadundo
+                    WHERE pycad_incremental_id=?""",
+        }
+
     def __init__(self,dbConnection):
         BaseDb.__init__(self)
         if dbConnection is None:
@@ -55,11 +68,9 @@ class UndoDb(BaseDb):
         """
             get the gretest undo index from database
         """
-        _sqlCheck="select max(pycad_incremental_id) from pycadundo"
-        _row=self.fetchOneRow(_sqlCheck)
+        _row=self.fetchOneRow('getMaxUndoIndex')
         if _row is None:            # no entity in the table
-            _sqlInser="""INSERT INTO pycadundo (pycad_incremental_id) VALUES (1)"""
-            self.makeUpdateInsert(_sqlInser)
+            self.makeUpdateInsert('insertUndo', (1, ))
             return 1
         return _row # get the max index of the table
 
@@ -67,11 +78,9 @@ class UndoDb(BaseDb):
         """
             get the active undo index from database
         """
-        _sqlCheck="select pycad_incremental_id from pycadundo where pycad_id=(select max(pycad_id) from pycadundo)"
-        _row=self.fetchOneRow(_sqlCheck)
+        _row=self.fetchOneRow('getLastUndoIndex')
         if _row is None:            # no entity in the table
-            _sqlInser="""INSERT INTO pycadundo (pycad_incremental_id) VALUES (1)"""
-            self.makeUpdateInsert(_sqlInser)
+            self.makeUpdateInsert('insertUndo', (1, ))
             return 1
         return _row # get the max index of the table
 
@@ -87,9 +96,7 @@ class UndoDb(BaseDb):
             else:
                 _id-=1
         if _id>0:
-            _sqlInsert="""INSERT INTO pycadundo
-                        (pycad_incremental_id) VALUES (%s)"""%str(_id)
-            self.makeUpdateInsert(_sqlInsert)
+            self.makeUpdateInsert('insertUndo', (_id, ))
             self.__activeUndo=_id
             return self.__activeUndo
         else:
@@ -107,9 +114,7 @@ class UndoDb(BaseDb):
             else:
                 _id+=1
         if _id<=self.__lastUndo:
-            _sqlInsert="""INSERT INTO pycadundo
-                        (pycad_incremental_id) VALUES (%s)"""%str(_id)
-            self.makeUpdateInsert(_sqlInsert)
+            self.makeUpdateInsert('insertUndo', (_id, ))
             self.__activeUndo=_id
             return self.__activeUndo
         else:
@@ -119,9 +124,7 @@ class UndoDb(BaseDb):
         """
             check is the undo id exsist
         """
-        _sqlSelect="""SELECT pycad_incremental_id FROM pycadundo
-                      WHERE pycad_incremental_id =%s"""%str(undoId)
-        return not self.fetchOneRow(_sqlSelect) is None
+        return not self.fetchOneRow('undoIdExsist', (undoId, )) is None
 
     def getNewUndo(self):
         """
@@ -131,9 +134,7 @@ class UndoDb(BaseDb):
             self.suspendCommit()        #suspend commit operation
             self.__lastUndo+=1
             self.__activeUndo=self.__lastUndo
-            _sqlInser="""INSERT INTO pycadundo
-                        (pycad_incremental_id) VALUES (%s)"""  %str(self.__lastUndo)
-            self.makeUpdateInsert(_sqlInser)
+            self.makeUpdateInsert('insertUndo', (self.__lastUndo, ))
             self.performCommit()
             return self.__lastUndo
         except:
@@ -147,16 +148,23 @@ class UndoDb(BaseDb):
         """
             Clear all the undo created
         """
-        _sqlDelete="""DELETE FROM pycadundo"""
-        self.makeUpdateInsert(_sqlDelete)
+        self.makeUpdateInsert('clearUndoTable')
 
     def deleteUndo(self,undoId):
         """
             delete the undo index
         """
-        _sqlDelete="""DELETE FROM pycadundo WHERE
-                    (pycad_incremental_id) VALUES (%s)"""%str(undoId)
-        self.makeUpdateInsert(_sqlDelete)
+        self.makeUpdateInsert('deleteUndo', (undoId, ))
+
+    def cancelUndo(self, undoId, activeUndoId):
+        """
+            remove the undo index got by getNewUndo that has not been used
+            and set back the active undo index
+        """
+        self.deleteUndo(undoId)
+        if self.__lastUndo==undoId:
+            self.__lastUndo-=1
+        self.__activeUndo=activeUndoId
 
     def getMaxUndoId(self):
         """
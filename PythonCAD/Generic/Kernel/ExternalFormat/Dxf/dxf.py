@@ -23,14 +23,10 @@ dxfDebug=False
 import math         # added to handle arc start and end point defination
 import re           # added to handle Mtext
 import os, sys
-from Kernel.initsetting               import cgcol
+from Kernel.initsetting               import cgcol, DRAWIN_ENTITY
 from Kernel.layer                     import Layer
-from Kernel.GeoEntity.point           import Point
-from Kernel.GeoEntity.segment         import Segment
-from Kernel.GeoEntity.arc             import Arc
-from Kernel.GeoEntity.text            import Text
-from Kernel.GeoEntity.ellipse         import Ellipse
-from Kernel.GeoEntity.polyline        import Polyline
+from Kernel.ExternalFormat.Dxf.dxfparallel import DxfParallelImport
+from Kernel.ExternalFormat.Dxf.dxfwriter   import DxfWriter, encodeText
 def ChangeColor(x):
     try:
         newcolor = cgcol[x]
@@ -109,12 +105,14 @@ class DrawingFile(object):
         else:
             raise "Unable to perfor writing operation"
 
-    def writeError(self,functionName,msg):
+    def writeError(self,functionName,msg,lineNumber=None):
         """
             Add an Error to the Collection
         """
+        if lineNumber is None:
+            lineNumber=self.__lineNumber
         _msg=u'Error on line %s function Name: %s Message %s \n'%(
-            str(self.__lineNumber),functionName,msg)
+            str(lineNumber),functionName,msg)
         self.__errors.append(_msg)
 
     def getError(self):
@@ -154,490 +152,55 @@ class Dxf(DrawingFile):
     def exportEntitis(self):
         """
             export The current file in dxf format
-        """
-        _fo=self.createAsci()               #open the file for writing
-        _layersEnts=self.getAllEntitis()    #get all the entities from the file
-        self.writeLine("999\nExported from Pythoncad\nSECTION\n  2\nENTITIES\n")#header section for entities
-        for _key in _layersEnts:            #Looping at all layer
-            #create header section#
-            for _obj in _layersEnts[_key]:  #looping at all entities in the layer
-                obj=_obj.toGeometricalEntity()
-                if isinstance(obj,Segment):#if it's segment
-                    self.writeSegment(obj, _obj.getInnerStyle()) # ad it at the dxf drawing
-                    continue
-                if isinstance(obj,Arc):
-                    self.writeArc(obj, _obj.getInnerStyle())
-                    continue
-                if isinstance(obj,Polyline):
-                    self.writePolyline(obj, _obj.getInnerStyle())
-                    continue
-                if isinstance(obj,Text):
-                    self.writeText(obj, _obj.getInnerStyle())
-                    continue
-                # go on end implements the other case arc circle ...
-        self.writeLine("  0\nENDSEC\n  0\nEOF")#writing End Of File
-        self.close()
-
-    def getAllEntitis(self):
-        """
-            retrive all the entitys from the drawing
-        """
-        _outLayers={}
-        getChildrenEnt=self.__kernel.getTreeLayer.getLayerChildren
-        layerNodes=self.__kernel.getTreeLayer.getLayerdbTree()
-        def populateDxfStructure(layers):
-            for key in layers:
-                _layerEnts=[]
-                layer, childs=layers[key]
-                for ent in getChildrenEnt(layer):
-                    _layerEnts.append(ent)
-                l=self.__kernel.getTreeLayer._getLayerConstructionElement(layer)
-                _outLayers[l.name]=_layerEnts
-                populateDxfStructure(childs)
-        populateDxfStructure(layerNodes)
-        return _outLayers
-
-    def writeSegment(self,e, style):
-        """
-           write segment to the dxf file
-        """
-        x1,y1=e.getP1().getCoords()
-        x2,y2=e.getP2().getCoords()
-        _c=style.getStyleProp('entity_color')
-        _c = ChangeColor(_c)
-        dPrint("debug line color are %s"%str( _c)) # TODO : replace the dprint with the logging
-        self.writeLine("  0\nLINE\n100\nAcdbLine\n")
-        self.writeLine(" 62\n" + str(_c) +"\n")
-        self.writeLine(" 10\n" +str(x1) +"\n")
-        self.writeLine(" 20\n" +str(y1) +"\n 30\n0.0\n")
-        self.writeLine(" 11\n" +str(x2) +"\n")
-        self.writeLine(" 21\n" +str(y2) +"\n 31\n0.0\n")
-
-    def writeArc(self,e, style):
-        """
-           Write Arc to the dxf file
-        """
-        x1,y1 = e.getCenter().getCoords()
-        r = e.getRadius()
-        sa = e.getStartAngle()
-        ea = e.getEndAngle()
-        _c = str(style.getStyleProp('entity_color'))
-        _c = ChangeColor(_c)
-        dPrint("debug Arc color are %s "%str( _c))
-        self.writeLine("  0\nARC\n100\nAcDbCircle\n")
-        self.writeLine(" 62\n" +str(_c) +"\n")
-        self.writeLine(" 10\n" +str(x1) +"\n")
-        self.writeLine(" 20\n" +str(y1) +"\n 30\n0.0\n")
-        self.writeLine(" 40\n" +str(r) +"\n")
-        self.writeLine(" 50\n" +str(sa) +"\n 51\n"+str(ea)+"\n")
-
-    def writePolyline(self,e, style):
-        """
-           Write Polyline to the dxf file
-        """
-        _c = str(style.getStyleProp('entity_color'))
-        _c = ChangeColor(_c)
-        dPrint( "debug Arc color are %s"%str(_c))
-        self.writeLine("  0\nLWPOLYLINE\n100\nAcDbPolyline\n")
-        self.writeLine(" 62\n" +str(_c) +"\n")
-        count = e.getNumPoints()
-        self.writeLine(" 90\n" +str(count)+ "\n")
-        self.writeLine(" 70\n0\n")
-        self.writeLine(" 43\n0\n")
-        c = 0
-        points = []
-        while c < count:
-            x1,y1 = e.getPoint(c).getCoords()
-            self.writeLine(" 10\n" +str(x1) +"\n")
-            self.writeLine(" 20\n" +str(y1) +"\n")
-            c = c + 1
-
-    def writeText(self,e, style):
-        """
-           Write Text to the dxf file
-        """
-        x1,y1=e.location.getCoords()
-        h = style.getStyleProp('text_height')
-        _c = str(style.getStyleProp('entity_color'))
-        _c = ChangeColor(_c)
-        dPrint("debug Text color are %s "%str( _c))
-        txt = e.text
-        txt = txt.replace(' ', '\~')
-        txt = txt.replace('\n', '\P')
-        self.writeLine("  0\nMTEXT\n100\nAcDbMText\n")
-        self.writeLine(" 62\n" +str(_c) +"\n")
-        self.writeLine(" 10\n" +str(x1) +"\n")
-        self.writeLine(" 20\n" +str(y1) +"\n 30\n0.0\n")
-        self.writeLine(" 40\n" +str(h) +"\n")
-        self.writeLine("  1\n" +str(txt) +"\n")
+            the entity of each layer are read from a cursor and written
+            one by one, so the memory do not grow with the drawing
+        """
+        _types=DRAWIN_ENTITY.values()
+        _layers=[]
+        for _layerEnt in self.__kernel.getTreeTable.getLayerEntities():
+            _cElements=_layerEnt.getConstructionElements()
+            _layer=_cElements[_cElements.keys()[0]]
+            _layers.append((_layerEnt, encodeText(_layer.name), _layer.visible))
+        _writer=DxfWriter(self.getFileName())
+        try:
+            _writer.writeHeader([(_name, _visible) for _layerEnt, _name, _visible in _layers])
+            for _layerEnt, _name, _visible in _layers:
+                for _id, _type, _cElements, _style in self.__kernel.iterChildrenItems(_layerEnt, _types):
+                    _writer.writeEntity(_name, _type, _cElements, _style, _id)
+        finally:
+            _writer.close()
+        for _id, _type, _msg in _writer.getErrors():
+            self.writeError(_type, "Entity %s %s"%(str(_id), _msg), 0)
+        for _type, _count in _writer.getSkipped().items():
+            dPrint("Skipped %s %s entity"%(str(_count), _type))
 
     def importEntitis(self):
         """
             Open The file and create The entity in pythonCad
+            the entity are saved in a new layer with a single undo, if the
+            import fails no entity is kept, if it is cancelled the entity
+            saved so far are kept
         """
         dPrint( "Debug: import entitys")
-        self.readAsci();
         _layerName,_ext=os.path.splitext(os.path.basename(self.getFileName()))
         _layerName="Imported_"+_layerName
-        parentLayer=self.__kernel.getTreeLayer.getActiveLater()
         newLayer=self.__kernel.saveEntity(Layer(_layerName))
-        self.__kernel.getTreeLayer.insert(newLayer, parentLayer)
-
+        self.__kernel.getTreeTable.insert(newLayer)
+        _import=DxfParallelImport(self.__kernel, self.getFileName())
+        _import.progressEvent+=self.__kernel.importProgressEvent
+        _import.cancelEvent+=self.__kernel.importCancelEvent
+        self.__kernel.startMassiveCreation()
         try:
-            self.__kernel.startMassiveCreation()
-            while True:
-                _k = self.readLine()
-                if not _k: break
-                else:
-                    ##print  "debug: readline", _k # TODO : replace the dprint with the logging
-                    #dPrint( "Debug: Read Line line = [%s]"%str(_k)) # TODO : replace the dprint with the logging
-                    if _k[0:5] == 'TABLE':
-                        _k = self.readLine() # for tag "  2"
-                        _k = self.readLine() # for table name
-                        ##print "debug TABLE found" # TODO : replace the dprint with the logging
-                        if _k[0:5] == 'LAYER':
-                            self.readLayer()
-                            #print "debug LAYER found" # TODO : replace the dprint with the logging
-                        continue
-                    if _k[0:4] == 'LINE':
-                        self.createLineFromDxf()
-                        ##print "debug line found" # TODO : replace the dprint with the logging
-                        continue
-                    if _k[0:6] == 'CIRCLE':
-                        self.createCircleFromDxf()
-                        continue
-                    if _k[0:5] == 'MTEXT':
-                        self.createTextFromDxf()
-                        continue
-                    if _k[0:4] == 'TEXT':
-                        #self.createTextFromDxf()
-                        continue
-                    if _k[0:3] == 'ARC':
-                        self.createArcFromDxf()
-                        ##print "debug arc found"
-                        continue
-                    if _k[0:10] == 'LWPOLYLINE':
-                        #self.createPolylineFromDxf()
-                        continue
-                    if _k[0:8] == 'POLYLINE':
-                        #self.createPolylineFromDxf()
-                        continue
-                    if not _k : break
-            self.__kernel.performCommit()
-        finally:
-            self.__kernel.stopMassiveCreation()
-    def readLayer(self):
-        """
-        Reading the data in the dxf file under TABLE section
-        it collects the information regarding the
-        Layers, Colors and Linetype
-        WORK IN PROGRESS
-        """
-        ##print 'debug Layer found !'
-        layerColor = {}
-        dxfColor = 0
-        layerName = '0'
-        #_k = self.readLine()
-        while True:
-            _k = self.readLine()
-            if _k[0:6] == 'ENDTAB':
-                break
-            if _k[0:3] == '  2':
-                _k = self.readLine()
-                layerName = _k.replace('\n', '')
-                #print "Debug New LayerName=", layerName
-            if _k[0:3] == ' 62':
-                _k = self.readLine()
-                dxfColor = _k.replace('\n', '')
-                #print "Debug new dxfColor = ", dxfColor
-            layerColor[layerName] = dxfColor
-        return layerColor
-
-    def createLineFromDxf(self):
-        """
-            read the line dxf section and create the line
-        """
-        dPrint( "Debug createLineFromDxf" )# TODO : replace the dprint with the logging
-        x1 = None
-        y1 = None
-        x2 = None
-        y2 = None
-        g = 0 # start counter to read lines
-        c = 0
-        while g < 18:
-            ##print "Debug g =", g
-            ##print "Debug: Read line  g = %s Value = %s "%(str(g),str(line))
-            _k = self.readLine()
-            ##print "Debug: Read line g = %s k =  %s "%(str(g),str(k))
-            #dPrint( "line value k="+_k)
-            if _k[0:3] == ' 62':# COLOR
-                _k = self.readLine()
-                c = (int(_k[0:-1]))
-            if _k[0:3] == ' 10':
-                dPrint( "debug 10"+ _k)
-                # this line of file contains start point"X" co ordinate
-                ##print "Debug: Convert To flot x1: %s" % str(k[0:-1])
-                _k = self.readLine()
-                x1 = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 20':# this line of file contains start point "Y" co ordinate
-                ##print "Debug: Convert To flot y1: %s" % str(k[0:-1])
-                _k = self.readLine()
-                y1 = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 30':# this line of file contains start point "Z" co ordinate
-                ##print "Debug: Convert To flot z1: %s" % str(k[0:-1])
-                _k = self.readLine()
-                z1 = (float(_k[0:-1]))
-                continue
-                # Z co ordinates are not used in PythonCAD we can live without this line
-            if _k[0:3] == ' 11':# this line of file contains End point "X" co ordinate
-                ##print "Debug: Convert To flot x2: %s" % str(k[0:-1])
-                _k = self.readLine()
-                x2 = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 21':# this line of file contains End point "Y" co ordinate
-                ##print "Debug: Convert To flot y2: %s" % str(k[0:-1])
-                _k = self.readLine()
-                y2 = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 31':# this line of file contains End point "Z" co ordinate
-                ##print "Debug: Convert To flot z2: %s" % str(k[0:-1])
-                _k = self.readLine()
-                z2 = (float(_k[0:-1]))
-                g = 119
-                continue
-                #Z coordinates are not used in PythonCAD we can live without this line
-        if c == None:
-            c = 7
-        if not ( x1==None or y1 ==None or
-           x2==None or y2 ==None ):
-            self.createLine(x1,y1,x2,y2,c)
-        else:
-            _msg=u'Read parameter from file x1: [%s] y1: [%s] x2: [%s] y2: [%s]'%(
-                        str(x1),str(y1),str(x2),str(y2))
-            self.writeError('createLineFromDxf',_msg)
-
-    def createLine(self,x1,y1,x2,y2,c):
-        """
-          Create the line into the current drawing
-        """
-        args={"SEGMENT_0":Point(x1, y1), "SEGMENT_1":Point(x2, y2)}
-        _seg = Segment(args)
-        self.__kernel.saveEntity(_seg)
-
-    def createCircleFromDxf(self):
-        """
-            Read and create the Circle into drawing
-        """
-        dPrint( "Debug createCircleFromDxf" )
-        g = 0 # reset g
-        c = 0
-        while g < 1:
-            _k = self.readLine()
-            dPrint( "line value k="+ _k)
-            if _k[0:3] == ' 62':# COLOR
-                _k = self.readLine()
-                c = (int(_k[0:-1]))
-            if _k[0:3] == ' 10':
-                _k = self.readLine()
-                x = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 20':
-                _k = self.readLine()
-                y = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 30':
-                _k = self.readLine()
-                z = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 40':
-                _k = self.readLine()
-                r = (float(_k[0:-1]))
-                g = 10 # g > 1 for break
-                'I need a "create Circle code" here to append the segment to image'
-        if c == None:
-            c = 7
-        self.createArc(x,y,r,c)
-
-
-    def createTextFromDxf(self):
-        """
-            Read and create the Text into drawing
-        """
-        dPrint( "Debug createTextFromDxf" )
-        g = 0 # reset g
-        x = None
-        y = None
-        h = None
-        _t= ''
-        while g < 1:
-            _k = self.readLine()
-            try:
-                dPrint("line value k="+ _k)
-                #if _k[0:3] == ' 62':# COLOR
-                #    _k = self.readLine()
-                #    c = (int(_k[0:-1]))
-                if _k[0:3] == ' 10':
-                    _k = self.readLine()
-                    x = (float(_k[0:-1]))
-                    ##print "Text Loc x =", x
-                    continue
-                if _k[0:3] == ' 20':
-                    _k = self.readLine()
-                    y = (float(_k[0:-1]))
-                    #rint "Text Loc y =", y
-                    continue
-                if _k[0:3] == ' 30':
-                    _k = self.readLine()
-                    z = (float(_k[0:-1]))
-                    ##print "Text Loc z =", z
-                    continue
-                if _k[0:3] == ' 40':
-                    _k = self.readLine()
-                    h = (float(_k[0:-1]))
-                    dPrint("Text Height =%s"%str(h))
-                    continue
-                if _k[0:3] == '  1':
-                    _k = self.readLine()
-                    _t = _k.replace('\~', ' ')
-                    _t = _t.replace('\P', '\n')
-                    ##print "Text itself is ", x, y, z, 'height', h, _t#
-                    g = 10 # g > 1 for break
-                    continue
-            except:
-                print "Error on reading "+str(_k)
-        if not (x is None or y is None or h is None):
-            self.createText(x,y,h,_t)
-        else:
-            _msg="Read parameter from file x: [%s] y: [%s] h: [%s] t: [%s]"%(
-                        str(x),str(y),str(h),str(_t))
-            self.writeError("createTextFromDxf",_msg)
-
-    def createArcFromDxf(self):
-        """
-            Read and create the ARC into drawing
-        """
-        g = 0 # reset g
-        c = 0
-        while g < 1:
-            _k = self.readLine()
-            if _k[0:3] == ' 62':# COLOR
-                _k = self.readLine()
-                c = (int(_k[0:-1]))
-            if _k[0:3] == ' 10':
-                _k = self.readLine()
-                x = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 20':
-                _k = self.readLine()
-                y = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 30':
-                _k = self.readLine()
-                z = (float(_k[0:-1]))
-            if _k[0:3] == ' 40':
-                _k = self.readLine()
-                r = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 50':
-                _k = self.readLine()
-                sa = (float(_k[0:-1]))
-                continue
-            if _k[0:3] == ' 51':
-                _k = self.readLine()
-                ea = (float(_k[0:-1]))
-                g = 10 # g > 1 for break\\
-                continue
-        if c == None:
-                c = 7
-        self.createArc(x,y,r,c,sa,ea)
-
-    def createArc(self,x,y,r,color=None,sa=None,ea=None):
-        """
-            Create a Arc entitys into the current drawing
-        """
-        _center = Point(x, y)
-        if sa is None or ea is None:
-            sa=ea=0 #This is the case of circle
-        else:
-            sa=(sa*math.pi)/180
-            ea=(ea*math.pi)/180
-            ea=ea-sa
-        args={"ARC_0":_center, "ARC_1":r, "ARC_2":sa, "ARC_3":ea}
-        _arc = Arc(args)
-        self.__kernel.saveEntity(_arc)
-
-    def createText(self,x,y,h,t):
-        """
-            Create a Text entitys into the current drawing
-        """
-        try:
-            _text = t.replace('\x00', '').decode('utf8', 'ignore').encode('utf8')
+            _import.run()
         except:
-            self.writeError("createText","Debug Error Converting in unicode [%s]"%t)
-            _text ='Unable to convert in unicode'
-        _p = Point(x, y)
-        args={"TEXT_0":_p,"TEXT_1":_text, "TEXT_2":0.0, "TEXT_3":""}
-        _tb = Text(args)
-        self.__kernel.saveEntity(_tb)
-
-    def createPolylineFromDxf(self):
-        """
-        Polyline creation read the line dxf section and create the line
-        """
-        dPrint("Exec createPolylineFromDxf")
-        c = 0
-        while True:
-            _k = self.readLine()
-            if _k[0:3] == ' 62':# COLOR
-                _k = self.readLine()
-                c = (int(_k[0:-1]))
-            if _k[0:3] == ' 10':
-                break
-        points=[]
-        p = ()
-        t = 0
-        while True:
-            # this line of file contains start point"X" co ordinate
-            # #print "Debug: Convert To flot x1: %s" % str(k[0:-1])
-            _k = self.readLine()
-            x = (float(_k[0:-1]))
-            _k = self.readLine()#pass for k[0:3] == ' 20'
-            _k = self.readLine()
-            y = (float(_k[0:-1]))
-            p = (x,y)
-            points.append(p)
-            dPrint( str(points))
-            _k = self.readLine()
-            if _k[0:3] == ' 30':
-                _k = self.readLine()
-                z1 = (float(_k[0:-1]))
-                _k = self.readLine()
-                continue
-            if _k[0:3] != ' 10':
-                break
-            continue
-        if c == None:
-                c = 7
-        if len(points)>1:
-            self.createPolyline(points,c)
-
-    def createPolyline(self,points,c):
-        """
-            Crate poliline into Pythoncad
-        """
-        pass #TODO: must be implemented
-
-        dPrint("Exec createPolyline")
-        i=0
-        args={}
-        for _x, _y in points:
-            _p = Point(_x, _y)
-            args["POLYLINE_%s"%str(i)]=_p
-            i+=1
-        pline=Polyline(args)
-        self.__kernel.saveEntity(pline)
+            _info=sys.exc_info()
+            self.__kernel.abortMassiveCreation()
+            raise _info[0], _info[1], _info[2]
+        self.__kernel.stopMassiveCreation()
+        for _lineNumber, _name, _msg in _import.getErrors():
+            self.writeError(_name, _msg, _lineNumber)
+        for _name, _count in _import.getSkipped().items():
+            dPrint("Skipped %s %s entity"%(str(_count), _name))
 
 def dPrint(msg):
     """
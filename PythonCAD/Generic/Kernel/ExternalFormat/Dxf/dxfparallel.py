@@ -0,0 +1,258 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# This module provide the parallel import of a dxf file
+#
+# the ENTITIES section is split in chunks that start with an entity, the
+# chunks are parsed by a pool of processes in compact records
+# (entityType, encodedConstructionElements, xmin, ymin, xmax, ymax) and a
+# single writer save the records in the document with batched inserts
+#
+import re
+import mmap
+import multiprocessing
+from collections import deque
+
+from Kernel.pycadevent                      import PyCadEvent
+from Kernel.entity                          import Entity
+from Kernel.Db.entitycodec                  import encodeConstructionElements
+from Kernel.ExternalFormat.Dxf.dxfreader    import DxfReader, ENTITY_CLASSES, SUB_ENTITIES
+
+#
+# size of the chunks parsed by a process
+#
+CHUNK_SIZE=1<<24
+#
+# the 0 group code line followed by the entity name, the name could not
+# be a number so a 0 value line followed by a group code do not match
+#
+_ENTITIES_START=re.compile(r'(?:\A|\n)[ \t]*0[ \t]*\r?\n[ \t]*SECTION[ \t]*\r?\n'
+                           r'[ \t]*2[ \t]*\r?\n[ \t]*ENTITIES[ \t]*(?:\r?\n|\Z)')
+_SECTION_END=re.compile(r'\n([ \t]*0[ \t]*\r?\n[ \t]*ENDSEC[ \t]*)(?:\r?\n|\Z)')
+_ENTITY_START=re.compile(r'\n([ \t]*0[ \t]*\r?\n[ \t]*([A-Za-z_][A-Za-z0-9_]*)[ \t]*)(?:\r?\n|\Z)')
+
+def findEntitiesSection(data):
+    """
+        get the (start, end) offset of the entity of the ENTITIES section
+        of the dxf data, a string or a mmap, None if there is no section
+    """
+    _m=_ENTITIES_START.search(data)
+    if _m is None:
+        return None
+    _start=_m.end()
+    _m=_SECTION_END.search(data, _start-1)
+    if _m is None:
+        return _start, len(data)
+    return _start, _m.start(1)
+
+def findEntityStart(data, offset, end):
+    """
+        get the offset of the first entity that start at or after offset
+        and is not a VERTEX, ATTRIB or SEQEND, end if there is no one
+    """
+    if offset>=end:
+        return end
+    _pos=max(offset-1, 0)
+    while True:
+        _m=_ENTITY_START.search(data, _pos, end)
+        if _m is None:
+            return end
+        if not _m.group(2) in SUB_ENTITIES:
+            return _m.start(1)
+        _pos=_m.end(2)
+
+def splitEntities(data, start, end, chunkSize=CHUNK_SIZE):
+    """
+        split the start, end range of the ENTITIES section in
+        [(start, end, firstLine), ...] chunks that begin with an entity
+    """
+    _chunks=[]
+    _line=data[:start].count('\n')+1
+    _s=start
+    while _s<end:
+        _e=findEntityStart(data, _s+chunkSize, end)
+        _chunks.append((_s, _e, _line))
+        _line+=data[_s:_e].count('\n')
+        _s=_e
+    return _chunks
+
+def iterRecords(reader):
+    """
+        iterate the (entityType, encodedConstructionElements, xmin, ymin,
+        xmax, ymax) records of the entity of the reader
+    """
+    for _type, _cElements in reader.iterItems():
+        try:
+            ENTITY_CLASSES[_type](_cElements)
+            _bbox=Entity(_type, _cElements, None, 0).getBBox()
+        except (TypeError, ValueError), _err:
+            reader.addError(0, _type, str(_err))
+            continue
+        yield (_type, str(encodeConstructionElements(_type, _cElements)))+tuple(_bbox)
+
+def parseChunk(fileName, blocks, start, end, firstLine=1):
+    """
+        parse the start, end range of the ENTITIES section
+        return (records, errors, skipped)
+    """
+    _reader=DxfReader(fileName, start=start, end=end, section='ENTITIES', firstLine=firstLine)
+    _reader.setBlocks(blocks)
+    _records=list(iterRecords(_reader))
+    return _records, _reader.getErrors(), _reader.getSkipped()
+
+#
+# the file name and the blocks of the pool process
+#
+_worker={}
+
+def _initWorker(fileName, blocks):
+    _worker['fileName']=fileName
+    _worker['blocks']=blocks
+
+def _parseChunkWorker(chunk):
+    return parseChunk(_worker['fileName'], _worker['blocks'], *chunk)
+
+class DxfParallelImport(object):
+    """
+        import the entity of a dxf file in a document, the chunks of the
+        ENTITIES section are parsed by a pool of processes and the records
+        are saved by the calling process in the order of the file
+        the handlers registered after the start of the pool are not used
+        by the pool processes on the platform without fork
+    """
+    def __init__(self, kernel, fileName, processes=None, chunkSize=CHUNK_SIZE):
+        self.__kernel=kernel
+        self.__fileName=fileName
+        if processes is None:
+            processes=multiprocessing.cpu_count()
+        self.__processes=max(processes, 1)
+        self.__chunkSize=chunkSize
+        self.__cancelled=False
+        self.__errors=[]
+        self.__skipped={}
+        # fired with (importer, doneBytes, totalBytes) after each chunk
+        self.progressEvent=PyCadEvent()
+        # fired with (importer, savedCount) when the import is cancelled
+        self.cancelEvent=PyCadEvent()
+
+    def cancel(self):
+        """
+            stop the import after the chunk in progress, could be called
+            from a progressEvent handler
+            the entity saved so far are kept
+        """
+        self.__cancelled=True
+
+    def isCancelled(self):
+        return self.__cancelled
+
+    def getErrors(self):
+        """
+            get the [(lineNumber, dxfEntityName, message), ...] of the
+            entity that could not be imported
+        """
+        return self.__errors
+
+    def getSkipped(self):
+        """
+            get the {dxfEntityName:count} of the entity with no handler
+        """
+        return self.__skipped
+
+    def run(self):
+        """
+            import the entity and return the number of saved entity
+        """
+        _fb=open(self.__fileName, 'rb')
+        try:
+            try:
+                _mm=mmap.mmap(_fb.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, mmap.error):
+                # empty file
+                return 0
+            try:
+                _section=findEntitiesSection(_mm)
+                if _section is None:
+                    return 0
+                _start, _end=_section
+                _chunks=splitEntities(_mm, _start, _end, self.__chunkSize)
+            finally:
+                _mm.close()
+        finally:
+            _fb.close()
+        # the BLOCKS section is before the ENTITIES section
+        _reader=DxfReader(self.__fileName, end=_start)
+        for _item in _reader.iterItems():
+            pass
+        return self._saveChunks(_chunks, _reader.getBlocks(), _start, _end)
+
+    def _iterResults(self, chunks, blocks):
+        """
+            iterate the (chunk, (records, errors, skipped)) in the chunk
+            order, only 2 chunks for process are parsed in advance
+        """
+        if self.__processes==1 or len(chunks)==1:
+            for _chunk in chunks:
+                yield _chunk, parseChunk(self.__fileName, blocks, *_chunk)
+            return
+        _pool=multiprocessing.Pool(min(self.__processes, len(chunks)),
+                                   _initWorker, (self.__fileName, blocks))
+        _running=deque()
+        _failed=False
+        try:
+            _todo=deque(chunks)
+            while _todo or _running:
+                while _todo and len(_running)<self.__processes*2:
+                    _chunk=_todo.popleft()
+                    _running.append((_chunk, _pool.apply_async(_parseChunkWorker, (_chunk, ))))
+                _chunk, _result=_running.popleft()
+                yield _chunk, _result.get()
+        except Exception:
+            _failed=True
+            _pool.terminate()
+            raise
+        finally:
+            # the cancelled import wait the chunks in progress, terminate
+            # could hang the pool while a result is sent
+            if not _failed:
+                for _chunk, _result in _running:
+                    _result.wait()
+                _pool.close()
+            _pool.join()
+
+    def _saveChunks(self, chunks, blocks, start, end):
+        """
+            save the records of the chunks and fire the events
+        """
+        _count=0
+        _results=self._iterResults(chunks, blocks)
+        try:
+            for (_s, _e, _line), (_records, _errors, _skipped) in _results:
+                _count+=len(self.__kernel.saveEntityRecords(_records))
+                self.__errors.extend(_errors)
+                for _name, _n in _skipped.items():
+                    self.__skipped[_name]=self.__skipped.get(_name, 0)+_n
+                self.progressEvent(self, _e-start, end-start)
+                if self.__cancelled:
+                    self.cancelEvent(self, _count)
+                    break
+        finally:
+            _results.close()
+        return _count
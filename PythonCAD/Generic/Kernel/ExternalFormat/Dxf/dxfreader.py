@@ -0,0 +1,450 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# This module provide the streaming reader of the dxf file
+#
+# the file is read as (group code, value) tags and the tags are grouped
+# by entity, the entity of the ENTITIES section are converted by the
+# handler registered for the dxf entity name in a list of
+# (entityType, constructionElements) items
+#
+import math
+import mmap
+from itertools import izip, chain
+
+from Kernel.GeoEntity.point           import Point
+from Kernel.GeoEntity.segment         import Segment
+from Kernel.GeoEntity.arc             import Arc
+from Kernel.GeoEntity.text            import Text
+from Kernel.GeoEntity.polyline        import Polyline
+from Kernel.GeoEntity.vertexarray     import VertexArray
+from Kernel.GeoUtil.affine            import translation_matrix, rotation_matrix
+from Kernel.GeoUtil.affine            import scale_matrix, multiply_matrix
+from Kernel.GeoUtil.affine            import transform_construction_elements
+
+#
+# the entity that follow a POLYLINE or an INSERT and are part of it
+#
+SUB_ENTITIES=('VERTEX', 'ATTRIB', 'SEQEND')
+#
+# the class of the entity type created by the handlers
+#
+ENTITY_CLASSES={
+    'SEGMENT':Segment,
+    'ARC':Arc,
+    'TEXT':Text,
+    'POLYLINE':Polyline,
+    }
+#
+# size of the blocks read from the file
+#
+BLOCK_SIZE=1<<22
+#
+# max level of the block inserted in a block
+#
+MAX_INSERT_LEVEL=16
+
+_dtr=math.pi/180.0
+
+DXF_ENTITY_HANDLERS={}
+
+class GroupCodes(dict):
+    """
+        the int value of the group code lines, a dict lookup is faster
+        then the int conversion of each line
+    """
+    def __missing__(self, line):
+        _code=int(line)
+        self[line]=_code
+        return _code
+
+_GROUP_CODES=GroupCodes()
+
+def registerEntityHandler(name, handler):
+    """
+        register the handler of the dxf entity name
+        handler(reader, tags) must return the list of the
+        (entityType, constructionElements) of the entity and raise
+        KeyError or ValueError for a wrong entity
+    """
+    DXF_ENTITY_HANDLERS[name.upper()]=handler
+
+def iterTags(lines):
+    """
+        iterate the (group code, value) tags of the dxf lines
+    """
+    _lines=iter(lines)
+    for _code, _value in izip(_lines, _lines):
+        yield int(_code), _value.rstrip('\r\n')
+
+def mainTags(tags):
+    """
+        get the tags of an entity without the VERTEX, ATTRIB and SEQEND
+        tags that follow it
+    """
+    for _i, (_code, _value) in enumerate(tags):
+        if _code==0:
+            return tags[:_i]
+    return tags
+
+def decodeText(text):
+    """
+        get the utf8 text of a dxf text value
+    """
+    return text.replace('\x00', '').decode('utf8', 'ignore').encode('utf8')
+
+def createLine(reader, tags):
+    _v=dict(tags)
+    return [('SEGMENT', {'SEGMENT_0':Point(float(_v[10]), float(_v[20])),
+                         'SEGMENT_1':Point(float(_v[11]), float(_v[21]))})]
+
+def createCircle(reader, tags):
+    _v=dict(tags)
+    # a circle is an arc of 2*pi as the one of the circle command, the
+    # interface do not draw an arc with no span
+    return [('ARC', {'ARC_0':Point(float(_v[10]), float(_v[20])),
+                     'ARC_1':float(_v[40]), 'ARC_2':0.0, 'ARC_3':2.0*math.pi})]
+
+def createArc(reader, tags):
+    _v=dict(tags)
+    _sa=float(_v[50])
+    # the dxf arc go counterclockwise from the start to the end angle
+    _span=math.fmod(float(_v[51])-_sa, 360.0)
+    if _span<=0.0:
+        _span+=360.0
+    return [('ARC', {'ARC_0':Point(float(_v[10]), float(_v[20])),
+                     'ARC_1':float(_v[40]), 'ARC_2':_sa*_dtr, 'ARC_3':_span*_dtr})]
+
+def createLwPolyline(reader, tags):
+    _coords=[]
+    _closed=False
+    for _code, _value in tags:
+        if _code==10 or _code==20:
+            _coords.append(float(_value))
+        elif _code==70:
+            _closed=int(_value)&1
+    if len(_coords)%2:
+        raise ValueError, "Wrong number of vertex coords"
+    if _closed and len(_coords)>2:
+        _coords.extend(_coords[0:2])
+    return [('POLYLINE', {'POLYLINE_VERTEX':VertexArray(_coords)})]
+
+def createPolyline(reader, tags):
+    _coords=[]
+    _closed=False
+    _inVertex=False
+    for _code, _value in tags:
+        if _code==0:
+            _inVertex=_value=='VERTEX'
+        elif not _inVertex:
+            if _code==70:
+                _closed=int(_value)&1
+        elif _code==10 or _code==20:
+            _coords.append(float(_value))
+    if len(_coords)%2:
+        raise ValueError, "Wrong number of vertex coords"
+    if _closed and len(_coords)>2:
+        _coords.extend(_coords[0:2])
+    return [('POLYLINE', {'POLYLINE_VERTEX':VertexArray(_coords)})]
+
+def createText(reader, tags):
+    _v=dict(tags)
+    # the pythoncad text angle is clockwise
+    _angle=-float(_v.get(50, 0.0))*_dtr
+    return [('TEXT', {'TEXT_0':Point(float(_v[10]), float(_v[20])),
+                      'TEXT_1':decodeText(_v[1]), 'TEXT_2':_angle, 'TEXT_3':''})]
+
+def createMText(reader, tags):
+    _v=dict(tags)
+    # the long text are split in the 3 tags before the 1 tag
+    _text=''.join([_value for _code, _value in tags if _code==3])+_v[1]
+    _text=_text.replace('\\~', ' ').replace('\\P', '\n')
+    if 11 in _v and 21 in _v:
+        _angle=-math.atan2(float(_v[21]), float(_v[11]))
+    else:
+        _angle=-float(_v.get(50, 0.0))*_dtr
+    return [('TEXT', {'TEXT_0':Point(float(_v[10]), float(_v[20])),
+                      'TEXT_1':decodeText(_text), 'TEXT_2':_angle, 'TEXT_3':''})]
+
+def createInsert(reader, tags):
+    _v=dict(mainTags(tags))
+    _items, _bx, _by=reader.getBlockItems(_v[2].strip())
+    if not _items:
+        return []
+    _sx=float(_v.get(41, 1.0))
+    _sy=float(_v.get(42, 1.0))
+    _rotation=rotation_matrix(0.0, 0.0, float(_v.get(50, 0.0))*_dtr)
+    _matrix=multiply_matrix(scale_matrix(0.0, 0.0, _sx, _sy), translation_matrix(-_bx, -_by))
+    _insert=translation_matrix(float(_v[10]), float(_v[20]))
+    _out=[]
+    # the insert could be an array of columns and rows
+    _columnSpacing=float(_v.get(44, 0.0))
+    _rowSpacing=float(_v.get(45, 0.0))
+    for _column in xrange(max(int(_v.get(70, 1)), 1)):
+        for _row in xrange(max(int(_v.get(71, 1)), 1)):
+            _offset=translation_matrix(_column*_columnSpacing, _row*_rowSpacing)
+            _m=multiply_matrix(_insert, multiply_matrix(_rotation, multiply_matrix(_offset, _matrix)))
+            _out.extend(zip([_type for _type, _cElements in _items],
+                            transform_construction_elements(_items, _m)))
+    return _out
+
+registerEntityHandler('LINE', createLine)
+registerEntityHandler('CIRCLE', createCircle)
+registerEntityHandler('ARC', createArc)
+registerEntityHandler('LWPOLYLINE', createLwPolyline)
+registerEntityHandler('POLYLINE', createPolyline)
+registerEntityHandler('TEXT', createText)
+registerEntityHandler('MTEXT', createMText)
+registerEntityHandler('INSERT', createInsert)
+
+class DxfReader(object):
+    """
+        streaming reader of the entity of a dxf file
+    """
+    def __init__(self, fileName, handlers=None, useMmap=False,
+                 start=0, end=None, section=None, firstLine=1):
+        """
+            handlers is the {dxfEntityName:handler} used for the entity
+            the registered handlers are used if None
+            start, end are the byte range of the file to read, section is
+            the dxf section where the range start and firstLine the line
+            number of start, used to read a part of the ENTITIES section
+        """
+        self.__fileName=fileName
+        if handlers is None:
+            handlers=DXF_ENTITY_HANDLERS
+        self.__handlers=handlers
+        self.__useMmap=useMmap
+        self.__start=start
+        self.__end=end
+        self.__section=section
+        self.__firstLine=firstLine
+        self.__blocks={}
+        self.__blockItems={}
+        self.__inserting=[]
+        self.__errors=[]
+        self.__skipped={}
+
+    def iterLineBlocks(self):
+        """
+            iterate the lists of lines of the file read in blocks from a
+            buffered or a mmap stream
+        """
+        _fb=open(self.__fileName, 'rb')
+        _mm=None
+        try:
+            _fb.seek(self.__start)
+            _read=_fb.read
+            if self.__useMmap:
+                try:
+                    _mm=mmap.mmap(_fb.fileno(), 0, access=mmap.ACCESS_READ)
+                except (ValueError, mmap.error):
+                    # empty file
+                    return
+                _mm.seek(self.__start)
+                _read=_mm.read
+            _remaining=None
+            if self.__end is not None:
+                _remaining=self.__end-self.__start
+            _rest=''
+            while True:
+                _size=BLOCK_SIZE
+                if _remaining is not None:
+                    _size=min(_size, _remaining)
+                    if _size<=0:
+                        break
+                    _remaining-=_size
+                _data=_read(_size)
+                if not _data:
+                    break
+                _data=_rest+_data
+                _cut=_data.rfind('\n')+1
+                _rest=_data[_cut:]
+                yield _data[:_cut].splitlines()
+            if _rest:
+                yield _rest.splitlines()
+        finally:
+            if _mm is not None:
+                _mm.close()
+            _fb.close()
+
+    def iterEntities(self):
+        """
+            iterate the (lineNumber, dxfEntityName, tags) of the file,
+            the VERTEX, ATTRIB and SEQEND tags are added to the entity
+            they follow
+        """
+        _held=None
+        _pending=[]
+        _base=self.__firstLine
+        for _lines in chain(self.iterLineBlocks(), (None, )):
+            _final=_lines is None
+            if _final:
+                _lines=_pending
+            elif _pending:
+                _lines=_pending+_lines
+            _nLines=len(_lines)-len(_lines)%2
+            _codes=map(_GROUP_CODES.__getitem__, _lines[0:_nLines:2])
+            _values=_lines[1:_nLines:2]
+            # the start of the entity are found by the c loop of index
+            _starts=[]
+            _i=-1
+            try:
+                while True:
+                    _i=_codes.index(0, _i+1)
+                    _starts.append(_i)
+            except ValueError:
+                pass
+            if _final:
+                _last=len(_codes)
+            elif _starts:
+                # the last entity could continue in the next block
+                _last=_starts.pop()
+            else:
+                _last=0
+            _starts.append(_last)
+            for _k in xrange(len(_starts)-1):
+                _s=_starts[_k]
+                _e=_starts[_k+1]
+                _name=_values[_s].strip()
+                _tags=zip(_codes[_s+1:_e], _values[_s+1:_e])
+                if _held is not None:
+                    if _name in SUB_ENTITIES:
+                        _held[2].append((0, _name))
+                        _held[2].extend(_tags)
+                        continue
+                    yield _held
+                    if _held[1]=='EOF':
+                        return
+                _held=(_base+_s*2, _name, _tags)
+            _pending=_lines[_last*2:]
+            _base+=_last*2
+        if _held is not None:
+            yield _held
+
+    def iterItems(self):
+        """
+            iterate the (entityType, constructionElements) of the entity
+            of the ENTITIES section
+        """
+        _section=self.__section
+        _block=None
+        for _lineNumber, _name, _tags in self.iterEntities():
+            if _name=='SECTION':
+                _section=dict(_tags).get(2, '').strip()
+            elif _name=='ENDSEC':
+                _section=None
+            elif _section=='ENTITIES':
+                for _item in self.convert(_name, _tags, _lineNumber):
+                    yield _item
+            elif _section=='BLOCKS':
+                if _name=='BLOCK':
+                    _v=dict(_tags)
+                    _block=[]
+                    self.__blocks[_v.get(2, '').strip()]=(
+                        float(_v.get(10, 0.0)), float(_v.get(20, 0.0)), _block)
+                elif _name=='ENDBLK':
+                    _block=None
+                elif _block is not None:
+                    _block.append((_lineNumber, _name, _tags))
+
+    def iterGeoEntities(self):
+        """
+            iterate the geometrical entity of the ENTITIES section
+        """
+        for _type, _cElements in self.iterItems():
+            try:
+                yield ENTITY_CLASSES[_type](_cElements)
+            except (TypeError, ValueError), _err:
+                self.addError(0, _type, str(_err))
+
+    def convert(self, name, tags, lineNumber=0):
+        """
+            get the (entityType, constructionElements) of a dxf entity
+            with the registered handler
+        """
+        _handler=self.__handlers.get(name)
+        if _handler is None:
+            self.__skipped[name]=self.__skipped.get(name, 0)+1
+            return []
+        try:
+            return _handler(self, tags)
+        except KeyError, _err:
+            _msg="Missing group code %s"%str(_err)
+        except (TypeError, ValueError), _err:
+            _msg=str(_err)
+        self.addError(lineNumber, name, _msg)
+        return []
+
+    def getBlockItems(self, name):
+        """
+            get the (items, baseX, baseY) of the block entity, the items
+            are computed once for each block
+        """
+        if name in self.__blockItems:
+            return self.__blockItems[name]
+        if not name in self.__blocks:
+            raise ValueError, "Block %s not defined"%str(name)
+        if name in self.__inserting or len(self.__inserting)>MAX_INSERT_LEVEL:
+            raise ValueError, "Block %s inserted in itself"%str(name)
+        _bx, _by, _entities=self.__blocks[name]
+        self.__inserting.append(name)
+        try:
+            _items=[]
+            for _lineNumber, _name, _tags in _entities:
+                _items.extend(self.convert(_name, _tags, _lineNumber))
+        finally:
+            self.__inserting.pop()
+        self.__blockItems[name]=(_items, _bx, _by)
+        return self.__blockItems[name]
+
+    def getBlocks(self):
+        """
+            get the {blockName:(baseX, baseY, entities)} of the BLOCKS
+            section read so far
+        """
+        return self.__blocks
+
+    def setBlocks(self, blocks):
+        """
+            set the blocks used by the INSERT of a part of the ENTITIES
+            section
+        """
+        self.__blocks=blocks
+        self.__blockItems={}
+
+    def addError(self, lineNumber, name, msg):
+        """
+            add the error of an entity
+        """
+        self.__errors.append((lineNumber, name, msg))
+
+    def getErrors(self):
+        """
+            get the [(lineNumber, dxfEntityName, message), ...] of the
+            entity that could not be converted
+        """
+        return self.__errors
+
+    def getSkipped(self):
+        """
+            get the {dxfEntityName:count} of the entity with no handler
+        """
+        return self.__skipped
@@ -0,0 +1,305 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# This module provide the streaming writer of the dxf file
+#
+# the construction elements of each entity are converted by the writer
+# registered for the entity type in the dxf text of the entity, the text
+# is buffered and written to the file in blocks
+#
+import math
+
+from Kernel.initsetting               import cgcol
+
+#
+# size of the text buffered before writing it to the file
+#
+BLOCK_SIZE=1<<20
+#
+# max length of a dxf text value, the long MTEXT are split in more tags
+#
+MAX_TEXT_LENGTH=250
+#
+# the color and the text height used for the entity with no style
+#
+DEFAULT_COLOR=256
+DEFAULT_TEXT_HEIGHT=10.0
+
+_rtd=180.0/math.pi
+
+DXF_ENTITY_WRITERS={}
+
+def registerEntityWriter(entityType, writer):
+    """
+        register the writer of the entity type
+        writer(cElements, head, style) must return the dxf text of the
+        entity, head is the text of the layer and color tags that follow
+        the entity name, and raise KeyError, TypeError or ValueError for a
+        wrong entity
+        a None writer skip the entity type
+    """
+    DXF_ENTITY_WRITERS[entityType.upper()]=writer
+
+def dxfColor(color):
+    """
+        get the dxf color index of a pythoncad (r, g, b) or '#rrggbb'
+        color, 256 (by layer) for the color not in the dxf palette
+    """
+    if isinstance(color, (tuple, list)) and len(color)==3:
+        color='#%02x%02x%02x'%tuple([int(_c) for _c in color])
+    try:
+        return cgcol.get(color, DEFAULT_COLOR)
+    except TypeError:
+        return DEFAULT_COLOR
+
+def encodeText(text):
+    """
+        get the dxf value of a text, the new lines are escaped
+    """
+    if isinstance(text, unicode):
+        text=text.encode('utf8')
+    return str(text).replace('\r', '').replace('\n', '\\P')
+
+def _xy(code, x, y):
+    return "%3d\n%r\n%3d\n%r\n%3d\n0.0\n"%(code, float(x), code+10, float(y), code+20)
+
+def _pointXy(code, point):
+    _x, _y=point.getCoords()
+    return _xy(code, _x, _y)
+
+def writePoint(cElements, head, style):
+    return "  0\nPOINT\n"+head+_xy(10, cElements['POINT_0'], cElements['POINT_1'])
+
+def writeSegment(cElements, head, style):
+    return ("  0\nLINE\n"+head+"100\nAcDbLine\n"+
+            _pointXy(10, cElements['SEGMENT_0'])+_pointXy(11, cElements['SEGMENT_1']))
+
+def writeArc(cElements, head, style):
+    _center=_pointXy(10, cElements['ARC_0'])
+    _radius=" 40\n%r\n"%float(cElements['ARC_1'])
+    _start=float(cElements['ARC_2'])
+    _span=float(cElements['ARC_3'])
+    # an arc with no span is a circle
+    if abs(_span)<1e-12 or abs(_span)>=2.0*math.pi:
+        return "  0\nCIRCLE\n"+head+"100\nAcDbCircle\n"+_center+_radius
+    # the dxf arc go counterclockwise from the start to the end angle
+    if _span<0.0:
+        _start+=_span
+        _span=-_span
+    return ("  0\nARC\n"+head+"100\nAcDbCircle\n"+_center+_radius+
+            "100\nAcDbArc\n 50\n%r\n 51\n%r\n"%(_start*_rtd, (_start+_span)*_rtd))
+
+def writeCCircle(cElements, head, style):
+    # the dxf have no construction circle
+    return ("  0\nCIRCLE\n"+head+"100\nAcDbCircle\n"+
+            _pointXy(10, cElements['CCIRCLE_0'])+" 40\n%r\n"%float(cElements['CCIRCLE_1']))
+
+def writeEllipse(cElements, head, style):
+    _h=float(cElements['ELLIPSE_1'])
+    _v=float(cElements['ELLIPSE_2'])
+    if _h<=0.0 or _v<=0.0:
+        raise ValueError, "Ellipse with a null axis"
+    # the major axis is given as the end point relative to the center,
+    # ELLIPSE_1 and ELLIPSE_2 are the full width and height
+    if _h>=_v:
+        _major=_xy(11, _h*0.5, 0.0)
+        _ratio=_v/_h
+    else:
+        _major=_xy(11, 0.0, _v*0.5)
+        _ratio=_h/_v
+    return ("  0\nELLIPSE\n"+head+"100\nAcDbEllipse\n"+_pointXy(10, cElements['ELLIPSE_0'])+
+            _major+" 40\n%r\n 41\n0.0\n 42\n%r\n"%(_ratio, 2.0*math.pi))
+
+def writeCLine(cElements, head, style):
+    _x1, _y1=cElements['CLINE_0'].getCoords()
+    _x2, _y2=cElements['CLINE_1'].getCoords()
+    _len=math.hypot(_x2-_x1, _y2-_y1)
+    if _len<1e-12:
+        raise ValueError, "Construction line with two equal points"
+    # the xline have a point and the unit direction vector
+    return ("  0\nXLINE\n"+head+"100\nAcDbXline\n"+_xy(10, _x1, _y1)+
+            _xy(11, (_x2-_x1)/_len, (_y2-_y1)/_len))
+
+def writePolyline(cElements, head, style):
+    _coords=cElements['POLYLINE_VERTEX'].getCoordArray()
+    _vertex="".join([" 10\n%r\n 20\n%r\n"%(_coords[_i], _coords[_i+1])
+                        for _i in xrange(0, len(_coords), 2)])
+    return ("  0\nLWPOLYLINE\n"+head+"100\nAcDbPolyline\n 90\n%d\n 70\n0\n 43\n0.0\n"%(len(_coords)//2)+
+            _vertex)
+
+def writeText(cElements, head, style):
+    _text=encodeText(cElements['TEXT_1'])
+    # the long text are split in 3 tags before the 1 tag
+    _tags=[]
+    while len(_text)>MAX_TEXT_LENGTH:
+        _tags.append("  3\n%s\n"%_text[:MAX_TEXT_LENGTH])
+        _text=_text[MAX_TEXT_LENGTH:]
+    _tags.append("  1\n%s\n"%_text)
+    _height=DEFAULT_TEXT_HEIGHT
+    if style is not None and style.getStyleProp('text_height') is not None:
+        _height=float(style.getStyleProp('text_height'))
+    # the pythoncad text angle is clockwise
+    _angle=-float(cElements['TEXT_2'] or 0.0)*_rtd
+    return ("  0\nMTEXT\n"+head+"100\nAcDbMText\n"+_pointXy(10, cElements['TEXT_0'])+
+            " 40\n%r\n"%_height+"".join(_tags)+" 50\n%r\n"%_angle)
+
+def writeDimension(cElements, head, style):
+    # a rotated linear dimension, DIMENSION_3 is on the dimension line
+    return ("  0\nDIMENSION\n"+head+"100\nAcDbDimension\n"+_pointXy(10, cElements['DIMENSION_3'])+
+            " 70\n0\n100\nAcDbAlignedDimension\n"+_pointXy(13, cElements['DIMENSION_1'])+
+            _pointXy(14, cElements['DIMENSION_2'])+" 50\n%r\n100\nAcDbRotatedDimension\n"%(
+            float(cElements['DIMENSION_4'])*_rtd))
+
+registerEntityWriter('POINT', writePoint)
+registerEntityWriter('SEGMENT', writeSegment)
+registerEntityWriter('ARC', writeArc)
+registerEntityWriter('CCIRCLE', writeCCircle)
+registerEntityWriter('ELLIPSE', writeEllipse)
+registerEntityWriter('CLINE', writeCLine)
+registerEntityWriter('POLYLINE', writePolyline)
+registerEntityWriter('TEXT', writeText)
+registerEntityWriter('DIMENSION', writeDimension)
+# the children of a composed entity are exported as entity of the layer
+registerEntityWriter('COMPOSED_ENTITY', None)
+
+class DxfWriter(object):
+    """
+        write a dxf file entity by entity, the text is buffered and
+        written in blocks of BLOCK_SIZE
+    """
+    def __init__(self, fileName, writers=None):
+        """
+            writers is the {entityType:writer} used for the entity
+            the registered writers are used if None
+        """
+        if writers is None:
+            writers=DXF_ENTITY_WRITERS
+        self.__writers=writers
+        self.__fb=open(fileName, 'wb')
+        self.__buffer=[]
+        self.__size=0
+        self.__styles={}
+        self.__errors=[]
+        self.__skipped={}
+        self.__count=0
+
+    def write(self, text):
+        """
+            add the text to the buffer and write the buffer when full
+        """
+        self.__buffer.append(text)
+        self.__size+=len(text)
+        if self.__size>=BLOCK_SIZE:
+            self.flush()
+
+    def flush(self):
+        """
+            write the buffer to the file
+        """
+        if self.__buffer:
+            self.__fb.write("".join(self.__buffer))
+            self.__buffer=[]
+            self.__size=0
+
+    def writeHeader(self, layers):
+        """
+            write the start of the file with the table of the
+            [(layerName, visible), ...] layers and open the ENTITIES
+            section
+        """
+        self.write("999\nExported from Pythoncad\n")
+        self.write("  0\nSECTION\n  2\nTABLES\n  0\nTABLE\n  2\nLAYER\n 70\n%d\n"%len(layers))
+        for _name, _visible in layers:
+            # the hidden layer have a negative color
+            _color=7
+            if not _visible:
+                _color=-7
+            self.write("  0\nLAYER\n  2\n%s\n 70\n0\n 62\n%d\n  6\nCONTINUOUS\n"%(
+                encodeText(_name), _color))
+        self.write("  0\nENDTAB\n  0\nENDSEC\n  0\nSECTION\n  2\nENTITIES\n")
+
+    def _styleValues(self, style):
+        """
+            get the (color index, inner style) of a style entity, the values
+            are computed once for each style
+        """
+        if style is None:
+            return DEFAULT_COLOR, None
+        _id=style.getId()
+        if not _id in self.__styles:
+            _cElements=style.getConstructionElements()
+            _innerStyle=_cElements[_cElements.keys()[0]]
+            self.__styles[_id]=(dxfColor(_innerStyle.getStyleProp('entity_color')), _innerStyle)
+        return self.__styles[_id]
+
+    def writeEntity(self, layerName, entityType, cElements, style, entityId=None):
+        """
+            write the entity with the writer registered for its type
+            return False if the entity is skipped or wrong
+        """
+        _writer=self.__writers.get(entityType)
+        if _writer is None:
+            self.__skipped[entityType]=self.__skipped.get(entityType, 0)+1
+            return False
+        _color, _innerStyle=self._styleValues(style)
+        _head="  8\n%s\n 62\n%d\n"%(layerName, _color)
+        try:
+            self.write(_writer(cElements, _head, _innerStyle))
+        except KeyError, _err:
+            self.addError(entityId, entityType, "Missing construction element %s"%str(_err))
+            return False
+        except (TypeError, ValueError, AttributeError), _err:
+            self.addError(entityId, entityType, str(_err))
+            return False
+        self.__count+=1
+        return True
+
+    def close(self):
+        """
+            close the ENTITIES section, write the end of file and close
+            the file
+        """
+        try:
+            self.write("  0\nENDSEC\n  0\nEOF\n")
+            self.flush()
+        finally:
+            self.__fb.close()
+
+    def addError(self, entityId, entityType, msg):
+        self.__errors.append((entityId, entityType, msg))
+
+    def getErrors(self):
+        """
+            get the [(entityId, entityType, message), ...] of the entity
+            that could not be written
+        """
+        return self.__errors
+
+    def getSkipped(self):
+        """
+            get the {entityType:count} of the entity with no writer
+        """
+        return self.__skipped
+
+    def getCount(self):
+        """
+            get the number of written entity
+        """
+        return self.__count
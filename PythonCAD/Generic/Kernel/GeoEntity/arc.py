@@ -412,22 +412,39 @@ class Arc(GeometricalEntity):
         return _val
 
     def getBounds(self):
-        _ep1, _ep2 = self.getEndpoints()
+        """
+            Return the bounding rectangle around the Arc.
+            the endAngle is the angular span starting from the startAngle
+            (xmin, ymin, xmax, ymax)
+        """
         _xc, _yc = self.center.getCoords()
         _r = self.radius
-        _xmin = min(_xc, _ep1[0], _ep2[0])
-        _ymin = min(_yc, _ep1[1], _ep2[1])
-        _xmax = max(_xc, _ep1[0], _ep2[0])
-        _ymax = max(_yc, _ep1[1], _ep2[1])
-        if self.throughAngle(0.0):
-            _xmax = _xc + _r
-        if self.throughAngle(90.0):
-            _ymax = _yc + _r
-        if self.throughAngle(180.0):
-            _xmin = _xc - _r
-        if self.throughAngle(270.0):
-            _ymin = _yc - _r
-        return _xmin, _ymin, _xmax, _ymax
+        _sa = self.startAngle
+        _span = self.endAngle
+        if abs(_span) < 1e-10 or abs(_span) >= pi_2:
+            return _xc - _r, _yc - _r, _xc + _r, _yc + _r
+        if _span < 0.0:
+            _sa = _sa + _span
+            _span = -_span
+        _ea = _sa + _span
+        _xList = [math.cos(_sa), math.cos(_ea)]
+        _yList = [math.sin(_sa), math.sin(_ea)]
+        # add all the quadrant points crossed by the arc
+        _quadrant = int(math.ceil(_sa / (math.pi * 0.5)))
+        _angle = _quadrant * math.pi * 0.5
+        while _angle < _ea:
+            _xList.append(math.cos(_angle))
+            _yList.append(math.sin(_angle))
+            _quadrant += 1
+            _angle = _quadrant * math.pi * 0.5
+        return (_xc + _r * min(_xList), _yc + _r * min(_yList),
+                _xc + _r * max(_xList), _yc + _r * max(_yList))
+
+    def getBBox(self):
+        """
+            get the bounding box of the arc
+        """
+        return self.getBounds()
 
     def clone(self):
         """
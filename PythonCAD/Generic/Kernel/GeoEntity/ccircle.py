@@ -307,6 +307,14 @@ class CCircle(GeometricalEntity):
                 _val = False
         return _val
 
+    def getBBox(self):
+        """
+            get the bounding box of the construction circle
+        """
+        _xc, _yc = self.center.getCoords()
+        _r = self.radius
+        return (_xc - _r, _yc - _r, _xc + _r, _yc + _r)
+
     def clone(self):
         """
             Create an identical copy of a CCircle
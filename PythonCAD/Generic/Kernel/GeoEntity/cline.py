@@ -34,6 +34,9 @@ from Kernel.GeoUtil.util                   import *
 from Kernel.GeoEntity.point                import Point
 from Kernel.GeoUtil.geolib                 import Vector
 
+# extension used for the bounding box of the infinite line
+CLINE_EXTENT=1.0e+20
+
 class CLine(GeometricalEntity):
     """
         A class for single point construction lines From Two points.
@@ -104,6 +107,20 @@ class CLine(GeometricalEntity):
         """
         return float(mainSympy.atan(getSympy.slope))
         
+    def getBBox(self):
+        """
+            get the bounding box of the construction line
+            the line is infinite so the box is extended to CLINE_EXTENT
+            in the direction of the line
+        """
+        x1, y1=self.p1.getCoords()
+        x2, y2=self.p2.getCoords()
+        if abs(x1 - x2) < 1e-10:
+            return (x1, -CLINE_EXTENT, x1, CLINE_EXTENT)
+        if abs(y1 - y2) < 1e-10:
+            return (-CLINE_EXTENT, y1, CLINE_EXTENT, y1)
+        return (-CLINE_EXTENT, -CLINE_EXTENT, CLINE_EXTENT, CLINE_EXTENT)
+        
     def clone(self):
         """
             Create an identical copy of an CLine.
@@ -193,6 +193,16 @@ class Ellipse(GeometricalEntity):
 #
 # r = a*(1-e)/(1 + e*cos(theta))
 
+    def getBBox(self):
+        """
+            get the bounding box of the ellipse
+            the axis values are the full width and height of the ellipse
+        """
+        _xc, _yc = self.center.getCoords()
+        _h = self.horizontalRadius*.5
+        _v = self.verticalRadius*.5
+        return (_xc - _h, _yc - _v, _xc + _h, _yc + _v)
+
     def clone(self):
         """
             Make a copy of an Ellipse.
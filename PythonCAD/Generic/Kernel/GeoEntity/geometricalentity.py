@@ -112,8 +112,25 @@ class GeometricalEntity(dict):
                 v=Vector(rotationPoint,self[key] )
                 v.rotate(angle)
                 self[key]=rotationPoint+v.point
-        
-    
+
+    def getBBox(self):
+        """
+            get the bounding box of the entity as (xmin, ymin, xmax, ymax)
+            the default implementation use all the construction points
+            return None if the entity do not have any point
+        """
+        from Kernel.GeoEntity.point import Point
+        _xList=[]
+        _yList=[]
+        for key in self:
+            if isinstance(self[key], Point):
+                x, y=self[key].getCoords()
+                _xList.append(x)
+                _yList.append(y)
+        if len(_xList)==0:
+            return None
+        return (min(_xList), min(_yList), max(_xList), max(_yList))
+
     def getSympy(self):
         """
             get the sympy object
@@ -201,6 +201,12 @@ class Point(GeometricalEntity):
         """
         return Point(self.__x, self.__y)
 
+    def getBBox(self):
+        """
+            get the bounding box of the point
+        """
+        return (self.__x, self.__y, self.__x, self.__y)
+
     def inRegion(self, xmin, ymin, xmax, ymax, fully=True):
         """
             Returns True if the Point is within the bounding values.
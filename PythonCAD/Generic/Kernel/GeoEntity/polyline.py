@@ -30,8 +30,26 @@ from Kernel.GeoUtil.tolerance              import *
 from Kernel.GeoEntity.point                import Point
 from Kernel.GeoEntity.segment              import Segment
 from Kernel.GeoEntity.cline                import CLine
+from Kernel.GeoEntity.vertexarray          import VertexArray
 from Kernel.GeoEntity.geometricalentity    import *
 
+#
+# the construction element of a polyline is a single VertexArray, the
+# old POLYLINE_n point keys are still accepted
+#
+POLYLINE_VERTEX='POLYLINE_VERTEX'
+
+def getPolylineIndex(name):
+    """
+        get the vertex index of a POLYLINE_n key
+    """
+    if not isinstance(name, str) or not name.startswith('POLYLINE_'):
+        raise TypeError, "Wrong argument %s "%str(name)
+    try:
+        return int(name[9:])
+    except ValueError:
+        raise TypeError, "Wrong argument %s "%str(name)
+
 class Polyline(GeometricalEntity):
     """
         A class representing a polyline. A polyline is essentially
@@ -40,78 +58,84 @@ class Polyline(GeometricalEntity):
     def __init__(self,kw):
         """
             Initialize a Polyline object.
+            kw['POLYLINE_VERTEX'] must be a VertexArray
+            or
             kw['POLYLINE_0'] must be a point
             kw['POLYLINE_..'] must be a point
             kw['POLYLINE_..n'] must be a point
         """
-        if len(kw)<2:
+        if POLYLINE_VERTEX in kw:
+            if len(kw)!=1:
+                raise TypeError, "Wrong number of items "
+            _vertex=kw[POLYLINE_VERTEX]
+        else:
+            for key in kw:
+                if not isinstance(kw[key], Point):
+                    raise TypeError, "Wrong Type for argument %s"%str(key)
+            _keys=sorted(kw, key=getPolylineIndex)
+            _vertex=VertexArray.fromPoints([kw[key] for key in _keys])
+        if not isinstance(_vertex, VertexArray):
+            raise TypeError, "Wrong Type for argument %s"%POLYLINE_VERTEX
+        if len(_vertex)<2:
             raise ValueError, "Invalid number of imput value "
-        argDescription=dict([(key,Point) for key in kw])
-        GeometricalEntity.__init__(self,kw, argDescription)
-
-    #def __len__(self):
-    #    return len(self.points)
+        GeometricalEntity.__init__(self, {POLYLINE_VERTEX:_vertex},
+                                    {POLYLINE_VERTEX:VertexArray})
 
     def __str__(self):
         return "Polyline"
     @property
     def info(self):
         return "Polyline"
+
+    @property
+    def vertex(self):
+        """
+            the VertexArray of the polyline
+        """
+        return self[POLYLINE_VERTEX]
+
+    def getVertexArray(self):
+        """
+            get the VertexArray with the coords of the polyline points
+        """
+        return self[POLYLINE_VERTEX]
+
     def __eq__(self, obj):
         """
             Compare two Polyline objects for equality.
+            the polyline with the same points in the reverse order are equal
         """
         if not isinstance(obj, Polyline):
             return False
         if obj is self:
             return True
-        _val = False
-        _ppts = obj.points
-        _pcount = len(_ppts)
-        _spts = self.points
-        _scount = len(_spts)
-        if _pcount == _scount:
-            _val = True
-            for _i in range(_scount):
-                if _ppts[_i] != _spts[_i]:
-                    _val = False
+        if len(obj.vertex)!=len(self.vertex):
+            return False
+        for _vertex in (obj.vertex, obj.vertex.reverse()):
+            for (_x1, _y1), (_x2, _y2) in zip(_vertex, self.vertex):
+                if abs(_x1-_x2)>TOL or abs(_y1-_y2)>TOL:
                     break
-            if not _val: # check reversed point list of second polyline
-                _val = True
-                _ppts.reverse()
-                for _i in range(_scount):
-                    if _ppts[_i] != _spts[_i]:
-                        _val = False
-                        break
-        return _val
+            else:
+                return True
+        return False
 
     def __ne__(self, obj):
         """
             Compare two Polyline objects for inequality.
         """
-        if not isinstance(obj, Polyline):
-            return True
-        if obj is self:
-            return False
-        _val = True
-        _ppts = obj.getPoints()
-        _pcount = len(_ppts)
-        _spts = self.points
-        _scount = len(_spts)
-        if _pcount == _scount:
-            _val = False
-            for _i in range(_scount):
-                if _ppts[_i] != _spts[_i]:
-                    _val = True
-                    break
-            if _val: # check reversed point list of second polyline
-                _val = False
-                _ppts.reverse()
-                for _i in range(_scount):
-                    if _ppts[_i] != _spts[_i]:
-                        _val = True
-                        break
-        return _val
+        return not self==obj
+
+    def getNumPoints(self):
+        """
+            get the number of points of the polyline
+        """
+        return len(self.vertex)
+
+    def getPoint(self, index):
+        """
+            get the Point at index
+        """
+        return Point(*self.vertex.getCoords(index))
 
     def getPoints(self):
         """
@@ -119,30 +143,37 @@ class Polyline(GeometricalEntity):
             This function returns a list containing all the Point
             objects that define the Polyline.
         """
-        return self.getConstructionElements()
+        return self.points()
+
+    def __vertexIndex(self, name):
+        """
+            get the index of the vertex from a POLYLINE_n name or an index
+        """
+        if isinstance(name, (int, long)):
+            return name
+        return getPolylineIndex(name)
 
     def addPoint(self, name, point):
         """
             Add a Point to the Polyline.
-            The argument 'i' must be an integer, and argument 'p' must be a
-            Point. The Point is added into the list of points comprising
-            the Polyline as the i'th point.
+            The argument name is an integer or a POLYLINE_n name, and the
+            argument point must be a Point. The Point is added into the list
+            of points comprising the Polyline as the n'th point.
         """
         if not isinstance(point, Point):
             raise TypeError, "Invalid Point for Polyline point: " + `type(point)`
-        self[name]=point
-
+        _x, _y=point.getCoords()
+        self.vertex.insert(self.__vertexIndex(name), _x, _y)
 
     def delPoint(self, name):
         """
             Remove a Point from the Polyline.
-            The argument i represents the index of the point to remove from
-            the list of points defining the Polyline. The point will be
-            removed only if the polyline will still have at least two Points.
+            The argument name is an integer or a POLYLINE_n name of the
+            point to remove. The point will be removed only if the polyline
+            will still have at least two Points.
         """
-
-        if len(self) > 2:
-            del self[name]
+        if len(self.vertex) > 2:
+            self.vertex.delete(self.__vertexIndex(name))
 
     def getBounds(self):
         """
@@ -150,75 +181,72 @@ class Polyline(GeometricalEntity):
             This method returns a tuple of four values:
             (xmin, ymin, xmax, ymax)
         """
-        _pts = self.points
-        _pxmin = None
-        _pymin = None
-        _pxmax = None
-        _pymax = None
-        for _pt in _pts:
-            _px, _py = _pt.getCoords()
-            if _pxmin is None or _px < _pxmin:
-                _pxmin = _px
-            if _pymin is None or _py < _pymin:
-                _pymin = _py
-            if _pxmax is None or _px > _pxmax:
-                _pxmax = _px
-            if _pymax is None or _py > _pymax:
-                _pymax = _py
-        return _pxmin, _pymin, _pxmax, _pymax
+        return self.vertex.getBounds()
+
+    def getBBox(self):
+        """
+            get the bounding box of the polyline as (xmin, ymin, xmax, ymax)
+        """
+        return self.vertex.getBounds()
 
     def points(self):
         """
             return a list of point
         """
-        exit=[]
-        kk=self.keys()
-        kk.sort()
-        for k in kk:
-            exit.append(self[k])
-        return exit
+        return [Point(_x, _y) for _x, _y in self.vertex]
 
     def clone(self):
         """
             Create an identical copy of a Polyline.
         """
-        _cpts = {}
-        i=0
-        for _pt in self.points:
-            name="POLYLINE_%s"%str(i)
-            _cpts[name]=_pt.clone()
-            i+=1
-        return Polyline(_cpts)
+        return Polyline({POLYLINE_VERTEX:self.vertex.clone()})
 
     def getSympySegments(self):
         """
             return an array of sympy Segment
         """
         out=[]
-
-        for s in self.getSegments():
-            out.append(s.getSympy())
+        for s in self.iterSegments():
+            out.append(s.toSegment().getSympy())
         return out
 
+    def iterSegments(self):
+        """
+            iterate the SegmentView of the polyline
+            the views are created when requested so a polyline with a
+            lot of points do not allocate all the segments
+        """
+        return self.vertex.iterSegments()
+
     def getSegments(self):
         """
             return an array of segments that identifie the polyline
             used for intersection porpouse
         """
-        tempPoint=None
-        exitArray=[]
-        for p in self.points():
-            if tempPoint:
-                constr={"SEGMENT_0":tempPoint, "SEGMENT_1":p}
-                exitArray.append(Segment(constr))
-            tempPoint=p
-        else:
-            return exitArray
-        return []
+        return [s.toSegment() for s in self.iterSegments()]
+
+    def move(self, fromPoint, toPoint):
+        """
+            move the polyline
+        """
+        _x1, _y1=fromPoint.getCoords()
+        _x2, _y2=toPoint.getCoords()
+        self.vertex.translate(_x2-_x1, _y2-_y1)
+        return Point(_x2-_x1, _y2-_y1)
+
+    def rotate(self, rotationPoint, angle):
+        """
+            rotate the polyline around the rotationPoint
+        """
+        _cx, _cy=rotationPoint.getCoords()
+        self.vertex.rotate(_cx, _cy, angle)
 
     def mirror(self, mirrorRef):
         """
             perform the mirror
         """
-        for k in self:
-            self[k].mirror(mirrorRef)
+        if not isinstance(mirrorRef, (CLine, Segment)):
+            raise TypeError, "mirrorObject must be Cline Segment or a tuple of points"
+        _x1, _y1=mirrorRef.getP1().getCoords()
+        _x2, _y2=mirrorRef.getP2().getCoords()
+        self.vertex.mirror(_x1, _y1, _x2, _y2)
@@ -0,0 +1,357 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# This module provide the contiguous storage of the polyline vertex
+#
+# the coords are stored as x0, y0, x1, y1 ... in a float64 array, the
+# Vertex and SegmentView are light objects created only when requested
+#
+import sys
+import math
+from array import array
+
+class Vertex(object):
+    """
+        light 2d point used to read the vertex of a VertexArray
+    """
+    __slots__=('x', 'y')
+    def __init__(self, x, y):
+        self.x=x
+        self.y=y
+
+    def getCoords(self):
+        """
+            get the x, y coords of the vertex
+        """
+        return self.x, self.y
+
+    def dist(self, obj):
+        """
+            get the distance from a Vertex or a Point
+        """
+        _x, _y=obj.getCoords()
+        return math.hypot(self.x-_x, self.y-_y)
+
+    def toPoint(self):
+        """
+            get a Point with the vertex coords
+        """
+        from Kernel.GeoEntity.point import Point
+        return Point(self.x, self.y)
+
+    def __eq__(self, obj):
+        if not hasattr(obj, 'getCoords'):
+            return False
+        return self.getCoords()==obj.getCoords()
+
+    def __ne__(self, obj):
+        return not self==obj
+
+    def __str__(self):
+        return "Vertex : (%g,%g)"%(self.x, self.y)
+
+class SegmentView(object):
+    """
+        light view of a polyline segment
+    """
+    __slots__=('x1', 'y1', 'x2', 'y2')
+    def __init__(self, x1, y1, x2, y2):
+        self.x1=x1
+        self.y1=y1
+        self.x2=x2
+        self.y2=y2
+
+    def getCoords(self):
+        """
+            get the x1, y1, x2, y2 coords of the segment
+        """
+        return self.x1, self.y1, self.x2, self.y2
+
+    def getEndpoints(self):
+        """
+            get the two Vertex of the segment
+        """
+        return Vertex(self.x1, self.y1), Vertex(self.x2, self.y2)
+
+    def getMiddlePoint(self):
+        """
+            get the middle Vertex of the segment
+        """
+        return Vertex((self.x1+self.x2)/2.0, (self.y1+self.y2)/2.0)
+
+    def length(self):
+        """
+            get the length of the segment
+        """
+        return math.hypot(self.x2-self.x1, self.y2-self.y1)
+
+    def toSegment(self):
+        """
+            get a Segment entity with the segment coords
+        """
+        from Kernel.GeoEntity.point     import Point
+        from Kernel.GeoEntity.segment   import Segment
+        return Segment({"SEGMENT_0":Point(self.x1, self.y1),
+                        "SEGMENT_1":Point(self.x2, self.y2)})
+
+    def __str__(self):
+        return "SegmentView : (%g,%g) (%g,%g)"%self.getCoords()
+
+class VertexArray(object):
+    """
+        the vertex of a polyline stored in a contiguous float64 array
+    """
+    def __init__(self, coords=None):
+        """
+            coords is a flat sequence x0, y0, x1, y1 ...
+        """
+        if coords is None:
+            coords=()
+        self.__coords=array('d', coords)
+        if len(self.__coords)%2:
+            raise ValueError, "The coords must be x, y pairs"
+
+    @classmethod
+    def fromPoints(cls, points):
+        """
+            create a VertexArray from a sequence of Point, Vertex or
+            (x, y) tuple
+        """
+        _out=cls()
+        _append=_out.append
+        for _p in points:
+            if isinstance(_p, tuple):
+                _append(*_p)
+            else:
+                _append(*_p.getCoords())
+        return _out
+
+    @classmethod
+    def fromBuffer(cls, data, offset=0, count=None):
+        """
+            create a VertexArray from the little endian float64 coords
+            stored in the data string starting from offset
+        """
+        _out=cls()
+        _end=len(data)
+        if count is not None:
+            _end=offset+count*16
+        _out.__coords.fromstring(data[offset:_end])
+        if sys.byteorder=='big':
+            _out.__coords.byteswap()
+        if len(_out.__coords)%2:
+            raise ValueError, "The coords must be x, y pairs"
+        return _out
+
+    def toBuffer(self):
+        """
+            get the coords as a little endian float64 string
+        """
+        if sys.byteorder=='big':
+            _coords=array('d', self.__coords)
+            _coords.byteswap()
+            return _coords.tostring()
+        return self.__coords.tostring()
+
+    def getCoordArray(self):
+        """
+            get the array of the coords x0, y0, x1, y1 ...
+        """
+        return self.__coords
+
+    def __len__(self):
+        return len(self.__coords)/2
+
+    def __index(self, index):
+        _count=len(self)
+        if index<0:
+            index+=_count
+        if index<0 or index>=_count:
+            raise IndexError, "Vertex index out of range"
+        return index*2
+
+    def getCoords(self, index):
+        """
+            get the x, y coords of the vertex
+        """
+        _i=self.__index(index)
+        return self.__coords[_i], self.__coords[_i+1]
+
+    def setCoords(self, index, x, y):
+        """
+            set the x, y coords of the vertex
+        """
+        _i=self.__index(index)
+        self.__coords[_i]=x
+        self.__coords[_i+1]=y
+
+    def getVertex(self, index):
+        """
+            get the Vertex at index
+        """
+        return Vertex(*self.getCoords(index))
+
+    def append(self, x, y):
+        """
+            add a vertex at the end
+        """
+        self.__coords.append(x)
+        self.__coords.append(y)
+
+    def insert(self, index, x, y):
+        """
+            insert a vertex before index
+        """
+        _count=len(self)
+        if index<0:
+            index=max(index+_count, 0)
+        index=min(index, _count)
+        self.__coords[index*2:index*2]=array('d', (x, y))
+
+    def delete(self, index):
+        """
+            remove the vertex at index
+        """
+        _i=self.__index(index)
+        del self.__coords[_i:_i+2]
+
+    def reverse(self):
+        """
+            get a new VertexArray with the vertex in the reverse order
+        """
+        _coords=self.__coords
+        _out=VertexArray()
+        for _i in xrange(len(_coords)-2, -1, -2):
+            _out.__coords.append(_coords[_i])
+            _out.__coords.append(_coords[_i+1])
+        return _out
+
+    def iterCoords(self):
+        """
+            iterate the x, y coords of the vertex
+        """
+        _coords=self.__coords
+        for _i in xrange(0, len(_coords), 2):
+            yield _coords[_i], _coords[_i+1]
+
+    __iter__=iterCoords
+
+    def iterVertex(self):
+        """
+            iterate the Vertex
+        """
+        for _x, _y in self.iterCoords():
+            yield Vertex(_x, _y)
+
+    def iterSegments(self):
+        """
+            iterate the SegmentView between the consecutive vertex
+            the views are created only when requested
+        """
+        _coords=self.__coords
+        for _i in xrange(0, len(_coords)-2, 2):
+            yield SegmentView(_coords[_i], _coords[_i+1], _coords[_i+2], _coords[_i+3])
+
+    def iterSegmentCoords(self):
+        """
+            iterate the x1, y1, x2, y2 coords of the segments
+        """
+        _coords=self.__coords
+        for _i in xrange(0, len(_coords)-2, 2):
+            yield _coords[_i], _coords[_i+1], _coords[_i+2], _coords[_i+3]
+
+    def getBounds(self):
+        """
+            get the (xmin, ymin, xmax, ymax) of the vertex
+            or (None, None, None, None) if there is no vertex
+        """
+        _coords=self.__coords
+        if not _coords:
+            return None, None, None, None
+        _xs=_coords[0::2]
+        _ys=_coords[1::2]
+        return min(_xs), min(_ys), max(_xs), max(_ys)
+
+    def transform(self, a, b, c, d, e, f):
+        """
+            apply the affine transformation to all the vertex
+            x'=a*x+b*y+c
+            y'=d*x+e*y+f
+        """
+        _coords=self.__coords
+        for _i in xrange(0, len(_coords), 2):
+            _x=_coords[_i]
+            _y=_coords[_i+1]
+            _coords[_i]=a*_x+b*_y+c
+            _coords[_i+1]=d*_x+e*_y+f
+
+    def translate(self, dx, dy):
+        """
+            move all the vertex of dx, dy
+        """
+        self.transform(1.0, 0.0, dx, 0.0, 1.0, dy)
+
+    def rotate(self, cx, cy, angle):
+        """
+            rotate all the vertex around cx, cy of angle radians
+        """
+        _cos=math.cos(angle)
+        _sin=math.sin(angle)
+        self.transform(_cos, -_sin, cx-_cos*cx+_sin*cy,
+                       _sin, _cos, cy-_sin*cx-_cos*cy)
+
+    def mirror(self, x1, y1, x2, y2):
+        """
+            mirror all the vertex on the line passing from x1, y1 and x2, y2
+        """
+        _dx=x2-x1
+        _dy=y2-y1
+        _len2=_dx*_dx+_dy*_dy
+        if _len2==0.0:
+            raise ValueError, "The mirror line must have two different points"
+        _cos2=(_dx*_dx-_dy*_dy)/_len2
+        _sin2=2.0*_dx*_dy/_len2
+        self.transform(_cos2, _sin2, x1-_cos2*x1-_sin2*y1,
+                       _sin2, -_cos2, y1-_sin2*x1+_cos2*y1)
+
+    def clone(self):
+        """
+            get a copy of the VertexArray
+        """
+        _out=VertexArray()
+        _out.__coords=array('d', self.__coords)
+        return _out
+
+    def __eq__(self, obj):
+        if not isinstance(obj, VertexArray):
+            return False
+        return self.__coords==obj.__coords
+
+    def __ne__(self, obj):
+        return not self==obj
+
+    def __getstate__(self):
+        return (self.toBuffer(), )
+
+    def __setstate__(self, state):
+        self.__coords=VertexArray.fromBuffer(state[0]).__coords
+
+    def __str__(self):
+        return "VertexArray : %s vertex"%str(len(self))
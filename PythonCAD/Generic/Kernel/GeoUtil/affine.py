@@ -0,0 +1,252 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# code to apply a 2d affine transformation to the construction elements
+# of many entity at once
+#
+# a matrix is the tuple (a, b, c, d, e, f) of the transformation
+#   x' = a*x + b*y + c
+#   y' = d*x + e*y + f
+# the coords of all the entity are gathered in a single float64 array,
+# transformed in one pass (with numpy when available) and scattered back
+# in new construction elements
+#
+import math
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from Kernel.GeoUtil.tolerance           import TOL
+from Kernel.GeoEntity.point             import Point
+from Kernel.GeoEntity.vertexarray       import VertexArray
+
+IDENTITY = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+
+def translation_matrix(dx, dy):
+    """
+        matrix that move of dx, dy
+    """
+    return (1.0, 0.0, float(dx), 0.0, 1.0, float(dy))
+
+def rotation_matrix(cx, cy, angle):
+    """
+        matrix that rotate of angle radians around cx, cy
+    """
+    _cos = math.cos(angle)
+    _sin = math.sin(angle)
+    return (_cos, -_sin, cx - _cos*cx + _sin*cy,
+            _sin, _cos, cy - _sin*cx - _cos*cy)
+
+def mirror_matrix(x1, y1, x2, y2):
+    """
+        matrix that mirror on the line passing from x1, y1 and x2, y2
+    """
+    _dx = x2 - x1
+    _dy = y2 - y1
+    _len2 = _dx*_dx + _dy*_dy
+    if _len2 < TOL*TOL:
+        raise ValueError, "The mirror line must have two different points"
+    _cos2 = (_dx*_dx - _dy*_dy)/_len2
+    _sin2 = 2.0*_dx*_dy/_len2
+    return (_cos2, _sin2, x1 - _cos2*x1 - _sin2*y1,
+            _sin2, -_cos2, y1 - _sin2*x1 + _cos2*y1)
+
+def scale_matrix(cx, cy, sx, sy=None):
+    """
+        matrix that scale of sx, sy from cx, cy
+        if sy is None the scale is uniform
+    """
+    if sy is None:
+        sy = sx
+    return (float(sx), 0.0, cx - sx*cx, 0.0, float(sy), cy - sy*cy)
+
+def multiply_matrix(m1, m2):
+    """
+        matrix that apply m2 and then m1
+    """
+    a1, b1, c1, d1, e1, f1 = m1
+    a2, b2, c2, d2, e2, f2 = m2
+    return (a1*a2 + b1*d2, a1*b2 + b1*e2, a1*c2 + b1*f2 + c1,
+            d1*a2 + e1*d2, d1*b2 + e1*e2, d1*c2 + e1*f2 + f1)
+
+def _similarity(matrix):
+    """
+        get (scale, rotation, mirrored) of a matrix that keep the circles
+        as circles, None for the other matrix
+    """
+    a, b, c, d, e, f = matrix
+    _det = a*e - b*d
+    _mirrored = _det < 0.0
+    if _mirrored:
+        _ok = abs(a + e) < TOL and abs(b - d) < TOL
+    else:
+        _ok = abs(a - e) < TOL and abs(b + d) < TOL
+    if not _ok or abs(_det) < TOL:
+        return None
+    return math.sqrt(abs(_det)), math.atan2(d, a), _mirrored
+
+def transform_coords(matrix, coords):
+    """
+        apply the matrix to the flat x0, y0, x1, y1 ... float64 array
+        and return the transformed array
+    """
+    a, b, c, d, e, f = matrix
+    if numpy is not None and len(coords) > 0:
+        _xy = numpy.frombuffer(coords, dtype=numpy.float64).reshape(-1, 2)
+        _out = numpy.empty_like(_xy)
+        _out[:, 0] = a*_xy[:, 0] + b*_xy[:, 1] + c
+        _out[:, 1] = d*_xy[:, 0] + e*_xy[:, 1] + f
+        return array('d', _out.tostring())
+    _out = array('d', coords)
+    for _i in xrange(0, len(_out), 2):
+        _x = _out[_i]
+        _y = _out[_i + 1]
+        _out[_i] = a*_x + b*_y + c
+        _out[_i + 1] = d*_x + e*_y + f
+    return _out
+
+#
+# the point construction elements of the entity type
+#
+POINT_FIELDS = {
+    'SEGMENT':('SEGMENT_0', 'SEGMENT_1'),
+    'ARC':('ARC_0', ),
+    'ELLIPSE':('ELLIPSE_0', ),
+    'CLINE':('CLINE_0', 'CLINE_1'),
+    'CCIRCLE':('CCIRCLE_0', ),
+    'TEXT':('TEXT_0', ),
+    'DIMENSION':('DIMENSION_1', 'DIMENSION_2', 'DIMENSION_3'),
+    }
+#
+# the entity type that could not be transformed with a generic affine
+# matrix because they need the circle to be kept as circle
+#
+SIMILARITY_ONLY = ('ARC', 'CCIRCLE', 'ELLIPSE')
+
+def _polyline_vertex(cElements):
+    """
+        get the VertexArray of the polyline construction elements, the
+        old POLYLINE_n points are converted
+    """
+    _vertex = cElements.get('POLYLINE_VERTEX')
+    if _vertex is not None:
+        return _vertex
+    from Kernel.GeoEntity.polyline import getPolylineIndex
+    _keys = sorted(cElements, key=getPolylineIndex)
+    return VertexArray.fromPoints([cElements[key] for key in _keys])
+
+def _gather(entityType, cElements, coords):
+    """
+        append the coords of the construction elements to coords
+    """
+    if entityType == 'POINT':
+        coords.append(float(cElements['POINT_0']))
+        coords.append(float(cElements['POINT_1']))
+    elif entityType == 'POLYLINE':
+        coords.extend(_polyline_vertex(cElements).getCoordArray())
+    elif entityType in POINT_FIELDS:
+        for _name in POINT_FIELDS[entityType]:
+            coords.extend(cElements[_name].getCoords())
+    else:
+        raise TypeError, "Entity type %s could not be transformed" % str(entityType)
+
+def _transform_values(entityType, cElements, similarity):
+    """
+        update the not point construction elements: radius, axis and
+        angles
+    """
+    if similarity is None:
+        return
+    _scale, _rotation, _mirrored = similarity
+    if entityType == 'ARC':
+        cElements['ARC_1'] = cElements['ARC_1']*_scale
+        if _mirrored:
+            cElements['ARC_2'] = _rotation - cElements['ARC_2'] - cElements['ARC_3']
+        else:
+            cElements['ARC_2'] = cElements['ARC_2'] + _rotation
+    elif entityType == 'CCIRCLE':
+        cElements['CCIRCLE_1'] = cElements['CCIRCLE_1']*_scale
+    elif entityType == 'ELLIPSE':
+        # the ellipse axis are horizontal and vertical so only the
+        # rotation of 90 degrees swap them
+        _h = cElements['ELLIPSE_1']*_scale
+        _v = cElements['ELLIPSE_2']*_scale
+        if abs(math.cos(_rotation)) < math.sqrt(0.5):
+            _h, _v = _v, _h
+        cElements['ELLIPSE_1'] = _h
+        cElements['ELLIPSE_2'] = _v
+    elif entityType == 'TEXT':
+        # the text angle is clockwise
+        if _mirrored:
+            cElements['TEXT_2'] = -_rotation - cElements['TEXT_2']
+        else:
+            cElements['TEXT_2'] = cElements['TEXT_2'] - _rotation
+    elif entityType == 'DIMENSION':
+        if _mirrored:
+            cElements['DIMENSION_4'] = _rotation - cElements['DIMENSION_4']
+        else:
+            cElements['DIMENSION_4'] = cElements['DIMENSION_4'] + _rotation
+
+def _scatter(entityType, cElements, coords, index):
+    """
+        create the new construction elements with the coords starting
+        from index
+        return (newConstructionElements, nextIndex)
+    """
+    if entityType == 'POINT':
+        _new = dict(cElements)
+        _new['POINT_0'] = coords[index]
+        _new['POINT_1'] = coords[index + 1]
+        return _new, index + 2
+    if entityType == 'POLYLINE':
+        _end = index + len(_polyline_vertex(cElements))*2
+        return {'POLYLINE_VERTEX':VertexArray(coords[index:_end])}, _end
+    _new = dict(cElements)
+    for _name in POINT_FIELDS[entityType]:
+        _new[_name] = Point(coords[index], coords[index + 1])
+        index += 2
+    return _new, index
+
+def transform_construction_elements(items, matrix):
+    """
+        apply the matrix to a list of (entityType, constructionElements)
+        and return the list of the new construction elements, the given
+        construction elements are not modified
+        raise TypeError for the entity type that could not be transformed
+        and ValueError if the matrix do not keep the circle of an arc, a
+        circle or an ellipse
+    """
+    _sim = _similarity(matrix)
+    _coords = array('d')
+    for _type, _cElements in items:
+        if _sim is None and _type in SIMILARITY_ONLY:
+            raise ValueError, "The %s could be transformed only by a similarity" % str(_type)
+        _gather(_type, _cElements, _coords)
+    _coords = transform_coords(matrix, _coords)
+    _out = []
+    _index = 0
+    for _type, _cElements in items:
+        _new, _index = _scatter(_type, _cElements, _coords, _index)
+        _transform_values(_type, _new, _sim)
+        _out.append(_new)
+    return _out
@@ -0,0 +1,348 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# code to calculate all the intersection between two set of entity
+#
+# the primitive of the entities (see intersection.py) are packed in numpy
+# array and every couple of primitive kind is solved for all the pairs at
+# once. Without numpy the pairs are solved one by one with the same
+# native solvers.
+#
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from Kernel.GeoUtil.tolerance       import TOL
+from Kernel.GeoUtil.intersection    import find_intersections
+from Kernel.GeoUtil.intersection    import _to_primitives
+from Kernel.GeoUtil.intersection    import _zero, _one, _pi_2
+
+#
+# max number of pairs solved in a single numpy operation
+#
+BATCH_SIZE = 250000
+
+def _get_id_geo(item, index):
+    """
+        get the id and the geometrical entity of an item of the batch
+        the item could be a kernel Entity, an (id, geometricalEntity)
+        tuple or a geometrical entity that is identified by its index
+    """
+    if isinstance(item, tuple):
+        return item
+    if getattr(item, 'getGeometricalEntity', None):
+        return item.getId(), item.getGeometricalEntity()
+    return index, item
+
+def _pack(entities):
+    """
+        convert the entities in primitive
+        return (geos, ids, unsupported, {kind:(ownerIndexArray, paramArray)})
+        unsupported is the list of the index of the entities without
+        native primitive
+    """
+    _geos = []
+    _ids = []
+    _unsupported = []
+    _packed = {}
+    for _i, _item in enumerate(entities):
+        _id, _geo = _get_id_geo(_item, _i)
+        _ids.append(_id)
+        _geos.append(_geo)
+        _primitives = _to_primitives(_geo)
+        if _primitives is None:
+            _unsupported.append(_i)
+            continue
+        for _primitive in _primitives:
+            _owners, _params = _packed.setdefault(_primitive[0], ([], []))
+            _owners.append(_i)
+            _params.append([_v is None and numpy.nan or _v for _v in _primitive[1:]])
+    for _kind in _packed:
+        _owners, _params = _packed[_kind]
+        _packed[_kind] = (numpy.array(_owners, dtype=int), numpy.array(_params, dtype=float))
+    return _geos, _ids, _unsupported, _packed
+
+def _in_arc_array(cx, cy, r, sa, span, x, y):
+    """
+        vectorized version of intersection._in_arc
+        the full circle have span nan
+    """
+    _full = numpy.isnan(span)
+    _span = numpy.where(_full, 1.0, span)
+    _angle = numpy.arctan2(y - cy, x - cx)
+    _delta = numpy.where(_span > 0.0, _angle - sa, sa - _angle)
+    _delta = numpy.mod(_delta, _pi_2)
+    _tol = TOL/r
+    _span = numpy.abs(_span)
+    return _full | (_delta <= _span + _tol) | (_delta >= _pi_2 - _tol)
+
+#
+# the batch solvers intersect the primitive la[i] with the primitive lb[i]
+# for every i and return the (index, x, y) arrays of the intersection points
+#
+def _lines_lines(la, lb):
+    """
+        vectorized version of intersection._line_line
+    """
+    _x1 = la[:, 0]; _y1 = la[:, 1]; _x2 = la[:, 2]; _y2 = la[:, 3]
+    _x3 = lb[:, 0]; _y3 = lb[:, 1]; _x4 = lb[:, 2]; _y4 = lb[:, 3]
+    _dx1 = _x2 - _x1; _dy1 = _y2 - _y1
+    _dx2 = _x4 - _x3; _dy2 = _y4 - _y3
+    _d = (_dx1*_dy2) - (_dy1*_dx2)
+    _valid = numpy.abs(_d) > TOL*numpy.hypot(_dx1, _dy1)*numpy.hypot(_dx2, _dy2)
+    _d = numpy.where(_valid, _d, 1.0)
+    _r = (((_y1 - _y3)*_dx2) - ((_x1 - _x3)*_dy2))/_d
+    _s = (((_y1 - _y3)*_dx1) - ((_x1 - _x3)*_dy1))/_d
+    _valid &= (la[:, 4] < 0.5) | ((_r >= _zero) & (_r <= _one))
+    _valid &= (lb[:, 4] < 0.5) | ((_s >= _zero) & (_s <= _one))
+    _index = numpy.nonzero(_valid)[0]
+    _r = _r[_index]
+    return _index, _x1[_index] + _r*_dx1[_index], _y1[_index] + _r*_dy1[_index]
+
+def _lines_unit_circle(x1, y1, x2, y2, bounded):
+    """
+        vectorized version of intersection._line_unit_circle
+        return the list of (validMask, t) for the two roots
+    """
+    _dx = x2 - x1
+    _dy = y2 - y1
+    _a = _dx*_dx + _dy*_dy
+    _valid = _a > TOL*TOL
+    _a = numpy.where(_valid, _a, 1.0)
+    _tm = -(x1*_dx + y1*_dy)/_a
+    _h = numpy.hypot(x1 + _tm*_dx, y1 + _tm*_dy)
+    _valid &= _h <= 1.0 + TOL
+    _tangent = numpy.abs(_h - 1.0) <= TOL
+    _dt = numpy.sqrt(numpy.clip(1.0 - _h*_h, 0.0, None))/numpy.sqrt(_a)
+    _dt = numpy.where(_tangent, 0.0, _dt)
+    _roots = []
+    for _t, _mask in ((_tm - _dt, _valid), (_tm + _dt, _valid & ~_tangent)):
+        _mask = _mask & (~bounded | ((_t >= _zero) & (_t <= _one)))
+        _roots.append((_mask, _t))
+    return _roots
+
+def _lines_circles(la, cb):
+    """
+        vectorized version of intersection._line_circle
+    """
+    _x1 = la[:, 0]; _y1 = la[:, 1]; _x2 = la[:, 2]; _y2 = la[:, 3]
+    _cx = cb[:, 0]; _cy = cb[:, 1]; _r = cb[:, 2]
+    _roots = _lines_unit_circle((_x1 - _cx)/_r, (_y1 - _cy)/_r,
+                                (_x2 - _cx)/_r, (_y2 - _cy)/_r, la[:, 4] > 0.5)
+    _out = []
+    for _mask, _t in _roots:
+        _x = _x1 + _t*(_x2 - _x1)
+        _y = _y1 + _t*(_y2 - _y1)
+        _mask = _mask & _in_arc_array(_cx, _cy, _r, cb[:, 3], cb[:, 4], _x, _y)
+        _index = numpy.nonzero(_mask)[0]
+        _out.append((_index, _x[_index], _y[_index]))
+    return _concatenate(_out)
+
+def _lines_ellipses(la, eb):
+    """
+        vectorized version of intersection._line_ellipse
+    """
+    _x1 = la[:, 0]; _y1 = la[:, 1]; _x2 = la[:, 2]; _y2 = la[:, 3]
+    _cx = eb[:, 0]; _cy = eb[:, 1]; _a = eb[:, 2]; _b = eb[:, 3]
+    _degenerate = (_a <= TOL) | (_b <= TOL)
+    _a = numpy.where(_degenerate, 1.0, _a)
+    _b = numpy.where(_degenerate, 1.0, _b)
+    _roots = _lines_unit_circle((_x1 - _cx)/_a, (_y1 - _cy)/_b,
+                                (_x2 - _cx)/_a, (_y2 - _cy)/_b, la[:, 4] > 0.5)
+    _out = []
+    for _mask, _t in _roots:
+        _index = numpy.nonzero(_mask & ~_degenerate)[0]
+        _t = _t[_index]
+        _out.append((_index, _x1[_index] + _t*(_x2[_index] - _x1[_index]),
+                     _y1[_index] + _t*(_y2[_index] - _y1[_index])))
+    return _concatenate(_out)
+
+def _circles_circles(ca, cb):
+    """
+        vectorized version of intersection._circle_circle
+    """
+    _cx1 = ca[:, 0]; _cy1 = ca[:, 1]; _r1 = ca[:, 2]
+    _cx2 = cb[:, 0]; _cy2 = cb[:, 1]; _r2 = cb[:, 2]
+    _dx = _cx2 - _cx1
+    _dy = _cy2 - _cy1
+    _d = numpy.hypot(_dx, _dy)
+    _tol = TOL*numpy.maximum(numpy.maximum(_r1, _r2), 1.0)
+    _valid = ((_d > TOL) & (_d <= _r1 + _r2 + _tol) &
+              (_d >= numpy.abs(_r1 - _r2) - _tol))
+    _d = numpy.where(_valid, _d, 1.0)
+    _a = (_r1*_r1 - _r2*_r2 + _d*_d)/(2.0*_d)
+    _h2 = _r1*_r1 - _a*_a
+    _tangent = _h2 <= _tol*_tol
+    _h = numpy.where(_tangent, 0.0, numpy.sqrt(numpy.clip(_h2, 0.0, None)))
+    _xm = _cx1 + _a*_dx/_d
+    _ym = _cy1 + _a*_dy/_d
+    _out = []
+    for _sign, _mask in ((1.0, _valid), (-1.0, _valid & ~_tangent)):
+        _x = _xm + _sign*_h*_dy/_d
+        _y = _ym - _sign*_h*_dx/_d
+        _mask = (_mask &
+                 _in_arc_array(_cx1, _cy1, _r1, ca[:, 3], ca[:, 4], _x, _y) &
+                 _in_arc_array(_cx2, _cy2, _r2, cb[:, 3], cb[:, 4], _x, _y))
+        _index = numpy.nonzero(_mask)[0]
+        _out.append((_index, _x[_index], _y[_index]))
+    return _concatenate(_out)
+
+def _concatenate(results):
+    """
+        join the list of tuple of arrays
+    """
+    return tuple([numpy.concatenate([_result[_i] for _result in results])
+                  for _i in range(len(results[0]))])
+
+_BATCH_SOLVERS = {('L', 'L'):_lines_lines,
+                  ('L', 'C'):_lines_circles,
+                  ('C', 'C'):_circles_circles,
+                  ('L', 'E'):_lines_ellipses}
+
+def _get_batch_solver(kinda, kindb):
+    """
+        get the batch solver for the couple of primitive kind
+        return (solver, swap) or (None, False) if there is no batch solver
+    """
+    if (kinda, kindb) in _BATCH_SOLVERS:
+        return _BATCH_SOLVERS[(kinda, kindb)], False
+    if (kindb, kinda) in _BATCH_SOLVERS:
+        return _BATCH_SOLVERS[(kindb, kinda)], True
+    return None, False
+
+def _solve_pairs(solver, swap, paramsa, paramsb):
+    """
+        solve the pairs paramsa[i], paramsb[i] with the batch solver
+        return the (index, x, y) arrays
+    """
+    if swap:
+        return solver(paramsb, paramsa)
+    return solver(paramsa, paramsb)
+
+def _solve_kinds(solver, swap, ownersa, paramsa, ownersb, paramsb):
+    """
+        solve all the pairs of two primitive kind splitting the first set
+        in chunk so that no more then BATCH_SIZE pairs are solved at once
+        return the list of (ownerA, ownerB, x, y) arrays
+    """
+    _nb = len(paramsb)
+    _chunk = max(1, BATCH_SIZE/max(1, _nb))
+    _out = []
+    for _start in xrange(0, len(paramsa), _chunk):
+        _na = min(_chunk, len(paramsa) - _start)
+        _ia = numpy.repeat(numpy.arange(_start, _start + _na), _nb)
+        _ib = numpy.tile(numpy.arange(_nb), _na)
+        _index, _x, _y = _solve_pairs(solver, swap, paramsa[_ia], paramsb[_ib])
+        _out.append((ownersa[_ia[_index]], ownersb[_ib[_index]], _x, _y))
+    return _out
+
+def _find_intersections_batch_numpy(entitiesA, entitiesB, unique):
+    """
+        numpy implementation of find_intersections_batch
+    """
+    _geosa, _idsa, _unsupporteda, _packeda = _pack(entitiesA)
+    if entitiesB is None:
+        _geosb, _idsb, _unsupportedb, _packedb = _geosa, _idsa, _unsupporteda, _packeda
+    else:
+        _geosb, _idsb, _unsupportedb, _packedb = _pack(entitiesB)
+    _results = []
+    _fallback = set()
+    for _oa in _unsupporteda:
+        _fallback.update([(_oa, _ob) for _ob in xrange(len(_geosb))])
+    for _ob in _unsupportedb:
+        _fallback.update([(_oa, _ob) for _oa in xrange(len(_geosa))])
+    for _kinda in _packeda:
+        for _kindb in _packedb:
+            _ownersa, _paramsa = _packeda[_kinda]
+            _ownersb, _paramsb = _packedb[_kindb]
+            _solver, _swap = _get_batch_solver(_kinda, _kindb)
+            if _solver is None:
+                for _oa in set(_ownersa.tolist()):
+                    _fallback.update([(_oa, _ob) for _ob in set(_ownersb.tolist())])
+                continue
+            _results.extend(_solve_kinds(_solver, _swap, _ownersa, _paramsa, _ownersb, _paramsb))
+    for _oa, _ob in _fallback:
+        if unique and _oa >= _ob:
+            continue
+        _points = find_intersections(_geosa[_oa], _geosb[_ob])
+        if _points:
+            _xs, _ys = zip(*_points)
+            _results.append((numpy.array([_oa]*len(_points), dtype=int),
+                             numpy.array([_ob]*len(_points), dtype=int),
+                             numpy.array(_xs, dtype=float),
+                             numpy.array(_ys, dtype=float)))
+    if not _results:
+        return []
+    _ownersa, _ownersb, _xs, _ys = _concatenate(_results)
+    if unique:
+        _mask = _ownersa < _ownersb
+        _ownersa, _ownersb, _xs, _ys = _ownersa[_mask], _ownersb[_mask], _xs[_mask], _ys[_mask]
+    _ownersa, _ownersb, _xs, _ys = _unique_hits(_ownersa, _ownersb, _xs, _ys)
+    return zip([_idsa[_oa] for _oa in _ownersa.tolist()],
+               [_idsb[_ob] for _ob in _ownersb.tolist()],
+               _xs.tolist(), _ys.tolist())
+
+def _unique_hits(ownersa, ownersb, xs, ys):
+    """
+        sort the hits by owner and remove the same point found by more
+        primitive of the same owner pair
+        return the (ownerA, ownerB, x, y) arrays
+    """
+    _order = numpy.lexsort((ys, xs, ownersb, ownersa))
+    ownersa, ownersb, xs, ys = ownersa[_order], ownersb[_order], xs[_order], ys[_order]
+    _tol = TOL*100.0*numpy.maximum(1.0, numpy.maximum(numpy.abs(xs), numpy.abs(ys)))
+    _keep = numpy.ones(len(xs), dtype=bool)
+    _keep[1:] = ~((ownersa[1:] == ownersa[:-1]) & (ownersb[1:] == ownersb[:-1]) &
+                  (numpy.abs(xs[1:] - xs[:-1]) <= _tol[1:]) &
+                  (numpy.abs(ys[1:] - ys[:-1]) <= _tol[1:]))
+    return ownersa[_keep], ownersb[_keep], xs[_keep], ys[_keep]
+
+def _find_intersections_batch_python(entitiesA, entitiesB, unique):
+    """
+        pure python implementation of find_intersections_batch
+    """
+    _itemsa = [_get_id_geo(_item, _i) for _i, _item in enumerate(entitiesA)]
+    if entitiesB is None:
+        _itemsb = _itemsa
+    else:
+        _itemsb = [_get_id_geo(_item, _i) for _i, _item in enumerate(entitiesB)]
+    _out = []
+    for _oa, (_ida, _geoa) in enumerate(_itemsa):
+        for _ob, (_idb, _geob) in enumerate(_itemsb):
+            if not unique or _oa < _ob:
+                for _x, _y in find_intersections(_geoa, _geob):
+                    _out.append((_ida, _idb, _x, _y))
+    return _out
+
+def find_intersections_batch(entitiesA, entitiesB=None):
+    """
+        Find all the intersection points between the entities of entitiesA
+        and the entities of entitiesB.
+        The entities could be kernel Entity, (id, geometricalEntity) tuple
+        or geometrical entity identified by their position in the list.
+        If entitiesB is None the intersection between all the pairs of
+        different entities of entitiesA are computed once.
+        Return an [(idA, idB, x, y), ...]
+    """
+    _unique = entitiesB is None
+    if numpy is None:
+        return _find_intersections_batch_python(entitiesA, entitiesB, _unique)
+    return _find_intersections_batch_numpy(entitiesA, entitiesB, _unique)
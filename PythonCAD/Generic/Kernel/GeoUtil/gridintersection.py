@@ -0,0 +1,367 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# code to find all the intersection of a set of entity
+#
+# the primitive of the entities (see intersection.py) are bucketed in an
+# uniform grid by their bounding box, only the primitive that share a cell
+# and have overlapping bounding box are intersected so the work grow with
+# the number of primitive and of the near pairs instead of all the pairs.
+# The candidate pairs are solved with the batch solvers of
+# batchintersection.py when numpy is available.
+#
+import math
+
+from Kernel.GeoUtil.tolerance           import TOL
+from Kernel.GeoUtil.intersection        import find_intersections
+from Kernel.GeoUtil.intersection        import _to_primitives, _get_solver, _add_point
+from Kernel.GeoUtil.batchintersection   import numpy
+from Kernel.GeoUtil.batchintersection   import _get_id_geo, _get_batch_solver, _solve_pairs
+from Kernel.GeoUtil.batchintersection   import _concatenate, _unique_hits
+
+#
+# primitive that cover more then MAX_CELLS cells are intersected with all
+# the other primitive instead of being bucketed
+#
+MAX_CELLS = 64
+
+class _Primitives(object):
+    """
+        flat list of the primitive of a set of entity
+    """
+    def __init__(self, entities):
+        self.ids = []
+        self.geos = []
+        self.kinds = []
+        self.owners = []
+        self.seqs = []
+        self.params = []
+        self.bboxes = []
+        for _i, _item in enumerate(entities):
+            _id, _geo = _get_id_geo(_item, _i)
+            self.ids.append(_id)
+            self.geos.append(_geo)
+            _primitives = _to_primitives(_geo)
+            if _primitives is None:
+                continue
+            for _seq, _primitive in enumerate(_primitives):
+                self.kinds.append(_primitive[0])
+                self.owners.append(_i)
+                self.seqs.append(_seq)
+                self.params.append(_primitive)
+                self.bboxes.append(_primitive_bbox(_primitive))
+
+    def __len__(self):
+        return len(self.kinds)
+
+def _primitive_bbox(primitive):
+    """
+        get the (xmin, ymin, xmax, ymax) of the primitive enlarged by TOL
+        return None for the unbounded line
+    """
+    _kind = primitive[0]
+    if _kind == 'L':
+        _kind, _x1, _y1, _x2, _y2, _bounded = primitive
+        if not _bounded:
+            return None
+        return (min(_x1, _x2) - TOL, min(_y1, _y2) - TOL,
+                max(_x1, _x2) + TOL, max(_y1, _y2) + TOL)
+    if _kind == 'C':
+        _kind, _xc, _yc, _r, _sa, _span = primitive
+        _a = _b = _r
+    else:
+        _kind, _xc, _yc, _a, _b = primitive
+    return (_xc - _a - TOL, _yc - _b - TOL, _xc + _a + TOL, _yc + _b + TOL)
+
+def _overlap(bboxa, bboxb):
+    """
+        check if two bounding box overlap, None is an unbounded box
+    """
+    if bboxa is None or bboxb is None:
+        return True
+    return (bboxa[0] <= bboxb[2] and bboxb[0] <= bboxa[2] and
+            bboxa[1] <= bboxb[3] and bboxb[1] <= bboxa[3])
+
+def _cell_size(bboxes):
+    """
+        get the grid cell size from the mean size of the primitive
+        the size is increased so that there are no more then 4 cell for
+        each primitive in the drawing extents
+    """
+    _finite = [_bbox for _bbox in bboxes if _bbox is not None]
+    if not _finite:
+        return 1.0
+    _size = sum([max(_bbox[2] - _bbox[0], _bbox[3] - _bbox[1]) for _bbox in _finite])/len(_finite)
+    _width = max([_bbox[2] for _bbox in _finite]) - min([_bbox[0] for _bbox in _finite])
+    _height = max([_bbox[3] for _bbox in _finite]) - min([_bbox[1] for _bbox in _finite])
+    _size = max(_size, math.sqrt(_width*_height/(4.0*len(_finite))))
+    if _size <= TOL:
+        return 1.0
+    return _size
+
+def _candidate_pairs(bboxes, cellSize):
+    """
+        get the (i, j) pairs, i<j, of the primitive with overlapping
+        bounding box
+        each pair is reported only by the cell that contains the lower
+        left corner of the overlap of the two bounding box
+    """
+    _buckets = {}
+    _large = []
+    for _i, _bbox in enumerate(bboxes):
+        if _bbox is None:
+            _large.append(_i)
+            continue
+        _ix0 = int(math.floor(_bbox[0]/cellSize))
+        _iy0 = int(math.floor(_bbox[1]/cellSize))
+        _ix1 = int(math.floor(_bbox[2]/cellSize))
+        _iy1 = int(math.floor(_bbox[3]/cellSize))
+        if (_ix1 - _ix0 + 1)*(_iy1 - _iy0 + 1) > MAX_CELLS:
+            _large.append(_i)
+            continue
+        for _ix in xrange(_ix0, _ix1 + 1):
+            for _iy in xrange(_iy0, _iy1 + 1):
+                _buckets.setdefault((_ix, _iy), []).append(_i)
+    _pairs = []
+    for (_ix, _iy), _items in _buckets.iteritems():
+        _n = len(_items)
+        for _a in xrange(_n - 1):
+            _i = _items[_a]
+            _bboxa = bboxes[_i]
+            for _b in xrange(_a + 1, _n):
+                _j = _items[_b]
+                _bboxb = bboxes[_j]
+                if not _overlap(_bboxa, _bboxb):
+                    continue
+                if (int(math.floor(max(_bboxa[0], _bboxb[0])/cellSize)) == _ix and
+                    int(math.floor(max(_bboxa[1], _bboxb[1])/cellSize)) == _iy):
+                    _pairs.append((_i, _j))
+    _isLarge = set(_large)
+    for _i in _large:
+        for _j in xrange(len(bboxes)):
+            if _j == _i or (_j in _isLarge and _j < _i):
+                continue
+            if _overlap(bboxes[_i], bboxes[_j]):
+                _pairs.append((min(_i, _j), max(_i, _j)))
+    return _pairs
+
+def _line_overlap(ipts, line1, line2):
+    """
+        end points of the overlap of two collinear segment or cline
+        the overlap of two cline is not reported
+    """
+    _kind, _x1, _y1, _x2, _y2, _bounded1 = line1
+    _kind, _x3, _y3, _x4, _y4, _bounded2 = line2
+    _dx1 = _x2 - _x1
+    _dy1 = _y2 - _y1
+    _l1 = _dx1*_dx1 + _dy1*_dy1
+    if _l1 <= TOL*TOL or not (_bounded1 or _bounded2):
+        return
+    _l = math.sqrt(_l1)
+    for _x, _y in ((_x3, _y3), (_x4, _y4)):
+        if abs((_x - _x1)*_dy1 - (_y - _y1)*_dx1) > TOL*_l*max(1.0, _l):
+            return
+    _t3 = ((_x3 - _x1)*_dx1 + (_y3 - _y1)*_dy1)/_l1
+    _t4 = ((_x4 - _x1)*_dx1 + (_y4 - _y1)*_dy1)/_l1
+    _lo, _hi = -float('inf'), float('inf')
+    if _bounded1:
+        _lo, _hi = 0.0, 1.0
+    if _bounded2:
+        _lo, _hi = max(_lo, min(_t3, _t4)), min(_hi, max(_t3, _t4))
+    if _hi - _lo <= TOL:
+        return
+    for _t in (_lo, _hi):
+        ipts.append((_x1 + _t*_dx1, _y1 + _t*_dy1))
+
+def _lines_overlaps(la, lb):
+    """
+        vectorized version of _line_overlap
+    """
+    _x1 = la[:, 0]; _y1 = la[:, 1]; _x2 = la[:, 2]; _y2 = la[:, 3]
+    _x3 = lb[:, 0]; _y3 = lb[:, 1]; _x4 = lb[:, 2]; _y4 = lb[:, 3]
+    _bounded1 = la[:, 4] > 0.5
+    _bounded2 = lb[:, 4] > 0.5
+    _dx1 = _x2 - _x1
+    _dy1 = _y2 - _y1
+    _l1 = _dx1*_dx1 + _dy1*_dy1
+    _valid = (_l1 > TOL*TOL) & (_bounded1 | _bounded2)
+    _l1 = numpy.where(_valid, _l1, 1.0)
+    _l = numpy.sqrt(_l1)
+    _tol = TOL*_l*numpy.maximum(1.0, _l)
+    _valid &= numpy.abs((_x3 - _x1)*_dy1 - (_y3 - _y1)*_dx1) <= _tol
+    _valid &= numpy.abs((_x4 - _x1)*_dy1 - (_y4 - _y1)*_dx1) <= _tol
+    _t3 = ((_x3 - _x1)*_dx1 + (_y3 - _y1)*_dy1)/_l1
+    _t4 = ((_x4 - _x1)*_dx1 + (_y4 - _y1)*_dy1)/_l1
+    _lo = numpy.where(_bounded1, 0.0, -numpy.inf)
+    _hi = numpy.where(_bounded1, 1.0, numpy.inf)
+    _lo = numpy.where(_bounded2, numpy.maximum(_lo, numpy.minimum(_t3, _t4)), _lo)
+    _hi = numpy.where(_bounded2, numpy.minimum(_hi, numpy.maximum(_t3, _t4)), _hi)
+    _valid &= _hi - _lo > TOL
+    _index = numpy.nonzero(_valid)[0]
+    _out = []
+    for _t in (_lo[_index], _hi[_index]):
+        _out.append((_index, _x1[_index] + _t*_dx1[_index], _y1[_index] + _t*_dy1[_index]))
+    return _concatenate(_out)
+
+def _is_vertex(primitive, x, y):
+    """
+        check if x, y is an end point of the segment primitive
+    """
+    _kind, _x1, _y1, _x2, _y2, _bounded = primitive
+    _tol = TOL*100.0*max(1.0, abs(x), abs(y))
+    return ((abs(_x1 - x) <= _tol and abs(_y1 - y) <= _tol) or
+            (abs(_x2 - x) <= _tol and abs(_y2 - y) <= _tol))
+
+def _split_pairs(primitives, pairs):
+    """
+        split the candidate pairs in the pairs of primitive to solve
+        grouped by primitive kind and the pairs of entity to be solved by
+        find_intersections
+        the consecutive segments of the same polyline are skipped
+    """
+    _groups = {}
+    _fallback = set()
+    _owners = primitives.owners
+    _seqs = primitives.seqs
+    _kinds = primitives.kinds
+    for _i, _j in pairs:
+        _oa = _owners[_i]
+        _ob = _owners[_j]
+        if _oa == _ob and abs(_seqs[_i] - _seqs[_j]) <= 1:
+            continue
+        if _oa > _ob:
+            _i, _j, _oa, _ob = _j, _i, _ob, _oa
+        _kinds2 = (_kinds[_i], _kinds[_j])
+        if _get_solver(_kinds2[0], _kinds2[1])[0] is None:
+            _fallback.add((_oa, _ob))
+        else:
+            _groups.setdefault(_kinds2, []).append((_i, _j))
+    return _groups, _fallback
+
+def _keep_hit(primitives, i, j, x, y):
+    """
+        the closed polyline first and last segment intersect in the shared
+        vertex that is not a self intersection
+    """
+    if primitives.owners[i] != primitives.owners[j]:
+        return True
+    _pa = primitives.params[i]
+    _pb = primitives.params[j]
+    return not (_is_vertex(_pa, x, y) and _is_vertex(_pb, x, y))
+
+def _find_all_intersections_numpy(primitives, groups):
+    """
+        solve the grouped pairs with the batch solvers
+        return the list of (ownerA, ownerB, x, y) arrays
+    """
+    _params = numpy.array([[_v is None and numpy.nan or _v for _v in _p[1:]] + [0.0]*(6 - len(_p))
+                           for _p in primitives.params], dtype=float)
+    _owners = numpy.array(primitives.owners, dtype=int)
+    _results = []
+    for (_kinda, _kindb), _pairs in groups.iteritems():
+        _pairs = numpy.array(_pairs, dtype=int)
+        _ia = _pairs[:, 0]
+        _ib = _pairs[:, 1]
+        _solver, _swap = _get_batch_solver(_kinda, _kindb)
+        _solved = [_solve_pairs(_solver, _swap, _params[_ia], _params[_ib])]
+        if _kinda == 'L' and _kindb == 'L':
+            _solved.append(_lines_overlaps(_params[_ia], _params[_ib]))
+        for _index, _x, _y in _solved:
+            _self = numpy.nonzero(_owners[_ia[_index]] == _owners[_ib[_index]])[0]
+            if len(_self):
+                _keep = numpy.ones(len(_index), dtype=bool)
+                for _k in _self.tolist():
+                    _keep[_k] = _keep_hit(primitives, _ia[_index[_k]], _ib[_index[_k]],
+                                          _x[_k], _y[_k])
+                _index, _x, _y = _index[_keep], _x[_keep], _y[_keep]
+            _results.append((_owners[_ia[_index]], _owners[_ib[_index]], _x, _y))
+    return _results
+
+def _find_all_intersections_python(primitives, groups):
+    """
+        solve the grouped pairs with the native solvers
+        return the list of (ownerA, ownerB, [(x, y), ...])
+    """
+    _results = []
+    for (_kinda, _kindb), _pairs in groups.iteritems():
+        _solver, _swap = _get_solver(_kinda, _kindb)
+        for _i, _j in _pairs:
+            _pa = primitives.params[_i]
+            _pb = primitives.params[_j]
+            _ipts = []
+            if _swap:
+                _solver(_ipts, _pb, _pa)
+            else:
+                _solver(_ipts, _pa, _pb)
+            if _kinda == 'L' and _kindb == 'L':
+                _line_overlap(_ipts, _pa, _pb)
+            _ipts = [(_x, _y) for _x, _y in _ipts if _keep_hit(primitives, _i, _j, _x, _y)]
+            _results.append((primitives.owners[_i], primitives.owners[_j], _ipts))
+    return _results
+
+def find_all_intersections(entities, cellSize=None):
+    """
+        Find all the intersection points between the entities, the self
+        intersection of the polylines and the end points of the overlap
+        of collinear segments.
+        The entities could be kernel Entity, (id, geometricalEntity) tuple
+        or geometrical entity identified by their position in the list.
+        The entities without native primitive (point, text, dimension ...)
+        are ignored.
+        cellSize is the size of the grid cell, None compute it from the
+        mean size of the entities.
+        Return an [(idA, idB, x, y), ...], idA is idB for the self
+        intersection
+    """
+    _primitives = _Primitives(entities)
+    if cellSize is None:
+        cellSize = _cell_size(_primitives.bboxes)
+    _pairs = _candidate_pairs(_primitives.bboxes, cellSize)
+    _groups, _fallback = _split_pairs(_primitives, _pairs)
+    _ids = _primitives.ids
+    _geos = _primitives.geos
+    if numpy is None:
+        _hits = {}
+        for _oa, _ob, _ipts in _find_all_intersections_python(_primitives, _groups):
+            for _point in _ipts:
+                _add_point(_hits.setdefault((_oa, _ob), []), _point)
+        for _oa, _ob in _fallback:
+            for _point in find_intersections(_geos[_oa], _geos[_ob]):
+                _add_point(_hits.setdefault((_oa, _ob), []), _point)
+        _out = []
+        for _oa, _ob in sorted(_hits.keys()):
+            for _x, _y in sorted(_hits[(_oa, _ob)]):
+                _out.append((_ids[_oa], _ids[_ob], _x, _y))
+        return _out
+    _results = _find_all_intersections_numpy(_primitives, _groups)
+    for _oa, _ob in _fallback:
+        _points = find_intersections(_geos[_oa], _geos[_ob])
+        if _points:
+            _xs, _ys = zip(*_points)
+            _results.append((numpy.array([_oa]*len(_points), dtype=int),
+                             numpy.array([_ob]*len(_points), dtype=int),
+                             numpy.array(_xs, dtype=float),
+                             numpy.array(_ys, dtype=float)))
+    if not _results:
+        return []
+    _ownersa, _ownersb, _xs, _ys = _unique_hits(*_concatenate(_results))
+    return zip([_ids[_oa] for _oa in _ownersa.tolist()],
+               [_ids[_ob] for _ob in _ownersb.tolist()],
+               _xs.tolist(), _ys.tolist())
@@ -35,12 +35,14 @@ from Kernel.GeoEntity.ccircle     import CCircle
 from Kernel.GeoEntity.polyline    import Polyline
 from Kernel.GeoEntity.ellipse     import Ellipse
 from Kernel.GeoUtil.geolib        import Vector
+from Kernel.GeoUtil.tolerance     import TOL
 #
 # common constants
 #
 
 _dtr = math.pi/180.0
 _rtd = 180.0/math.pi
+_pi_2 = math.pi*2.0
 
 _zero = 0.0 - 1e-10
 _one = 1.0 + 1e-10
@@ -112,68 +114,290 @@ def _null_intfunc(ipts, obja, objb):
 def _non_intersecting(ipts, obja, objb):
     pass
 #
-# Ellipse intersection function
+# native intersection functions
+#
+# every geometrical entity is converted in one or more primitive
+# tuple of float and the intersection of each couple of primitive
+# is computed in closed form by the function in _SOLVERS
+#   ('L', x1, y1, x2, y2, bounded) segment (bounded) or cline
+#   ('C', xc, yc, r, startAngle, span) arc, span is None for a full circle
+#   ('E', xc, yc, a, b) ellipse with the axis parallel to x and y
+#
+
+def _segment_primitives(seg):
+    _x1, _y1 = seg.p1.getCoords()
+    _x2, _y2 = seg.p2.getCoords()
+    return [('L', _x1, _y1, _x2, _y2, True)]
+
+def _cline_primitives(cline):
+    _x1, _y1 = cline.p1.getCoords()
+    _x2, _y2 = cline.p2.getCoords()
+    return [('L', _x1, _y1, _x2, _y2, False)]
+
+def _arc_primitives(arc):
+    _xc, _yc = arc.center.getCoords()
+    _span = arc.endAngle
+    if abs(_span) < 1e-10 or abs(_span) >= _pi_2:
+        _span = None
+    return [('C', _xc, _yc, float(arc.radius), float(arc.startAngle), _span)]
+
+def _ccircle_primitives(circle):
+    _xc, _yc = circle.center.getCoords()
+    return [('C', _xc, _yc, float(circle.radius), 0.0, None)]
+
+def _ellipse_primitives(ellipse):
+    _xc, _yc = ellipse.center.getCoords()
+    return [('E', _xc, _yc, ellipse.horizontalRadius*0.5, ellipse.verticalRadius*0.5)]
+
+def _polyline_primitives(pol):
+    return [('L', _x1, _y1, _x2, _y2, True)
+                for _x1, _y1, _x2, _y2 in pol.getVertexArray().iterSegmentCoords()]
+
+_PRIMITIVES = ((Polyline, _polyline_primitives),
+               (Segment, _segment_primitives),
+               (CLine, _cline_primitives),
+               (Arc, _arc_primitives),
+               (CCircle, _ccircle_primitives),
+               (Ellipse, _ellipse_primitives))
+
+def _to_primitives(obj):
+    """
+        convert a geometrical entity in a list of primitive
+        return None if the entity is not supported
+    """
+    for _class, _function in _PRIMITIVES:
+        if isinstance(obj, _class):
+            return _function(obj)
+    return None
+
+def _in_arc(circle, x, y):
+    """
+        check if the point x, y on the circle is inside the arc span
+    """
+    _kind, _xc, _yc, _r, _sa, _span = circle
+    if _span is None:
+        return True
+    _tol = TOL/_r
+    _angle = math.atan2(y - _yc, x - _xc)
+    if _span > 0.0:
+        _delta = math.fmod(_angle - _sa, _pi_2)
+    else:
+        _delta = math.fmod(_sa - _angle, _pi_2)
+        _span = -_span
+    if _delta < 0.0:
+        _delta = _delta + _pi_2
+    return _delta <= _span + _tol or _delta >= _pi_2 - _tol
+
+def _line_line(ipts, line1, line2):
+    """
+        intersection of two segment or cline
+        parallel and overlapping lines have no intersection point
+    """
+    _kind, _x1, _y1, _x2, _y2, _bounded1 = line1
+    _kind, _x3, _y3, _x4, _y4, _bounded2 = line2
+    _dx1 = _x2 - _x1
+    _dy1 = _y2 - _y1
+    _dx2 = _x4 - _x3
+    _dy2 = _y4 - _y3
+    _d = (_dx1*_dy2) - (_dy1*_dx2)
+    if abs(_d) <= TOL*math.hypot(_dx1, _dy1)*math.hypot(_dx2, _dy2):
+        return
+    _r = (((_y1 - _y3)*_dx2) - ((_x1 - _x3)*_dy2))/_d
+    _s = (((_y1 - _y3)*_dx1) - ((_x1 - _x3)*_dy1))/_d
+    if _bounded1 and (_r < _zero or _r > _one):
+        return
+    if _bounded2 and (_s < _zero or _s > _one):
+        return
+    ipts.append((_x1 + _r*_dx1, _y1 + _r*_dy1))
+
+def _line_unit_circle(x1, y1, x2, y2, bounded):
+    """
+        intersection of a line with the circle of radius 1 centered in 0, 0
+        return the list of the line parameter t of the intersection points
+    """
+    _dx = x2 - x1
+    _dy = y2 - y1
+    _a = _dx*_dx + _dy*_dy
+    if _a <= TOL*TOL:
+        return []
+    _tm = -(x1*_dx + y1*_dy)/_a
+    # distance from the center to the line
+    _h = math.hypot(x1 + _tm*_dx, y1 + _tm*_dy)
+    if _h > 1.0 + TOL:
+        return []
+    if abs(_h - 1.0) <= TOL:
+        _ts = [_tm]
+    else:
+        _dt = math.sqrt(1.0 - _h*_h)/math.sqrt(_a)
+        _ts = [_tm - _dt, _tm + _dt]
+    if bounded:
+        _ts = [_t for _t in _ts if _t >= _zero and _t <= _one]
+    return _ts
+
+def _line_circle(ipts, line, circle):
+    """
+        intersection of a segment or cline with an arc or circle
+    """
+    _kind, _x1, _y1, _x2, _y2, _bounded = line
+    _kind, _xc, _yc, _r, _sa, _span = circle
+    _ts = _line_unit_circle((_x1 - _xc)/_r, (_y1 - _yc)/_r,
+                            (_x2 - _xc)/_r, (_y2 - _yc)/_r, _bounded)
+    for _t in _ts:
+        _x = _x1 + _t*(_x2 - _x1)
+        _y = _y1 + _t*(_y2 - _y1)
+        if _in_arc(circle, _x, _y):
+            ipts.append((_x, _y))
+
+def _circle_circle(ipts, circle1, circle2):
+    """
+        intersection of two arc or circle
+        concentric circles have no intersection point
+    """
+    _kind, _xc1, _yc1, _r1, _sa1, _span1 = circle1
+    _kind, _xc2, _yc2, _r2, _sa2, _span2 = circle2
+    _dx = _xc2 - _xc1
+    _dy = _yc2 - _yc1
+    _d = math.hypot(_dx, _dy)
+    if _d <= TOL:
+        return
+    _tol = TOL*max(1.0, _r1, _r2)
+    if _d > _r1 + _r2 + _tol or _d < abs(_r1 - _r2) - _tol:
+        return
+    _a = (_r1*_r1 - _r2*_r2 + _d*_d)/(2.0*_d)
+    _h2 = _r1*_r1 - _a*_a
+    _xm = _xc1 + _a*_dx/_d
+    _ym = _yc1 + _a*_dy/_d
+    if _h2 <= _tol*_tol:
+        _points = [(_xm, _ym)]
+    else:
+        _h = math.sqrt(_h2)
+        _points = [(_xm + _h*_dy/_d, _ym - _h*_dx/_d),
+                   (_xm - _h*_dy/_d, _ym + _h*_dx/_d)]
+    for _x, _y in _points:
+        if _in_arc(circle1, _x, _y) and _in_arc(circle2, _x, _y):
+            ipts.append((_x, _y))
+
+def _line_ellipse(ipts, line, ellipse):
+    """
+        intersection of a segment or cline with an ellipse
+        the ellipse is scaled to the unit circle, the line parameter
+        of the intersection points does not change
+    """
+    _kind, _x1, _y1, _x2, _y2, _bounded = line
+    _kind, _xc, _yc, _a, _b = ellipse
+    if _a <= TOL or _b <= TOL:
+        return
+    _ts = _line_unit_circle((_x1 - _xc)/_a, (_y1 - _yc)/_b,
+                            (_x2 - _xc)/_a, (_y2 - _yc)/_b, _bounded)
+    for _t in _ts:
+        ipts.append((_x1 + _t*(_x2 - _x1), _y1 + _t*(_y2 - _y1)))
+
+_SOLVERS = {('L', 'L'):_line_line,
+            ('L', 'C'):_line_circle,
+            ('C', 'C'):_circle_circle,
+            ('L', 'E'):_line_ellipse}
+
+def _get_solver(kinda, kindb):
+    """
+        get the solver for the couple of primitive
+        return (solver, swap) or (None, False) if there is no native solver
+    """
+    if (kinda, kindb) in _SOLVERS:
+        return _SOLVERS[(kinda, kindb)], False
+    if (kindb, kinda) in _SOLVERS:
+        return _SOLVERS[(kindb, kinda)], True
+    return None, False
+
+def _add_point(ipts, point):
+    """
+        add the point to ipts if it is not already in the list
+    """
+    _x, _y = point
+    _tol = TOL*100.0*max(1.0, abs(_x), abs(_y))
+    for _px, _py in ipts:
+        if abs(_px - _x) <= _tol and abs(_py - _y) <= _tol:
+            return
+    ipts.append(point)
+
+def _native_intersection(ipts, obja, objb):
+    """
+        compute the intersection with the native solvers
+        return False if a couple of primitive have no native solver
+    """
+    _primitivesa = _to_primitives(obja)
+    _primitivesb = _to_primitives(objb)
+    if _primitivesa is None or _primitivesb is None:
+        return False
+    _tempIpts = []
+    for _pa in _primitivesa:
+        for _pb in _primitivesb:
+            _solver, _swap = _get_solver(_pa[0], _pb[0])
+            if _solver is None:
+                return False
+            if _swap:
+                _solver(_tempIpts, _pb, _pa)
+            else:
+                _solver(_tempIpts, _pa, _pb)
+    for _point in _tempIpts:
+        _add_point(ipts, _point)
+    return True
+
+#
+# sympy intersection functions
 #
 def _sympy_intersection(ipts, obj1, obj2):
     """
-        calculate the intersection beteen polyline and segment
+        calculate the intersection beteen two entity with sympy
     """
     from sympy.geometry import Point as sPoint
     from sympy.geometry import intersection as sIntersection
     sympySegment=obj1.getSympy()
     sympyObj2=obj2.getSympy()
-    #print "try intersect ", sympySegment, sympyObj2
     iObjs=sIntersection(sympySegment, sympyObj2 )
-    #print "iObjs", iObjs
     for p in iObjs:
         if isinstance(p, sPoint):
             ipts.append((float(p[0]),float(p[1])))
-    #print "Intersection",ipts
-def _pol_obj_intersection(ipts, pol, obj):
+
+def _sympy_arc_filter(ipts, obj):
     """
-        calculate the intersection beteen polyline and a generic object
+        sympy see the arc as a circle remove the points outside the arc
     """
-    for seg in pol.getSegments():
-        tempIpts=[]
-        _sympy_intersection(tempIpts,  seg,  obj)
-        if len(tempIpts)>0:
-            ipts=tempIpts
-            break
+    if isinstance(obj, Arc):
+        _circle = _arc_primitives(obj)[0]
+        return [p for p in ipts if _in_arc(_circle, p[0], p[1])]
+    return ipts
 
-def _pol_pol_intersection(ipts, pol1, pol2):
+def _sympy_find_intersections(ipts, obja, objb):
     """
-        found an intersection between polyline and other object
+        exact intersection with sympy, the polyline are split in segments
     """
-    if isinstance(pol1, Polyline):
-        if isinstance(pol2, Polyline):
-            for seg1 in pol1.getSegments():
-                for seg2 in pol2.getSegments():
-                    tempIpts=[]
-                    _sympy_intersection(tempIpts,  seg1,  seg2)
-                    if len(tempIpts)>0:
-                        ipts=tempIpts
-                        break
+    _objsa = isinstance(obja, Polyline) and obja.getSegments() or [obja]
+    _objsb = isinstance(objb, Polyline) and objb.getSegments() or [objb]
+    for _obja in _objsa:
+        for _objb in _objsb:
+            _tempIpts = []
+            try:
+                _sympy_intersection(_tempIpts, _obja, _objb)
+            except:
+                print "find_intersections: problem with sympy intersection",_obja,_objb
+                continue
+            _tempIpts = _sympy_arc_filter(_tempIpts, _obja)
+            _tempIpts = _sympy_arc_filter(_tempIpts, _objb)
+            for _point in _tempIpts:
+                _add_point(ipts, _point)
 
-def find_intersections(obja, objb):
+def find_intersections(obja, objb, exact=False):
     """
         Find intersection points
+        Return an [(x,y),(x1,y1),...]
+        The intersection are computed in floating point with the native
+        solvers, exact=True or the couple of entity that have no native
+        solver use the sympy symbolic intersection
     """
     _ipts=[]
-    if isinstance(obja,Polyline) or isinstance(objb,Polyline):
-        if isinstance(obja,Polyline) and isinstance(objb,Polyline):
-            _pol_pol_intersection(_ipts, obja, objb)
-        else:
-            if isinstance(objb,Polyline):
-                sp=obja
-                obja=objb
-                objb=sp
-            _pol_obj_intersection(_ipts, obja, objb)
-
-    else:
-            try:
-                _sympy_intersection(_ipts, obja, objb)
-            except:
-                print "find_intersections: problem with sympy intersection",obja,objb
+    if not exact and _native_intersection(_ipts, obja, objb):
+        return _ipts
+    _sympy_find_intersections(_ipts, obja, objb)
     return _ipts
 
 def findSegmentExtendedIntersection(obja, objb):
@@ -0,0 +1,153 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# code to simplify a polyline with the Douglas-Peucker algorithm
+#
+# the vertex that are nearer then the tolerance to the simplified polyline
+# are removed, the first and the last vertex are always kept
+# a first pass remove the vertex near the previous one, it keep the
+# Douglas-Peucker fast when it split the polyline near its ends, half of
+# the tolerance is used by each pass
+# the polyline is split in ranges of MAX_RANGE vertex that are simplified
+# alone, so a polyline with many equal peaks (where the farthest vertex is
+# always near an end of the range) do not make the algorithm quadratic on
+# all the vertex
+#
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+#
+# the ranges with less points are scanned without numpy
+#
+NUMPY_MIN_RANGE = 64
+#
+# the max number of vertex of the starting ranges
+#
+MAX_RANGE = 4096
+
+def _radial_points(points, tolerance):
+    """
+        get the points that are farther then tolerance from the previous
+        kept point, the first and the last point are kept
+    """
+    _tol2 = tolerance*tolerance
+    _x0, _y0 = points[0]
+    _kept = [points[0]]
+    for _i in xrange(1, len(points) - 1):
+        _x, _y = points[_i]
+        if (_x - _x0)**2 + (_y - _y0)**2 > _tol2:
+            _kept.append(points[_i])
+            _x0 = _x
+            _y0 = _y
+    _kept.append(points[-1])
+    return _kept
+
+def _farthest(points, first, last):
+    """
+        get the (index, square distance) of the point of the range
+        farthest from the segment of the first and the last point
+    """
+    _x1, _y1 = points[first]
+    _x2, _y2 = points[last]
+    _dx = _x2 - _x1
+    _dy = _y2 - _y1
+    _len2 = _dx*_dx + _dy*_dy
+    _max = -1.0
+    _index = first
+    for _i in xrange(first + 1, last):
+        _x, _y = points[_i]
+        _x -= _x1
+        _y -= _y1
+        if _len2 > 0.0:
+            _t = (_x*_dx + _y*_dy)/_len2
+            if _t > 1.0:
+                _t = 1.0
+            elif _t < 0.0:
+                _t = 0.0
+            _x -= _t*_dx
+            _y -= _t*_dy
+        _d2 = _x*_x + _y*_y
+        if _d2 > _max:
+            _max = _d2
+            _index = _i
+    return _index, _max
+
+def _farthest_numpy(xs, ys, first, last):
+    """
+        numpy version of _farthest on the arrays of the coords
+    """
+    _x1 = xs[first]
+    _y1 = ys[first]
+    _dx = xs[last] - _x1
+    _dy = ys[last] - _y1
+    _len2 = _dx*_dx + _dy*_dy
+    _x = xs[first + 1:last] - _x1
+    _y = ys[first + 1:last] - _y1
+    if _len2 > 0.0:
+        _t = numpy.clip((_x*_dx + _y*_dy)/_len2, 0.0, 1.0)
+        _x = _x - _t*_dx
+        _y = _y - _t*_dy
+    _d2 = _x*_x + _y*_y
+    _i = int(_d2.argmax())
+    return first + 1 + _i, float(_d2[_i])
+
+def simplify_points(points, tolerance):
+    """
+        simplify the [(x, y), ...] points of a polyline, the simplified
+        polyline is at a distance less then tolerance from all the points
+        return the list of the kept points
+    """
+    if len(points) < 3 or tolerance <= 0.0:
+        return list(points)
+    points = _radial_points(points, tolerance/2.0)
+    _n = len(points)
+    if _n < 3:
+        return points
+    _tol2 = tolerance*tolerance/4.0
+    _keep = [False]*_n
+    if numpy is not None and _n > NUMPY_MIN_RANGE:
+        _coords = numpy.array(points, dtype=numpy.float64)
+        _xs = _coords[:, 0]
+        _ys = _coords[:, 1]
+    else:
+        _xs = None
+    # the ranges still to simplify, a stack instead of the recursion so the
+    # long polyline do not reach the recursion limit
+    _stack = []
+    for _first in xrange(0, _n - 1, MAX_RANGE):
+        _last = min(_first + MAX_RANGE, _n - 1)
+        _keep[_first] = _keep[_last] = True
+        _stack.append((_first, _last))
+    while _stack:
+        _first, _last = _stack.pop()
+        if _last - _first < 2:
+            continue
+        if _xs is not None and _last - _first > NUMPY_MIN_RANGE:
+            _index, _max = _farthest_numpy(_xs, _ys, _first, _last)
+        else:
+            _index, _max = _farthest(points, _first, _last)
+        if _max > _tol2:
+            _keep[_index] = True
+            _stack.append((_first, _index))
+            _stack.append((_index, _last))
+    return [points[_i] for _i in xrange(_n) if _keep[_i]]
@@ -40,12 +40,14 @@ from Kernel.entity                  import Entity
 from Kernel.composedentity          import ComposedEntity
 from Kernel.layertree               import LayerTable
 from Kernel.layer                   import Layer
+from Kernel.entitycache             import EntityCache
 
 #***************************************************Db Import
 from Kernel.Db.undodb               import UndoDb
 from Kernel.Db.entitydb             import EntityDb
 from Kernel.Db.basedb               import BaseDb
 from Kernel.Db.relationdb           import RelationDb
+from Kernel.Db.schemadb             import SchemaDb
 
 
 #****************************************************Entity Import
@@ -57,6 +59,8 @@ from Kernel.GeoEntity.ellipse      import Ellipse
 from Kernel.GeoEntity.polyline     import Polyline
 from Kernel.GeoEntity.style        import Style
 from Kernel.GeoEntity.entityutil   import *
+from Kernel.GeoUtil.gridintersection    import find_all_intersections
+from Kernel.GeoUtil.affine              import transform_construction_elements
 
 #   Define the log
 LEVELS = {'PyCad_Debug':    logging.DEBUG,
@@ -85,20 +89,40 @@ class Document(BaseDb):
         self.saveEntityEvent=PyCadEvent()
         self.deleteEntityEvent=PyCadEvent()
         self.massiveDeleteEvent=PyCadEvent()
+        self.massiveSaveEntityEvent=PyCadEvent()
         self.showEntEvent=PyCadEvent()
         self.hideEntEvent=PyCadEvent()
         self.updateShowEntEvent=PyCadEvent()
         self.undoRedoEvent=PyCadEvent()
         self.handledErrorEvent=PyCadEvent()
+        # fired with (document, entityIds, visible) after a set based
+        # update or an import of records, visible=0 the entity are hidden
+        # or deleted
+        self.massiveUpdateEvent=PyCadEvent()
+        self.importProgressEvent=PyCadEvent()
+        self.importCancelEvent=PyCadEvent()
         #create Connection
         self.createConnection(dbPath)
         # inizialize extentionObject
         self.__UndoDb=UndoDb(self.getConnection())
         self.__EntityDb=EntityDb(self.getConnection())
-        self.__RelationDb=RelationDb(self.getConnection())
+        self.__RelationDb=RelationDb(self.getConnection(), self.__EntityDb)
+        SchemaDb(self.getConnection(), self.__EntityDb).migrate()
         # Some inizialization parameter
         self.__bulkCommit=False
         self.__bulkUndoIndex=-1     # undo index are always positive so we do not brake in case missing entity id
+        self.__bulkEntity=[]        # (entity, encoded values) waiting to be written by _flushBulk
+        self.__bulkEntityIndex={}   # entity id -> position in __bulkEntity
+        self.__bulkSavedIds=set()   # id of all the entity saved since startMassiveCreation
+        self.__bulkFlushedIds=set() # id already notified to the listeners by _flushBulk
+        self.__bulkCommitted=False  # True if a commit has been done during the massive creation
+        self.__bulkDbCommit=True    # BaseDb.commit at startMassiveCreation
+        self.__bulkActiveUndo=-1    # active undo index at startMassiveCreation
+        self.__bulkRelation=[]      # relation (parentId, childId) waiting to be written
+        self.__bulkCount=0
+        self.__bulkStartTime=None
+        self.__bulkRecordIds=[]     # id of the records saved without the Entity objects
+        self.__entityCache=EntityCache(ENTITY_CACHE_SIZE)
         self.__entId=self.__EntityDb.getNewEntId()
         #   set the default style
         self.__logger.debug('Set Style')
@@ -177,24 +201,234 @@ class Document(BaseDb):
             suspend the undo for write operation
         """
         self.__logger.debug('startMassiveCreation')
-        self.__bulkCommit=True
+        self.__bulkDbCommit=BaseDb.commit
+        self.__bulkActiveUndo=self.__UndoDb.getActiveUndoId()
         self.__bulkUndoIndex=self.__UndoDb.getNewUndo()
+        self.__bulkCommit=True
+        self.__bulkCount=0
+        self.__bulkStartTime=time.time()
+        # all the write of the massive creation are in the same transaction
+        BaseDb.commit=False
 
     def stopMassiveCreation(self):
         """
             Reactive the undo trace
+            return a tuple (number of saved entity, elapsed time in seconds)
         """
         self.__logger.debug('stopMassiveCreation')
+        try:
+            self._flushBulk()
+            BaseDb.performCommit(self)
+        except:
+            _info=sys.exc_info()
+            self.abortMassiveCreation()
+            raise _info[0], _info[1], _info[2]
+        _count=self.__bulkCount
+        _elapsed=0.0
+        if self.__bulkStartTime is not None:
+            _elapsed=time.time()-self.__bulkStartTime
+        if _count>0:
+            _rate=_count/max(_elapsed, 1e-6)
+            self.__logger.info('massive creation: %s entity in %.3f s (%.0f entity/s)'%(str(_count), _elapsed, _rate))
+        self._resetBulk()
+        return _count, _elapsed
+
+    def abortMassiveCreation(self):
+        """
+            discard all the entity saved since startMassiveCreation
+            the buffered entity are dropped, the written one are rolled back
+            and the undo index of the massive creation is removed
+        """
+        self.__logger.debug('abortMassiveCreation')
+        _flushedIds=list(self.__bulkFlushedIds)
+        self.__bulkEntity=[]
+        self.__bulkEntityIndex={}
+        self.__bulkRelation=[]
+        self.__bulkRecordIds=[]
+        try:
+            self.performRollback()
+            if not self.__bulkCommitted:
+                # the undo index is committed by getNewUndo
+                self.__UndoDb.cancelUndo(self.__bulkUndoIndex, self.__bulkActiveUndo)
+                BaseDb.performCommit(self)
+        finally:
+            self.__EntityDb.clearStyleCache()
+            self._evictEntitys(self.__bulkSavedIds)
+            self._resetBulk()
+        if _flushedIds:
+            # the listeners have already got this entity from _flushBulk
+            self.undoRedoEvent(self, _flushedIds)
+
+    def _resetBulk(self):
+        """
+            leave the massive creation and restore the caller BaseDb.commit
+        """
         self.__bulkCommit=False
         self.__bulkUndoIndex=-1
-        self.performCommit()
+        self.__bulkActiveUndo=-1
+        self.__bulkCount=0
+        self.__bulkStartTime=None
+        self.__bulkSavedIds=set()
+        self.__bulkFlushedIds=set()
+        self.__bulkCommitted=False
+        BaseDb.commit=self.__bulkDbCommit
+
+    def _flushBulk(self):
+        """
+            write all the entity and relation buffered during the massive creation
+            and fire a single massiveSaveEntityEvent
+        """
+        if not self.__bulkEntity and not self.__bulkRelation and not self.__bulkRecordIds:
+            return
+        _entitys=[_ent for _ent, _encoded in self.__bulkEntity]
+        _encodedEntitys=[_encoded for _ent, _encoded in self.__bulkEntity]
+        self.__bulkEntity=[]
+        self.__bulkEntityIndex={}
+        if _entitys:
+            self.__EntityDb.saveEntities(_entitys, self.__bulkUndoIndex, _encodedEntitys)
+            self.__bulkFlushedIds.update([_ent.getId() for _ent in _entitys])
+        if self.__bulkRelation:
+            self.__RelationDb.saveRelations(self.__bulkRelation)
+            self.__bulkRelation=[]
+        self.__bulkCount+=len(_entitys)
+        if _entitys:
+            self.massiveSaveEntityEvent(self, _entitys)
+        if self.__bulkRecordIds:
+            # the records saved by saveEntityRecords have no Entity object
+            # so the listeners read only the one they need
+            _ids=self.__bulkRecordIds
+            self.__bulkRecordIds=[]
+            self.__bulkFlushedIds.update(_ids)
+            self.massiveUpdateEvent(self, _ids, 1)
+
+    def performCommit(self):
+        """
+            write the buffered entity and perform a commit
+        """
+        self._flushBulk()
+        BaseDb.performCommit(self)
+        if self.__bulkCommit:
+            self.__bulkCommitted=True
+
+    def getStatementStats(self):
+        """
+            get the statistic of the statement executed by the document
+            and by its entity, relation and undo db
+            return a dictionary {statementName:(callCount, totalTime)}
+        """
+        _stats={}
+        for _db in (self, self.__EntityDb, self.__RelationDb, self.__UndoDb):
+            for _key, (_count, _time) in BaseDb.getStatementStats(_db).items():
+                _oldCount, _oldTime=_stats.get(_key, (0, 0.0))
+                _stats[_key]=(_oldCount+_count, _oldTime+_time)
+        return _stats
+
+    def resetStatementStats(self):
+        """
+            reset the statement statistic of the document and of its db
+        """
+        for _db in (self, self.__EntityDb, self.__RelationDb, self.__UndoDb):
+            BaseDb.resetStatementStats(_db)
 
     def getEntity(self,entId):
         """
             get the entity from a given id
+            the entity is shared with the entity cache so it must be
+            modified only to be saved
         """
         self.__logger.debug('getEntity')
-        return self.__EntityDb.getEntityEntityId(entId)
+        _entity=self.__entityCache.get(entId)
+        if _entity is not None:
+            return _entity
+        self._flushBulk()
+        _entity=self.__EntityDb.getEntityEntityId(entId)
+        if _entity is not None:
+            self.__entityCache.put(_entity)
+        return _entity
+
+    def getEntities(self, entityIds, skipMissing=False):
+        """
+            get the entity of the given ids in the same order
+            the entity that are not in the cache are read with one query
+            raise EntityMissing if an id is not in the database
+            skipMissing:    if True the id that are not in the database are
+                            left out, as the entity removed by an undo
+        """
+        self.__logger.debug('getEntities')
+        _entitys={}
+        _missing=[]
+        for _id in entityIds:
+            _entity=self.__entityCache.get(_id)
+            if _entity is None:
+                _missing.append(_id)
+            else:
+                _entitys[_entity.getId()]=_entity
+        if _missing:
+            self._flushBulk()
+            for _entity in self.__EntityDb.getEntitiesEntityId(_missing).itervalues():
+                self.__entityCache.put(_entity)
+                _entitys[_entity.getId()]=_entity
+        _out=[]
+        for _id in entityIds:
+            _entity=_entitys.get(int(_id))
+            if _entity is None:
+                if skipMissing:
+                    continue
+                raise EntityMissing("No entity with id %s"%str(_id))
+            _out.append(_entity)
+        return _out
+
+    def transformEntities(self, entityIds, matrix, copy=False):
+        """
+            apply the affine matrix (a, b, c, d, e, f) to the entity
+                x'=a*x+b*y+c
+                y'=d*x+e*y+f
+            the matrix could be created with the GeoUtil.affine functions
+            all the entity are read with one query, transformed in a single
+            pass and saved in one bulk transaction with a single undo
+            if a save fails the massive creation is aborted and no entity
+            is changed
+            copy:   if True new entity are created in the active layer and
+                    the original entity are not changed
+            return the list of the saved entity
+        """
+        self.__logger.debug('transformEntities')
+        _entitys=self.getEntities(entityIds)
+        _cElements=transform_construction_elements(
+                        [(_ent.getEntityType(), _ent.getConstructionElements()) for _ent in _entitys],
+                        matrix)
+        _nested=self.__bulkCommit
+        if not _nested:
+            self.startMassiveCreation()
+        try:
+            _out=[]
+            for _ent, _newElements in zip(_entitys, _cElements):
+                if copy:
+                    if _ent.getEntityType()=='POINT':
+                        _geoEnt=Point(_newElements['POINT_0'], _newElements['POINT_1'])
+                    else:
+                        _geoEnt=DRAWIN_ENTITY_CLASS[_ent.getEntityType()](_newElements)
+                    _out.append(self.saveEntity(_geoEnt))
+                else:
+                    _ent.setConstructionElements(_newElements)
+                    _out.append(self.saveEntity(_ent))
+        except:
+            _info=sys.exc_info()
+            # nothing of the transformation is kept and the cached entity
+            # could have a geometry that is not saved, so they are read
+            # again from the database
+            self.abortMassiveCreation()
+            self._evictEntitys([_ent.getId() for _ent in _entitys])
+            raise _info[0], _info[1], _info[2]
+        if not _nested:
+            self.stopMassiveCreation()
+        return _out
+
+    def getEntityCache(self):
+        """
+            get the entity cache of the document
+        """
+        return self.__entityCache
 
     def getEntityFromType(self,entityType):
         """
@@ -204,6 +438,7 @@ class Document(BaseDb):
             type as list ["SEGMENT","ARC",...   ]
         """
         self.__logger.debug('getEntityFromType')
+        self._flushBulk()
         if isinstance(entityType,list):
             return self.__EntityDb.getEntityFromTypeArray(entityType)
         else:
@@ -213,8 +448,74 @@ class Document(BaseDb):
         """
             get all drawing entity from the db
         """
+        self._flushBulk()
         return self.__EntityDb.getEntityFromTypeArray([DRAWIN_ENTITY[key] for key in DRAWIN_ENTITY.keys()])
 
+    def getEntitiesInRegion(self, xmin, ymin, xmax, ymax, types=None):
+        """
+            get all the visible entity that have the bounding box
+            overlapping the region xmin, ymin, xmax, ymax
+            types:  an array of entity type ['SEGMENT','ARC'] if None all
+                    the drawing entity are considered
+        """
+        self.__logger.debug('getEntitiesInRegion')
+        if xmin>xmax:
+            xmin, xmax=xmax, xmin
+        if ymin>ymax:
+            ymin, ymax=ymax, ymin
+        self._flushBulk()
+        return self.__EntityDb.getEntityInRegion(xmin, ymin, xmax, ymax, self._regionTypes(types))
+
+    def getEntityIdsInRegion(self, xmin, ymin, xmax, ymax, types=None):
+        """
+            get the id of all the visible entity that have the bounding box
+            overlapping the region xmin, ymin, xmax, ymax
+            no entity is read, so the caller could read only the entity
+            that it do not have with getEntities
+        """
+        self.__logger.debug('getEntityIdsInRegion')
+        if xmin>xmax:
+            xmin, xmax=xmax, xmin
+        if ymin>ymax:
+            ymin, ymax=ymax, ymin
+        self._flushBulk()
+        return self.__EntityDb.getEntityIdsInRegion(xmin, ymin, xmax, ymax, self._regionTypes(types))
+
+    def getExtents(self, types=None):
+        """
+            get the (xmin, ymin, xmax, ymax) bounding box of all the
+            visible entity, None for an empty drawing
+        """
+        self.__logger.debug('getExtents')
+        self._flushBulk()
+        return self.__EntityDb.getExtents(self._regionTypes(types))
+
+    def _regionTypes(self, types):
+        """
+            get the type array of the region query
+        """
+        if types is None:
+            return [DRAWIN_ENTITY[key] for key in DRAWIN_ENTITY.keys()]
+        if not isinstance(types, (list, tuple)):
+            return [types]
+        return types
+
+    def getAllIntersections(self, layer=None):
+        """
+            get all the intersection points between the visible drawing
+            entity of the document, or of the layer, including the polyline
+            self intersection and the overlap of collinear segments
+            return an [(entityIdA, entityIdB, x, y), ...]
+        """
+        self.__logger.debug('getAllIntersections')
+        if layer is None:
+            _entitys=self.getAllDrawingEntity()
+        else:
+            _types=DRAWIN_ENTITY.values()
+            _entitys=[_ent for _ent in self.getAllChildrenType(layer, 'ALL')
+                        if _ent.eType in _types and _ent.visible==1]
+        return find_all_intersections(_entitys)
+
     def getEntInDbTableFormat(self, visible=1, entityType='ALL', entityTypeArray=None):
         """
             return a db table of the entity
@@ -224,6 +525,7 @@ class Document(BaseDb):
                 ['ARC','SEGMENT]
             Remarks if entityTypeArray is not None entityType is ignored
         """
+        self._flushBulk()
         return self.__EntityDb.getMultiFilteredEntity(visible,entityType , entityTypeArray)
 
     def convertToGeometricalEntity(self, entity):
@@ -236,6 +538,7 @@ class Document(BaseDb):
         """
             check if the drawing have some data in it
         """
+        self._flushBulk()
         return self.__EntityDb.haveDrwEntitys([DRAWIN_ENTITY[key] for key in DRAWIN_ENTITY.keys()])
 
     def saveSympyEnt(self, sympyEnt):
@@ -283,6 +586,50 @@ class Document(BaseDb):
             msg="Unexpected error: %s "%str(sys.exc_info()[0])
             raise StructuralError, msg
 
+    def saveEntityRecords(self, records):
+        """
+            save the (entityType, encodedConstructionElements, xmin, ymin,
+            xmax, ymax) records created outside the kernel with the active
+            style in the active layer
+            the rows are written without creating the Entity objects and
+            at the end the massiveUpdateEvent is fired with the new ids,
+            so the listeners read only the entity they need
+            return the list of the new entity id
+        """
+        self.__logger.debug('saveEntityRecords')
+        if not records:
+            return []
+        _firstId=self.__entId+1
+        self.__entId+=len(records)
+        _ids=range(_firstId, self.__entId+1)
+        _layerId=self.__LayerTable.getActiveLayer().getId()
+        _relations=[(_layerId, _id) for _id in _ids]
+        if self.__bulkCommit:
+            # the records are written now, the relations with the buffered
+            # one and the event at the end of the massive creation
+            _commit=BaseDb.commit
+            BaseDb.commit=False
+            try:
+                self.__EntityDb.saveRecords(records, _firstId, self.__activeStyleObj, self.__bulkUndoIndex)
+            finally:
+                BaseDb.commit=_commit
+            self.__bulkRelation.extend(_relations)
+            self.__bulkCount+=len(records)
+            self.__bulkRecordIds.extend(_ids)
+            self.__bulkSavedIds.update(_ids)
+            return _ids
+        _undoId=self.__UndoDb.getNewUndo()
+        _commit=BaseDb.commit
+        BaseDb.commit=False
+        try:
+            self.__EntityDb.saveRecords(records, _firstId, self.__activeStyleObj, _undoId)
+            self.__RelationDb.saveRelations(_relations)
+        finally:
+            BaseDb.commit=_commit
+        self.performCommit()
+        self.massiveUpdateEvent(self, _ids, 1)
+        return _ids
+
     def _saveComposedEntity(self, entity):
         """
             save all the geometrical entity composed
@@ -295,10 +642,10 @@ class Document(BaseDb):
         _cElements, entityType =self._getCelements(entity)
         _obj=self._saveDbEnt(entType=entityType,constructorElements=_cElements)
         #seve the relation layer compose ent
-        self.__RelationDb.saveRelation(self.__LayerTable.getActiveLayer(),_obj)
+        self._saveRelation(self.__LayerTable.getActiveLayer(),_obj)
         #seve the relation composed ent ent
         for c in relComp:
-            self.__RelationDb.saveRelation(_obj,c)
+            self._saveRelation(_obj,c)
         return _obj
 
     def _saveGeometricalEntity(self, entity):
@@ -323,9 +670,18 @@ class Document(BaseDb):
         self.__entId+=1
         _cElements, entityType=self._getCelements(entity)
         _obj=self._saveDbEnt(entityType,_cElements)
-        self.__RelationDb.saveRelation(self.__LayerTable.getActiveLayer(),_obj)
+        self._saveRelation(self.__LayerTable.getActiveLayer(),_obj)
         return _obj
 
+    def _saveRelation(self, parentEntObj, childEntObj):
+        """
+            save the relation or buffer it during the massive creation
+        """
+        if self.__bulkCommit:
+            self.__bulkRelation.append((parentEntObj.getId(), childEntObj.getId()))
+        else:
+            self.__RelationDb.saveRelation(parentEntObj, childEntObj)
+
     def getNewId(self):
         """
             get a new id
@@ -365,6 +721,7 @@ class Document(BaseDb):
         #-1 is for all the entity style that do not have style :-)
         _newDbEnt=Entity('STYLE',_cElements,None,self.__entId)
         self.__EntityDb.saveEntity(_newDbEnt,self.__UndoDb.getNewUndo())
+        self.__entityCache.put(_newDbEnt)
         self.saveEntityEvent(self,_newDbEnt)
         self.showEntEvent(self,_newDbEnt)
         return _newDbEnt
@@ -394,13 +751,33 @@ class Document(BaseDb):
         if entity==None:
             _newDbEnt=Entity(entType,constructorElements,self.__activeStyleObj,self.__entId)
         else:
-            if self.entityExsist(entity.getId()):
+            if not self.__bulkCommit and self.entityExsist(entity.getId()):
                 updateEvent=True
             _newDbEnt=entity
-        if self.__bulkUndoIndex>=0:
-            self.__EntityDb.saveEntity(_newDbEnt,self.__bulkUndoIndex)
-        else:
-            self.__EntityDb.saveEntity(_newDbEnt,self.__UndoDb.getNewUndo())
+        if self.__bulkCommit:
+            # the row is written and the massiveSaveEntityEvent is fired by _flushBulk
+            # the entity is encoded now so a later change of the object is not stored
+            _id=_newDbEnt.getId()
+            _bulkItem=(_newDbEnt, self.__EntityDb.encodeEntity(_newDbEnt))
+            if _id in self.__bulkEntityIndex:
+                # saved again in the same undo step only the last revision is kept
+                self.__bulkEntity[self.__bulkEntityIndex[_id]]=_bulkItem
+            else:
+                self.__bulkEntityIndex[_id]=len(self.__bulkEntity)
+                self.__bulkEntity.append(_bulkItem)
+            self.__bulkSavedIds.add(_id)
+            self.__entityCache.put(_newDbEnt)
+            return _newDbEnt
+        try:
+            if self.__bulkUndoIndex>=0:
+                self.__EntityDb.saveEntity(_newDbEnt,self.__bulkUndoIndex)
+            else:
+                self.__EntityDb.saveEntity(_newDbEnt,self.__UndoDb.getNewUndo())
+        except:
+            # the cached instance could be modified but not saved
+            self.__entityCache.evict(_newDbEnt.getId())
+            raise
+        self.__entityCache.put(_newDbEnt)
         self.saveEntityEvent(self,_newDbEnt)
         if updateEvent:
             self.updateShowEntEvent(self,_newDbEnt)
@@ -419,12 +796,12 @@ class Document(BaseDb):
             get the style object
         """
         self.__logger.debug('getStyle')
-        _styleObjs=self.getStyleList()
         if id!=None:
-            for sto in _styleObjs:
-                if sto.getId()==id:
-                    return sto
+            sto=self.__EntityDb.getStyleEntity(id)
+            if sto is not None:
+                return sto
         else:
+            _styleObjs=self.getStyleList()
             for sto in _styleObjs:
                 _styleObj=sto.getConstructionElements()
                 stlName=_styleObj[_styleObj.keys()[0]].getName()
@@ -460,36 +837,56 @@ class Document(BaseDb):
             get all the style from the db
         """
         self.__logger.debug('getStyleList')
-        return self.getEntityFromType('STYLE')
+        return [self.__EntityDb.getStyleEntity(sto.getId()) for sto in self.getEntityFromType('STYLE')]
 
     activeStyle=property(getActiveStyle,setActiveStyle)
 
     def unDo(self):
         """
             perform an undo operation
+            the undoRedoEvent is fired with the id of the entity changed
+            by the undo and the list is returned
         """
         self.__logger.debug('unDo')
+        self._flushBulk()
         try:
-            self.__EntityDb.markUndoVisibility(self.__UndoDb.getActiveUndoId(),0)
+            _activeUndo=self.__UndoDb.getActiveUndoId()
+            _entityIds=self.__EntityDb.getUndoEntityIds(_activeUndo)
+            self.__EntityDb.markUndoVisibility(_activeUndo,0)
+            self._evictEntitys(_entityIds)
             _newUndo=self.__UndoDb.dbUndo()
             self.__EntityDb.performCommit()
-            self.undoRedoEvent(self, None)
+            self.undoRedoEvent(self, _entityIds)
+            return _entityIds
         except UndoDb:
             raise UndoDb, "Generical problem to perform undo"
 
     def reDo(self):
         """
             perform a redo operation
+            the undoRedoEvent is fired with the id of the entity changed
+            by the redo and the list is returned
         """
         self.__logger.debug('reDo')
+        self._flushBulk()
         try:
             _activeRedo=self.__UndoDb.dbRedo()
+            _entityIds=self.__EntityDb.getUndoEntityIds(_activeRedo)
             self.__EntityDb.markUndoVisibility(_activeRedo, 1)
+            self._evictEntitys(_entityIds)
             self.__EntityDb.performCommit()
-            self.undoRedoEvent(self, None)
+            self.undoRedoEvent(self, _entityIds)
+            return _entityIds
         except UndoDb:
             raise UndoDb, "Generical problem to perform reDo"
 
+    def _evictEntitys(self, entityIds):
+        """
+            remove the entity from the entity cache
+        """
+        for _id in entityIds:
+            self.__entityCache.evict(_id)
+
     def clearUnDoHistory(self):
         """
             perform a clear history operation
@@ -516,13 +913,16 @@ class Document(BaseDb):
                 entity.relese()
                 self.saveEntity(entity)
             # Clear the old entity
+            self._flushBulk()
             self.__EntityDb.clearEnt()
+            self.__entityCache.clear()
             # Increse the revision index
             self.__EntityDb.increaseRevisionIndex()
             # Commit all the change
             self.performCommit()
         except:
             self.__EntityDb.decreseRevisionIndex()
+            self.__entityCache.clear()
             print "Unable to perform the release operation"
         finally:
             self.stopMassiveCreation()
@@ -532,9 +932,12 @@ class Document(BaseDb):
             Delete the entity from the database
         """
         self.__logger.debug('deleteEntity')
-        entity=self.__EntityDb.getEntityEntityId(entityId)
+        entity=self.getEntity(entityId)
+        if entity is None:
+            raise EntityMissing, "Unable to find the entity with id %s"%str(entityId)
         entity.delete()
         self.saveEntity(entity)
+        self.__entityCache.evict(entityId)
         self.deleteEntityEvent(self,entity)
 
     def massiveDelete(self, entityIds):
@@ -546,9 +949,10 @@ class Document(BaseDb):
         try:
             self.startMassiveCreation()
             for entityId in entityIds:
-                entity=self.__EntityDb.getEntityEntityId(entityId)
+                entity=self.getEntity(entityId)
                 entity.delete()
                 self.saveEntity(entity)
+                self.__entityCache.evict(entityId)
                 _delEnity.append(entity)
             else:
                 self.performCommit()
@@ -578,13 +982,55 @@ class Document(BaseDb):
             raise EntityMissing, "All function attribut are null"
         activeEnt=None
         if entity != None:
-            activeEnt=self.__EntityDb.getEntityEntityId(entity.getId())
+            activeEnt=self.getEntity(entity.getId())
         if activeEnt == None and entityId is not None:
-            activeEnt=self.__EntityDb.getEntityEntityId(entityId)
+            activeEnt=self.getEntity(entityId)
         if activeEnt.visible!=visible:
             activeEnt.visible=visible
             self.saveEntity(activeEnt)
 
+    def massiveUpdateChildren(self, parentObject, visible=None, delete=False, saveParent=False):
+        """
+            save in a single undo step a new revision of all the children
+            of parentObject with the given visible, or in the DELETE state
+            the revisions are written by a set based sql statement and a
+            single massiveUpdateEvent is fired
+            saveParent save also the modified parentObject in the same step
+            return the id of the updated children
+        """
+        self.__logger.debug('massiveUpdateChildren')
+        self._flushBulk()
+        _state=None
+        if delete:
+            _state=OBJECT_STATE[2]
+            visible=None
+        if self.__bulkUndoIndex>=0:
+            _undoId=self.__bulkUndoIndex
+        else:
+            _undoId=self.__UndoDb.getNewUndo()
+        _commit=BaseDb.commit
+        BaseDb.commit=False
+        try:
+            _entityIds=self.__EntityDb.saveChildrenRevision(parentObject.getId(), _undoId, visible, _state)
+            if saveParent:
+                self.__EntityDb.saveEntity(parentObject, _undoId)
+        except:
+            self.__entityCache.evict(parentObject.getId())
+            raise
+        finally:
+            BaseDb.commit=_commit
+        if not self.__bulkCommit:
+            self.performCommit()
+        self._evictEntitys(_entityIds)
+        if saveParent and delete:
+            self.__entityCache.evict(parentObject.getId())
+        if _entityIds:
+            _visible=visible
+            if delete:
+                _visible=0
+            self.massiveUpdateEvent(self, _entityIds, _visible)
+        return _entityIds
+
     def importExternalFormat(self, fileName):
         """
             This method allow you to import a file from an external format
@@ -625,8 +1071,20 @@ class Document(BaseDb):
         """
             Get all the entity children from an pyCadDb object
         """
+        self._flushBulk()
         return self.__RelationDb.getAllChildrenType(parentObject, childrenType)
 
+    def iterChildrenItems(self, parentObject, childrenTypes):
+        """
+            iterate the (entityId, entityType, constructionElements, style)
+            of the children of the given types of a pyCadDb object
+            the rows are read from a cursor while iterating, so the memory
+            do not grow with the number of children
+        """
+        self._flushBulk()
+        _rows=self.__RelationDb.getChildrenRows(parentObject.getId(), childrenTypes)
+        return self.__EntityDb.iterRowItems(_rows)
+
     def getRelatioObject(self):
         """
             getRelationObject
@@ -22,10 +22,45 @@
 #
 
 
+import math
+
 from Kernel.Db.pycadobject             import *
 from Kernel.GeoEntity.point            import Point
+from Kernel.GeoEntity.vertexarray      import VertexArray
 from Kernel.GeoEntity.style            import Style
 
+#
+# entity type that have the bounding box of the construction points so
+# the box is computed without building the geometrical entity
+#
+POINTS_BBOX_TYPES=('SEGMENT', 'DIMENSION')
+#
+# the kernel do not know the font used to draw the text, so the text box
+# is computed with a character width equal to the text height and a line
+# of two text height, that are bigger than the one of the common fonts
+#
+DEFAULT_TEXT_HEIGHT=10.0
+TEXT_BBOX_LINE=2.0
+
+def getTextBBox(cElements, height=DEFAULT_TEXT_HEIGHT):
+    """
+        get the (xmin, ymin, xmax, ymax) of the box of a text rotated with
+        the text angle, the box is taken on all the sides of the text point
+        because the text could be drawn in any position around it
+    """
+    _x, _y=cElements['TEXT_0'].getCoords()
+    _text=cElements['TEXT_1']
+    if not isinstance(_text, basestring):
+        _text=str(_text)
+    _lines=_text.splitlines() or ['']
+    _width=max([len(_line) for _line in _lines])*height
+    _height=len(_lines)*height*TEXT_BBOX_LINE
+    _angle=float(cElements.get('TEXT_2') or 0.0)
+    _cos, _sin=abs(math.cos(_angle)), abs(math.sin(_angle))
+    _dx=_width*_cos+_height*_sin
+    _dy=_width*_sin+_height*_cos
+    return (float(_x)-_dx, float(_y)-_dy, float(_x)+_dx, float(_y)+_dy)
+
 class Entity(PyCadObject):
     """
         basic PythonCAD entity structure
@@ -47,33 +82,57 @@ class Entity(PyCadObject):
     def getBBox(self):
         """
             get the bounding Box Of the entity
+            (xmin, ymin, xmax, ymax) or (None, None, None, None) for the
+            entity that have no geometry like style, layer and settings
         """
+        if self.__bBox is None:
+            self.__bBox=self._computeBBox()
         return self.__bBox
 
     def updateBBox(self):
         """
             update the bounding box from the construction elements
+            the box is computed the first time is requested
+        """
+        self.__bBox=None
+
+    def _computeBBox(self):
+        """
+            compute the bounding box from the geometrical entity
+        """
+        if self.eType=='TEXT':
+            try:
+                return getTextBBox(self._constructionElements, self._textHeight())
+            except (TypeError, ValueError, KeyError, AttributeError):
+                return (None, None, None, None)
+        if self.eType in POINTS_BBOX_TYPES:
+            _coords=[v.getCoords() for v in self._constructionElements.itervalues()
+                        if isinstance(v, Point)]
+            if _coords:
+                _xs, _ys=zip(*_coords)
+                return (float(min(_xs)), float(min(_ys)), float(max(_xs)), float(max(_ys)))
+        try:
+            geoEnt=self.getGeometricalEntity()
+        except (TypeError, ValueError, KeyError):
+            geoEnt=None
+        if geoEnt is None:
+            return (None, None, None, None)
+        bBox=geoEnt.getBBox()
+        if bBox is None:
+            return (None, None, None, None)
+        return tuple([float(v) for v in bBox])
+
+    def _textHeight(self):
+        """
+            get the text height of the entity style, the scene draw the
+            text with the default font so the height is never less than
+            the default one
         """
-        # Todo : Find a better way to create the bounding box for all
-        # the geometrical entity may be is better that all the geometrical
-        # entity have an implementatio of the bounding box
-        self.__bBox=(0,0,0,0)
-        return
-        _xList=[]
-        _yList=[]
-        for key in self._constructionElements:
-            if isinstance(self._constructionElements[key],Point):
-                x,y=self._constructionElements[key].getCoords()
-                _xList.append(x)
-                _yList.append(y)
-        _xList.sort()
-        _yList.sort()
-        if len(_xList)>0:
-            if len(_xList)==1:
-                _yList=_xList
-            self.__bBox=(_xList[0],_yList[0],_xList[-1],_yList[-1])
-        else:
-            self.__bBox=(0,0,0,0)
+        try:
+            _height=float(self.getInnerStyle().getStyleProp('text_height'))
+        except (AttributeError, TypeError, ValueError, KeyError, IndexError):
+            return DEFAULT_TEXT_HEIGHT
+        return max(_height, DEFAULT_TEXT_HEIGHT)
 
     def getConstructionElements(self):
         """
@@ -86,24 +145,44 @@ class Entity(PyCadObject):
             set the construction elements for the object
         """
         self._constructionElements=constructionElements
+        self.__geoEnt=None
         self.updateBBox()
-    
+
+    def getGeometricalEntity(self):
+        """
+            get the geometrical entity of the entity
+            the object is built the first time and kept until the construction
+            elements change so it must be used only to read the geometry,
+            use toGeometricalEntity to get an object that could be modified
+        """
+        if self.__geoEnt is None:
+            self.__geoEnt=self._buildGeometricalEntity(False)
+        return self.__geoEnt
+
     def toGeometricalEntity(self):
         """
             Convert an entity into a geometrical entity
-        """ 
-        from Kernel.initsetting             import DRAWIN_ENTITY
-        geoEnt=None
-        cObjecs=self.getConstructionElements()
-        cType=self.getEntityType()
-        for key in DRAWIN_ENTITY:
-            if DRAWIN_ENTITY[key]==cType:
-                if cType =="POINT":
-                    geoEnt=Point(cObjecs["POINT_0"], cObjecs["POINT_1"])
-                else:
-                    geoEnt=key(cObjecs)
-                break
-        return geoEnt
-
-
+        """
+        return self._buildGeometricalEntity(True)
 
+    def _buildGeometricalEntity(self, clone):
+        """
+            build the geometrical entity from the construction elements
+            clone:  if True the points are cloned so the geometrical entity
+                    could be modified without changing the cached entity,
+                    if False the points are shared with the construction
+                    elements and the entity must be used only to read
+        """
+        from Kernel.initsetting             import DRAWIN_ENTITY_CLASS
+        cType=self.getEntityType()
+        geoClass=DRAWIN_ENTITY_CLASS.get(cType)
+        if geoClass is None:
+            return None
+        cObjecs=self.getConstructionElements()
+        if cType =="POINT":
+            return Point(cObjecs["POINT_0"], cObjecs["POINT_1"])
+        if not clone:
+            return geoClass(dict(cObjecs))
+        _cObjecs=dict([(k, isinstance(v, (Point, VertexArray)) and v.clone() or v)
+                        for k, v in cObjecs.items()])
+        return geoClass(_cObjecs)
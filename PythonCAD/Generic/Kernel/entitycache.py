@@ -0,0 +1,103 @@
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# This  module provide the in memory cache of the document entity
+#
+from collections import OrderedDict
+
+class EntityCache(object):
+    """
+        id keyed identity cache of the entity with a least recently used
+        eviction when more then maxSize entity are stored
+    """
+    def __init__(self, maxSize):
+        self.__entitys=OrderedDict()
+        self.__maxSize=maxSize
+        self.hits=0
+        self.misses=0
+
+    def _key(self, entityId):
+        """
+            the entity id could arrive as int or as string from the commands
+        """
+        try:
+            return int(entityId)
+        except (TypeError, ValueError):
+            return entityId
+
+    def get(self, entityId):
+        """
+            get the cached entity and mark it as the most recently used
+            return None if the entity is not in the cache
+        """
+        _key=self._key(entityId)
+        _entity=self.__entitys.pop(_key, None)
+        if _entity is None:
+            self.misses+=1
+            return None
+        self.__entitys[_key]=_entity
+        self.hits+=1
+        return _entity
+
+    def put(self, entity):
+        """
+            store the entity in the cache
+        """
+        if self.__maxSize<=0:
+            return
+        _key=self._key(entity.getId())
+        self.__entitys.pop(_key, None)
+        self.__entitys[_key]=entity
+        while len(self.__entitys)>self.__maxSize:
+            self.__entitys.popitem(last=False)
+
+    def evict(self, entityId):
+        """
+            remove the entity from the cache
+        """
+        self.__entitys.pop(self._key(entityId), None)
+
+    def clear(self):
+        """
+            remove all the entity from the cache
+        """
+        self.__entitys.clear()
+
+    def getMaxSize(self):
+        """
+            get the max number of cached entity
+        """
+        return self.__maxSize
+
+    def setMaxSize(self, value):
+        """
+            set the max number of cached entity
+        """
+        self.__maxSize=value
+        while len(self.__entitys)>max(value, 0):
+            self.__entitys.popitem(last=False)
+
+    maxSize=property(getMaxSize, setMaxSize, None, "max number of cached entity")
+
+    def __len__(self):
+        return len(self.__entitys)
+
+    def __contains__(self, entityId):
+        return self._key(entityId) in self.__entitys
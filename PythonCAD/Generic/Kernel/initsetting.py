@@ -76,6 +76,10 @@ from Kernel.composedentity      import ComposedEntity
 #
 MAX_RECENT_FILE=5
 #
+# Max number of entity kept in memory by the document entity cache
+#
+ENTITY_CACHE_SIZE=10000
+#
 # Object workflow state of the entity
 #
 OBJECT_STATE=['MODIFIE','RELEASED', 'DELETE']
@@ -136,6 +140,11 @@ DRAWIN_ENTITY={ Point:'POINT',
                 ComposedEntity:'COMPOSED_ENTITY',
                 Dimension:'DIMENSION'}
 
+#
+# Geometrical class of the drawing entity type
+#
+DRAWIN_ENTITY_CLASS=dict([(DRAWIN_ENTITY[key], key) for key in DRAWIN_ENTITY])
+
 DRAWIN_COMPOSED_ENTITY={Fillet:'FILLET',
                         Chamfer:'CHAMFER',
                         Bisector:'BISECTOR'}
@@ -349,6 +358,10 @@ ACTIVE_SNAP_LIST=[SNAP_POINT_ARRAY["END"],
                   SNAP_POINT_ARRAY["QUADRANT"],
                   SNAP_POINT_ARRAY["INTERSECTION"]
                   ]
+#
+# Size of the cell of the spatial hash of the snap points
+#
+SNAP_INDEX_CELL_SIZE=10.0
 
 #
 # Color table to define a match from Autocad external format and Pythoncad internal format
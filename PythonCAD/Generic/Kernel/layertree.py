@@ -30,37 +30,144 @@ from Kernel.pycadevent          import PyCadEvent
 class LayerTable(object):
     """
     Class used to interface with the database/save file
+    the layer are kept in memory indexed by id and by name with the
+    child layer of each layer, the indexes are updated from the events
+    of the document
     """
 
     def __init__(self, kernel):
         self.__kr = kernel
 
+        self.setCurrentEvent = PyCadEvent()
+        self.deleteEvent = PyCadEvent()
+        self.insertEvent = PyCadEvent()
+        self.updateEvent = PyCadEvent()
+
+        self.reload()
+        self.__kr.saveEntityEvent += self.eventSave
+        self.__kr.massiveSaveEntityEvent += self.eventMassiveSave
+        self.__kr.deleteEntityEvent += self.eventDelete
+        self.__kr.massiveUpdateEvent += self.eventMassiveUpdate
+        self.__kr.undoRedoEvent += self.eventUndoRedo
+
         # TODO: Check why a layer is created without a document open
         # Add a default layer if none exists
         layer_count = self.getLayerCount()
         if not layer_count:
             new_layer = self.__kr.saveEntity(Layer('Default'))
+            self._putLayer(new_layer)
             self.__activeLayer = new_layer
         else:
             # Set active layer to first visible layer it finds
             # TODO: Save active layer between sessions
             self.__activeLayer = self.getVisibleLayer()
 
-        self.setCurrentEvent = PyCadEvent()
-        self.deleteEvent = PyCadEvent()
-        self.insertEvent = PyCadEvent()
-        self.updateEvent = PyCadEvent()
+    def reload(self):
+        """
+            read all the layer and the layer relation from the database
+        """
+        self.__layers = {}          # layer id : layer entity
+        self.__names = {}           # layer name : layer id
+        self.__children = {}        # layer id : [child layer id, ...]
+        self.__parents = {}         # layer id : parent layer id
+        for layer in self.__kr.getEntityFromType('LAYER'):
+            self._putLayer(layer)
+        for parentId, childId in self.__kr.getRelatioObject().getLayerRelations():
+            if parentId in self.__layers and childId in self.__layers:
+                self.__children[parentId].append(childId)
+                self.__parents[childId] = parentId
+
+    def _putLayer(self, layer):
+        """
+            add or update the layer in the indexes
+        """
+        if layer.state == 'DELETE':
+            self._removeLayer(layer.getId())
+            return
+        layerId = layer.getId()
+        self._removeName(layerId)
+        self.__layers[layerId] = layer
+        self.__names[self._getLayerConstructionElement(layer).name] = layerId
+        self.__children.setdefault(layerId, [])
+
+    def _removeName(self, layerId):
+        """
+            remove the name of the layer from the name index
+        """
+        layer = self.__layers.get(layerId)
+        if layer is not None:
+            name = self._getLayerConstructionElement(layer).name
+            if self.__names.get(name) == layerId:
+                del self.__names[name]
+
+    def _removeLayer(self, layerId):
+        """
+            remove the layer from the indexes, the child layer become root
+            layer
+        """
+        if not layerId in self.__layers:
+            return
+        self._removeName(layerId)
+        del self.__layers[layerId]
+        for childId in self.__children.pop(layerId, []):
+            self.__parents.pop(childId, None)
+        parentId = self.__parents.pop(layerId, None)
+        if parentId is not None:
+            self.__children[parentId].remove(layerId)
+
+    def eventSave(self, document, entity):
+        """
+            Manage the save entity event
+        """
+        if entity.eType == 'LAYER':
+            self._putLayer(entity)
+
+    def eventMassiveSave(self, document, entitys):
+        """
+            Manage the massive save event
+        """
+        for entity in entitys:
+            if entity.eType == 'LAYER':
+                self._putLayer(entity)
+
+    def eventDelete(self, document, entity):
+        """
+            Manage the delete entity event
+        """
+        if entity.eType == 'LAYER':
+            self._removeLayer(entity.getId())
+
+    def eventMassiveUpdate(self, document, entityIds, visible):
+        """
+            Manage the set based update event, the layer are read again
+            only if a child layer is changed
+        """
+        for entityId in entityIds:
+            if entityId in self.__layers:
+                self.reload()
+                return
+
+    def eventUndoRedo(self, document, entityIds):
+        """
+            Manage the undo redo event, the layer are read again because
+            an undo could restore a deleted layer
+        """
+        self.reload()
+        activeLayer = self.__layers.get(self.__activeLayer.getId())
+        if activeLayer is None:
+            activeLayer = self.getVisibleLayer() or self.__activeLayer
+        self.__activeLayer = activeLayer
 
     def setActiveLayer(self, layerId):
         """
             set the active layer
         """
-        activeLayer=self.__kr.getEntity(layerId)
+        activeLayer=self.__layers.get(layerId)
         if activeLayer:
             self.__activeLayer=activeLayer
             self.setCurrentEvent(activeLayer)
         else:
-            raise EntityMissing, "Unable to find the layer %s"%str(layerName)
+            raise EntityMissing, "Unable to find the layer %s"%str(layerId)
 
     def getActiveLayer(self):
         """
@@ -75,6 +182,7 @@ class LayerTable(object):
         childEndDb = self.__kr.getEntity(layer.getId())
         if not childEndDb:
             childEndDb = self.__kr.saveEntity(layer)
+        self._putLayer(childEndDb)
         self.__activeLayer=childEndDb
         self.insertEvent(childEndDb) #Fire Event
 
@@ -90,9 +198,8 @@ class LayerTable(object):
     def getLayerChildrenLayer(self,layer):
         """
             get the layer children
-            ### Unneeded ###
         """
-        return self.__kr.getAllChildrenType(layer, 'LAYER')
+        return [self.__layers[childId] for childId in self.__children.get(layer.getId(), [])]
 
     #************************************************************************
     #*************************layer managment********************************
@@ -102,10 +209,7 @@ class LayerTable(object):
             get all the child id of a layer
             ### Unneeded ###
         """
-        #manage in a better way the logger  self.__kr.__logger.debug('getLayerChild')
-        _layerId=self.__kr.getEntLayerDb(layerName).getId()
-        _childIds=self.__kr.__pyCadRelDb.getChildrenIds(_layerId)
-        return _childIds
+        return self.__kr.getRelatioObject().getChildrenIds(layer.getId())
 
     def getLayerChildren(self,layer,entityType=None):
         """
@@ -119,84 +223,80 @@ class LayerTable(object):
         """
             get the pycadent  layer by giving a name
         """
-        #TODO: manage logger self.__logger.debug('getEntLayerDb')
-        _layersEnts=self.__kr.getEntityFromType('LAYER')
-        #TODO: Optimaze this loop with the build in type [...] if possible
-        for layersEnt in _layersEnts:
-            unpickleLayers=layersEnt.getConstructionElements()
-            for key in unpickleLayers:
-                if unpickleLayers[key].name==layerName:
-                    return layersEnt
-        else:
+        layerId = self.__names.get(layerName)
+        if layerId is None:
             raise EntityMissing,"Layer name %s missing"%str(layerName)
+        return self.__layers[layerId]
 
     def getVisibleLayer(self, ignore = []):
-        # TODO: Cleanup as in getEntLayerDb
-        layer_entities = self.__kr.getEntityFromType('LAYER')
-        for layer_entity in layer_entities:
-            if layer_entity.getId() not in ignore:
-                unpickled_layer = layer_entity.getConstructionElements()
-                for layer in unpickled_layer.itervalues():
-                    if layer.visible:
-                        # TODO: Refactor, indent pretty deep
-                        return layer_entity
+        """
+            get the first visible layer that is not in the ignore ids
+        """
+        for layerId in sorted(self.__layers):
+            if layerId not in ignore:
+                layer_entity = self.__layers[layerId]
+                if self._getLayerConstructionElement(layer_entity).visible:
+                    return layer_entity
         return False
 
     def getLayerCount(self):
-        layers = self.__kr.getEntityFromType('LAYER')
-        return len(layers)
+        return len(self.__layers)
 
     def getLayers(self):
         """
         Returns a dictionary of all the layers
         """
-        layers = self.__kr.getEntityFromType('LAYER')
         layer_dict = {}
-        for layer in layers:
-            c = self._getLayerConstructionElement(layer)
-            layer_dict[layer.getId()] = c
+        for layerId, layer in self.__layers.iteritems():
+            layer_dict[layerId] = self._getLayerConstructionElement(layer)
         return layer_dict
 
+    def getLayerEntities(self):
+        """
+            get the list of all the layer entity ordered by id
+        """
+        return [self.__layers[layerId] for layerId in sorted(self.__layers)]
+
     def getLayerTree(self):
         """
             create a dictionary with all the layer nested
         """
-        rootDbEnt=self.getEntLayerDb(MAIN_LAYER)
-        def createNode(layer):
+        def createNode(layerId):
             childs={}
-            c=self._getLayerConstructionElement(layer)
-            layers=self.getLayerChildrenLayer(layer)
-            for l in layers:
-                ca=self._getLayerConstructionElement(l)
-                childs[l.getId()]=(ca, createNode(l))
+            for childId in self.__children[layerId]:
+                ca=self._getLayerConstructionElement(self.__layers[childId])
+                childs[childId]=(ca, createNode(childId))
             return childs
-        c=self._getLayerConstructionElement(rootDbEnt)
         exitDb={}
-        exitDb[rootDbEnt.getId()]=(c,createNode(rootDbEnt) )
+        for layerId, layer in self.__layers.iteritems():
+            if not layerId in self.__parents:
+                c=self._getLayerConstructionElement(layer)
+                exitDb[layerId]=(c, createNode(layerId))
         return exitDb
 
     def getLayerdbTree(self):
-        # TODO: Update DXF export/import
         """
             create a dictionary with all the layer nested as db entity
         """
-        rootDbEnt=self.getEntLayerDb(MAIN_LAYER)
-        def createNode(layer):
+        def createNode(layerId):
             childs={}
-            layers=self.getLayerChildrenLayer(layer)
-            for l in layers:
-                childs[l.getId()]=(l, createNode(l))
+            for childId in self.__children[layerId]:
+                childs[childId]=(self.__layers[childId], createNode(childId))
             return childs
         exitDb={}
-        exitDb[rootDbEnt.getId()]=(rootDbEnt,createNode(rootDbEnt) )
+        for layerId, layer in self.__layers.iteritems():
+            if not layerId in self.__parents:
+                exitDb[layerId]=(layer, createNode(layerId))
         return exitDb
 
     def getParentLayer(self,layer):
         """
-            get the parent layer
-            ToDo: to be tested
+            get the parent layer, None for a root layer
         """
-        return self.__kr.getRelatioObject().getParentEnt(layer)
+        parentId=self.__parents.get(layer.getId())
+        if parentId is None:
+            return None
+        return self.__layers[parentId]
 
     def delete(self, layerId):
         """
@@ -212,19 +312,18 @@ class LayerTable(object):
                 return False
             self.setActiveLayer(visible_layer.getId())
 
-        # Delete all entities (SEGMENTS, TEXT, etc.)
-        self.deleteLayerEntity(deleteLayer)
-
-        # Delete the layer
-        self.__kr.deleteEntity(layerId)
+        # Delete the layer and all the entities (SEGMENTS, TEXT, etc.)
+        # in a single undo step
+        deleteLayer.delete()
+        self.__kr.massiveUpdateChildren(deleteLayer, delete=True, saveParent=True)
+        self._removeLayer(layerId)
         self.deleteEvent(layerId)
 
     def deleteLayerEntity(self, layer):
         """
             delete all layer entity
         """
-        for ent in self.getLayerChildren(layer):
-                self.__kr.deleteEntity(ent.getId())
+        self.__kr.massiveUpdateChildren(layer, delete=True)
 
     def rename(self, layerId, newName):
         """
@@ -241,15 +340,14 @@ class LayerTable(object):
         layer.getConstructionElements()['LAYER'].name=newName
         print layer.getConstructionElements()['LAYER'].__dict__
         self.__kr.saveEntity(layer)
+        self._putLayer(layer)
         self.updateEvent(layer)
 
     def _show(self, layer):
-        # Show all the children entity
-        for entity in self.getLayerChildren(layer):
-            self.__kr.unHideEntity(entity = entity)
-        # Show and update the layer object
+        # Show the layer object and all the children entity
         layer.getConstructionElements()['LAYER'].visible = True
-        self.__kr.saveEntity(layer)
+        self.__kr.massiveUpdateChildren(layer, visible=1, saveParent=True)
+        self._putLayer(layer)
         self.updateEvent(layer)
 
     def show(self, layer_id):
@@ -257,14 +355,10 @@ class LayerTable(object):
         self._show(layer)
 
     def _hide(self, layer):
-        # Hide all the children entity
-        for entity in self.getLayerChildren(layer):
-            self.__kr.hideEntity(entity = entity)
-
-        # Hide and update the layer object
+        # Hide the layer object and all the children entity
         layer.getConstructionElements()['LAYER'].visible = False
-        self.__kr.saveEntity(layer)
-
+        self.__kr.massiveUpdateChildren(layer, visible=0, saveParent=True)
+        self._putLayer(layer)
         self.updateEvent(layer)
 
     def hide(self, layerId):
@@ -31,9 +31,23 @@ from Kernel.GeoUtil.intersection    import *
 from Interface.Entity.base          import BaseEntity
 
 class SnapPoint():
-    def __init__(self, scene):
+    def __init__(self, scene, snapIndex=None):
         self.activeSnap=ACTIVE_SNAP_POINT
         self._scene=scene
+        self._snapIndex=snapIndex
+
+    def _isIndexed(self, entity):
+        """
+            check if the snap points of the entity are in the snap index
+        """
+        return (self._snapIndex is not None and entity is not None and
+                getattr(entity, 'ID', None) in self._snapIndex)
+
+    def _getIndexedPoint(self, entity, point, kinds):
+        """
+            get the indexed snap point of the entity nearest to point
+        """
+        return self._snapIndex.nearest(point, kinds=kinds, entityId=entity.ID)[0]
 
     def getSnapPoint(self,  point, entity):
         """
@@ -69,30 +83,35 @@ class SnapPoint():
             elif SNAP_POINT_ARRAY["LIST"]== self.activeSnap:
                 #TODO: this should be used when checklist of snap will be enabled
                 snapPoints=[]
-                if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["MID"])>0:
-                    pnt=self.getSnapMiddlePoint(entity)
-                    if pnt!=None:
-                        snapPoints.append(pnt)
-
-                if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["END"])>0:
-                    pnt=self.getSnapEndPoint(entity, snapPoint)
-                    if pnt!=None:
-                        snapPoints.append(pnt)
-
-                if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["QUADRANT"])>0:
-                    pnt=self.getSnapQuadrantPoint(entity, snapPoint)
-                    if pnt!=None:
-                        snapPoints.append(pnt)
-
-                if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["ORTHO"])>0:
-                    pnt=self.getSnapOrtoPoint(entity, snapPoint)
-                    if pnt!=None:
-                        snapPoints.append(pnt)
-
-                if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["INTERSECTION"])>0:
-                    pnt=self.getIntersection(entity, snapPoint)
-                    if pnt!=None:
-                        snapPoints.append(pnt)
+                if self._isIndexed(entity):
+                    snapPoints.append(self._getIndexedPoint(entity, snapPoint, ACTIVE_SNAP_LIST))
+                    if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["ORTHO"])>0:
+                        snapPoints.append(self.getSnapOrtoPoint(entity, snapPoint))
+                else:
+                    if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["MID"])>0:
+                        pnt=self.getSnapMiddlePoint(entity)
+                        if pnt!=None:
+                            snapPoints.append(pnt)
+
+                    if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["END"])>0:
+                        pnt=self.getSnapEndPoint(entity, snapPoint)
+                        if pnt!=None:
+                            snapPoints.append(pnt)
+
+                    if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["QUADRANT"])>0:
+                        pnt=self.getSnapQuadrantPoint(entity, snapPoint)
+                        if pnt!=None:
+                            snapPoints.append(pnt)
+
+                    if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["ORTHO"])>0:
+                        pnt=self.getSnapOrtoPoint(entity, snapPoint)
+                        if pnt!=None:
+                            snapPoints.append(pnt)
+
+                    if ACTIVE_SNAP_LIST.count(SNAP_POINT_ARRAY["INTERSECTION"])>0:
+                        pnt=self.getIntersection(entity, snapPoint)
+                        if pnt!=None:
+                            snapPoints.append(pnt)
 
                 outPoint=(None, None)
                 for p in snapPoints:
@@ -140,6 +159,8 @@ class SnapPoint():
         """
             this function compute midpoint snap constraint to the entity argument
         """
+        if self._isIndexed(entity):
+            return self._getIndexedPoint(entity, Point(0.0, 0.0), [SNAP_POINT_ARRAY["MID"]])
         returnVal=None
         if getattr(entity, 'geoItem', None):
             if getattr(entity.geoItem, 'getMiddlePoint', None):
@@ -152,6 +173,8 @@ class SnapPoint():
         """
         if point == None or entity == None:
             return None
+        if self._isIndexed(entity):
+            return self._getIndexedPoint(entity, point, [SNAP_POINT_ARRAY["END"]])
 
         if getattr(entity, 'geoItem', None):
             if getattr(entity.geoItem, 'getEndpoints', None):
@@ -170,6 +193,8 @@ class SnapPoint():
         """
             this function compute the  snap from the center of an entity
         """
+        if self._isIndexed(entity):
+            return self._getIndexedPoint(entity, Point(0.0, 0.0), [SNAP_POINT_ARRAY["CENTER"]])
         returnVal=None
         if getattr(entity, 'geoItem', None):
             geoEntity=entity.geoItem
@@ -182,7 +207,10 @@ class SnapPoint():
     def getIntersection(self, entity, point):
         """
             this function compute the  snap intersection point
+            the indexed entity use the cached intersection points
         """
+        if self._isIndexed(entity):
+            return self._getIndexedPoint(entity, point, [SNAP_POINT_ARRAY["INTERSECTION"]])
         returnVal=None
         distance=None
         if entity!=None:
@@ -209,6 +237,8 @@ class SnapPoint():
         """
             this function compute the  snap from the quadrant
         """
+        if self._isIndexed(entity):
+            return self._getIndexedPoint(entity, point, [SNAP_POINT_ARRAY["QUADRANT"]])
         returnVal=None
         if getattr(entity, 'geoItem', None):
             geoEntity=entity.geoItem
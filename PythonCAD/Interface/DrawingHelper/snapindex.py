@@ -0,0 +1,424 @@
+#
+# Copyright (c) 2010 Matteo Boscolo, Carlo Pavan
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# This Module provide the index of the snap points of a document
+#
+# the end, mid, center, quadrant and intersection points of the drawing
+# entity are computed once and stored in a spatial hash, the index is
+# updated from the document events
+# only the entity of the region loaded by the scene are indexed and the
+# index is filled at the first snap request
+#
+import math
+
+from Kernel.initsetting                 import SNAP_POINT_ARRAY, SNAP_INDEX_CELL_SIZE, DRAWIN_ENTITY
+from Kernel.GeoEntity.point             import Point
+from Kernel.GeoUtil.gridintersection    import find_all_intersections
+from Kernel.GeoUtil.batchintersection   import find_intersections_batch
+
+#
+# entity that cover more then MAX_CELLS cells are kept out of the entity
+# grid and tested with all the new entity
+#
+MAX_CELLS=64
+
+def getEntitySnapPoints(geoEntity):
+    """
+        get the [(kind, x, y), ...] snap points of a geometrical entity
+        the kind is a SNAP_POINT_ARRAY value
+    """
+    _points=[]
+    if getattr(geoEntity, 'getEndpoints', None):
+        for _p in geoEntity.getEndpoints():
+            _points.append((SNAP_POINT_ARRAY["END"], _p))
+    elif isinstance(geoEntity, Point):
+        _points.append((SNAP_POINT_ARRAY["END"], geoEntity.getPoint()))
+    if getattr(geoEntity, 'getMiddlePoint', None):
+        _points.append((SNAP_POINT_ARRAY["MID"], geoEntity.getMiddlePoint()))
+    if getattr(geoEntity, 'getCenter', None):
+        _points.append((SNAP_POINT_ARRAY["CENTER"], geoEntity.center))
+    if getattr(geoEntity, 'getQuadrant', None):
+        for _p in geoEntity.getQuadrant():
+            _points.append((SNAP_POINT_ARRAY["QUADRANT"], _p))
+    return [(_kind, float(_p.x), float(_p.y)) for _kind, _p in _points]
+
+class SnapIndex(object):
+    """
+        spatial hash of the snap points of the visible drawing entity
+        of a document
+        a snap point is stored as (x, y, kind, entityIds) the entityIds
+        is the tuple of the two entity id for the intersection points
+        region is the (xmin, ymin, xmax, ymax) of the indexed entity,
+        None for all the drawing
+    """
+    def __init__(self, document, cellSize=SNAP_INDEX_CELL_SIZE, region=None):
+        self.__document=document
+        self.__cellSize=float(cellSize)
+        self.__drwTypes=DRAWIN_ENTITY.values()
+        self.__region=region
+        self.clear()
+        if document is not None:
+            document.saveEntityEvent        += self.eventSave
+            document.showEntEvent           += self.eventSave
+            document.updateShowEntEvent     += self.eventSave
+            document.deleteEntityEvent      += self.eventDelete
+            document.hideEntEvent           += self.eventDelete
+            document.massiveDeleteEvent     += self.eventMassiveDelete
+            document.massiveUpdateEvent     += self.eventMassiveUpdate
+            document.massiveSaveEntityEvent += self.eventMassiveSave
+            document.undoRedoEvent          += self.eventUndoRedo
+
+    def clear(self):
+        """
+            remove all the snap points, the index is filled again at the
+            next snap request
+        """
+        self.__cells={}
+        self.__records={}
+        self.__entitys={}
+        self.__geos={}
+        self.__bboxes={}
+        self.__entityCells={}
+        self.__large=set()
+        self.__loaded=False
+        self.__synced=False
+
+    def rebuild(self):
+        """
+            rebuild the index from the visible drawing entity of the region
+        """
+        self.clear()
+        self._sync()
+
+    def setRegion(self, region):
+        """
+            set the (xmin, ymin, xmax, ymax) region of the indexed entity,
+            the entity out of the region are removed at the next snap
+            request
+        """
+        self.__region=region
+        self.__synced=False
+
+    def getRegion(self):
+        """
+            get the region of the indexed entity
+        """
+        return self.__region
+
+    def _sync(self):
+        """
+            remove the entity out of the region and add the missing one
+            with the intersection points with the entity already in
+        """
+        if self.__synced:
+            return
+        self.__synced=True
+        self.__loaded=True
+        if self.__document is None:
+            return
+        if self.__region is None:
+            _entitys=[_ent for _ent in self.__document.getAllDrawingEntity()
+                        if not _ent.getId() in self.__entitys and self._isSnapEntity(_ent)]
+        else:
+            _xmin, _ymin, _xmax, _ymax=self.__region
+            _ids=self.__document.getEntityIdsInRegion(_xmin, _ymin, _xmax, _ymax,
+                                                      self.__drwTypes)
+            _inRegion=set(_ids)
+            for _id in self.__entitys.keys():
+                if not _id in _inRegion:
+                    self._removeEntity(_id)
+            _entitys=[_ent for _ent in self.__document.getEntities(
+                        [_id for _id in _ids if not _id in self.__entitys])
+                        if self._isSnapEntity(_ent)]
+        if not _entitys:
+            return
+        _newIds=set()
+        for _ent in _entitys:
+            self._addEntity(_ent)
+            _newIds.add(_ent.getId())
+        _neighbourIds=set()
+        for _id in _newIds:
+            _neighbourIds.update(self._neighbours(_id))
+        _neighbourIds.difference_update(_newIds)
+        for _hit in find_all_intersections(_entitys):
+            self._addIntersection(_hit)
+        if _neighbourIds:
+            _neighbours=[self.__entitys[_id] for _id in _neighbourIds]
+            for _hit in find_intersections_batch(_entitys, _neighbours):
+                self._addIntersection(_hit)
+
+    def _isSnapEntity(self, entity):
+        """
+            check if the entity snap points have to be indexed
+        """
+        return (entity is not None and entity.eType in self.__drwTypes and
+                entity.state!="DELETE" and entity.visible)
+
+    def _inRegion(self, entity):
+        """
+            check if the entity bounding box overlap the region
+        """
+        if self.__region is None:
+            return True
+        _bbox=entity.getBBox()
+        if _bbox[0] is None:
+            return True
+        _xmin, _ymin, _xmax, _ymax=self.__region
+        return (_bbox[0]<=_xmax and _bbox[2]>=_xmin and
+                _bbox[1]<=_ymax and _bbox[3]>=_ymin)
+
+    def _cell(self, x, y):
+        return (int(math.floor(x/self.__cellSize)), int(math.floor(y/self.__cellSize)))
+
+    def _bboxCells(self, bbox):
+        """
+            get the cells covered by the bbox or None if the bbox is too big
+        """
+        _ix0, _iy0=self._cell(bbox[0], bbox[1])
+        _ix1, _iy1=self._cell(bbox[2], bbox[3])
+        if (_ix1-_ix0+1)*(_iy1-_iy0+1)>MAX_CELLS:
+            return None
+        return [(_ix, _iy) for _ix in xrange(_ix0, _ix1+1) for _iy in xrange(_iy0, _iy1+1)]
+
+    def _addRecord(self, record):
+        """
+            store the snap point record in the hash and in the entity lists
+        """
+        self.__cells.setdefault(self._cell(record[0], record[1]), []).append(record)
+        for _id in set(record[3]):
+            self.__records.setdefault(_id, []).append(record)
+
+    def _addEntity(self, entity):
+        """
+            add the entity snap points and the entity box
+        """
+        _id=entity.getId()
+        self.__entitys[_id]=entity
+        try:
+            _geoEntity=entity.getGeometricalEntity()
+        except (TypeError, ValueError, KeyError):
+            return
+        self.__geos[_id]=_geoEntity
+        for _kind, _x, _y in getEntitySnapPoints(_geoEntity):
+            self._addRecord((_x, _y, _kind, (_id, )))
+        _bbox=entity.getBBox()
+        if _bbox[0] is None:
+            return
+        self.__bboxes[_id]=_bbox
+        _cells=self._bboxCells(_bbox)
+        if _cells is None:
+            self.__large.add(_id)
+            return
+        for _cell in _cells:
+            self.__entityCells.setdefault(_cell, set()).add(_id)
+
+    def _addIntersection(self, hit):
+        _idA, _idB, _x, _y=hit
+        self._addRecord((_x, _y, SNAP_POINT_ARRAY["INTERSECTION"], (_idA, _idB)))
+
+    def _neighbours(self, entityId):
+        """
+            get the id of the entity with the bbox overlapping the entity bbox
+        """
+        _bbox=self.__bboxes.get(entityId)
+        if _bbox is None:
+            return set()
+        _cells=self._bboxCells(_bbox)
+        if _cells is None:
+            _ids=set(self.__bboxes.keys())
+        else:
+            _ids=set(self.__large)
+            for _cell in _cells:
+                _ids.update(self.__entityCells.get(_cell, ()))
+        _ids.discard(entityId)
+        _out=set()
+        for _id in _ids:
+            _other=self.__bboxes[_id]
+            if (_bbox[0]<=_other[2] and _other[0]<=_bbox[2] and
+                _bbox[1]<=_other[3] and _other[1]<=_bbox[3]):
+                _out.add(_id)
+        return _out
+
+    def _removeEntity(self, entityId):
+        """
+            remove the entity snap points and the intersection points with
+            the other entity
+        """
+        for _record in self.__records.pop(entityId, []):
+            _cell=self.__cells.get(self._cell(_record[0], _record[1]))
+            if _cell is not None:
+                _cell.remove(_record)
+            for _id in set(_record[3]):
+                if _id!=entityId:
+                    self.__records[_id].remove(_record)
+        self.__entitys.pop(entityId, None)
+        self.__geos.pop(entityId, None)
+        _bbox=self.__bboxes.pop(entityId, None)
+        if entityId in self.__large:
+            self.__large.discard(entityId)
+        elif _bbox is not None:
+            for _cell in self._bboxCells(_bbox):
+                self.__entityCells[_cell].discard(entityId)
+
+    def updateEntity(self, entity):
+        """
+            update the snap points of a saved entity
+        """
+        _id=entity.getId()
+        if not self.__loaded:
+            # the entity is read at the first snap request
+            return
+        if not self._isSnapEntity(entity) or not self._inRegion(entity):
+            self._removeEntity(_id)
+            return
+        if _id in self.__geos and self.__geos[_id] is entity.getGeometricalEntity():
+            # the save and the show event are fired for the same change
+            return
+        self._removeEntity(_id)
+        self._addEntity(entity)
+        _neighbours=[self.__entitys[_nId] for _nId in self._neighbours(_id)]
+        for _hit in find_all_intersections([entity]):
+            self._addIntersection(_hit)
+        if _neighbours:
+            for _hit in find_intersections_batch([entity], _neighbours):
+                self._addIntersection(_hit)
+
+    def removeEntity(self, entityId):
+        """
+            remove the snap points of the entity
+        """
+        self._removeEntity(entityId)
+
+    def getEntityPoints(self, entityId, kinds=None):
+        """
+            get the [(Point, kind), ...] snap points of the entity
+        """
+        self._sync()
+        return [(Point(_x, _y), _kind) for _x, _y, _kind, _ids in self.__records.get(entityId, [])
+                    if kinds is None or _kind in kinds]
+
+    def nearest(self, point, radius=None, kinds=None, entityId=None):
+        """
+            get the (Point, kind) of the snap point nearest to point, or
+            (None, None)
+            radius:     max distance of the snap point, None for no limit
+                        only when the entityId is given
+            kinds:      [SNAP_POINT_ARRAY value, ...] None for all the kinds
+            entityId:   look only at the snap points of the entity
+        """
+        self._sync()
+        _x, _y=float(point.x), float(point.y)
+        if entityId is not None:
+            _records=self.__records.get(entityId, [])
+        else:
+            _records=[]
+            _ix0, _iy0=self._cell(_x-radius, _y-radius)
+            _ix1, _iy1=self._cell(_x+radius, _y+radius)
+            for _ix in xrange(_ix0, _ix1+1):
+                for _iy in xrange(_iy0, _iy1+1):
+                    _records.extend(self.__cells.get((_ix, _iy), ()))
+        _best=None
+        _bestDist=None
+        for _record in _records:
+            if kinds is not None and not _record[2] in kinds:
+                continue
+            _dist=math.hypot(_record[0]-_x, _record[1]-_y)
+            if radius is not None and _dist>radius:
+                continue
+            if _bestDist is None or _dist<_bestDist:
+                _best=_record
+                _bestDist=_dist
+        if _best is None:
+            return None, None
+        return Point(_best[0], _best[1]), _best[2]
+
+    def __contains__(self, entityId):
+        self._sync()
+        return entityId in self.__entitys
+
+    def __len__(self):
+        self._sync()
+        return sum([len(_records) for _records in self.__cells.itervalues()])
+
+    def eventSave(self, document, entity):
+        """
+            Manage the save and show entity event
+        """
+        self.updateEntity(entity)
+
+    def eventDelete(self, document, entity):
+        """
+            Manage the delete and hide entity event
+        """
+        self.removeEntity(entity.getId())
+
+    def eventMassiveDelete(self, document, entitys):
+        """
+            Manage the massive delete event
+        """
+        for _ent in entitys:
+            self.removeEntity(_ent.getId())
+
+    def eventMassiveSave(self, document, entitys):
+        """
+            Manage the massive save event, the index is filled again at the
+            next snap request when a lot of entity are saved
+        """
+        if len(entitys)>len(self.__entitys):
+            self.clear()
+            return
+        for _ent in entitys:
+            self.updateEntity(_ent)
+
+    def eventMassiveUpdate(self, document, entityIds, visible):
+        """
+            Manage the set based update of the entity visibility or state
+            and the import of records
+        """
+        for _id in entityIds:
+            self.removeEntity(_id)
+        if not visible:
+            return
+        if not self.__loaded:
+            return
+        if self.__region is not None:
+            _xmin, _ymin, _xmax, _ymax=self.__region
+            _inRegion=set(document.getEntityIdsInRegion(_xmin, _ymin, _xmax, _ymax,
+                                                         self.__drwTypes))
+            entityIds=[_id for _id in entityIds if _id in _inRegion]
+        if len(entityIds)>len(self.__entitys):
+            self.clear()
+            return
+        for _ent in document.getEntities(entityIds):
+            if self._isSnapEntity(_ent):
+                self.updateEntity(_ent)
+
+    def eventUndoRedo(self, document, entityIds):
+        """
+            Manage the undo redo event
+        """
+        if entityIds is None:
+            self.clear()
+            return
+        for _id in entityIds:
+            self.removeEntity(_id)
+        for _ent in document.getEntities(entityIds, skipMissing=True):
+            if self._isSnapEntity(_ent):
+                self.updateEntity(_ent)
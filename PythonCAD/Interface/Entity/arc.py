@@ -52,11 +52,45 @@ class Arc(BaseEntity):
                              self.yc,
                              self.h,
                              self.h)
-        #x, y=self.startPoint.getCoords()
-        painterPath.moveTo(self.xc, self.yc*-1.0)
-        painterPath.arcTo(qRect,self.startAngle,self.spanAngle) 
+        # the path angle are in degrees and not in 1/16 of degrees
+        painterPath.arcMoveTo(qRect, self.startAngle/16.0)
+        painterPath.arcTo(qRect, self.startAngle/16.0, self.spanAngle/16.0)
         return
+
+    def distanceTo(self, x, y):
+        """
+            distance of the point from the arc
+        """
+        r=self.h/2.0
+        cx=self.xc+r
+        cy=self.yc+r
+        # the qt angle are counterclockwise with the y axis down
+        angle=math.degrees(math.atan2(cy-y, x-cx))
+        start=self.startAngle/16.0
+        span=self.spanAngle/16.0
+        if span<0.0:
+            start+=span
+            span=-span
+        if span>=360.0 or (angle-start)%360.0<=span:
+            return abs(math.hypot(x-cx, y-cy)-r)
+        distance=None
+        for a in (start, start+span):
+            a=math.radians(a)
+            d=math.hypot(x-cx-r*math.cos(a), y-cy+r*math.sin(a))
+            if distance is None or d<distance:
+                distance=d
+        return distance
     
+    def drawLevelOfDetail(self, painter, lod):
+        """
+            the small arc are drawn as simplified polyline
+        """
+        rect=self.geometryRect()
+        if max(rect.width(), rect.height())*lod<LOD_CURVE_PIXEL:
+            self.drawSimplified(painter, lod)
+            return True
+        return False
+
     def drawGeometry(self, painter, option, widget):
         """
             extending of the paint method
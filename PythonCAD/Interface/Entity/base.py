@@ -30,6 +30,34 @@ from PyQt4  import QtCore, QtGui
 from Kernel.initsetting         import PYTHONCAD_HIGLITGT_COLOR, PYTHONCAD_COLOR, MOUSE_GRAPH_DIMENSION
 
 from Kernel.GeoEntity.point     import Point
+from Kernel.GeoUtil.simplify    import simplify_points
+
+#
+# level of detail in pixel: the items smaller then LOD_MIN_PIXEL are not
+# drawn, the text lower then LOD_TEXT_PIXEL is drawn as a box, the curve
+# smaller then LOD_CURVE_PIXEL are drawn as polyline and the polyline are
+# simplified with a tolerance of LOD_TOLERANCE_PIXEL
+#
+LOD_MIN_PIXEL=1.0
+LOD_TEXT_PIXEL=4.0
+LOD_CURVE_PIXEL=32.0
+LOD_TOLERANCE_PIXEL=0.5
+
+def segmentDistance(px, py, x1, y1, x2, y2):
+    """
+        distance of the point px, py from the segment x1, y1, x2, y2
+    """
+    dx=x2-x1
+    dy=y2-y1
+    l2=dx*dx+dy*dy
+    if l2>0.0:
+        t=((px-x1)*dx+(py-y1)*dy)/float(l2)
+        if t>=1.0:
+            x1, y1=x2, y2
+        elif t>0.0:
+            x1+=t*dx
+            y1+=t*dy
+    return math.hypot(px-x1, py-y1)
 
 class BaseEntity(QtGui.QGraphicsItem):
     shapeSize=MOUSE_GRAPH_DIMENSION
@@ -37,6 +65,13 @@ class BaseEntity(QtGui.QGraphicsItem):
     showBBox=False  #This Flag is used for debug porpoise
     def __init__(self, entity):
         super(BaseEntity, self).__init__()
+        # cached geometry, cleared by updateGeometry
+        self.__path=None
+        self.__geometryRect=None
+        self.__polygons=None
+        self.__shape=None
+        self.__boundingRect=None
+        self.__simplified={}
         self.setAcceptsHoverEvents(True)                        #Fire over events
         self.setFlag(QtGui.QGraphicsItem.ItemIsSelectable, True)
         #Get the geometry
@@ -84,7 +119,7 @@ class BaseEntity(QtGui.QGraphicsItem):
         return self._entity.getId()
     @property
     def geoItem(self):
-        return self._entity.toGeometricalEntity()
+        return self._entity.getGeometricalEntity()
     @property
     def style(self):
         return self._entity.getInnerStyle()
@@ -147,16 +182,113 @@ class BaseEntity(QtGui.QGraphicsItem):
         """
         pass
 
+    def updateGeometry(self):
+        """
+            clear the cached path, shape and bounding rect
+            must be called when the geometry of the item or the shapeSize
+            change
+        """
+        self.prepareGeometryChange()
+        self.__path=None
+        self.__geometryRect=None
+        self.__polygons=None
+        self.__shape=None
+        self.__boundingRect=None
+        self.__simplified={}
+
+    def geometryPath(self):
+        """
+            get the path of the geometry drawn by drawShape
+        """
+        if self.__path is None:
+            self.__path=QtGui.QPainterPath()
+            self.drawShape(self.__path)
+        return self.__path
+
+    def geometryRect(self):
+        """
+            get the bounding rect of the geometry with no shape tickness
+        """
+        if self.__geometryRect is None:
+            self.__geometryRect=self.geometryPath().boundingRect()
+        return self.__geometryRect
+
+    def geometryPolygons(self):
+        """
+            get the geometry path as a list of polylines
+        """
+        if self.__polygons is None:
+            self.__polygons=[[(p.x(), p.y()) for p in polygon]
+                                for polygon in self.geometryPath().toSubpathPolygons()]
+        return self.__polygons
+
+    def simplifiedPolygons(self, lod):
+        """
+            get the geometry polygons simplified for the level of detail
+            the tolerance is rounded to a power of 2 and the polygons are
+            cached for each tolerance
+        """
+        tier=int(math.floor(math.log(LOD_TOLERANCE_PIXEL/lod, 2.0)))
+        if not tier in self.__simplified:
+            tolerance=math.pow(2.0, tier)
+            self.__simplified[tier]=[
+                QtGui.QPolygonF([QtCore.QPointF(x, y) for x, y in simplify_points(polygon, tolerance)])
+                for polygon in self.geometryPolygons()]
+        return self.__simplified[tier]
+
+    def drawSimplified(self, painter, lod):
+        """
+            draw the geometry polygons simplified for the level of detail
+        """
+        for polygon in self.simplifiedPolygons(lod):
+            painter.drawPolyline(polygon)
+
+    def drawLevelOfDetail(self, painter, lod):
+        """
+            draw a simplified geometry for the level of detail, lod is the
+            size in pixel of a scene unit
+            return False to draw the full geometry with drawGeometry
+        """
+        return False
+
+    def distanceTo(self, x, y):
+        """
+            distance of the point x, y in item coordinates from the geometry
+            the polyline of the geometry path are used, the derived class
+            could compute it exactly
+        """
+        distance=None
+        for polygon in self.geometryPolygons():
+            for i in xrange(1, len(polygon)):
+                x1, y1=polygon[i-1]
+                x2, y2=polygon[i]
+                d=segmentDistance(x, y, x1, y1, x2, y2)
+                if distance is None or d<distance:
+                    distance=d
+        if distance is None:
+            return float('inf')
+        return distance
+
+    def contains(self, point):
+        """
+            overloading of the qt hit test, the point hit the item if its
+            distance from the geometry is less then half the shapeSize
+        """
+        if not self.boundingRect().contains(point):
+            return False
+        return self.distanceTo(point.x(), point.y())<=self.shapeSize/2.0
+
     def shape(self):
         """
             overloading of the shape method
+            the stroke is computed only when qt need the shape, as for the
+            rubber band selection
         """
-        painterStrock=QtGui.QPainterPathStroker()
-        path=QtGui.QPainterPath()
-        self.drawShape(path)
-        painterStrock.setWidth(self.shapeSize)
-        path1=painterStrock.createStroke(path)
-        return path1
+        if self.__shape is None:
+            painterStrock=QtGui.QPainterPathStroker()
+            painterStrock.setWidth(self.shapeSize)
+            self.__shape=painterStrock.createStroke(self.geometryPath())
+        return self.__shape
 
     def paint(self, painter,option,widget):
         """
@@ -173,8 +305,14 @@ class BaseEntity(QtGui.QGraphicsItem):
             painter.setPen(QtGui.QPen(QtGui.QColor.fromRgb(r, g, b)))
             painter.drawRect(self.boundingRect())
 
+        # the sub pixel items are not drawn
+        lod=option.levelOfDetailFromTransform(painter.worldTransform())
+        rect=self.geometryRect()
+        if max(rect.width(), rect.height())*lod<LOD_MIN_PIXEL:
+            return
         painter.setPen(self.pen)
-        self.drawGeometry(painter,option,widget)
+        if not self.drawLevelOfDetail(painter, lod):
+            self.drawGeometry(painter,option,widget)
         return
 
     def getDistance(self, qtPointF_1, qtPointF_2):
@@ -188,8 +326,13 @@ class BaseEntity(QtGui.QGraphicsItem):
     def boundingRect(self):
         """
             overloading of the qt bounding rectangle
+            the geometry rect enlarged by half the shapeSize, the bound of
+            the stroked shape
         """
-        return self.shape().boundingRect()
+        if self.__boundingRect is None:
+            m=self.shapeSize/2.0
+            self.__boundingRect=self.geometryRect().adjusted(-m, -m, m, m)
+        return self.__boundingRect
 
 
 
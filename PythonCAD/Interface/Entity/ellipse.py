@@ -43,10 +43,20 @@ class Ellipse(BaseEntity):
         h2=self.h/2.0
         painterPath.addEllipse(-w2,-h2,self.w,self.h )     
     
+    def drawLevelOfDetail(self, painter, lod):
+        """
+            the small ellipse are drawn as simplified polyline
+        """
+        rect=self.geometryRect()
+        if max(rect.width(), rect.height())*lod<LOD_CURVE_PIXEL:
+            self.drawSimplified(painter, lod)
+            return True
+        return False
+
     def drawGeometry(self, painter, option, widget):
         """
             called from the paint method
         """
         #   Create Ellipse
-        painter.drawEllipse(self.boundingRect())
+        painter.drawEllipse(self.geometryRect())
 
@@ -42,6 +42,12 @@ class Point(BaseEntity):
         """
         painterPath.addRect(self.boundingRect())
 
+    def distanceTo(self, x, y):
+        """
+            the point is hit in the square of the boundingRect
+        """
+        return max(abs(x-self.xc), abs(y-self.yc))
+
     def drawGeometry(self, painter, option, widget):
         """
             overloading of the paint method
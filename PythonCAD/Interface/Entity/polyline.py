@@ -49,6 +49,13 @@ class Polyline(BaseEntity):
         for i in range(1,len(self.qtPoints)):
             painterPath.lineTo(self.qtPoints[i])    
     
+    def drawLevelOfDetail(self, painter, lod):
+        """
+            draw the polyline simplified for the zoom
+        """
+        self.drawSimplified(painter, lod)
+        return True
+
     def drawGeometry(self, painter, option, widget):
         """
             overloading of the paint method
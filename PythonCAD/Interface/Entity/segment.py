@@ -39,7 +39,13 @@ class Segment(BaseEntity):
         """
         painterPath.moveTo(self.x, self.y)
         painterPath.lineTo(self.x1, self.y1)
-        
+
+    def distanceTo(self, x, y):
+        """
+            distance of the point from the segment
+        """
+        return segmentDistance(x, y, self.x, self.y, self.x1, self.y1)
+
     def drawGeometry(self, painter, option, widget):
         #Create Segment
         p1=QtCore.QPointF(self.x, self.y)
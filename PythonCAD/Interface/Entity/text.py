@@ -41,13 +41,33 @@ class Text(BaseEntity):
         """
             overloading of the shape method 
         """
-        painterPath.addText(QtCore.QPointF(0.0, 0.0), self.font, self.text)        
+        # the box of the text, the glyph outline are not needed for the
+        # shape and the hit test
+        painterPath.addRect(QtGui.QFontMetricsF(self.font).boundingRect(self.text))
         return
+
+    def drawLevelOfDetail(self, painter, lod):
+        """
+            the text too small to be read is drawn as a box
+        """
+        rect=self.geometryRect()
+        if rect.height()*lod<LOD_TEXT_PIXEL:
+            painter.drawRect(rect)
+            return True
+        return False
+
+    def distanceTo(self, x, y):
+        """
+            the text is hit in the rect of the text
+        """
+        if self.geometryRect().contains(QtCore.QPointF(x, y)):
+            return 0.0
+        return float('inf')
         
         
     def drawGeometry(self, painter, option, widget):
         #Create Text
-        painter.drawText(self.boundingRect(),QtCore.Qt.AlignCenter,  self.text)
+        painter.drawText(self.geometryRect(),QtCore.Qt.AlignCenter,  self.text)
         
         
         
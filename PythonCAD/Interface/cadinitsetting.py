@@ -59,6 +59,15 @@ SCANE_OBJECT_TYPE=dict(zip(SCENE_SUPPORTED_TYPE,
 
 INTERFACE_COMMAND={'DISTANCE2POINT':Distance2Point}
 
+#
+# the scene keep only the items of the entity near the visible area of
+# the view, the margin is the fraction of the view width and height added
+# on each side, the items are loaded in batches after the view stop moving
+#
+SCENE_VIEWPORT_MARGIN=0.5
+SCENE_LOAD_BATCH=2000
+SCENE_VIEWPORT_DELAY=50
+
 RESTART_COMMAND_OPTION=True
 
 BACKGROUND_COLOR=(255, 255, 255)
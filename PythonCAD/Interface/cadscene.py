@@ -42,6 +42,7 @@ from Interface.cadinitsetting       import *
 from Interface.Preview.base         import PreviewBase
 
 from Interface.DrawingHelper.snap import *
+from Interface.DrawingHelper.snapindex import SnapIndex
 from Interface.DrawingHelper.polarguides import GuideHandler
 
 from Kernel.pycadevent              import PyCadEvent
@@ -65,6 +66,19 @@ class CadScene(QtGui.QGraphicsScene):
         self.firePan=PyCadEvent()
         self.fireZoomFit=PyCadEvent()
         self.__document=document
+        # entity id : item of the entity in the scene
+        self.__entityItems={}
+        # visible scene rect of the view and loaded (xmin, ymin, xmax, ymax)
+        # document region
+        self.__viewRect=None
+        self.__loadedRegion=None
+        self.__pendingIds=[]
+        self.__viewportTimer=QtCore.QTimer(self)
+        self.__viewportTimer.setSingleShot(True)
+        QtCore.QObject.connect(self.__viewportTimer, QtCore.SIGNAL('timeout()'), self._loadViewport)
+        self.__loadTimer=QtCore.QTimer(self)
+        self.__loadTimer.setSingleShot(True)
+        QtCore.QObject.connect(self.__loadTimer, QtCore.SIGNAL('timeout()'), self._loadPending)
         self.needPreview=False
         self.forceDirectionEnabled=False
         self.forceDirection=None
@@ -88,6 +102,7 @@ class CadScene(QtGui.QGraphicsScene):
         self.selectionAddMode=False
 
         # Init loading of snap marks
+        self.snapIndex=None
         self.initSnap()
 
         # Init loading of guides
@@ -101,7 +116,7 @@ class CadScene(QtGui.QGraphicsScene):
 
     def initSnap(self):
         # Init loading of snap marks
-        self.snappingPoint=SnapPoint(self)
+        self.snappingPoint=SnapPoint(self, self.snapIndex)
         self.endMark=SnapEndMark(0.0, 0.0)
         self.addItem(self.endMark)
 
@@ -370,16 +385,105 @@ class CadScene(QtGui.QGraphicsScene):
             self.__document.updateShowEntEvent  += self.eventUpdate
             self.__document.deleteEntityEvent   += self.eventDelete
             self.__document.massiveDeleteEvent  += self.eventMassiveDelete
+            self.__document.massiveSaveEntityEvent  += self.eventMassiveSave
+            self.__document.massiveUpdateEvent  += self.eventMassiveUpdate
             self.__document.undoRedoEvent       += self.eventUndoRedo
             self.__document.hideEntEvent        += self.eventDelete
+            # the snap index is filled from the loaded region at the first snap
+            self.snapIndex=SnapIndex(self.__document, region=self.__loadedRegion)
+            self.snappingPoint=SnapPoint(self, self.snapIndex)
 
     def populateScene(self, document):
         """
-            Traverse all entities in the document and add these to the scene.
-        """
-        entities = self.__document.getEntityFromType(SCENE_SUPPORTED_TYPE)
-        for entity in entities:
-            self.addGraficalObject(entity)
+            Add to the scene the entities near the visible area of the view.
+            the other entities are added by updateViewport when the view
+            is moved
+        """
+        self.__loadedRegion=None
+        self.__pendingIds=[]
+        if self.__viewRect is not None:
+            self._loadViewport()
+
+    def updateViewport(self, viewRect):
+        """
+            set the visible scene rect of the view, the entities are loaded
+            when the view stop moving for SCENE_VIEWPORT_DELAY ms
+        """
+        self.__viewRect=QtCore.QRectF(viewRect)
+        self.__viewportTimer.start(SCENE_VIEWPORT_DELAY)
+
+    def _loadViewport(self):
+        """
+            query the document for the entities in the visible rect plus
+            the margin, remove the items outside and load the missing ones
+            the items of the selected entities are kept
+        """
+        rect=self.__viewRect
+        if rect is None:
+            return
+        # scene y is the document y reversed
+        if self.__loadedRegion is not None:
+            xmin, ymin, xmax, ymax=self.__loadedRegion
+            if (rect.left()>=xmin and rect.right()<=xmax and
+                -rect.bottom()>=ymin and -rect.top()<=ymax):
+                return
+        dx=rect.width()*SCENE_VIEWPORT_MARGIN
+        dy=rect.height()*SCENE_VIEWPORT_MARGIN
+        region=(rect.left()-dx, -rect.bottom()-dy, rect.right()+dx, -rect.top()+dy)
+        entityIds=self.__document.getEntityIdsInRegion(region[0], region[1],
+                                                       region[2], region[3],
+                                                       SCENE_SUPPORTED_TYPE)
+        self.__loadedRegion=region
+        if self.snapIndex is not None:
+            self.snapIndex.setRegion(region)
+        inRegion=set(entityIds)
+        for entityId, item in self.__entityItems.items():
+            if not entityId in inRegion and not item.isSelected():
+                self.removeGraficalItem(item)
+        self.__pendingIds=[entityId for entityId in entityIds
+                            if not entityId in self.__entityItems]
+        # the first batch is painted with the current view
+        self._loadPending()
+
+    def _loadPending(self):
+        """
+            add to the scene the next SCENE_LOAD_BATCH pending entities,
+            the remaining ones are loaded from the event loop so the view
+            stay responsive
+        """
+        batch=self.__pendingIds[:SCENE_LOAD_BATCH]
+        self.__pendingIds=self.__pendingIds[SCENE_LOAD_BATCH:]
+        if batch:
+            for entity in self.__document.getEntities(batch):
+                if (not entity.getId() in self.__entityItems and
+                        entity.state!="DELETE" and entity.visible):
+                    self.addGraficalObject(entity)
+        if self.__pendingIds:
+            self.__loadTimer.start(0)
+
+    def isInLoadedRegion(self, entity):
+        """
+            check if the bounding box of the entity overlap the loaded
+            region, all the entities are in before the first view update
+        """
+        if self.__loadedRegion is None:
+            return True
+        xmin, ymin, xmax, ymax=entity.getBBox()
+        if xmin is None:
+            return True
+        rxmin, rymin, rxmax, rymax=self.__loadedRegion
+        return xmin<=rxmax and xmax>=rxmin and ymin<=rymax and ymax>=rymin
+
+    def getExtentsRect(self):
+        """
+            get the scene rect of all the document entities, None for an
+            empty document
+        """
+        extents=self.__document.getExtents(SCENE_SUPPORTED_TYPE)
+        if extents is None:
+            return None
+        xmin, ymin, xmax, ymax=extents
+        return QtCore.QRectF(xmin, -ymax, xmax-xmin, ymax-ymin)
 
     def addGraficalObject(self, entity):
         """
@@ -397,22 +501,53 @@ class CadScene(QtGui.QGraphicsScene):
         """
         if qtItem!=None:
             self.addItem(qtItem)
+            if isinstance(qtItem, BaseEntity):
+                self.__entityItems[qtItem.ID]=qtItem
 
-    def eventUndoRedo(self, document, entity):
+    def updateItemsGeometry(self):
         """
-            Manage the undo redo event
+            clear the cached geometry of all the items, called when the
+            shapeSize change
         """
-        self.clear()
-        self.populateScene(document)
-        self.initSnap()
-        self.initGuides()
+        for item in self.__entityItems.itervalues():
+            item.updateGeometry()
+
+    def removeGraficalItem(self, qtItem):
+        """
+            remove item from the scene
+        """
+        if isinstance(qtItem, BaseEntity):
+            self.__entityItems.pop(qtItem.ID, None)
+        self.removeItem(qtItem)
+
+    def eventUndoRedo(self, document, entityIds):
+        """
+            Manage the undo redo event
+            only the items of the entity changed by the undo are updated
+        """
+        if entityIds is None:
+            self.clear()
+            self.__entityItems={}
+            self.populateScene(document)
+            self.initSnap()
+            self.initGuides()
+            return
+        dicItems=self.getAllBaseEntity()
+        for entityId in entityIds:
+            if entityId in dicItems:
+                self.removeGraficalItem(dicItems[entityId])
+        # the entity created by an undone step are no more in the document
+        for ent in document.getEntities(entityIds, skipMissing=True):
+            if ent.state!="DELETE" and ent.visible and self.isInLoadedRegion(ent):
+                self.addGraficalObject(ent)
 
 
     def eventShow(self, document, entity):
         """
             Manage the show entity event
         """
-        self.addGraficalObject(entity)
+        if self.isInLoadedRegion(entity):
+            self.addGraficalObject(entity)
 
 
     def eventUpdate(self, document, entity):
@@ -442,25 +577,58 @@ class CadScene(QtGui.QGraphicsScene):
         #endTime=time.clock()-startTime
         #print "eventDelete in %s"%str(endTime)
 
+    def eventMassiveSave(self, document, entitys):
+        """
+            Manage the massive save event fired at the end of a massive creation
+            new entity are added, exsisting one are updated and deleted
+            one are removed from the scene
+        """
+        dicItems=self.getAllBaseEntity()
+        for ent in entitys:
+            itemId=ent.getId()
+            if itemId in dicItems:
+                self.removeGraficalItem(dicItems[itemId])
+            if ent.state!="DELETE" and ent.visible and self.isInLoadedRegion(ent):
+                self.addGraficalObject(ent)
+
+    def eventMassiveUpdate(self, document, entityIds, visible):
+        """
+            Manage the set based update of the entity visibility or state
+            and the import of records
+            the hidden or deleted entity are removed, the shown one that
+            are in the loaded region are read from the document with one
+            query
+        """
+        dicItems=self.getAllBaseEntity()
+        for entityId in entityIds:
+            if entityId in dicItems:
+                self.removeGraficalItem(dicItems[entityId])
+        if not visible:
+            return
+        if self.__loadedRegion is not None:
+            xmin, ymin, xmax, ymax=self.__loadedRegion
+            inRegion=set(document.getEntityIdsInRegion(xmin, ymin, xmax, ymax,
+                                                       SCENE_SUPPORTED_TYPE))
+            entityIds=[entityId for entityId in entityIds if entityId in inRegion]
+        for ent in document.getEntities(entityIds):
+            if ent.state!="DELETE" and ent.visible and self.isInLoadedRegion(ent):
+                self.addGraficalObject(ent)
+
     def deleteEntity(self, entitys):
         """
             delete the entity from the scene
         """
-        dicItems=dict([( item.ID, item)for item in self.items() if isinstance(item, BaseEntity)])
         for ent in entitys:
             if ent.eType!="LAYER":
                 itemId=ent.getId()
-                if dicItems.has_key(itemId):
-                    self.removeItem(dicItems[itemId])
+                if self.__entityItems.has_key(itemId):
+                    self.removeGraficalItem(self.__entityItems[itemId])
 
     def getEntFromId(self, id):
         """
             get the grafical entity from an id
         """
-        dicItems=dict([( item.ID, item)for item in self.items() if isinstance(item, BaseEntity) and item.ID==id])
-        if len(dicItems)>0:
-            return dicItems[0][1]
-        return None
+        return self.__entityItems.get(id)
 
     def updateItemsFromID(self,entitys):
         """
@@ -469,22 +637,22 @@ class CadScene(QtGui.QGraphicsScene):
         dicItems=self.getAllBaseEntity()
         for ent in entitys:
             if ent.getId() in dicItems:
-                self.removeItem(dicItems[ent.getId()])
+                self.removeGraficalItem(dicItems[ent.getId()])
                 self.addGraficalObject(ent)
 
     def getAllBaseEntity(self):
         """
             get all the base entity from the scene
         """
-        return dict([( item.ID, item)for item in self.items() if isinstance(item, BaseEntity)])
+        return dict(self.__entityItems)
 
     def updateItemsFromID_2(self,entities):
         """
             update the scene from the Entity []
         """
         ids=[ent.getId() for ent in entities]
-        items=[item for item in self.items() if item.ID in ids]
+        items=[item for item in self.__entityItems.values() if item.ID in ids]
         for item in items:
-                self.removeItem(item)
+                self.removeGraficalItem(item)
         for ent in entities:
                 self.addGraficalObject(ent)
@@ -77,13 +77,9 @@ class CadView(QtGui.QGraphicsView):
         """
             fit all the item in the view
         """
-        boundingRectangle=[item.boundingRect() for item in self.scene().items() if isinstance(item, BaseEntity)]
-        qRect=None
-        for bound in boundingRectangle:
-            if not qRect:
-                qRect=bound
-            else:
-                qRect=qRect.unite(bound)
+        # the scene have only the items near the view so the extents
+        # are read from the document
+        qRect=self.scene().getExtentsRect()
         if qRect:
             self.zoomWindows(qRect)
             self.updateShape()
@@ -108,19 +104,41 @@ class CadView(QtGui.QGraphicsView):
         qRect.setWidth(qRect.width()+zb)
         qRect.setHeight(qRect.height()+zb)
         self.fitInView(qRect,1) # KeepAspectRatioByExpanding
+        self.updateViewport()
         self.updateShape()
 
 
     def scaleView(self, factor):
         self.scale(factor, factor)
+        self.updateViewport()
+
+    def updateViewport(self):
+        """
+            send the visible scene rect to the scene that load the
+            entities near it
+        """
+        self.scene().updateViewport(self.mapToScene(self.viewport().rect()).boundingRect())
+
+    def scrollContentsBy(self, dx, dy):
+        super(CadView, self).scrollContentsBy(dx, dy)
+        self.updateViewport()
+
+    def resizeEvent(self, event):
+        super(CadView, self).resizeEvent(event)
+        self.updateViewport()
 
     def updateShape(self):
         """
             update the item shape tickness
+            the tickness change by power of 2 so the cached geometry of the
+            items is computed again only when the zoom change tier
         """
         matrixScaleFactor=self.matrix().m11()
         if matrixScaleFactor<0.001:
             matrixScaleFactor=0.001
         val=(1.0/matrixScaleFactor)*10
-        BaseEntity.shapeSize=val
+        val=math.pow(2.0, round(math.log(val, 2.0)))
         PreviewBase.shapeSize=val
+        if BaseEntity.shapeSize!=val:
+            BaseEntity.shapeSize=val
+            self.scene().updateItemsGeometry()
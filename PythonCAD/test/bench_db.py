@@ -0,0 +1,214 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# Benchmark of the pythoncad kernel
+# usage: python bench_db.py [benchmarkName [size ...]]
+#
+import sys
+import os
+import time
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Generic'))
+
+from Kernel.Db.entitydb         import EntityDb
+from Kernel.Db.relationdb       import RelationDb
+from Kernel.Db.undodb           import UndoDb
+from Kernel.Db.schemadb         import SchemaDb
+from Kernel.document            import Document
+from Kernel.GeoEntity.point     import Point
+from Kernel.GeoEntity.segment   import Segment
+from Kernel.initsetting         import DRAWIN_ENTITY
+from Kernel.GeoUtil.affine      import translation_matrix, rotation_matrix
+
+N_LOOKUP=100
+#
+# lookup made by the kernel on the columns indexed by the schema migration
+#
+LOOKUPS=(
+    ('entity id', """SELECT max(pycad_id) FROM pycadent
+                    WHERE pycad_entity_id=?"""),
+    ('undo id', """SELECT pycad_entity_id FROM pycadent
+                    WHERE pycad_undo_id=?"""),
+    ('parent id', RelationDb.STATEMENTS['getChildrenIds']),
+    ('child id', """SELECT pycad_parent_id FROM pycadrel
+                    WHERE pycad_child_id=?"""),
+    ('incremental id', UndoDb.STATEMENTS['undoIdExsist']),
+    )
+
+def fillTables(connection, nRows):
+    """
+        fill the pycadent, pycadrel and pycadundo table with nRows
+        synthetic rows, each entity have 2 revision
+    """
+    _nEnt=nRows/2
+    connection.executemany("""INSERT INTO pycadent (pycad_id, pycad_entity_id,
+                    pycad_object_type, pycad_undo_id, pycad_undo_visible,
+                    pycad_entity_state, pycad_visible) VALUES (?,?,?,?,1,'MODIFIE',1)""",
+                    ((i+1, i%_nEnt+1, 'SEGMENT', i+1) for i in xrange(nRows)))
+    connection.executemany("""INSERT INTO pycadrel (pycad_parent_id, pycad_child_id)
+                    VALUES (?,?)""", ((i/10+1, i+1) for i in xrange(nRows)))
+    connection.executemany("""INSERT INTO pycadundo (pycad_incremental_id)
+                    VALUES (?)""", ((i+1, ) for i in xrange(nRows)))
+    connection.commit()
+
+def timeLookup(db, sqlSelect, keys):
+    """
+        execute the select for all the keys and return the mean time in ms
+    """
+    startTime=time.time()
+    for key in keys:
+        db.makeSelect(sqlSelect, (key, )).fetchall()
+    return (time.time()-startTime)*1000.0/len(keys)
+
+def benchLookup(nRows):
+    """
+        time the lookup by entity id, undo id, parent id, child id and
+        incremental id before and after the schema migration
+    """
+    _entityDb=EntityDb(None)
+    _connection=_entityDb.getConnection()
+    RelationDb(_connection, _entityDb)
+    UndoDb(_connection)
+    startTime=time.time()
+    fillTables(_connection, nRows)
+    print "Rows: %s filled in %.3fs"%(str(nRows), time.time()-startTime)
+    _keys=[random.randint(1, nRows/2) for i in range(N_LOOKUP)]
+    _before=[timeLookup(_entityDb, sqlSelect, _keys) for name, sqlSelect in LOOKUPS]
+    startTime=time.time()
+    SchemaDb(_connection, _entityDb).migrate()
+    print "    migration in %.3fs"%(time.time()-startTime)
+    for i, (name, sqlSelect) in enumerate(LOOKUPS):
+        _after=timeLookup(_entityDb, sqlSelect, _keys)
+        print "    %-16s before %9.4fms  after %9.4fms"%(name, _before[i], _after)
+    _connection.close()
+    os.remove(_entityDb.dbPath)
+
+def benchUndo(nEntity):
+    """
+        time the undo and the redo of a single segment on a document with
+        nEntity segment, the scene update read only the changed entity
+        instead of all the drawing entity
+    """
+    _document=Document()
+    startTime=time.time()
+    _document.startMassiveCreation()
+    for i in xrange(nEntity):
+        _document.saveEntity(Segment({'SEGMENT_0':Point(i, 0), 'SEGMENT_1':Point(i, 10)}))
+    _document.stopMassiveCreation()
+    print "Entity: %s created in %.3fs"%(str(nEntity), time.time()-startTime)
+    _document.saveEntity(Segment({'SEGMENT_0':Point(0, 0), 'SEGMENT_1':Point(10, 10)}))
+    _drwTypes=DRAWIN_ENTITY.values()
+    for name, operation in (('undo', _document.unDo), ('redo', _document.reDo)):
+        startTime=time.time()
+        _document.getEntityFromType(_drwTypes)
+        _repopulate=time.time()-startTime
+        startTime=time.time()
+        _ids=operation()
+        _kernel=time.time()-startTime
+        startTime=time.time()
+        for _id in _ids:
+            _document.getEntity(_id)
+        _incremental=time.time()-startTime
+        print "    %s kernel %.4fs  incremental read %.4fs  full read %.4fs"%(
+                    name, _kernel, _incremental, _repopulate)
+    _document.getConnection().close()
+    os.remove(_document.dbPath)
+
+def benchTransform(nEntity):
+    """
+        time the move and the rotation of nEntity segment with a single
+        transformEntities call against the old per entity loop
+    """
+    _document=Document()
+    _document.startMassiveCreation()
+    _ids=[_document.saveEntity(Segment({'SEGMENT_0':Point(i, 0), 'SEGMENT_1':Point(i, 10)})).getId()
+            for i in xrange(nEntity)]
+    _document.stopMassiveCreation()
+    _document.getEntityCache().clear()
+    print "Entity: %s"%str(nEntity)
+    for name, matrix in (('move', translation_matrix(10.0, 5.0)),
+                         ('rotate', rotation_matrix(0.0, 0.0, 0.5))):
+        startTime=time.time()
+        _document.transformEntities(_ids, matrix)
+        print "    %-8s transformEntities %.3fs"%(name, time.time()-startTime)
+    _document.getEntityCache().clear()
+    startTime=time.time()
+    _document.startMassiveCreation()
+    for _id in _ids:
+        _dbEnt=_document.getEntity(_id)
+        _geoEnt=_document.convertToGeometricalEntity(_dbEnt)
+        _geoEnt.move(Point(0, 0), Point(10, 5))
+        _dbEnt.setConstructionElements(_geoEnt.getConstructionElements())
+        _document.saveEntity(_dbEnt)
+    _document.stopMassiveCreation()
+    print "    %-8s per entity loop   %.3fs"%('move', time.time()-startTime)
+    _document.getConnection().close()
+    os.remove(_document.dbPath)
+
+def benchViewport(nEntity):
+    """
+        time the read of the entity in a 1000x1000 view of a 10000x10000
+        drawing with nEntity segment, as done by the scene at the first
+        paint, against the read of all the drawing entity
+    """
+    random.seed(1)
+    _document=Document()
+    startTime=time.time()
+    _document.startMassiveCreation()
+    for i in xrange(nEntity):
+        _x, _y=random.uniform(0.0, 10000.0), random.uniform(0.0, 10000.0)
+        _document.saveEntity(Segment({'SEGMENT_0':Point(_x, _y), 'SEGMENT_1':Point(_x+5.0, _y+5.0)}))
+    _document.stopMassiveCreation()
+    print "Entity: %s created in %.3fs"%(str(nEntity), time.time()-startTime)
+    _document.getEntityCache().clear()
+    startTime=time.time()
+    _ids=_document.getEntityIdsInRegion(4500.0, 4500.0, 5500.0, 5500.0)
+    _query=time.time()-startTime
+    startTime=time.time()
+    _document.getEntities(_ids)
+    _read=time.time()-startTime
+    startTime=time.time()
+    _document.getExtents()
+    _extents=time.time()-startTime
+    startTime=time.time()
+    _document.getAllDrawingEntity()
+    _full=time.time()-startTime
+    print "    %s in view  ids %.4fs  read %.4fs  extents %.3fs  full read %.3fs"%(
+                str(len(_ids)), _query, _read, _extents, _full)
+    _document.getConnection().close()
+    os.remove(_document.dbPath)
+
+BENCHMARKS={'lookup':(benchLookup, [10000, 100000, 1000000]),
+            'undo':(benchUndo, [1000, 10000, 100000]),
+            'transform':(benchTransform, [1000, 10000, 50000]),
+            'viewport':(benchViewport, [10000, 100000, 500000])}
+
+if __name__=='__main__':
+    if len(sys.argv)>1:
+        _names=[sys.argv[1]]
+    else:
+        _names=sorted(BENCHMARKS.keys())
+    for _name in _names:
+        _function, _sizes=BENCHMARKS[_name]
+        _sizes=[int(arg) for arg in sys.argv[2:]] or _sizes
+        for _size in _sizes:
+            _function(_size)
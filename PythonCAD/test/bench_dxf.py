@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# Benchmark of the pythoncad dxf import and export
+# usage: python bench_dxf.py [benchmarkName [size ...]]
+#
+import sys
+import os
+import time
+import random
+import tempfile
+import multiprocessing
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Generic'))
+
+from Kernel.document                        import Document
+from Kernel.GeoEntity.point                 import Point
+from Kernel.GeoEntity.segment               import Segment
+from Kernel.GeoEntity.arc                   import Arc
+from Kernel.GeoEntity.polyline              import Polyline
+from Kernel.ExternalFormat.Dxf.dxf          import Dxf
+from Kernel.ExternalFormat.Dxf.dxfreader    import DxfReader
+from Kernel.ExternalFormat.Dxf.dxfparallel  import DxfParallelImport
+
+#
+# the document import is tested only on the small files
+#
+N_IMPORT_MAX=20
+
+def _xy(x, y, code=10):
+    return "%3d\n%.6f\n%3d\n%.6f\n%3d\n0.0\n"%(code, x, code+10, y, code+20)
+
+def randomEntity():
+    """
+        get the dxf text of a random entity
+    """
+    _x, _y=random.uniform(0.0, 10000.0), random.uniform(0.0, 10000.0)
+    _kind=random.random()
+    _head="  0\n%s\n  5\n%X\n  8\n0\n"
+    if _kind<0.6:
+        return (_head%('LINE', random.randint(1, 1<<30))+"100\nAcDbLine\n"+
+                _xy(_x, _y)+_xy(_x+random.uniform(-10.0, 10.0), _y+random.uniform(-10.0, 10.0), 11))
+    if _kind<0.7:
+        return (_head%('CIRCLE', random.randint(1, 1<<30))+"100\nAcDbCircle\n"+
+                _xy(_x, _y)+" 40\n%.6f\n"%random.uniform(1.0, 5.0))
+    if _kind<0.8:
+        return (_head%('ARC', random.randint(1, 1<<30))+"100\nAcDbCircle\n"+
+                _xy(_x, _y)+" 40\n%.6f\n 50\n%.6f\n 51\n%.6f\n"%(random.uniform(1.0, 5.0),
+                random.uniform(0.0, 360.0), random.uniform(0.0, 360.0)))
+    if _kind<0.9:
+        _vertex=''.join([" 10\n%.6f\n 20\n%.6f\n"%(_x+i, _y+random.uniform(-1.0, 1.0)) for i in xrange(5)])
+        return (_head%('LWPOLYLINE', random.randint(1, 1<<30))+"100\nAcDbPolyline\n 90\n5\n 70\n0\n"+_vertex)
+    if _kind<0.95:
+        return (_head%('TEXT', random.randint(1, 1<<30))+"100\nAcDbText\n"+
+                _xy(_x, _y)+" 40\n2.5\n  1\nText %s\n 50\n30.0\n"%str(random.randint(0, 1000)))
+    return (_head%('INSERT', random.randint(1, 1<<30))+"100\nAcDbBlockReference\n  2\nBOX\n"+
+            _xy(_x, _y)+" 50\n%.6f\n"%random.uniform(0.0, 360.0))
+
+BLOCKS=("  0\nSECTION\n  2\nBLOCKS\n  0\nBLOCK\n  8\n0\n  2\nBOX\n 70\n0\n"+_xy(0.0, 0.0)+
+        "".join(["  0\nLINE\n  8\n0\n"+_xy(_x1, _y1)+_xy(_x2, _y2, 11) for _x1, _y1, _x2, _y2 in
+                    ((0, 0, 1, 0), (1, 0, 1, 1), (1, 1, 0, 1), (0, 1, 0, 0))])+
+        "  0\nENDBLK\n  8\n0\n  0\nENDSEC\n")
+
+def writeDxf(fileName, sizeMb):
+    """
+        write a synthetic dxf file of about sizeMb
+        return the number of dxf entity
+    """
+    random.seed(1)
+    _size=sizeMb*1024*1024
+    _count=0
+    _written=0
+    _fb=open(fileName, 'w')
+    try:
+        _fb.write(BLOCKS+"  0\nSECTION\n  2\nENTITIES\n")
+        while _written<_size:
+            _chunk=''.join([randomEntity() for i in xrange(1000)])
+            _fb.write(_chunk)
+            _written+=len(_chunk)
+            _count+=1000
+        _fb.write("  0\nENDSEC\n  0\nEOF\n")
+    finally:
+        _fb.close()
+    return _count
+
+def benchRead(sizeMb):
+    """
+        time the reading of a synthetic dxf file of sizeMb with the
+        buffered and the mmap stream, and the import in a document for
+        the small files, the tags time is the tokenizer time
+    """
+    _fd, _fileName=tempfile.mkstemp(suffix='.dxf')
+    os.close(_fd)
+    try:
+        _count=writeDxf(_fileName, sizeMb)
+        print "Dxf: %sMB %s entity"%(str(sizeMb), str(_count))
+        startTime=time.time()
+        for _entity in DxfReader(_fileName).iterEntities():
+            pass
+        _elapsed=time.time()-startTime
+        print "    %-10s %.3fs  %.0f dxf entity/s  %.1fMB/s"%(
+            'tags', _elapsed, _count/_elapsed, sizeMb/_elapsed)
+        for name, useMmap in (('buffered', False), ('mmap', True)):
+            startTime=time.time()
+            _nItems=0
+            for _entity in DxfReader(_fileName, useMmap=useMmap).iterGeoEntities():
+                _nItems+=1
+            _elapsed=time.time()-startTime
+            print "    %-10s %.3fs  %s entity  %.0f dxf entity/s  %.1fMB/s"%(
+                name, _elapsed, str(_nItems), _count/_elapsed, sizeMb/_elapsed)
+        if sizeMb<=N_IMPORT_MAX:
+            _document=Document()
+            startTime=time.time()
+            Dxf(_document, _fileName).importEntitis()
+            _elapsed=time.time()-startTime
+            print "    %-10s %.3fs  %.0f dxf entity/s"%('document', _elapsed, _count/_elapsed)
+    finally:
+        os.remove(_fileName)
+
+def benchParallel(sizeMb):
+    """
+        time the import in a document of a synthetic dxf file of sizeMb
+        with one process and with a process for cpu
+    """
+    _fd, _fileName=tempfile.mkstemp(suffix='.dxf')
+    os.close(_fd)
+    try:
+        _count=writeDxf(_fileName, sizeMb)
+        print "Dxf: %sMB %s entity"%(str(sizeMb), str(_count))
+        for _processes in sorted(set([1, multiprocessing.cpu_count()])):
+            _document=Document()
+            startTime=time.time()
+            try:
+                _document.startMassiveCreation()
+                _nItems=DxfParallelImport(_document, _fileName, _processes).run()
+                _document.performCommit()
+            finally:
+                _document.stopMassiveCreation()
+            _elapsed=time.time()-startTime
+            print "    %2d process %.3fs  %s entity  %.0f dxf entity/s  %.1fMB/s"%(
+                _processes, _elapsed, str(_nItems), _count/_elapsed, sizeMb/_elapsed)
+    finally:
+        os.remove(_fileName)
+
+def benchWrite(nEntity):
+    """
+        time the dxf export of a document of nEntity thousands entity
+    """
+    random.seed(1)
+    _document=Document()
+    try:
+        _document.startMassiveCreation()
+        for i in xrange(nEntity*1000):
+            _x, _y=random.uniform(0.0, 10000.0), random.uniform(0.0, 10000.0)
+            if i%10==0:
+                _entity=Arc({'ARC_0':Point(_x, _y), 'ARC_1':2.0, 'ARC_2':0.0, 'ARC_3':1.0})
+            elif i%10==1:
+                _entity=Polyline({'POLYLINE_0':Point(_x, _y), 'POLYLINE_1':Point(_x+1.0, _y),
+                                  'POLYLINE_2':Point(_x+1.0, _y+1.0)})
+            else:
+                _entity=Segment({'SEGMENT_0':Point(_x, _y), 'SEGMENT_1':Point(_x+1.0, _y+1.0)})
+            _document.saveEntity(_entity)
+        _document.performCommit()
+    finally:
+        _document.stopMassiveCreation()
+    _fd, _fileName=tempfile.mkstemp(suffix='.dxf')
+    os.close(_fd)
+    try:
+        startTime=time.time()
+        Dxf(_document, _fileName).exportEntitis()
+        _elapsed=time.time()-startTime
+        _size=os.path.getsize(_fileName)/1024.0/1024.0
+        print "Export: %s entity %.3fs  %.0f entity/s  %.1fMB/s"%(
+            str(nEntity*1000), _elapsed, nEntity*1000/_elapsed, _size/_elapsed)
+    finally:
+        os.remove(_fileName)
+
+BENCHMARKS={'read':(benchRead, [5, 50, 500]),
+            'parallel':(benchParallel, [5, 50]),
+            'write':(benchWrite, [10, 100])}
+
+if __name__=='__main__':
+    if len(sys.argv)>1:
+        _names=[sys.argv[1]]
+    else:
+        _names=sorted(BENCHMARKS.keys())
+    for _name in _names:
+        _function, _sizes=BENCHMARKS[_name]
+        _sizes=[int(arg) for arg in sys.argv[2:]] or _sizes
+        for _size in _sizes:
+            _function(_size)
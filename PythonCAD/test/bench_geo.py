@@ -0,0 +1,266 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# Benchmark of the pythoncad geometry
+# usage: python bench_geo.py [benchmarkName [size ...]]
+#
+import sys
+import os
+import time
+import math
+import random
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Generic'))
+
+from Kernel.GeoEntity.point         import Point
+from Kernel.GeoEntity.segment       import Segment
+from Kernel.GeoEntity.arc           import Arc
+from Kernel.GeoEntity.cline         import CLine
+from Kernel.GeoEntity.ccircle       import CCircle
+from Kernel.GeoEntity.ellipse       import Ellipse
+from Kernel.GeoEntity.polyline      import Polyline
+from Kernel.GeoEntity.vertexarray   import VertexArray
+from Kernel.GeoUtil.intersection    import find_intersections
+from Kernel.GeoUtil.batchintersection import find_intersections_batch
+from Kernel.GeoUtil.gridintersection import find_all_intersections
+from Kernel.GeoUtil.rotate          import rotate_objects
+from Kernel.GeoUtil.simplify        import simplify_points
+
+def randomCoord():
+    return random.uniform(-100.0, 100.0)
+
+def randomPoint():
+    return Point(randomCoord(), randomCoord())
+
+def randomSegment():
+    return Segment({'SEGMENT_0':randomPoint(), 'SEGMENT_1':randomPoint()})
+
+def randomArc():
+    return Arc({'ARC_0':randomPoint(),
+                'ARC_1':random.uniform(1.0, 80.0),
+                'ARC_2':random.uniform(0.0, math.pi*2.0),
+                'ARC_3':random.uniform(-math.pi*2.0, math.pi*2.0)})
+
+def randomEllipse():
+    return Ellipse({'ELLIPSE_0':randomPoint(),
+                    'ELLIPSE_1':random.uniform(2.0, 160.0),
+                    'ELLIPSE_2':random.uniform(2.0, 160.0)})
+
+def randomCLine():
+    return CLine({'CLINE_0':randomPoint(), 'CLINE_1':randomPoint()})
+
+def randomCCircle():
+    return CCircle({'CCIRCLE_0':randomPoint(), 'CCIRCLE_1':random.uniform(1.0, 80.0)})
+
+PAIRS=(('segment/segment', randomSegment, randomSegment),
+       ('segment/arc', randomSegment, randomArc),
+       ('arc/arc', randomArc, randomArc),
+       ('segment/ellipse', randomSegment, randomEllipse),
+       ('cline/ccircle', randomCLine, randomCCircle))
+#
+# the sympy intersection is slow so only a part of the pairs are tested
+#
+N_EXACT=20
+
+def timeIntersections(pairs, exact):
+    """
+        return the mean time in ms of the intersection of the pairs
+    """
+    startTime=time.time()
+    for obja, objb in pairs:
+        find_intersections(obja, objb, exact)
+    return (time.time()-startTime)*1000.0/len(pairs)
+
+def benchIntersection(nPairs):
+    """
+        compare the native and the sympy intersection on random pairs
+    """
+    random.seed(1)
+    print "Random pairs: %s"%str(nPairs)
+    for name, functiona, functionb in PAIRS:
+        _pairs=[(functiona(), functionb()) for i in xrange(nPairs)]
+        _native=timeIntersections(_pairs, False)
+        _exact=timeIntersections(_pairs[:N_EXACT], True)
+        print "    %-16s native %8.4fms  sympy %9.4fms  speedup %8.1fx"%(
+                    name, _native, _exact, _exact/_native)
+
+#
+# entity of the all pairs intersection, the ellipse are not used because
+# the ellipse/arc intersection have no native solver
+#
+BATCH_ENTITY=(randomSegment, randomArc, randomCLine, randomCCircle)
+
+def benchBatch(nEntity):
+    """
+        compare the pairwise and the batch intersection of all the pairs
+        of nEntity random entity
+    """
+    random.seed(1)
+    _entitys=[(i, random.choice(BATCH_ENTITY)()) for i in xrange(nEntity)]
+    startTime=time.time()
+    _nPairwise=0
+    for i, (_ida, _obja) in enumerate(_entitys):
+        for _idb, _objb in _entitys[i+1:]:
+            _nPairwise+=len(find_intersections(_obja, _objb))
+    _pairwise=time.time()-startTime
+    startTime=time.time()
+    _nBatch=len(find_intersections_batch(_entitys))
+    _batch=time.time()-startTime
+    print "Entity: %s  pairwise %.3fs (%s points)  batch %.3fs (%s points)  speedup %.1fx"%(
+                str(nEntity), _pairwise, str(_nPairwise), _batch, str(_nBatch), _pairwise/_batch)
+
+#
+# the all intersections of a drawing are computed on short segments and
+# arcs spread with a constant density so the intersection grow with the
+# number of entity
+#
+N_BATCH_MAX=5000
+
+def randomDrawing(nEntity):
+    """
+        nEntity short segments and arcs on an area proportional to nEntity
+    """
+    _size=math.sqrt(nEntity)*10.0
+    _entitys=[]
+    for i in xrange(nEntity):
+        _x, _y=random.uniform(0.0, _size), random.uniform(0.0, _size)
+        if i%4:
+            _entitys.append((i, Segment({'SEGMENT_0':Point(_x, _y),
+                    'SEGMENT_1':Point(_x+random.uniform(-10.0, 10.0), _y+random.uniform(-10.0, 10.0))})))
+        else:
+            _entitys.append((i, Arc({'ARC_0':Point(_x, _y), 'ARC_1':random.uniform(1.0, 5.0),
+                    'ARC_2':random.uniform(0.0, math.pi*2.0), 'ARC_3':random.uniform(0.0, math.pi*2.0)})))
+    return _entitys
+
+def benchAllIntersections(nEntity):
+    """
+        time the grid all intersections of a drawing against the all
+        pairs batch intersection
+    """
+    random.seed(1)
+    _entitys=randomDrawing(nEntity)
+    startTime=time.time()
+    _nGrid=len(find_all_intersections(_entitys))
+    _grid=time.time()-startTime
+    _result="Entity: %s  grid %.3fs (%s points)"%(str(nEntity), _grid, str(_nGrid))
+    if nEntity<=N_BATCH_MAX:
+        startTime=time.time()
+        _nBatch=len(find_intersections_batch(_entitys))
+        _batch=time.time()-startTime
+        _result+="  batch %.3fs (%s points)"%(_batch, str(_nBatch))
+    print _result
+
+def memoryUsage():
+    """
+        get the resident memory of the process in MB, None if unknown
+    """
+    try:
+        for line in open('/proc/self/status'):
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])/1024.0
+    except IOError:
+        pass
+    return None
+
+def benchPolyline(nVertex):
+    """
+        time and measure a contour polyline of nVertex built from the
+        vertex array and from the POLYLINE_n points
+    """
+    _startMemory=memoryUsage()
+    startTime=time.time()
+    _vertex=VertexArray()
+    for i in xrange(nVertex):
+        _vertex.append(float(i), math.sin(i*0.01)*100.0)
+    _polyline=Polyline({'POLYLINE_VERTEX':_vertex})
+    _build=time.time()-startTime
+    _memory=memoryUsage()
+    startTime=time.time()
+    _polyline.getBBox()
+    _nSegment=0
+    for _segment in _polyline.iterSegments():
+        _nSegment+=1
+    _iterate=time.time()-startTime
+    _result="Vertex: %s  array build %.3fs  bbox and segments %.3fs"%(
+                str(nVertex), _build, _iterate)
+    if _startMemory is not None:
+        _result+="  memory %.1fMB"%(_memory-_startMemory)
+    del _polyline, _vertex
+    _startMemory=memoryUsage()
+    startTime=time.time()
+    _points=dict([('POLYLINE_%s'%str(i), Point(float(i), math.sin(i*0.01)*100.0))
+                    for i in xrange(nVertex)])
+    _pointsMemory=memoryUsage()
+    Polyline(_points)
+    _result+="  (points build %.3fs"%(time.time()-startTime)
+    if _startMemory is not None:
+        _result+=" memory %.1fMB"%(_pointsMemory-_startMemory)
+    print _result+")"
+
+def benchRotate(nEntity):
+    """
+        time the batch rotation of a drawing against the rotation of
+        each entity
+    """
+    random.seed(1)
+    _entitys=[_obj for _id, _obj in randomDrawing(nEntity)]
+    startTime=time.time()
+    rotate_objects(_entitys, 0.0, 0.0, 30.0)
+    _batch=time.time()-startTime
+    _center=Point(0.0, 0.0)
+    startTime=time.time()
+    for _obj in _entitys:
+        _obj.rotate(_center, math.pi/6.0)
+    _single=time.time()-startTime
+    print "Entity: %s  batch %.3fs  single %.3fs  speedup %.1fx"%(
+                str(nEntity), _batch, _single, _single/_batch)
+
+def benchSimplify(nVertex):
+    """
+        time the simplification of a polyline of nVertex for the level of
+        detail of the zoom, the tolerance double at each zoom out
+    """
+    _points=[(float(i), math.sin(i*0.01)*100.0) for i in xrange(nVertex)]
+    _result="Vertex: %s"%str(nVertex)
+    for _tolerance in (0.01, 1.0, 100.0):
+        startTime=time.time()
+        _simplified=simplify_points(_points, _tolerance)
+        _result+="  tol %s %.3fs %s vertex"%(str(_tolerance), time.time()-startTime,
+                                             str(len(_simplified)))
+    print _result
+
+BENCHMARKS={'intersection':(benchIntersection, [1000]),
+            'batch':(benchBatch, [100, 1000, 3000]),
+            'all':(benchAllIntersections, [1000, 5000, 10000, 50000, 100000]),
+            'polyline':(benchPolyline, [10000, 100000, 1000000]),
+            'rotate':(benchRotate, [10000, 100000]),
+            'simplify':(benchSimplify, [10000, 100000, 1000000])}
+
+if __name__=='__main__':
+    if len(sys.argv)>1:
+        _names=[sys.argv[1]]
+    else:
+        _names=sorted(BENCHMARKS.keys())
+    for _name in _names:
+        _function, _sizes=BENCHMARKS[_name]
+        _sizes=[int(arg) for arg in sys.argv[2:]] or _sizes
+        for _size in _sizes:
+            _function(_size)
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# Test of the pythoncad database
+# usage: python test_db.py
+#
+import sys
+import os
+import math
+import shutil
+import cPickle as pickle
+import tempfile
+import unittest
+
+_testDir=os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(_testDir, '..', 'Generic'))
+
+from Kernel.document            import Document
+from Kernel.GeoEntity.point     import Point
+from Kernel.GeoEntity.segment   import Segment
+from Kernel.GeoEntity.text      import Text
+from Kernel.Db.entitydb         import EntityDb
+from Kernel.Db.schemadb         import SchemaDb, SCHEMA_VERSION
+from Kernel.Db.entitycodec      import *
+
+#
+# drawing written by the pythoncad version before the spatial index and the
+# head table, it have 2 segment, an arc, an ellipse, a polyline with the
+# POLYLINE_n points, a text and a deleted segment
+#
+BASELINE_DRAWING=os.path.join(_testDir, 'data', 'baseline.pdr')
+
+class TestBaselineDrawing(unittest.TestCase):
+    """
+        open a drawing saved with the old database schema
+    """
+    def setUp(self):
+        _fd, self.fileName=tempfile.mkstemp(suffix='.pdr')
+        os.close(_fd)
+        shutil.copy(BASELINE_DRAWING, self.fileName)
+        self.document=Document(self.fileName)
+
+    def tearDown(self):
+        self.document.getConnection().close()
+        os.remove(self.fileName)
+
+    def testEntities(self):
+        _entitys=self.document.getAllDrawingEntity()
+        self.assertEqual(sorted([_ent.eType for _ent in _entitys]),
+                         ['ARC', 'ELLIPSE', 'POLYLINE', 'SEGMENT', 'SEGMENT', 'TEXT'])
+        _segment=self.document.getEntity(4)
+        self.assertEqual(_segment.getBBox(), (0.0, 0.0, 10.0, 5.0))
+        _polyline=self.document.getEntity(8)
+        self.assertEqual(len(self.document.convertToGeometricalEntity(_polyline).points()), 3)
+
+    def testDeletedEntity(self):
+        self.assertEqual(self.document.getEntity(10).state, 'DELETE')
+        _ids=[_ent.getId() for _ent in self.document.getAllDrawingEntity()]
+        self.assertFalse(10 in _ids)
+
+    def testSpatialIndex(self):
+        _ids=sorted([_ent.getId() for _ent in self.document.getEntitiesInRegion(-1.0, -1.0, 15.0, 15.0)])
+        self.assertEqual(_ids, [4])
+        self.assertEqual(sorted(self.document.getEntityIdsInRegion(45.0, 45.0, 60.0, 60.0)), [6])
+        # the text is found beside its point
+        self.assertEqual(self.document.getEntityIdsInRegion(140.0, 0.0, 150.0, 5.0), [9])
+
+    def testSaveAndReopen(self):
+        _new=self.document.saveEntity(Segment({'SEGMENT_0':Point(200, 200), 'SEGMENT_1':Point(210, 200)}))
+        self.document.getConnection().close()
+        self.document=Document(self.fileName)
+        self.assertEqual(len(self.document.getAllDrawingEntity()), 7)
+        self.assertEqual(self.document.getEntityIdsInRegion(199.0, 199.0, 201.0, 201.0), [_new.getId()])
+
+class TestCodec(unittest.TestCase):
+    """
+        encode and decode the construction elements
+    """
+    def roundTrip(self, entityType, cElements):
+        return decodeConstructionElements(entityType,
+                    encodeConstructionElements(entityType, cElements))
+
+    def testSegment(self):
+        _cElements=self.roundTrip('SEGMENT', {'SEGMENT_0':Point(1.5, -2), 'SEGMENT_1':Point(3, 1e10)})
+        self.assertEqual(_cElements['SEGMENT_0'].getCoords(), (1.5, -2.0))
+        self.assertEqual(_cElements['SEGMENT_1'].getCoords(), (3.0, 1e10))
+
+    def testArc(self):
+        _cElements=self.roundTrip('ARC', {'ARC_0':Point(0, 0), 'ARC_1':10.0,
+                                          'ARC_2':0.1, 'ARC_3':math.pi/2})
+        self.assertEqual(_cElements['ARC_0'].getCoords(), (0.0, 0.0))
+        self.assertEqual((_cElements['ARC_1'], _cElements['ARC_2'], _cElements['ARC_3']),
+                         (10.0, 0.1, math.pi/2))
+
+    def testText(self):
+        _cElements=self.roundTrip('TEXT', {'TEXT_0':Point(3, 3), 'TEXT_1':u'\xe0b',
+                                           'TEXT_2':0.0, 'TEXT_3':'sw'})
+        self.assertEqual(_cElements['TEXT_1'], u'\xe0b')
+        self.assertEqual(_cElements['TEXT_3'], 'sw')
+        self.assertEqual(self.roundTrip('TEXT', {'TEXT_0':Point(3, 3), 'TEXT_1':'ab',
+                                                 'TEXT_2':0.0, 'TEXT_3':'sw'})['TEXT_1'], 'ab')
+
+    def testPickle(self):
+        # the construction elements out of the schema are pickled
+        _cElements=self.roundTrip('SEGMENT', {'SEGMENT_0':Point(1, 2), 'SEGMENT_1':'bad'})
+        self.assertEqual(_cElements['SEGMENT_1'], 'bad')
+        self.assertEqual(self.roundTrip('LAYER', {'LAYER':'value'}), {'LAYER':'value'})
+
+    def testLegacy(self):
+        _cElements={'CLINE_0':Point(1, 2), 'CLINE_1':Point(3, 4)}
+        _decoded=decodeConstructionElements('CLINE', pickle.dumps(_cElements))
+        self.assertEqual(_decoded['CLINE_1'].getCoords(), (3.0, 4.0))
+        self.assertEqual(decodeProperties(pickle.dumps({})), [])
+        self.assertEqual(decodeProperties(encodeProperties({})), [])
+        self.assertEqual(decodeProperties(None), [])
+
+    def testLegacyRow(self):
+        _document=Document()
+        try:
+            _segment=_document.saveEntity(Segment({'SEGMENT_0':Point(0, 0), 'SEGMENT_1':Point(1, 1)}))
+            _cElements={'SEGMENT_0':Point(1, 2), 'SEGMENT_1':Point(3, 4)}
+            _document.getConnection().execute("""UPDATE pycadent SET pycad_object_definition=?,
+                                                 pycad_property=? WHERE pycad_entity_id=?""",
+                                              (pickle.dumps(_cElements), pickle.dumps({}), _segment.getId()))
+            _document.getEntityCache().clear()
+            _entity=_document.getEntity(_segment.getId())
+            self.assertEqual(_entity.getConstructionElements()['SEGMENT_0'].getCoords(), (1.0, 2.0))
+        finally:
+            _document.getConnection().close()
+            os.remove(_document.dbPath)
+
+class TestHeadTable(unittest.TestCase):
+    """
+        the head table kept by the save, the undo and the redo is the
+        one computed from the revision history
+    """
+    def setUp(self):
+        _fd, self.fileName=tempfile.mkstemp(suffix='.pdr')
+        os.close(_fd)
+        os.remove(self.fileName)
+        self.document=Document(self.fileName)
+        self.segments=[self.document.saveEntity(Segment({'SEGMENT_0':Point(i*10, 0),
+                                                         'SEGMENT_1':Point(i*10+5, 5)}))
+                        for i in xrange(5)]
+
+    def tearDown(self):
+        self.document.getConnection().close()
+        os.remove(self.fileName)
+
+    def headRows(self):
+        return sorted(self.document.getConnection().execute("SELECT * FROM pycadhead").fetchall())
+
+    def assertHead(self):
+        _rows=self.headRows()
+        _connection=self.document.getConnection()
+        _connection.execute("DROP TABLE pycadhead")
+        _connection.commit()
+        _connection.close()
+        self.document=Document(self.fileName)
+        self.assertEqual(self.headRows(), _rows)
+
+    def moveSegment(self):
+        _entity=self.document.getEntity(self.segments[0].getId())
+        _entity.setConstructionElements({'SEGMENT_0':Point(-100, -100), 'SEGMENT_1':Point(-90, -90)})
+        self.document.saveEntity(_entity)
+
+    def testSave(self):
+        self.moveSegment()
+        self.assertEqual(self.document.getEntity(self.segments[0].getId()).getBBox(),
+                         (-100.0, -100.0, -90.0, -90.0))
+        self.assertHead()
+
+    def testUndoRedo(self):
+        self.moveSegment()
+        self.document.unDo()
+        self.assertEqual(self.document.getEntity(self.segments[0].getId()).getBBox(),
+                         (0.0, 0.0, 5.0, 5.0))
+        self.assertHead()
+        self.document.reDo()
+        self.assertEqual(self.document.getEntity(self.segments[0].getId()).getBBox(),
+                         (-100.0, -100.0, -90.0, -90.0))
+        self.assertHead()
+
+    def testDelete(self):
+        _id=self.segments[1].getId()
+        self.document.deleteEntity(_id)
+        self.assertEqual(len(self.document.getAllDrawingEntity()), 4)
+        self.assertEqual(self.document.getEntity(_id).state, 'DELETE')
+        self.assertHead()
+        self.document.unDo()
+        self.assertEqual(len(self.document.getAllDrawingEntity()), 5)
+        self.assertHead()
+
+    def testUpdateEntity(self):
+        _entity=self.document.getEntity(self.segments[0].getId())
+        _entity.setConstructionElements({'SEGMENT_0':Point(-100, -100), 'SEGMENT_1':Point(-90, -90)})
+        EntityDb(self.document.getConnection()).uptateEntity(_entity)
+        # the spatial index is updated with the bounding box
+        self.assertEqual(self.document.getEntityIdsInRegion(-101.0, -101.0, -89.0, -89.0), [_entity.getId()])
+        self.assertEqual(self.document.getEntityIdsInRegion(-1.0, -1.0, 1.0, 1.0), [])
+        self.assertHead()
+
+    def testMassiveCreation(self):
+        self.document.startMassiveCreation()
+        for i in xrange(100):
+            self.document.saveEntity(Segment({'SEGMENT_0':Point(i, 0), 'SEGMENT_1':Point(i, 1)}))
+        self.document.stopMassiveCreation()
+        self.assertEqual(len(self.document.getAllDrawingEntity()), 105)
+        self.assertHead()
+
+class TestTextBBox(unittest.TestCase):
+    """
+        the text is found in the region around its point
+    """
+    def setUp(self):
+        _fd, self.fileName=tempfile.mkstemp(suffix='.pdr')
+        os.close(_fd)
+        os.remove(self.fileName)
+        self.document=Document(self.fileName)
+        self.text=self.document.saveEntity(Text({'TEXT_0':Point(0, 0), 'TEXT_1':'text',
+                                                 'TEXT_2':0.0, 'TEXT_3':'sw'}))
+
+    def tearDown(self):
+        self.document.getConnection().close()
+        os.remove(self.fileName)
+
+    def testRegion(self):
+        _bBox=self.text.getBBox()
+        self.assertTrue(_bBox[0]<0.0 and _bBox[2]>0.0 and _bBox[1]<0.0 and _bBox[3]>0.0)
+        self.assertEqual(self.document.getEntityIdsInRegion(5.0, 1.0, 10.0, 2.0), [self.text.getId()])
+
+    def pointBBox(self, schemaVersion):
+        # the drawing saved with the box of the text point
+        _connection=self.document.getConnection()
+        _connection.execute("""UPDATE pycadent SET pycad_bbox_xmin=0, pycad_bbox_ymin=0,
+                                pycad_bbox_xmax=0, pycad_bbox_ymax=0""")
+        _connection.execute("""UPDATE pycadent_rtree SET pycad_bbox_xmin=0, pycad_bbox_ymin=0,
+                                pycad_bbox_xmax=0, pycad_bbox_ymax=0""")
+        _connection.execute("PRAGMA user_version=%s"%schemaVersion)
+        _connection.commit()
+        _connection.close()
+        self.document=Document(self.fileName)
+
+    def testOldBBox(self):
+        self.pointBBox(1)
+        self.assertEqual(self.document.getEntityIdsInRegion(5.0, 1.0, 10.0, 2.0), [self.text.getId()])
+        self.assertEqual(SchemaDb(self.document.getConnection()).getSchemaVersion(), SCHEMA_VERSION)
+
+    def testMigratedBBox(self):
+        # the box is computed again only by the migration
+        self.pointBBox(SCHEMA_VERSION)
+        self.assertEqual(self.document.getEntityIdsInRegion(5.0, 1.0, 10.0, 2.0), [])
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# Test of the pythoncad document operations
+# usage: python test_document.py
+#
+import sys
+import os
+import math
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Generic'))
+
+from Kernel.document                import Document
+from Kernel.layer                   import Layer
+from Kernel.exception               import StructuralError
+from Kernel.Db.basedb               import BaseDb
+from Kernel.GeoEntity.point         import Point
+from Kernel.GeoEntity.segment       import Segment
+from Kernel.GeoEntity.arc           import Arc
+from Kernel.GeoUtil.affine          import translation_matrix, rotation_matrix
+
+def segmentCoords(entity):
+    _cElements=entity.getConstructionElements()
+    return _cElements['SEGMENT_0'].getCoords()+_cElements['SEGMENT_1'].getCoords()
+
+class TestTransformEntities(unittest.TestCase):
+    """
+        transform the entity of the document with an affine matrix
+    """
+    def setUp(self):
+        self.document=Document()
+        self.ids=[]
+        for _i in xrange(3):
+            _ent=self.document.saveEntity(Segment({'SEGMENT_0':Point(0, _i),
+                                                   'SEGMENT_1':Point(10, _i)}))
+            self.ids.append(_ent.getId())
+
+    def tearDown(self):
+        self.document.getConnection().close()
+        os.remove(self.document.dbPath)
+
+    def testMove(self):
+        _out=self.document.transformEntities(self.ids, translation_matrix(5.0, 1.0))
+        self.assertEqual([_ent.getId() for _ent in _out], self.ids)
+        self.assertEqual(segmentCoords(self.document.getEntity(self.ids[2])), (5.0, 3.0, 15.0, 3.0))
+        self.assertEqual(self.document.getEntity(self.ids[2]).getBBox(), (5.0, 3.0, 15.0, 3.0))
+        self.assertEqual(len(self.document.getAllDrawingEntity()), 3)
+        # the transformation is a single undo
+        self.document.unDo()
+        for _i, _id in enumerate(self.ids):
+            self.assertEqual(segmentCoords(self.document.getEntity(_id)), (0.0, _i, 10.0, _i))
+
+    def testCopy(self):
+        _arc=self.document.saveEntity(Arc({'ARC_0':Point(3, 4), 'ARC_1':2.0, 'ARC_2':0.3, 'ARC_3':1.0}))
+        _out=self.document.transformEntities([_arc.getId()], rotation_matrix(1.0, 2.0, 0.7), copy=True)
+        self.assertEqual(len(_out), 1)
+        self.assertNotEqual(_out[0].getId(), _arc.getId())
+        self.assertEqual(len(self.document.getAllDrawingEntity()), 5)
+        _reference=Arc({'ARC_0':Point(3, 4), 'ARC_1':2.0, 'ARC_2':0.3, 'ARC_3':1.0})
+        _reference.rotate(Point(1, 2), 0.7)
+        _copy=_out[0].toGeometricalEntity()
+        self.assertAlmostEqual(_copy.center.x, _reference.center.x)
+        self.assertAlmostEqual(_copy.center.y, _reference.center.y)
+        self.assertAlmostEqual(math.sin(_copy.startAngle), math.sin(_reference.startAngle))
+        # the original entity is not changed
+        self.assertEqual(self.document.getEntity(_arc.getId()).getConstructionElements()['ARC_0'].getCoords(),
+                         (3.0, 4.0))
+
+    def testFailure(self):
+        _saveEntity=self.document.saveEntity
+        _saved=[]
+        def saveEntity(entity):
+            if _saved:
+                raise StructuralError, "save failure"
+            _saved.append(entity)
+            return _saveEntity(entity)
+        self.document.saveEntity=saveEntity
+        self.assertRaises(StructuralError, self.document.transformEntities,
+                          self.ids, translation_matrix(5.0, 0.0))
+        del self.document.saveEntity
+        # the transformation is rolled back for all the entity
+        self.assertEqual(segmentCoords(self.document.getEntity(self.ids[0])), (0.0, 0.0, 10.0, 0.0))
+        self.assertEqual(segmentCoords(self.document.getEntity(self.ids[1])), (0.0, 1.0, 10.0, 1.0))
+        self.assertEqual(segmentCoords(self.document.getEntity(self.ids[2])), (0.0, 2.0, 10.0, 2.0))
+
+class TestMassiveCreation(unittest.TestCase):
+    """
+        save the entity with startMassiveCreation and stopMassiveCreation
+    """
+    def setUp(self):
+        self.document=Document()
+
+    def tearDown(self):
+        self.document.getConnection().close()
+        os.remove(self.document.dbPath)
+
+    def count(self, sql):
+        return self.document.getConnection().execute(sql).fetchone()[0]
+
+    def testEncodeOnSave(self):
+        _point=Point(0, 0)
+        self.document.startMassiveCreation()
+        _ent=self.document.saveEntity(Segment({'SEGMENT_0':_point, 'SEGMENT_1':Point(10, 0)}))
+        self.document.saveEntity(_ent)
+        # the change done after the save is not stored
+        _point.x=7
+        self.document.stopMassiveCreation()
+        self.assertEqual(self.count("SELECT COUNT(*) FROM pycadent WHERE pycad_entity_id=%s"%_ent.getId()), 1)
+        self.document.getConnection().close()
+        self.document=Document(self.document.dbPath)
+        self.assertEqual(segmentCoords(self.document.getEntity(_ent.getId())), (0.0, 0.0, 10.0, 0.0))
+
+    def testAbort(self):
+        _undo=self.count("SELECT COUNT(*) FROM pycadundo")
+        _entity=self.count("SELECT COUNT(*) FROM pycadent")
+        BaseDb.commit=False
+        self.document.startMassiveCreation()
+        _ent=self.document.saveEntity(Segment({'SEGMENT_0':Point(0, 0), 'SEGMENT_1':Point(10, 0)}))
+        # read the entity so it is written before the abort
+        self.document.getEntitiesInRegion(-1, -1, 11, 1)
+        self.document.saveEntity(Segment({'SEGMENT_0':Point(0, 1), 'SEGMENT_1':Point(10, 1)}))
+        self.document.abortMassiveCreation()
+        self.assertFalse(BaseDb.commit)
+        BaseDb.commit=True
+        self.assertEqual(self.count("SELECT COUNT(*) FROM pycadent WHERE pycad_entity_id=%s"%_ent.getId()), 0)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM pycadent"), _entity)
+        self.assertEqual(self.count("SELECT COUNT(*) FROM pycadundo"), _undo)
+        self.assertEqual(self.document.getEntitiesInRegion(-1, -1, 11, 2), [])
+
+class TestLayer(unittest.TestCase):
+    """
+        hide, show and delete a layer with all its entity
+    """
+    def setUp(self):
+        self.document=Document()
+        self.layerTable=self.document.getTreeTable
+        self.baseLayer=self.layerTable.getActiveLayer()
+        self.document.saveEntity(Segment({'SEGMENT_0':Point(0, -5), 'SEGMENT_1':Point(0, 5)}))
+        self.layer=self.document.saveEntity(Layer('B'))
+        self.layerTable.insert(self.layer)
+        for _i in xrange(20):
+            self.document.saveEntity(Segment({'SEGMENT_0':Point(_i, 0), 'SEGMENT_1':Point(_i, 1)}))
+        self.layerTable.setActiveLayer(self.baseLayer.getId())
+        self.events=[]
+        self.document.massiveUpdateEvent+=self.eventMassiveUpdate
+
+    def tearDown(self):
+        self.document.getConnection().close()
+        os.remove(self.document.dbPath)
+
+    def eventMassiveUpdate(self, document, entityIds, visible):
+        self.events.append((len(entityIds), visible))
+
+    def segmentCount(self):
+        return len(self.document.getEntityFromType('SEGMENT'))
+
+    def isLayerVisible(self):
+        return self.document.getEntity(self.layer.getId()).getConstructionElements()['LAYER'].visible
+
+    def testHideShow(self):
+        self.layerTable.hide(self.layer.getId())
+        self.assertEqual(self.segmentCount(), 1)
+        self.assertEqual(self.events, [(20, 0)])
+        self.assertFalse(self.isLayerVisible())
+        self.assertEqual(len(self.document.getEntitiesInRegion(-1, -1, 21, 2)), 1)
+        self.layerTable.show(self.layer.getId())
+        self.assertEqual(self.segmentCount(), 21)
+        self.assertEqual(self.events[-1], (20, 1))
+        self.assertTrue(self.isLayerVisible())
+
+    def testHideUndo(self):
+        self.layerTable.hide(self.layer.getId())
+        self.document.unDo()
+        self.assertEqual(self.segmentCount(), 21)
+        self.assertTrue(self.isLayerVisible())
+        self.document.reDo()
+        self.assertEqual(self.segmentCount(), 1)
+        self.assertFalse(self.isLayerVisible())
+
+    def testHiddenEntity(self):
+        # the entity already hidden is not hidden again, the show of the
+        # layer show all its entity
+        _entity=self.document.getEntityFromType('SEGMENT')[-1]
+        self.document.hideEntity(entity=_entity)
+        self.assertEqual(self.segmentCount(), 20)
+        self.layerTable.hide(self.layer.getId())
+        self.assertEqual(self.events[-1], (19, 0))
+        self.layerTable.show(self.layer.getId())
+        self.assertEqual(self.events[-1], (20, 1))
+        self.assertEqual(self.segmentCount(), 21)
+
+    def testDelete(self):
+        self.layerTable.delete(self.layer.getId())
+        self.assertEqual(self.segmentCount(), 1)
+        self.assertEqual(self.events[-1], (20, 0))
+        self.assertEqual(self.document.getEntity(self.layer.getId()).state, 'DELETE')
+        self.assertFalse(self.layer.getId() in [_l.getId() for _l in self.document.getEntityFromType('LAYER')])
+        self.document.unDo()
+        self.assertEqual(self.segmentCount(), 21)
+        self.assertTrue(self.layer.getId() in [_l.getId() for _l in self.document.getEntityFromType('LAYER')])
+        self.assertEqual(len(self.document.getEntitiesInRegion(-1, -1, 21, 2)), 21)
+
+if __name__=='__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# Test of the pythoncad dxf import and export
+# usage: python test_dxf.py
+#
+import sys
+import os
+import math
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Generic'))
+
+from Kernel.document                        import Document
+from Kernel.GeoEntity.point                 import Point
+from Kernel.GeoEntity.arc                   import Arc
+from Kernel.GeoEntity.ellipse               import Ellipse
+from Kernel.GeoEntity.segment               import Segment
+from Kernel.GeoEntity.text                  import Text
+from Kernel.GeoEntity.polyline              import Polyline
+from Kernel.ExternalFormat.Dxf.dxf          import Dxf
+from Kernel.ExternalFormat.Dxf.dxfreader    import DxfReader, iterTags
+
+def writeTempFile(text):
+    _fd, _fileName=tempfile.mkstemp(suffix='.dxf')
+    os.write(_fd, text)
+    os.close(_fd)
+    return _fileName
+
+def entitiesText(entities):
+    return "  0\nSECTION\n  2\nENTITIES\n"+entities+"  0\nENDSEC\n  0\nEOF\n"
+
+class TestDxfReader(unittest.TestCase):
+    """
+        read the dxf entity as pythoncad construction elements
+    """
+    def readItems(self, entities):
+        _fileName=writeTempFile(entitiesText(entities))
+        try:
+            return list(DxfReader(_fileName).iterItems())
+        finally:
+            os.remove(_fileName)
+
+    def testCircle(self):
+        _items=self.readItems("  0\nCIRCLE\n  8\n0\n 10\n1.0\n 20\n2.0\n 30\n0.0\n 40\n3.0\n")
+        self.assertEqual(len(_items), 1)
+        _type, _cElements=_items[0]
+        self.assertEqual(_type, 'ARC')
+        self.assertEqual(_cElements['ARC_0'].getCoords(), (1.0, 2.0))
+        self.assertEqual(_cElements['ARC_1'], 3.0)
+        # the circle is a full arc as the one of the circle command
+        self.assertEqual(_cElements['ARC_2'], 0.0)
+        self.assertAlmostEqual(_cElements['ARC_3'], 2.0*math.pi)
+        self.assertAlmostEqual(Arc(_cElements).getAngle(), 2.0*math.pi)
+
+class TestDxfRoundTrip(unittest.TestCase):
+    """
+        export a document and import it in a new document
+    """
+    def setUp(self):
+        self.document=Document()
+        _fd, self.fileName=tempfile.mkstemp(suffix='.dxf')
+        os.close(_fd)
+
+    def tearDown(self):
+        os.remove(self.fileName)
+
+    def roundTrip(self):
+        Dxf(self.document, self.fileName).exportEntitis()
+        _document=Document()
+        Dxf(_document, self.fileName).importEntitis()
+        return _document.getAllDrawingEntity()
+
+    def testCircle(self):
+        self.document.saveEntity(Arc({'ARC_0':Point(5.0, 5.0), 'ARC_1':2.0,
+                                      'ARC_2':0.0, 'ARC_3':2.0*math.pi}))
+        _entitys=self.roundTrip()
+        self.assertEqual(len(_entitys), 1)
+        _cElements=_entitys[0].getConstructionElements()
+        self.assertEqual(_cElements['ARC_1'], 2.0)
+        self.assertAlmostEqual(_cElements['ARC_3'], 2.0*math.pi)
+        self.assertEqual(_entitys[0].getBBox(), (3.0, 3.0, 7.0, 7.0))
+
+    def testEntities(self):
+        self.document.saveEntity(Segment({'SEGMENT_0':Point(0.0, 0.0), 'SEGMENT_1':Point(3.0, 4.0)}))
+        self.document.saveEntity(Arc({'ARC_0':Point(5.0, 5.0), 'ARC_1':2.0,
+                                      'ARC_2':0.5, 'ARC_3':1.0}))
+        self.document.saveEntity(Text({'TEXT_0':Point(1.0, 1.0), 'TEXT_1':u'h\xe9llo\nworld',
+                                       'TEXT_2':-math.pi/2, 'TEXT_3':None}))
+        self.document.saveEntity(Polyline({'POLYLINE_0':Point(0.0, 0.0), 'POLYLINE_1':Point(1.0, 0.0),
+                                           'POLYLINE_2':Point(1.0, 1.0)}))
+        _entitys={}
+        for _ent in self.roundTrip():
+            _entitys[_ent.getEntityType()]=_ent.getConstructionElements()
+        self.assertEqual(sorted(_entitys.keys()), ['ARC', 'POLYLINE', 'SEGMENT', 'TEXT'])
+        self.assertEqual(_entitys['SEGMENT']['SEGMENT_1'].getCoords(), (3.0, 4.0))
+        self.assertAlmostEqual(_entitys['ARC']['ARC_2'], 0.5)
+        self.assertAlmostEqual(_entitys['ARC']['ARC_3'], 1.0)
+        self.assertEqual(_entitys['TEXT']['TEXT_1'], u'h\xe9llo\nworld'.encode('utf-8'))
+        self.assertAlmostEqual(_entitys['TEXT']['TEXT_2'], -math.pi/2)
+        self.assertEqual([_p.getCoords() for _p in Polyline(_entitys['POLYLINE']).points()],
+                         [(0.0, 0.0), (1.0, 0.0), (1.0, 1.0)])
+
+    def testImportEvent(self):
+        self.document.saveEntity(Arc({'ARC_0':Point(5.0, 5.0), 'ARC_1':2.0,
+                                      'ARC_2':0.0, 'ARC_3':2.0*math.pi}))
+        Dxf(self.document, self.fileName).exportEntitis()
+        _document=Document()
+        _undoRedo=[]
+        _update=[]
+        _document.undoRedoEvent+=lambda document, entityIds: _undoRedo.append(entityIds)
+        _document.massiveUpdateEvent+=lambda document, entityIds, visible: _update.append((entityIds, visible))
+        Dxf(_document, self.fileName).importEntitis()
+        # the import is not an undo, only the new entity are notified
+        self.assertEqual(_undoRedo, [])
+        _ids=[_ent.getId() for _ent in _document.getAllDrawingEntity()]
+        self.assertEqual(_update, [(_ids, 1)])
+
+    def testImportFailure(self):
+        self.document.saveEntity(Segment({'SEGMENT_0':Point(0.0, 0.0), 'SEGMENT_1':Point(3.0, 4.0)}))
+        Dxf(self.document, self.fileName).exportEntitis()
+        _document=Document()
+        _saveEntityRecords=_document.saveEntityRecords
+        def saveEntityRecords(records):
+            _saveEntityRecords(records)
+            raise ValueError, "save failure"
+        _document.saveEntityRecords=saveEntityRecords
+        self.assertRaises(ValueError, Dxf(_document, self.fileName).importEntitis)
+        del _document.saveEntityRecords
+        # the entity saved before the failure are rolled back
+        self.assertEqual(_document.getAllDrawingEntity(), [])
+
+    def testEllipse(self):
+        self.document.saveEntity(Ellipse({'ELLIPSE_0':Point(1.0, 1.0),
+                                          'ELLIPSE_1':2.0, 'ELLIPSE_2':6.0}))
+        Dxf(self.document, self.fileName).exportEntitis()
+        _tags=list(iterTags(open(self.fileName).readlines()))
+        _index=_tags.index((0, 'ELLIPSE'))
+        _values={}
+        for _code, _value in _tags[_index+1:]:
+            if _code==0:
+                break
+            _values[_code]=_value
+        # the major axis end point is the half of the ellipse height
+        self.assertEqual((float(_values[11]), float(_values[21])), (0.0, 3.0))
+        self.assertAlmostEqual(float(_values[40]), 2.0/6.0)
+
+if __name__=='__main__':
+    unittest.main()
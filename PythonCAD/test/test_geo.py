@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+#
+# Copyright (c) 2010 Matteo Boscolo
+#
+# This file is part of PythonCAD.
+#
+# PythonCAD is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# PythonCAD is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with PythonCAD; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#
+#
+# Test of the pythoncad geometry
+# usage: python test_geo.py
+#
+import sys
+import os
+import math
+import random
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Generic'))
+
+from Kernel.GeoEntity.point                 import Point
+from Kernel.GeoEntity.segment               import Segment
+from Kernel.GeoEntity.arc                   import Arc
+from Kernel.GeoEntity.cline                 import CLine
+from Kernel.GeoEntity.ccircle               import CCircle
+from Kernel.GeoEntity.ellipse               import Ellipse
+from Kernel.GeoEntity.text                  import Text
+from Kernel.GeoEntity.polyline              import Polyline
+from Kernel.GeoEntity.vertexarray           import VertexArray
+from Kernel.GeoUtil.intersection            import find_intersections
+from Kernel.GeoUtil                         import batchintersection
+from Kernel.GeoUtil.batchintersection       import find_intersections_batch
+from Kernel.GeoUtil                         import gridintersection
+from Kernel.GeoUtil.gridintersection        import find_all_intersections
+from Kernel.GeoUtil.affine                  import *
+from Kernel.GeoUtil.rotate                  import rotate_objects
+from Kernel.Db.entitycodec                  import encodeConstructionElements, decodeConstructionElements
+
+def randomValue():
+    return random.uniform(-10.0, 10.0)
+
+def randomPoint():
+    return Point(randomValue(), randomValue())
+
+def randomSegment():
+    return Segment({'SEGMENT_0':randomPoint(), 'SEGMENT_1':randomPoint()})
+
+def randomShortSegment():
+    _p=randomPoint()
+    return Segment({'SEGMENT_0':_p, 'SEGMENT_1':Point(_p.x+random.uniform(-2.0, 2.0),
+                                                     _p.y+random.uniform(-2.0, 2.0))})
+
+def randomArc():
+    return Arc({'ARC_0':randomPoint(), 'ARC_1':random.uniform(1.0, 8.0),
+                'ARC_2':random.uniform(0.0, 2.0*math.pi), 'ARC_3':random.uniform(0.5, 6.0)})
+
+def randomCircle():
+    return Arc({'ARC_0':randomPoint(), 'ARC_1':random.uniform(1.0, 8.0),
+                'ARC_2':0.0, 'ARC_3':2.0*math.pi})
+
+def randomCLine():
+    return CLine({'CLINE_0':randomPoint(), 'CLINE_1':randomPoint()})
+
+def randomCCircle():
+    return CCircle({'CCIRCLE_0':randomPoint(), 'CCIRCLE_1':random.uniform(1.0, 8.0)})
+
+def randomEllipse():
+    return Ellipse({'ELLIPSE_0':randomPoint(), 'ELLIPSE_1':random.uniform(2.0, 16.0),
+                    'ELLIPSE_2':random.uniform(2.0, 16.0)})
+
+def randomPolyline():
+    return Polyline(dict([('POLYLINE_%s'%str(i), randomPoint()) for i in xrange(4)]))
+
+def roundHits(hits):
+    return set([(a, b, round(x, 6), round(y, 6)) for a, b, x, y in hits])
+
+def pairwiseHits(entitiesA, entitiesB=None):
+    """
+        the intersection of all the pairs computed one by one
+    """
+    _hits=set()
+    for i, _a in enumerate(entitiesA):
+        if entitiesB is None:
+            _others=enumerate(entitiesA[i+1:], i+1)
+        else:
+            _others=enumerate(entitiesB)
+        for j, _b in _others:
+            for x, y in find_intersections(_a, _b):
+                _hits.add((i, j, round(x, 6), round(y, 6)))
+    return _hits
+
+class TestIntersection(unittest.TestCase):
+    """
+        the native intersection give the points of the sympy one
+    """
+    def setUp(self):
+        random.seed(3)
+
+    def assertSamePoints(self, native, exact):
+        self.assertEqual(len(native), len(exact), (native, exact))
+        for x, y in native:
+            self.assertTrue([1 for ex, ey in exact if abs(x-ex)<1e-6 and abs(y-ey)<1e-6],
+                            (native, exact))
+
+    def checkKinds(self, makeA, makeB, count=8):
+        for i in xrange(count):
+            _a, _b=makeA(), makeB()
+            self.assertSamePoints(find_intersections(_a, _b), find_intersections(_a, _b, exact=True))
+
+    def testSegmentSegment(self):
+        self.checkKinds(randomSegment, randomSegment)
+
+    def testSegmentCircle(self):
+        self.checkKinds(randomSegment, randomCircle)
+
+    def testSegmentArc(self):
+        self.checkKinds(randomSegment, randomArc)
+
+    def testArcArc(self):
+        self.checkKinds(randomArc, randomArc)
+
+    def testSegmentEllipse(self):
+        self.checkKinds(randomSegment, randomEllipse, 4)
+
+    def testCLineCCircle(self):
+        self.checkKinds(randomCLine, randomCCircle)
+
+    def testCLineCLine(self):
+        self.checkKinds(randomCLine, randomCLine)
+
+    def testTangent(self):
+        _circle=CCircle({'CCIRCLE_0':Point(0, 0), 'CCIRCLE_1':1.0})
+        _line=CLine({'CLINE_0':Point(-2, 1), 'CLINE_1':Point(2, 1)})
+        self.assertSamePoints(find_intersections(_line, _circle), [(0.0, 1.0)])
+
+    def testPolyline(self):
+        _polyline=Polyline({'POLYLINE_0':Point(-5, 0), 'POLYLINE_1':Point(0, 0), 'POLYLINE_2':Point(0, 5)})
+        _segment=Segment({'SEGMENT_0':Point(-3, 1), 'SEGMENT_1':Point(3, 1)})
+        self.assertSamePoints(find_intersections(_polyline, _segment), [(0.0, 1.0)])
+
+class TestBatchIntersection(unittest.TestCase):
+    """
+        the batch intersection give the points of the pairwise one
+    """
+    def setUp(self):
+        random.seed(3)
+        _kinds=[randomSegment, randomArc, randomCLine, randomCCircle, randomPolyline]
+        self.entitiesA=[random.choice(_kinds)() for i in xrange(40)]
+        self.entitiesB=[random.choice(_kinds)() for i in xrange(30)]
+        self.numpy=batchintersection.numpy
+
+    def tearDown(self):
+        batchintersection.numpy=self.numpy
+
+    def testTwoLists(self):
+        _reference=pairwiseHits(self.entitiesA, self.entitiesB)
+        self.assertTrue(_reference)
+        self.assertEqual(roundHits(find_intersections_batch(self.entitiesA, self.entitiesB)), _reference)
+
+    def testSameList(self):
+        _reference=pairwiseHits(self.entitiesA)
+        self.assertEqual(roundHits(find_intersections_batch(self.entitiesA)), _reference)
+
+    def testWithoutNumpy(self):
+        _reference=pairwiseHits(self.entitiesA, self.entitiesB)
+        batchintersection.numpy=None
+        self.assertEqual(roundHits(find_intersections_batch(self.entitiesA, self.entitiesB)), _reference)
+
+    def testEllipse(self):
+        _ellipses=[randomEllipse() for i in xrange(5)]
+        _lines=[random.choice([randomSegment, randomCLine])() for i in xrange(20)]
+        self.assertEqual(roundHits(find_intersections_batch(_ellipses, _lines)),
+                         pairwiseHits(_ellipses, _lines))
+
+    def testIds(self):
+        _a=('a', Segment({'SEGMENT_0':Point(0, 0), 'SEGMENT_1':Point(10, 10)}))
+        _b=('b', Segment({'SEGMENT_0':Point(0, 10), 'SEGMENT_1':Point(10, 0)}))
+        self.assertEqual(find_intersections_batch([_a], [_b]), [('a', 'b', 5.0, 5.0)])
+
+class TestGridIntersection(unittest.TestCase):
+    """
+        the grid intersection give the points of the batch one
+    """
+    def setUp(self):
+        random.seed(5)
+        _kinds=[randomSegment, randomArc, randomCLine, randomCCircle,
+                randomShortSegment, randomShortSegment, randomShortSegment]
+        self.entitys=[random.choice(_kinds)() for i in xrange(150)]
+        self.numpy=gridintersection.numpy
+
+    def tearDown(self):
+        gridintersection.numpy=self.numpy
+
+    def testBatch(self):
+        _reference=roundHits(find_intersections_batch(self.entitys))
+        self.assertEqual(roundHits(find_all_intersections(self.entitys)), _reference)
+        for _cellSize in (0.5, 5.0, 1000.0):
+            self.assertEqual(roundHits(find_all_intersections(self.entitys, _cellSize)), _reference)
+        gridintersection.numpy=None
+        self.assertEqual(roundHits(find_all_intersections(self.entitys)), _reference)
+
+    def testSelfIntersection(self):
+        _bow=Polyline({'POLYLINE_0':Point(0, 0), 'POLYLINE_1':Point(10, 10), 'POLYLINE_2':Point(10, 0),
+                       'POLYLINE_3':Point(0, 10), 'POLYLINE_4':Point(0, 0)})
+        self.assertEqual(roundHits(find_all_intersections([_bow])), set([(0, 0, 5.0, 5.0)]))
+        _square=Polyline({'POLYLINE_0':Point(0, 0), 'POLYLINE_1':Point(10, 0), 'POLYLINE_2':Point(10, 10),
+                          'POLYLINE_3':Point(0, 10), 'POLYLINE_4':Point(0, 0)})
+        self.assertEqual(find_all_intersections([_square]), [])
+
+    def testOverlap(self):
+        _entitys=[Segment({'SEGMENT_0':Point(0, 0), 'SEGMENT_1':Point(10, 0)}),
+                  Segment({'SEGMENT_0':Point(5, 0), 'SEGMENT_1':Point(20, 0)}),
+                  CLine({'CLINE_0':Point(0, 0), 'CLINE_1':Point(1, 0)})]
+        _reference=set([(0, 1, 5, 0), (0, 1, 10, 0), (0, 2, 0, 0), (0, 2, 10, 0), (1, 2, 5, 0), (1, 2, 20, 0)])
+        self.assertEqual(roundHits(find_all_intersections(_entitys)), _reference)
+        gridintersection.numpy=None
+        self.assertEqual(roundHits(find_all_intersections(_entitys)), _reference)
+
+class TestPolyline(unittest.TestCase):
+    """
+        the polyline points are stored in a VertexArray
+    """
+    def setUp(self):
+        self.kw=dict([('POLYLINE_%s'%str(i), Point(i, i%2)) for i in xrange(12)])
+        self.polyline=Polyline(self.kw)
+
+    def testLegacyKeys(self):
+        self.assertEqual([_p.getCoords() for _p in self.polyline.points()],
+                         [(float(i), float(i%2)) for i in xrange(12)])
+        self.assertEqual(self.polyline.getNumPoints(), 12)
+        self.assertEqual(self.polyline.getPoint(-1).getCoords(), (11.0, 1.0))
+        self.assertEqual(self.polyline.getBBox(), (0.0, 0.0, 11.0, 1.0))
+        self.assertEqual(len(self.polyline.getSegments()), 11)
+
+    def testVertexArray(self):
+        _polyline=Polyline({'POLYLINE_VERTEX':VertexArray([1, 0, 2, 0, 3, 0])})
+        self.assertEqual(_polyline.getNumPoints(), 3)
+        self.assertEqual(_polyline.getPoint(2).getCoords(), (3.0, 0.0))
+        self.assertEqual(Polyline({'POLYLINE_VERTEX':self.polyline.vertex.reverse()}), self.polyline)
+
+    def testClone(self):
+        _clone=self.polyline.clone()
+        self.assertEqual(_clone, self.polyline)
+        self.assertFalse(_clone.vertex is self.polyline.vertex)
+        _clone.move(Point(0, 0), Point(1, 2))
+        self.assertEqual(_clone.getPoint(0).getCoords(), (1.0, 2.0))
+        self.assertEqual(self.polyline.getPoint(0).getCoords(), (0.0, 0.0))
+
+    def testAddDelPoint(self):
+        _polyline=self.polyline.clone()
+        _polyline.addPoint('POLYLINE_1', Point(9, 9))
+        self.assertEqual(_polyline.getPoint(1).getCoords(), (9.0, 9.0))
+        self.assertEqual(_polyline.getNumPoints(), 13)
+        _polyline.delPoint(1)
+        self.assertEqual(_polyline, self.polyline)
+
+    def testCodec(self):
+        _data=encodeConstructionElements('POLYLINE', self.polyline.getConstructionElements())
+        self.assertEqual(decodeConstructionElements('POLYLINE', _data)['POLYLINE_VERTEX'], self.polyline.vertex)
+        _data=encodeConstructionElements('POLYLINE', self.kw)
+        self.assertEqual(Polyline(decodeConstructionElements('POLYLINE', _data)), self.polyline)
+
+class TestTransform(unittest.TestCase):
+    """
+        the affine transformation of the construction elements
+    """
+    def assertNear(self, a, b):
+        self.assertTrue(abs(a-b)<1e-9, (a, b))
+
+    def transform(self, entityType, cElements, matrix):
+        return transform_construction_elements([(entityType, cElements)], matrix)[0]
+
+    def testTranslation(self):
+        _cElements=self.transform('SEGMENT', {'SEGMENT_0':Point(0, 0), 'SEGMENT_1':Point(10, 5)},
+                                  translation_matrix(1.0, 2.0))
+        self.assertEqual(_cElements['SEGMENT_0'].getCoords(), (1.0, 2.0))
+        self.assertEqual(_cElements['SEGMENT_1'].getCoords(), (11.0, 7.0))
+
+    def testRotation(self):
+        _arc=Arc({'ARC_0':Point(3, 4), 'ARC_1':2.0, 'ARC_2':0.3, 'ARC_3':1.0})
+        _cElements=self.transform('ARC', _arc.getConstructionElements(), rotation_matrix(1.0, 2.0, 0.7))
+        _reference=Arc({'ARC_0':Point(3, 4), 'ARC_1':2.0, 'ARC_2':0.3, 'ARC_3':1.0})
+        _reference.rotate(Point(1, 2), 0.7)
+        self.assertNear(_cElements['ARC_0'].x, _reference.center.x)
+        self.assertNear(_cElements['ARC_0'].y, _reference.center.y)
+        self.assertNear(math.sin(_cElements['ARC_2']), math.sin(_reference.startAngle))
+        self.assertNear(_cElements['ARC_1'], 2.0)
+
+    def testMirror(self):
+        _arc=Arc({'ARC_0':Point(3, 4), 'ARC_1':2.0, 'ARC_2':0.3, 'ARC_3':1.0})
+        _start, _end=_arc.getEndpoints()
+        _mirror=Arc(self.transform('ARC', _arc.getConstructionElements(), mirror_matrix(0, 0, 1, 1)))
+        _newStart, _newEnd=_mirror.getEndpoints()
+        # the mirror swap the arc end points
+        self.assertNear(_newStart.x, _end.y)
+        self.assertNear(_newStart.y, _end.x)
+        self.assertNear(_newEnd.x, _start.y)
+        self.assertNear(_newEnd.y, _start.x)
+
+    def testScale(self):
+        _cElements=self.transform('ARC', {'ARC_0':Point(1, 1), 'ARC_1':3.0, 'ARC_2':0.0,
+                                          'ARC_3':2.0*math.pi}, scale_matrix(0, 0, 2.0))
+        self.assertNear(_cElements['ARC_1'], 6.0)
+        self.assertRaises(ValueError, self.transform, 'ARC', _cElements, scale_matrix(0, 0, 2.0, 1.0))
+
+    def testEllipse(self):
+        _cElements=self.transform('ELLIPSE', {'ELLIPSE_0':Point(5, 5), 'ELLIPSE_1':4.0,
+                                              'ELLIPSE_2':2.0}, rotation_matrix(0, 0, math.pi/2))
+        self.assertNear(_cElements['ELLIPSE_0'].x, -5.0)
+        self.assertEqual((_cElements['ELLIPSE_1'], _cElements['ELLIPSE_2']), (2.0, 4.0))
+
+    def testPolyline(self):
+        _cElements=self.transform('POLYLINE', {'POLYLINE_VERTEX':VertexArray([1, 0, 2, 0])},
+                                  translation_matrix(0.0, 1.0))
+        self.assertEqual([_p.getCoords() for _p in Polyline(_cElements).points()], [(1.0, 1.0), (2.0, 1.0)])
+
+class TestRotate(unittest.TestCase):
+    """
+        rotate the geometrical entity in a single pass
+    """
+    def assertNear(self, a, b):
+        self.assertTrue(abs(a-b)<1e-9, (a, b))
+
+    def testSharedPoint(self):
+        _p=Point(10, 0)
+        _s1=Segment({'SEGMENT_0':_p, 'SEGMENT_1':Point(20, 0)})
+        _s2=Segment({'SEGMENT_0':_p, 'SEGMENT_1':Point(10, 5)})
+        rotate_objects([_s1, _s2, _p], 0, 0, 90)
+        # the shared point is rotated once
+        self.assertNear(_p.x, 0.0)
+        self.assertNear(_p.y, 10.0)
+        self.assertNear(_s1.getEndpoints()[1].y, 20.0)
+
+    def testArc(self):
+        _arc=Arc({'ARC_0':Point(1, 1), 'ARC_1':2.0, 'ARC_2':0.5, 'ARC_3':1.0})
+        _reference=_arc.clone()
+        _reference.rotate(Point(3, 4), math.radians(30))
+        rotate_objects([_arc], 3, 4, 30)
+        self.assertNear(_arc.center.x, _reference.center.x)
+        self.assertNear(_arc.center.y, _reference.center.y)
+        self.assertNear(_arc['ARC_2'], _reference['ARC_2'])
+
+    def testText(self):
+        _text=Text({'TEXT_0':Point(1, 2), 'TEXT_1':'a', 'TEXT_2':0.1, 'TEXT_3':'sw'})
+        rotate_objects([_text], 0, 0, 45)
+        self.assertNear(_text['TEXT_2'], 0.1-math.pi/4)
+
+    def testEllipse(self):
+        _ellipse=Ellipse({'ELLIPSE_0':Point(5, 0), 'ELLIPSE_1':4.0, 'ELLIPSE_2':2.0})
+        rotate_objects([_ellipse], 0, 0, -90)
+        self.assertNear(_ellipse['ELLIPSE_1'], 2.0)
+        self.assertNear(_ellipse['ELLIPSE_0'].y, -5.0)
+        # the ellipse axis can not be rotated of 30 degrees, nothing is changed
+        _segment=Segment({'SEGMENT_0':Point(1, 0), 'SEGMENT_1':Point(2, 0)})
+        self.assertRaises(ValueError, rotate_objects, [_segment, _ellipse], 0, 0, 30)
+        self.assertNear(_ellipse['ELLIPSE_1'], 2.0)
+        self.assertNear(_segment.getEndpoints()[0].x, 1.0)
+
+    def testPolyline(self):
+        _polyline=Polyline({'POLYLINE_VERTEX':VertexArray([1, 0, 2, 0, 3, 0])})
+        rotate_objects((_polyline, _polyline), 0, 0, 180)
+        self.assertNear(_polyline.getPoint(2).x, -3.0)
+
+    def testError(self):
+        self.assertRaises(TypeError, rotate_objects, [object()], 0, 0, 10)
+
+if __name__=='__main__':
+    unittest.main()